@@ -0,0 +1,4 @@
+"""Benchmarks for syncfiles, run with python -m benchmarks.run_benchmarks.
+
+Author: Kevin Hodge
+"""
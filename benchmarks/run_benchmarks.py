@@ -0,0 +1,468 @@
+"""Runs the syncfiles benchmarks on synthetic trees and writes the results to JSON.
+
+Usage:
+    python -m benchmarks.run_benchmarks [--entries N [N ...]] [--repeat N] [--depth N] [--memory] [--output FILE]
+
+Example (10k, 100k and 1M entries):
+    python -m benchmarks.run_benchmarks --entries 10000 100000 1000000 --output results.json
+
+--memory runs the benchmarks on an in-memory file system (MemoryFileSystem) instead of a temporary directory, which
+removes disk noise and makes 1M entry trees practical.
+
+The sync_sequential and sync_pipeline benchmarks run the initial sync of the same tree with Check and Sync one after
+the other and with SyncPipeline, first_copy_sequential and first_copy_pipeline are the seconds until each copied its
+first file.
+
+The scan_all and scan_ignored benchmarks scan a tree where 90% of the entries are in node_modules, without ignore
+rules and with node_modules/ excluded.
+
+The traverse_list and traverse_stream benchmarks build the path of every entry of the tree, as a list with
+FileStructure.files_to_list and one path at a time from FileStructure.iter_entries, and also report the peak memory
+allocated during the walk (peak_bytes, from tracemalloc).
+
+The trees_separate_names and trees_shared_names benchmarks load two identical trees and the snapshot (as read from
+its JSON file), with a NameTable per sync directory and with one shared NameTable, and report the memory the loaded
+trees hold (retained_bytes, from tracemalloc).
+
+The diff_in_memory and diff_external benchmarks check two synced trees against their snapshot with FileStructures and
+with StreamingDiff (sorted runs on disk, with a 64 KiB memory budget), and report the peak memory allocated during
+the check (peak_bytes, from tracemalloc).
+
+The check_full and check_digests benchmarks check a synced, unchanged tree against its snapshot without and with the
+Merkle digests stored in the snapshot (see merkle.py), after the tree has been scanned.
+
+The plan_entries benchmark plans a sync of the changed entries without copying or deleting anything: it creates the
+SyncManager (which gathers the sync directories and tombstones) and runs the per-entry planning loop (entry attributes
+and the path of the entry in each sync directory).
+
+The deep_* benchmarks run the tree algorithms on a chain of --depth nested directories, seconds_per_level is the time
+divided by the depth.
+
+Each benchmark reports the best time of --repeat runs, except the sync benchmarks which change the trees and run once.
+Compare the output files of two commits to find regressions.
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from syncfiles.entry import dir_entry
+from syncfiles.external_diff import StreamingDiff
+from syncfiles.file_structure import FileStructure
+from syncfiles.file_system_interface import DBInterface, FSInterface
+from syncfiles.ignore_rules import IgnoreRules
+from syncfiles.memory_interface import MemoryFileSystem
+from syncfiles.name_table import NameTable
+from syncfiles.pipeline import SyncPipeline
+from syncfiles.snapshot_records import read_records, records_to_snapshot, snapshot_to_records, write_records
+from syncfiles.sync_manager import SyncManager
+from syncfiles.sync_stats import SyncStats
+from benchmarks.tree_generator import TreeSpec, apply_changes, generate_tree
+
+
+def time_best(function: Callable[[], Any], repeat: int) -> float:
+    """Gets the shortest time (seconds) of repeat calls to function."""
+    best_time: float = float("inf")
+    for _ in range(repeat):
+        start_time: float = time.perf_counter()
+        function()
+        best_time = min(best_time, time.perf_counter() - start_time)
+    return best_time
+
+
+def time_once(function: Callable[[], Any]) -> float:
+    return time_best(function, 1)
+
+
+def time_peak_memory(function: Callable[[], Any]) -> Tuple[float, int]:
+    """Gets the time (seconds, slowed down by tracemalloc) and the peak memory allocated (bytes) of one call."""
+    tracemalloc.start()
+    try:
+        start_time: float = time.perf_counter()
+        function()
+        seconds: float = time.perf_counter() - start_time
+        peak_bytes: int = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak_bytes
+
+
+def sync_cycle(fstructs: List[FileStructure], db: Type[DBInterface], last_sync_dict: Dict[str, Any],
+               stats: Optional[SyncStats] = None) -> Dict[str, Any]:
+    """Runs the work of Check and Sync: scan, diff, plan, sync and snapshot.
+
+    Returns:
+        dict[str, Any]: New last sync snapshot.
+    """
+    for fstruct in fstructs:
+        fstruct.update_file_structure()
+        fstruct.check_file_structure(last_sync_dict)
+    sync_manager: SyncManager = SyncManager(fstructs, db, stats=stats)
+    sync_manager.sync()
+    return sync_manager.get_last_sync()
+
+
+def stream_paths(fstruct: FileStructure) -> Iterator[str]:
+    """Yields the paths of FileStructure.files_to_list one at a time, without holding the list."""
+    directory_path: str = fstruct.get_directory_path()
+    for relative_path, _ in fstruct.iter_entries():
+        yield str(fstruct.db(directory_path) / relative_path)
+
+
+def plan_entries(fstructs: List[FileStructure], db: Type[DBInterface]) -> int:
+    """Creates a SyncManager and runs the per-entry planning of SyncManager.sync_updated without performing the
+    actions: the attributes of each updated entry and its path in every sync directory.
+
+    Returns:
+        int: Number of entries planned.
+    """
+    sync_manager: SyncManager = SyncManager(fstructs, db)
+    entry_count: int = 0
+    for fstruct, directory in zip(sync_manager.fstructs, sync_manager.fstruct_dirs):
+        for fstruct_entry, _ in fstruct.iter_updated():
+            sync_manager.get_entry_attributes(fstruct_entry, directory)
+            for sync_dir in sync_manager.fstruct_dirs:
+                sync_manager.join_paths(sync_dir, fstruct_entry)
+            entry_count += 1
+    return entry_count
+
+
+def benchmark_tree(entry_count: int, base_dir: str, db: Type[DBInterface] = FSInterface, repeat: int = 3,
+                   **spec_kwargs: Any) -> List[Dict[str, Any]]:
+    """Runs every benchmark on a tree of about entry_count entries created in base_dir.
+
+    Returns:
+        results (list[dict[str, Any]]): Benchmark name, entry count, seconds and number of runs of each benchmark.
+    """
+    spec: TreeSpec = TreeSpec.for_entry_count(entry_count, **spec_kwargs)
+    root1: str = str(db(base_dir) / f"tree_{entry_count}_1")
+    root2: str = str(db(base_dir) / f"tree_{entry_count}_2")
+    generate_tree(root1, spec, db)
+    db(root2).mkdir(parents=True, exist_ok=True)
+    results: List[Dict[str, Any]] = []
+
+    def add_result(name: str, seconds: float, runs: int) -> None:
+        results.append({'benchmark': name, 'entries': spec.get_entry_count(), 'seconds': seconds, 'runs': runs})
+
+    fstruct1: FileStructure = FileStructure(root1, db)
+    fstruct2: FileStructure = FileStructure(root2, db, side=1)
+    add_result("update_file_structure", time_best(fstruct1.update_file_structure, repeat), repeat)
+    snapshot: Dict[str, Any] = fstruct1.files_to_json()
+    add_result("to_json", time_best(fstruct1.files_to_json, repeat), repeat)
+    add_result("from_json", time_best(lambda: fstruct1.from_json(snapshot), repeat), repeat)
+    for name, traverse in [("traverse_list", lambda: len(fstruct1.files_to_list())),
+                           ("traverse_stream", lambda: sum(1 for _ in stream_paths(fstruct1)))]:
+        seconds, peak_bytes = time_peak_memory(traverse)
+        add_result(name, seconds, 1)
+        results[-1]['peak_bytes'] = peak_bytes
+
+    last_sync: Dict[str, Any] = {}
+    start_time: float = time.perf_counter()
+    last_sync = sync_cycle([fstruct1, fstruct2], db, last_sync)
+    add_result("sync_initial", time.perf_counter() - start_time, 1)
+
+    apply_changes(root1, spec, db)
+    for fstruct in [fstruct1, fstruct2]:
+        fstruct.update_file_structure()
+    add_result("check_file_structure", time_best(lambda: fstruct1.check_file_structure(last_sync), repeat), repeat)
+    fstruct2.check_file_structure(last_sync)
+    add_result("plan_entries", time_best(lambda: plan_entries([fstruct1, fstruct2], db), repeat), repeat)
+    add_result("sync_changes", time_once(lambda: sync_cycle([fstruct1, fstruct2], db, last_sync)), 1)
+    return results
+
+
+def benchmark_ignored_scan(entry_count: int, base_dir: str, db: Type[DBInterface] = FSInterface, repeat: int = 3,
+                           excluded_fraction: float = 0.9, **spec_kwargs: Any) -> List[Dict[str, Any]]:
+    """Times scanning a tree dominated by an excluded directory (node_modules), with and without ignore rules.
+
+    Returns:
+        results (list[dict[str, Any]]): Same format as benchmark_tree.
+    """
+    root: str = str(db(base_dir) / f"ignored_{entry_count}")
+    excluded_spec: TreeSpec = TreeSpec.for_entry_count(max(int(entry_count * excluded_fraction), 1), **spec_kwargs)
+    included_spec: TreeSpec = TreeSpec.for_entry_count(max(entry_count - excluded_spec.get_entry_count(), 1),
+                                                       **spec_kwargs)
+    generate_tree(str(db(root) / "node_modules"), excluded_spec, db)
+    generate_tree(str(db(root) / "src"), included_spec, db)
+    ignore_rules: IgnoreRules = IgnoreRules(["node_modules/", "*.tmp"])
+    total_entries: int = excluded_spec.get_entry_count() + included_spec.get_entry_count() + 2
+    fstruct_all: FileStructure = FileStructure(root, db)
+    fstruct_ignored: FileStructure = FileStructure(root, db, ignore_rules=ignore_rules)
+    return [
+        {'benchmark': "scan_all", 'entries': total_entries,
+         'seconds': time_best(fstruct_all.update_file_structure, repeat), 'runs': repeat},
+        {'benchmark': "scan_ignored", 'entries': total_entries,
+         'seconds': time_best(fstruct_ignored.update_file_structure, repeat), 'runs': repeat},
+    ]
+
+
+def benchmark_pipeline(entry_count: int, base_dir: str, db: Type[DBInterface] = FSInterface,
+                       **spec_kwargs: Any) -> List[Dict[str, Any]]:
+    """Times the initial sync of a tree with Check and Sync in sequence and with SyncPipeline.
+
+    Returns:
+        results (list[dict[str, Any]]): Same format as benchmark_tree, first_copy_* are the seconds until the first
+            file was copied.
+    """
+    spec: TreeSpec = TreeSpec.for_entry_count(entry_count, **spec_kwargs)
+    results: List[Dict[str, Any]] = []
+    for mode in ["sequential", "pipeline"]:
+        root1: str = str(db(base_dir) / f"{mode}_{entry_count}_1")
+        root2: str = str(db(base_dir) / f"{mode}_{entry_count}_2")
+        generate_tree(root1, spec, db)
+        db(root2).mkdir(parents=True, exist_ok=True)
+        fstructs: List[FileStructure] = [FileStructure(root1, db), FileStructure(root2, db, side=1)]
+        stats: SyncStats = SyncStats()
+        if mode == "sequential":
+            sync_cycle(fstructs, db, {}, stats)
+        else:
+            SyncPipeline(fstructs, db, stats).run({})
+        stats.finish()
+        first_copy_latency: Optional[float] = stats.first_copy_latency
+        results.append({'benchmark': f"sync_{mode}", 'entries': spec.get_entry_count(), 'seconds': stats.get_latency(),
+                        'runs': 1})
+        results.append({'benchmark': f"first_copy_{mode}", 'entries': spec.get_entry_count(),
+                        'seconds': first_copy_latency if first_copy_latency is not None else stats.get_latency(),
+                        'runs': 1})
+    return results
+
+
+def benchmark_names(entry_count: int, base_dir: str, db: Type[DBInterface] = FSInterface,
+                    **spec_kwargs: Any) -> List[Dict[str, Any]]:
+    """Loads two identical trees and their snapshot with separate and with shared NameTables.
+
+    Returns:
+        results (list[dict[str, Any]]): Same format as benchmark_tree, with the bytes held by the loaded trees.
+    """
+    spec: TreeSpec = TreeSpec.for_entry_count(entry_count, **spec_kwargs)
+    roots: List[str] = [str(db(base_dir) / f"names_{entry_count}_{index}") for index in [1, 2]]
+    for root in roots:
+        generate_tree(root, spec, db)
+    snapshot_json: str = json.dumps(FileStructure(roots[0], db).files_to_json())
+    results: List[Dict[str, Any]] = []
+    for name, shared in [("trees_separate_names", False), ("trees_shared_names", True)]:
+        shared_table: Optional[NameTable] = NameTable() if shared else None
+        tracemalloc.start()
+        try:
+            start_time: float = time.perf_counter()
+            fstructs: List[FileStructure] = [FileStructure(root, db, name_table=shared_table) for root in roots]
+            last_sync_files: dir_entry = fstructs[0].from_json(json.loads(snapshot_json))
+            seconds: float = time.perf_counter() - start_time
+            retained_bytes: int = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        del fstructs, last_sync_files
+        results.append({'benchmark': name, 'entries': spec.get_entry_count(), 'seconds': seconds, 'runs': 1,
+                        'retained_bytes': retained_bytes})
+    return results
+
+
+def benchmark_external_diff(entry_count: int, base_dir: str, db: Type[DBInterface] = FSInterface,
+                            memory_budget: int = 64 * 1024, **spec_kwargs: Any) -> List[Dict[str, Any]]:
+    """Checks two synced trees without changes against their snapshot in memory and with StreamingDiff.
+
+    Returns:
+        results (list[dict[str, Any]]): Same format as benchmark_tree, with the peak memory of each check.
+    """
+    spec: TreeSpec = TreeSpec.for_entry_count(entry_count, **spec_kwargs)
+    roots: List[str] = [str(db(base_dir) / f"external_{entry_count}_{index}") for index in [1, 2]]
+    for root in roots:
+        generate_tree(root, spec, db)
+    snapshot: Dict[str, Any] = SyncManager([FileStructure(root, db, side=side) for side, root in enumerate(roots)],
+                                           db).get_last_sync()
+    snapshot_file: DBInterface = db(base_dir) / f"external_{entry_count}.json"
+    with snapshot_file.open("w") as json_file:
+        json.dump(snapshot, json_file)
+    records_file: DBInterface = db(base_dir) / f"external_{entry_count}.sorted.jsonl"
+    with records_file.open("w") as sorted_file:
+        write_records(sorted_file, snapshot_to_records(snapshot))
+    del snapshot
+
+    def diff_in_memory() -> int:
+        with snapshot_file.open() as json_file:
+            last_sync_dict: Dict[str, Any] = json.load(json_file)
+        return sum(FileStructure(root, db, side=side).check_file_structure(last_sync_dict)
+                   for side, root in enumerate(roots))
+
+    def diff_external() -> int:
+        with records_file.open() as sorted_file:
+            return StreamingDiff(roots, [db, db], memory_budget).run(read_records(sorted_file))
+
+    results: List[Dict[str, Any]] = []
+    for name, diff in [("diff_in_memory", diff_in_memory), ("diff_external", diff_external)]:
+        seconds, peak_bytes = time_peak_memory(diff)
+        results.append({'benchmark': name, 'entries': spec.get_entry_count(), 'seconds': seconds, 'runs': 1,
+                        'peak_bytes': peak_bytes})
+    return results
+
+
+def benchmark_digests(entry_count: int, base_dir: str, db: Type[DBInterface] = FSInterface, repeat: int = 3,
+                      **spec_kwargs: Any) -> List[Dict[str, Any]]:
+    """Checks a synced tree without changes against its snapshot without and with Merkle digests.
+
+    Returns:
+        results (list[dict[str, Any]]): Same format as benchmark_tree.
+    """
+    spec: TreeSpec = TreeSpec.for_entry_count(entry_count, **spec_kwargs)
+    root1: str = str(db(base_dir) / f"digests_{entry_count}_1")
+    root2: str = str(db(base_dir) / f"digests_{entry_count}_2")
+    generate_tree(root1, spec, db)
+    db(root2).mkdir(parents=True, exist_ok=True)
+    fstructs: List[FileStructure] = [FileStructure(root1, db), FileStructure(root2, db, side=1)]
+    snapshot: Dict[str, Any] = sync_cycle(fstructs, db, {})
+    snapshot_without_digests: Dict[str, Any] = records_to_snapshot(snapshot_to_records(snapshot))
+    fstructs[0].update_file_structure()
+    return [
+        {'benchmark': "check_full", 'entries': spec.get_entry_count(), 'runs': repeat,
+         'seconds': time_best(lambda: fstructs[0].check_file_structure(snapshot_without_digests), repeat)},
+        {'benchmark': "check_digests", 'entries': spec.get_entry_count(), 'runs': repeat,
+         'seconds': time_best(lambda: fstructs[0].check_file_structure(snapshot), repeat)},
+    ]
+
+
+def benchmark_deep_tree(depth: int, base_dir: str, db: Type[DBInterface] = FSInterface, repeat: int = 3
+                        ) -> List[Dict[str, Any]]:
+    """Times scanning, diffing, JSON conversion and the last sync snapshot of a chain of depth nested directories with
+    a file at the bottom, so the time is dominated by the cost of each level.
+
+    Returns:
+        results (list[dict[str, Any]]): Same format as benchmark_tree, with the seconds per level of each benchmark.
+    """
+    root1: DBInterface = db(base_dir) / f"deep_{depth}_1"
+    root2: DBInterface = db(base_dir) / f"deep_{depth}_2"
+    deepest: DBInterface = root1
+    root1.mkdir(parents=True, exist_ok=True)
+    for _ in range(depth):
+        deepest = deepest / "d"
+        deepest.mkdir(parents=False, exist_ok=True)
+    with (deepest / "file.txt").open("w") as deep_file:
+        deep_file.write("deep")
+    root2.mkdir(parents=True, exist_ok=True)
+
+    fstruct1: FileStructure = FileStructure(str(root1), db)
+    fstruct2: FileStructure = FileStructure(str(root2), db, side=1)
+    snapshot: Dict[str, Any] = fstruct1.files_to_json()
+    benchmarks: List[Tuple[str, Callable[[], Any]]] = [
+        ("deep_update_file_structure", fstruct1.update_file_structure),
+        ("deep_to_json", fstruct1.files_to_json),
+        ("deep_from_json", lambda: fstruct1.from_json(snapshot)),
+        ("deep_check_file_structure", lambda: fstruct1.check_file_structure(snapshot)),
+        ("deep_get_last_sync",
+         lambda: SyncManager([fstruct1, fstruct2], db).get_last_sync(fstruct1.files, fstruct1.files)),
+    ]
+    results: List[Dict[str, Any]] = []
+    for name, function in benchmarks:
+        seconds: float = time_best(function, repeat)
+        results.append({'benchmark': name, 'entries': depth + 1, 'seconds': seconds, 'runs': repeat,
+                        'seconds_per_level': seconds / depth})
+    return results
+
+
+def remove_temp_dir(directory: str) -> None:
+    """Removes a temporary benchmark directory with FSInterface.rmtree, which does not recurse once per level (as
+    shutil.rmtree does before Python 3.12), so the deep trees are removed too."""
+    try:
+        FSInterface(directory).rmtree()
+    except OSError:
+        pass
+
+
+def get_commit() -> Optional[str]:
+    try:
+        result: "subprocess.CompletedProcess[str]" = subprocess.run(
+            ["git", "rev-parse", "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    except OSError:
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def run_benchmarks(entry_counts: List[int], repeat: int = 3, memory: bool = False, depth: int = 500,
+                   **spec_kwargs: Any) -> Dict[str, Any]:
+    """Runs the benchmarks for each entry count, then the deep tree benchmarks at depth.
+
+    Each tree is created in a temporary directory, which is removed afterwards, or in a new MemoryFileSystem if memory
+    is True.
+    """
+    results: List[Dict[str, Any]] = []
+    for entry_count in entry_counts:
+        if memory:
+            db: Type[DBInterface] = MemoryFileSystem().get_interface()
+            results.extend(benchmark_tree(entry_count, "/benchmark", db, repeat, **spec_kwargs))
+            results.extend(benchmark_ignored_scan(entry_count, "/benchmark", db, repeat, **spec_kwargs))
+            results.extend(benchmark_pipeline(entry_count, "/benchmark", db, **spec_kwargs))
+            results.extend(benchmark_names(entry_count, "/benchmark", db, **spec_kwargs))
+            results.extend(benchmark_external_diff(entry_count, "/benchmark", db, **spec_kwargs))
+            results.extend(benchmark_digests(entry_count, "/benchmark", db, repeat, **spec_kwargs))
+            continue
+        base_dir: str = tempfile.mkdtemp(prefix="syncfiles_benchmark_")
+        try:
+            results.extend(benchmark_tree(entry_count, base_dir, FSInterface, repeat, **spec_kwargs))
+            results.extend(benchmark_ignored_scan(entry_count, base_dir, FSInterface, repeat, **spec_kwargs))
+            results.extend(benchmark_pipeline(entry_count, base_dir, FSInterface, **spec_kwargs))
+            results.extend(benchmark_names(entry_count, base_dir, FSInterface, **spec_kwargs))
+            results.extend(benchmark_external_diff(entry_count, base_dir, FSInterface, **spec_kwargs))
+            results.extend(benchmark_digests(entry_count, base_dir, FSInterface, repeat, **spec_kwargs))
+        finally:
+            remove_temp_dir(base_dir)
+    if memory:
+        results.extend(benchmark_deep_tree(depth, "/benchmark", MemoryFileSystem().get_interface(), repeat))
+    else:
+        deep_base_dir: str = tempfile.mkdtemp(prefix="syncfiles_benchmark_")
+        try:
+            results.extend(benchmark_deep_tree(depth, deep_base_dir, FSInterface, repeat))
+        finally:
+            remove_temp_dir(deep_base_dir)
+    return {
+        'commit': get_commit(),
+        'backend': "memory" if memory else "disk",
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'results': results,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run_benchmarks", description="Benchmarks syncfiles on synthetic trees.")
+    parser.add_argument("--entries", type=int, nargs="+", default=[10000],
+                        help="approximate number of files and folders in each tree (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each benchmark (default: %(default)s)")
+    parser.add_argument("--fan-out", type=int, default=10, help="sub-directories per directory (default: %(default)s)")
+    parser.add_argument("--change-rate", type=float, default=0.01,
+                        help="fraction of files changed before the check and sync benchmarks (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the tree generator (default: %(default)s)")
+    parser.add_argument("--depth", type=int, default=500,
+                        help="nested directories of the deep tree benchmarks (default: %(default)s)")
+    parser.add_argument("--memory", action="store_true", help="use an in-memory file system instead of the disk")
+    parser.add_argument("-o", "--output", help="file the JSON results are written to (default: stdout)")
+    args: argparse.Namespace = parser.parse_args(argv)
+    if args.fan_out < 2:
+        parser.error("--fan-out must be at least 2")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args: argparse.Namespace = parse_args(argv)
+    report: Dict[str, Any] = run_benchmarks(args.entries, args.repeat, args.memory, args.depth, fan_out=args.fan_out,
+                                            change_rate=args.change_rate, seed=args.seed)
+    for result in report['results']:
+        print(f"{result['benchmark']:>22} {result['entries']:>9} entries {result['seconds']:10.4f} s",
+              file=sys.stderr)
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Deterministic synthetic directory trees for benchmarks.
+
+The same TreeSpec (including its seed) always produces the same directories, file names and file sizes, so results
+from different commits are comparable.
+
+Author: Kevin Hodge
+"""
+
+from typing import Dict, List, Optional, Tuple, Type
+import random
+from syncfiles.file_system_interface import DBInterface, FSInterface
+
+# (size in bytes, weight): mostly small files with a few large ones.
+default_sizes: List[Tuple[int, float]] = [(0, 0.1), (100, 0.5), (4 * 1024, 0.3), (64 * 1024, 0.1)]
+
+
+class TreeSpec:
+    """Describes a synthetic tree.
+
+    Attributes:
+        file_count (int): Number of files in the tree.
+        fan_out (int): Number of sub-directories in each directory above depth.
+        depth (int): Number of directory levels below the root.
+        sizes (list[tuple[int, float]]): File sizes (bytes) and their relative weights.
+        change_rate (float): Fraction of files changed by apply_changes.
+        seed (int): Seed of the random generator used for file placement, sizes and changes.
+    """
+    def __init__(self, file_count: int = 1000, fan_out: int = 4, depth: int = 3,
+                 sizes: Optional[List[Tuple[int, float]]] = None, change_rate: float = 0.01, seed: int = 0) -> None:
+        self.file_count: int = file_count
+        self.fan_out: int = fan_out
+        self.depth: int = depth
+        self.sizes: List[Tuple[int, float]] = sizes if sizes is not None else default_sizes
+        self.change_rate: float = change_rate
+        self.seed: int = seed
+
+    @classmethod
+    def for_entry_count(cls, entry_count: int, fan_out: int = 10, **kwargs) -> "TreeSpec":
+        """Creates a TreeSpec with about entry_count files and folders and about 100 files per directory.
+
+        Raises:
+            ValueError: fan_out is less than 2 (the depth of a chain of single directories would grow with
+                entry_count).
+        """
+        if fan_out < 2:
+            raise ValueError("fan_out must be at least 2.")
+        depth: int = 0
+        while (fan_out ** (depth + 1) - 1) // (fan_out - 1) * 100 < entry_count:
+            depth += 1
+        spec: TreeSpec = cls(0, fan_out, depth, **kwargs)
+        spec.file_count = max(entry_count - len(spec.get_dir_paths()), 0)
+        return spec
+
+    def get_dir_paths(self) -> List[List[str]]:
+        """Gets the path (relative to the root) of every directory in breadth-first order, excluding the root."""
+        dir_paths: List[List[str]] = []
+        level: List[List[str]] = [[]]
+        for _ in range(self.depth):
+            level = [parent + [f"d{index}"] for parent in level for index in range(self.fan_out)]
+            dir_paths.extend(level)
+        return dir_paths
+
+    def get_files(self) -> List[Tuple[List[str], int]]:
+        """Gets the path (relative to the root) and size of every file."""
+        rng: random.Random = random.Random(self.seed)
+        parents: List[List[str]] = [[]] + self.get_dir_paths()
+        sizes: List[int] = [size for size, _ in self.sizes]
+        weights: List[float] = [weight for _, weight in self.sizes]
+        files: List[Tuple[List[str], int]] = []
+        for index in range(self.file_count):
+            parent: List[str] = rng.choice(parents)
+            files.append((parent + [f"f{index}.dat"], rng.choices(sizes, weights)[0]))
+        return files
+
+    def get_entry_count(self) -> int:
+        return len(self.get_dir_paths()) + self.file_count
+
+
+def join(db: Type[DBInterface], root: str, path: List[str]) -> DBInterface:
+    entry_path: DBInterface = db(root)
+    for name in path:
+        entry_path = entry_path / name
+    return entry_path
+
+
+def write_file(file_path: DBInterface, size: int) -> None:
+    with file_path.open("wb") as file_to_write:
+        file_to_write.write(b"\0" * size)
+
+
+def generate_tree(root: str, spec: TreeSpec, db: Type[DBInterface] = FSInterface) -> int:
+    """Creates the tree described by spec below root.
+
+    Returns:
+        int: Number of files and folders created.
+    """
+    db(root).mkdir(parents=True, exist_ok=True)
+    for dir_path in spec.get_dir_paths():
+        join(db, root, dir_path).mkdir(parents=True, exist_ok=True)
+    for file_path, size in spec.get_files():
+        write_file(join(db, root, file_path), size)
+    return spec.get_entry_count()
+
+
+def apply_changes(root: str, spec: TreeSpec, db: Type[DBInterface] = FSInterface) -> Dict[str, int]:
+    """Changes spec.change_rate of the files in a tree created by generate_tree.
+
+    The changed files are split evenly between modified, deleted and new files.
+
+    Returns:
+        dict[str, int]: Number of files modified, deleted and created.
+    """
+    rng: random.Random = random.Random(spec.seed + 1)
+    files: List[Tuple[List[str], int]] = spec.get_files()
+    change_count: int = min(round(spec.file_count * spec.change_rate), len(files))
+    changed_files: List[Tuple[List[str], int]] = rng.sample(files, change_count)
+    changes: Dict[str, int] = {'modified': 0, 'deleted': 0, 'created': 0}
+    for index, (file_path, size) in enumerate(changed_files):
+        if index % 3 == 0:
+            write_file(join(db, root, file_path), size + 1)
+            changes['modified'] += 1
+        elif index % 3 == 1:
+            join(db, root, file_path).unlink()
+            changes['deleted'] += 1
+        else:
+            write_file(join(db, root, file_path[:-1] + [f"new_{file_path[-1]}"]), size)
+            changes['created'] += 1
+    return changes
@@ -0,0 +1,10 @@
+"""Runs the command line interface with python -m syncfiles.
+
+Author: Kevin Hodge
+"""
+
+import sys
+from syncfiles.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
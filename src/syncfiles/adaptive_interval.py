@@ -0,0 +1,78 @@
+"""Contains AdaptiveInterval.
+
+Chooses how long Wait sleeps between sync cycles from what the last cycle found:
+    - changes: the cycle found changes, the interval is divided by backoff (down to min_interval).
+    - idle: the cycle found nothing, the interval is multiplied by backoff (up to max_interval).
+    - scan_budget: the interval is raised so the cycle's scan time is at most max_scan_fraction of the wall time
+      (scan time / (scan time + interval)). This wins over max_interval, so a slow scan never takes more than the
+      configured share of the time.
+
+Author: Kevin Hodge
+"""
+
+from typing import Optional
+
+CHANGES: str = "changes"
+IDLE: str = "idle"
+SCAN_BUDGET: str = "scan_budget"
+
+
+class AdaptiveInterval:
+    """Polling interval that adapts to the observed change rate and scan cost (see the module docstring).
+
+    Attributes:
+        min_interval (float): Shortest interval (seconds) while changes keep arriving.
+        max_interval (float): Longest interval (seconds) while cycles find nothing.
+        backoff (float): Factor the interval is multiplied (idle) or divided (changes) by after each cycle.
+        max_scan_fraction (float): Largest fraction of wall time spent scanning, between 0 (exclusive) and 1.
+        interval (float): Current interval in seconds.
+        reason (str, optional): Why the interval last changed (changes, idle or scan_budget), None before the first
+            cycle.
+    """
+    def __init__(self, min_interval: float = 1.0, max_interval: float = 300.0, backoff: float = 2.0,
+                 max_scan_fraction: float = 0.1, initial_interval: Optional[float] = None) -> None:
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Intervals must satisfy 0 < min_interval <= max_interval.")
+        if backoff <= 1.0:
+            raise ValueError("backoff must be greater than 1.")
+        if not 0.0 < max_scan_fraction < 1.0:
+            raise ValueError("max_scan_fraction must be between 0 and 1.")
+        self.min_interval: float = min_interval
+        self.max_interval: float = max_interval
+        self.backoff: float = backoff
+        self.max_scan_fraction: float = max_scan_fraction
+        self.interval: float = min(max(initial_interval if initial_interval is not None else min_interval,
+                                       min_interval), max_interval)
+        self.reason: Optional[str] = None
+
+    def get_interval(self) -> float:
+        return self.interval
+
+    def get_reason(self) -> Optional[str]:
+        return self.reason
+
+    def get_scan_budget_interval(self, scan_time: float) -> float:
+        """Gets the shortest interval that keeps scan_time within max_scan_fraction of the wall time."""
+        return scan_time * (1.0 - self.max_scan_fraction) / self.max_scan_fraction
+
+    def update(self, changes_found: int, scan_time: float) -> float:
+        """Adapts the interval to the cycle that just finished.
+
+        Args:
+            changes_found (int): Number of changes found by the cycle.
+            scan_time (float): Seconds the cycle spent scanning.
+
+        Returns:
+            interval (float): Seconds to wait before the next cycle.
+        """
+        if changes_found > 0:
+            self.interval = max(self.interval / self.backoff, self.min_interval)
+            self.reason = CHANGES
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+            self.reason = IDLE
+        scan_budget_interval: float = self.get_scan_budget_interval(scan_time)
+        if scan_budget_interval > self.interval:
+            self.interval = scan_budget_interval
+            self.reason = SCAN_BUDGET
+        return self.interval
@@ -0,0 +1,323 @@
+"""Sync Agent
+
+Serves the local file system to a RemoteConnection (see remote_interface.py and remote_protocol.py) over stdio or a
+socket. Requests run on a thread pool, so many can be in flight, and their responses are sent as they complete.
+
+Only paths within the sync roots given with --root are served, requests for any other path fail with a
+PermissionError. A socket client must first send the shared secret from the SYNCFILES_AGENT_TOKEN environment variable
+(RemoteConnection.connect does), the socket is bound to localhost unless a host is given.
+
+Usage:
+    python -m syncfiles.agent --root DIR [--root DIR ...]
+        (stdio, e.g. launched with: ssh host python -m syncfiles.agent --root /srv/files)
+    SYNCFILES_AGENT_TOKEN=... python -m syncfiles.agent --root DIR --listen [HOST:]PORT
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Type, Union, cast
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import hmac
+import os
+import socketserver
+import sys
+import threading
+from syncfiles.file_system_interface import DBInterface, FSInterface, StatRecord
+from syncfiles.ignore_rules import IgnoreRules
+import syncfiles.remote_protocol as protocol
+
+protocol_version: int = 1
+token_variable: str = "SYNCFILES_AGENT_TOKEN"
+default_host: str = "127.0.0.1"
+
+
+class Agent:
+    """Serves DBInterface operations to one connection.
+
+    Attributes:
+        reader (BinaryIO): Stream frames are read from.
+        writer (BinaryIO): Stream frames are written to.
+        db (Type[DBInterface]): Backend the operations run on.
+        roots (list[str]): Sync roots (resolved), the only directories whose paths are served.
+        uploads (dict[int, BinaryIO | Exception]): Open file (or the error opening it) of each write in progress.
+        ignore_rules (dict[tuple[str, ...], IgnoreRules]): Compiled ignore patterns sent with list_tree, so each set of
+            patterns is only compiled once.
+    """
+    def __init__(self, reader: BinaryIO, writer: BinaryIO, roots: List[str], db: Type[DBInterface] = FSInterface,
+                 workers: int = 8) -> None:
+        self.reader: BinaryIO = reader
+        self.writer: BinaryIO = writer
+        self.db: Type[DBInterface] = db
+        self.roots: List[str] = [os.path.realpath(root) for root in roots]
+        self.workers: int = workers
+        self.write_lock: threading.Lock = threading.Lock()
+        self.uploads: Dict[int, Union[BinaryIO, Exception]] = dict()
+        self.ignore_rules: Dict[Tuple[str, ...], IgnoreRules] = dict()
+        self.operations: Dict[str, Callable[..., Any]] = {
+            'hello': lambda: {'version': protocol_version},
+            'cwd': lambda: str(self.db.cwd()),
+            'exists': lambda path: self.get_path(path).exists(),
+            'is_file': lambda path: self.get_path(path).is_file(),
+            'is_dir': lambda path: self.get_path(path).is_dir(),
+            'get_mod_time': lambda path: self.get_path(path).get_mod_time(),
+            'get_size': lambda path: self.get_path(path).get_size(),
+            'list_dir': lambda path: [protocol.record_to_json(record) for record in self.get_path(path).list_dir()],
+            'list_tree': self.list_tree,
+            'stat_many': self.stat_many,
+            'mkdir': lambda path, parents, exist_ok: self.get_path(path).mkdir(parents=parents, exist_ok=exist_ok),
+            'mkdir_many': lambda paths: self.db.mkdir_many(self.check_paths(paths)),
+            'unlink': lambda path: self.get_target(path).unlink(),
+            'unlink_many': lambda paths: self.db.unlink_many([self.check_target(path) for path in paths]),
+            'rename': lambda path, new_path: self.rename(path, new_path),
+            'copyfile': lambda old_path, new_path: self.db.copyfile(self.check_path(old_path),
+                                                                    self.check_path(new_path)),
+            'rmtree': lambda path: self.get_target(path).rmtree(),
+        }
+
+    def check_path(self, path: str) -> str:
+        """Resolves symlinks and ".." in path and checks that the result is within one of the sync roots.
+
+        Operations run on the returned path rather than path, so a symlink swapped in after the check cannot redirect
+        them outside the sync roots.
+
+        Returns:
+            str: The resolved path.
+
+        Raises:
+            PermissionError: path is outside the sync roots.
+        """
+        real_path: str = os.path.realpath(path)
+        for root in self.roots:
+            try:
+                if os.path.commonpath([root, real_path]) == root:
+                    return real_path
+            except ValueError:
+                # Paths on different drives.
+                continue
+        raise PermissionError(f"{path} is outside the sync roots.")
+
+    def check_target(self, path: str) -> str:
+        """Like check_path, for paths that are removed or replaced (unlink, rmtree, rename).
+
+        Only the parent directory is resolved, so a symlink is removed itself rather than what it points to.
+
+        Returns:
+            str: The resolved parent directory joined with the name of path.
+
+        Raises:
+            PermissionError: path is outside the sync roots or is one of the sync roots.
+        """
+        parent, name = os.path.split(os.path.normpath(path))
+        real_path: str = os.path.join(os.path.realpath(parent), name)
+        if name in ["", os.curdir, os.pardir] or real_path in self.roots:
+            raise PermissionError(f"{path} is a sync root.")
+        self.check_path(parent)
+        return real_path
+
+    def check_paths(self, paths: List[str]) -> List[str]:
+        return [self.check_path(path) for path in paths]
+
+    def get_path(self, path: str) -> DBInterface:
+        return self.db(self.check_path(path))
+
+    def get_target(self, path: str) -> DBInterface:
+        return self.db(self.check_target(path))
+
+    def rename(self, path: str, new_path: str) -> str:
+        self.get_target(path).rename(self.get_target(new_path))
+        return new_path
+
+    def list_tree(self, path: str, patterns: Optional[List[str]] = None,
+                  relative_path: str = "") -> Dict[str, List[List[Any]]]:
+        ignore: Optional[IgnoreRules] = None
+        if patterns:
+            key: Tuple[str, ...] = tuple(patterns)
+            if key not in self.ignore_rules:
+                self.ignore_rules[key] = IgnoreRules(patterns)
+            ignore = self.ignore_rules[key]
+        listing: Dict[str, List[StatRecord]] = self.get_path(path).list_tree(
+            ignore.get_prune(relative_path) if ignore is not None else None)
+        return {relative_path: [protocol.record_to_json(record) for record in records]
+                for relative_path, records in listing.items()}
+
+    def stat_many(self, paths: List[str]) -> List[Optional[List[Any]]]:
+        return [protocol.record_to_json(record) if record is not None else None
+                for record in self.db.stat_many(self.check_paths(paths))]
+
+    def send(self, request_id: int, frame_type: int, payload: bytes = b"") -> None:
+        with self.write_lock:
+            self.writer.write(protocol.encode_frame(request_id, frame_type, payload))
+            self.writer.flush()
+
+    def authenticate(self, token: str) -> bool:
+        """Reads the first frame of the connection, which must be an "auth" request with the shared secret token.
+
+        Returns:
+            bool: True if the token matched (answered with RESPONSE), False otherwise (answered with ERROR).
+        """
+        frame: Optional[protocol.Frame] = protocol.read_frame(self.reader)
+        if frame is None:
+            return False
+        request_id, frame_type, payload = frame
+        try:
+            request: Dict[str, Any] = protocol.decode_json(payload)
+            authenticated: bool = frame_type == protocol.REQUEST and request['op'] == "auth" and \
+                hmac.compare_digest(str(request['args'][0]).encode("utf-8"), token.encode("utf-8"))
+        except (ValueError, KeyError, TypeError, IndexError):
+            authenticated = False
+        if not authenticated:
+            self.send(request_id, protocol.ERROR, protocol.encode_error(PermissionError("Authentication failed.")))
+            return False
+        self.send(request_id, protocol.RESPONSE, protocol.encode_json(None))
+        return True
+
+    def serve(self) -> None:
+        """Handles frames until the connection is closed.
+
+        A request that cannot be decoded (or has no op or args) is answered with an ERROR frame.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                frame: Optional[protocol.Frame] = protocol.read_frame(self.reader)
+                if frame is None:
+                    break
+                request_id, frame_type, payload = frame
+                if frame_type == protocol.REQUEST:
+                    try:
+                        request: Dict[str, Any] = protocol.decode_json(payload)
+                        op: str = request['op']
+                        args: List[Any] = request['args']
+                        if op == "write":
+                            self.start_upload(request_id, args[0])
+                            continue
+                    except (ValueError, KeyError, TypeError, IndexError) as err:
+                        self.send(request_id, protocol.ERROR, protocol.encode_error(err))
+                        continue
+                    executor.submit(self.handle_request, request_id, op, args)
+                elif frame_type == protocol.CHUNK:
+                    self.write_upload(request_id, payload)
+                elif frame_type == protocol.END:
+                    self.finish_upload(request_id)
+        for upload in self.uploads.values():
+            if not isinstance(upload, Exception):
+                upload.close()
+
+    def handle_request(self, request_id: int, op: str, args: List[Any]) -> None:
+        try:
+            if op == "read":
+                self.send_file(request_id, args[0])
+                return None
+            if op not in self.operations:
+                raise ValueError(f"Unknown operation: {op}")
+            result: Any = self.operations[op](*args)
+            self.send(request_id, protocol.RESPONSE, protocol.encode_json(result))
+        except Exception as err:
+            self.send(request_id, protocol.ERROR, protocol.encode_error(err))
+
+    def send_file(self, request_id: int, path: str) -> None:
+        with self.get_path(path).open("rb") as file_to_read:
+            chunk: bytes = file_to_read.read(protocol.chunk_size)
+            while chunk:
+                self.send(request_id, protocol.CHUNK, chunk)
+                chunk = file_to_read.read(protocol.chunk_size)
+        self.send(request_id, protocol.END)
+
+    def start_upload(self, request_id: int, path: str) -> None:
+        try:
+            self.uploads[request_id] = self.get_path(path).open("wb")
+        except Exception as err:
+            self.uploads[request_id] = err
+
+    def write_upload(self, request_id: int, data: bytes) -> None:
+        upload: Union[BinaryIO, Exception, None] = self.uploads.get(request_id)
+        if upload is None or isinstance(upload, Exception):
+            return None
+        try:
+            upload.write(data)
+        except Exception as err:
+            upload.close()
+            self.uploads[request_id] = err
+
+    def finish_upload(self, request_id: int) -> None:
+        upload: Union[BinaryIO, Exception, None] = self.uploads.pop(request_id, None)
+        if upload is None:
+            upload = ValueError(f"No write in progress for request {request_id}.")
+        if isinstance(upload, Exception):
+            self.send(request_id, protocol.ERROR, protocol.encode_error(upload))
+            return None
+        try:
+            upload.close()
+        except Exception as err:
+            self.send(request_id, protocol.ERROR, protocol.encode_error(err))
+            return None
+        self.send(request_id, protocol.RESPONSE, protocol.encode_json(None))
+
+
+class AgentServer(socketserver.ThreadingTCPServer):
+    """Serves every connection accepted on a TCP socket with an Agent on its own thread, once the client has sent the
+    shared secret token (see Agent.authenticate). Stop it with shutdown() from another thread.
+
+    Attributes:
+        token (str): Shared secret clients must send first.
+        roots (list[str]): Sync roots served to every connection.
+        db (Type[DBInterface]): Backend the operations run on.
+    """
+    daemon_threads: bool = True
+    allow_reuse_address: bool = True
+
+    def __init__(self, host: str, port: int, token: str, roots: List[str], db: Type[DBInterface] = FSInterface
+                 ) -> None:
+        if not token:
+            raise ValueError("The agent token must not be empty.")
+        self.token: str = token
+        self.roots: List[str] = roots
+        self.db: Type[DBInterface] = db
+        super().__init__((host, port), AgentRequestHandler)
+
+    def get_port(self) -> int:
+        return int(self.server_address[1])
+
+
+class AgentRequestHandler(socketserver.StreamRequestHandler):
+    server: AgentServer
+
+    def handle(self) -> None:
+        agent: Agent = Agent(cast(BinaryIO, self.rfile), cast(BinaryIO, self.wfile), self.server.roots, self.server.db)
+        if agent.authenticate(self.server.token):
+            agent.serve()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="syncfiles-agent", description="Serves the local file system to a remote syncfiles process.")
+    parser.add_argument("--root", action="append", required=True, metavar="DIR",
+                        help="sync root to serve (repeatable), paths outside every root are rejected")
+    parser.add_argument("--listen", metavar="[HOST:]PORT",
+                        help=f"serve on a TCP socket (on {default_host} unless HOST is given) instead of stdin/stdout, "
+                        f"clients must send the secret in the {token_variable} environment variable")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args: argparse.Namespace = parse_args(argv)
+    if args.listen is not None:
+        token: str = os.environ.get(token_variable, "")
+        if not token:
+            print(f"--listen requires a shared secret in the {token_variable} environment variable.", file=sys.stderr)
+            return 2
+        host, _, port = args.listen.rpartition(":")
+        with AgentServer(host or default_host, int(port), token, args.root) as server:
+            print(f"Listening on {server.get_port()}", file=sys.stderr, flush=True)
+            server.serve_forever()
+        return 0
+    reader: BinaryIO = sys.stdin.buffer
+    writer: BinaryIO = sys.stdout.buffer
+    # Anything printed would corrupt the frames on stdout.
+    sys.stdout = sys.stderr
+    Agent(reader, writer, args.root).serve()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
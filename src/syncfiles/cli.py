@@ -0,0 +1,308 @@
+"""Sync Files Command Line Interface
+
+Usage:
+    python -m syncfiles [directories ...] [--once | --headless] [--interval SECONDS] [--output FILE]
+                        [--adaptive [--min-interval SECONDS] [--max-interval SECONDS] [--max-scan-fraction FRACTION]]
+                        [--trace FILE] [--trace-sample N] [--metrics-port PORT] [--metrics-file FILE]
+                        [--remote-agent COMMAND] [--ignore PATTERN ...] [--full-sweep-every N]
+                        [--scan-workers N] [--copy-workers N] [--pipeline] [--memory-budget BYTES]
+                        [--verbose]
+
+This is the only argument parser: python -m syncfiles.main and python -m syncfiles.daemon (which adds --headless) pass
+their arguments to it.
+
+Without --once or --headless the status window is shown (see main.py). --once runs Initial, Check, Sync (if changes
+were found) and Final exactly once, then writes a JSON summary of the cycle and exits with one of the exit codes below,
+so it can be driven by an external scheduler. Only the summary is written to stdout, --verbose output goes to stderr.
+With --pipeline, Check and Sync are replaced by one Pipeline state that overlaps scanning, diffing and copying (see
+pipeline.py). With --memory-budget, they are replaced by one Stream state
+that diffs sorted runs of the directories on disk (see external_diff.py).
+
+With --adaptive the interval starts at --interval, shrinks toward --min-interval while cycles find changes, backs off
+toward --max-interval while they find none and is raised so scanning takes at most --max-scan-fraction of the time.
+
+If sync_directories_file.json configures named pairs ({"pairs": {...}}), --once and --headless run every pair on one
+PairScheduler with shared scan and copy worker pools (see pair_scheduler.py), the --once summary has the summary of
+each pair in "pairs".
+
+With --remote-agent, directories starting with "remote:" are accessed through a sync agent started with COMMAND, e.g.
+    python -m syncfiles ~/files remote:/srv/files --remote-agent "ssh host python -m syncfiles.agent --root /srv/files"
+
+Exit Codes:
+    0: The cycle finished (with or without changes).
+    1: An error stopped the cycle, the summary contains the error.
+    2: Invalid arguments or directories.
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Optional, Type
+import argparse
+import contextlib
+import json
+import shlex
+import sys
+from syncfiles.config_manager import ConfigManager
+from syncfiles.adaptive_interval import AdaptiveInterval
+from syncfiles.file_system_interface import DBInterface, FSInterface
+from syncfiles.headless_ui import HeadlessUI
+from syncfiles.sync_state_machine import StateObserver, SyncStateMachine
+from syncfiles.sync_states import Initial, StateData
+from syncfiles.tracer import TraceObserver, Tracer, set_tracer
+# remote_interface, metrics, pair_scheduler and daemon are imported by the branches that use them, so a cycle only
+# imports the features it was started with.
+
+EXIT_OK: int = 0
+EXIT_ERROR: int = 1
+EXIT_USAGE: int = 2
+remote_prefix: str = "remote:"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(prog="syncfiles", description="Syncs directories.")
+    parser.add_argument("directories", nargs="*",
+                        help="directories to sync, read from sync_directories_file.json if not provided")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--once", action="store_true", help="run one sync cycle and print a JSON summary")
+    mode.add_argument("--headless", action="store_true", help="sync continuously without a GUI")
+    parser.add_argument("-i", "--interval", type=float, default=StateData.sleep_time,
+                        help="seconds to wait between sync cycles (default: %(default)s)")
+    add_adaptive_arguments(parser)
+    add_pair_arguments(parser)
+    add_pipeline_argument(parser)
+    add_memory_budget_argument(parser)
+    parser.add_argument("-o", "--output", help="file the --once summary is written to (default: stdout)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write a Chrome trace (chrome://tracing, ui.perfetto.dev) of every sync cycle to FILE")
+    parser.add_argument("--trace-sample", type=int, default=1, metavar="N",
+                        help="record 1 in N per-file copy and delete spans in the trace (default: %(default)s)")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-file", metavar="FILE",
+                        help="rewrite Prometheus metrics to FILE after every cycle (node_exporter textfile collector)")
+    parser.add_argument("--remote-agent", metavar="COMMAND",
+                        help=f"command starting a sync agent for the directories starting with {remote_prefix}")
+    parser.add_argument("--ignore", action="append", default=[], metavar="PATTERN",
+                        help="exclude entries matching a gitignore-style pattern (repeatable), added to the \"ignore\" "
+                             "patterns of sync_directories_file.json")
+    parser.add_argument("--full-sweep-every", type=int, default=0, metavar="N",
+                        help="scan recently changed (hot) directories every cycle and unchanged (cold) ones less "
+                             "often, with a full scan every N cycles (default: every directory every cycle)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print state transitions and file structures")
+    return parser.parse_args(argv)
+
+
+def add_adaptive_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--adaptive", action="store_true",
+                        help="adapt the interval to the change rate and scan time, starting at --interval")
+    parser.add_argument("--min-interval", type=float, default=1.0, metavar="SECONDS",
+                        help="shortest adaptive interval (default: %(default)s)")
+    parser.add_argument("--max-interval", type=float, default=300.0, metavar="SECONDS",
+                        help="longest adaptive interval (default: %(default)s)")
+    parser.add_argument("--max-scan-fraction", type=float, default=0.1, metavar="FRACTION",
+                        help="largest fraction of time spent scanning with --adaptive (default: %(default)s)")
+
+
+def add_pair_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--scan-workers", type=int, default=2, metavar="N",
+                        help="named pairs scanning at once (default: %(default)s)")
+    parser.add_argument("--copy-workers", type=int, default=2, metavar="N",
+                        help="named pairs syncing at once (default: %(default)s)")
+
+
+def add_pipeline_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap scanning, diffing and copying in each cycle with an asyncio pipeline")
+
+
+def add_memory_budget_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--memory-budget", type=int, default=0, metavar="BYTES",
+                        help="diff sorted runs on disk using about BYTES of memory for the entries, for trees larger "
+                             "than memory (default: off)")
+
+
+def check_pair_arguments(args: argparse.Namespace, config: ConfigManager) -> None:
+    """Checks the arguments of add_pair_arguments and that directories are not provided for named pairs.
+
+    Raises:
+        ValueError: Fewer than 1 worker, or directories provided while named pairs are configured.
+    """
+    if args.scan_workers < 1 or args.copy_workers < 1:
+        raise ValueError("--scan-workers and --copy-workers must be at least 1.")
+    if args.directories and config.has_pairs():
+        raise ValueError("Directories are configured as named pairs in sync_directories_file.json.")
+
+
+def get_adaptive_interval(args: argparse.Namespace) -> Optional[AdaptiveInterval]:
+    """Creates the AdaptiveInterval selected by the arguments of add_adaptive_arguments.
+
+    Raises:
+        ValueError: Invalid intervals or fraction.
+    """
+    if not args.adaptive:
+        return None
+    return AdaptiveInterval(args.min_interval, args.max_interval, max_scan_fraction=args.max_scan_fraction,
+                            initial_interval=args.interval)
+
+
+def configure_directories(config: ConfigManager, directories: List[str]) -> bool:
+    """Writes directories provided on the command line to the config file.
+
+    Args:
+        config (ConfigManager): Config used by the daemon.
+        directories (list[str]): Directories provided on the command line.
+
+    Returns:
+        bool: True if enough valid, unique directories were provided and written.
+    """
+    sync_directories: List[str] = []
+    for directory in directories:
+        sync_directories = config.check_sync_directory(directory, sync_directories)
+    return config.write_sync_directories(sync_directories)
+
+
+def run_once(config: ConfigManager, db: Type[DBInterface], verbose: bool = False,
+             observers: Optional[List[StateObserver]] = None) -> Dict[str, Any]:
+    """Runs Initial, Check, Sync (if required) and Final once.
+
+    Args:
+        observers (list[StateObserver], optional): Observers added to the state machine.
+
+    Returns:
+        summary (dict[str, Any]): Stats of the cycle, its status and the error (if one occurred).
+    """
+    state_data: StateData = StateData(config, HeadlessUI(), db, verbose=verbose)
+    state_data.once = True
+    state_machine: SyncStateMachine = SyncStateMachine()
+    for observer in observers if observers is not None else []:
+        state_machine.add_observer(observer)
+    state_machine.set_initial_state(Initial(state_data))
+    state_machine.run()
+    return get_summary(state_data)
+
+
+def run_pairs_once(config: ConfigManager, db: Type[DBInterface], verbose: bool = False,
+                   observers: Optional[List[StateObserver]] = None, scan_workers: int = 2,
+                   copy_workers: int = 2) -> Dict[str, Any]:
+    """Runs one cycle of every named pair of config on one PairScheduler.
+
+    Returns:
+        summary (dict[str, Any]): Summary of each pair (as returned by run_once) by name in "pairs", status is "error"
+            if any pair raised an error.
+    """
+    from syncfiles.pair_scheduler import PairScheduler
+
+    scheduler: PairScheduler = PairScheduler(HeadlessUI(), scan_workers, copy_workers)
+    for pair_config in config.get_pair_configs():
+        scheduler.add_pair(pair_config, db, verbose=verbose, observers=observers, once=True)
+    scheduler.run()
+    pairs: Dict[str, Any] = {pair.name: get_summary(pair.state_data) for pair in scheduler.get_pairs()}
+    status: str = "error" if any(pair['status'] == "error" for pair in pairs.values()) else "ok"
+    return {'status': status, 'pairs': pairs}
+
+
+def get_summary(state_data: StateData) -> Dict[str, Any]:
+    """Gets the stats of the last cycle run with state_data, its status and the error (if one occurred)."""
+    summary: Dict[str, Any] = {'status': "ok"}
+    summary.update(state_data.stats.to_dict())
+    summary['synced'] = "Sync" in state_data.stats.phase_times
+    if state_data.error_raised:
+        summary['status'] = "error"
+        if state_data.error is not None:
+            summary['error'] = {
+                'error_id': state_data.error.get_error_id(),
+                'message': str(state_data.error),
+            }
+    return summary
+
+
+def write_summary(summary: Dict[str, Any], output: Optional[str] = None) -> None:
+    if output is None:
+        print(json.dumps(summary))
+        return None
+    with open(output, "w") as summary_file:
+        json.dump(summary, summary_file)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args: argparse.Namespace = parse_args(argv)
+    db: Type[DBInterface] = FSInterface
+    config: ConfigManager = ConfigManager(db, verbose=args.verbose)
+    config.add_ignore_patterns(args.ignore)
+    config.set_full_sweep_every(args.full_sweep_every)
+    config.set_pipeline(args.pipeline)
+    config.set_memory_budget(args.memory_budget)
+    with contextlib.ExitStack() as stack:
+        if args.remote_agent is not None:
+            from syncfiles.remote_interface import RemoteConnection, RemoteFileSystem
+
+            try:
+                connection: RemoteConnection = RemoteConnection.launch(shlex.split(args.remote_agent))
+            except (OSError, ValueError) as err:
+                print(f"Could not start the sync agent: {err}", file=sys.stderr)
+                return EXIT_USAGE
+            stack.callback(connection.close)
+            config.add_backend(remote_prefix, RemoteFileSystem(connection, remote_prefix).get_interface())
+        return run_configured(args, config, db)
+
+
+def run_configured(args: argparse.Namespace, config: ConfigManager, db: Type[DBInterface]) -> int:
+    try:
+        check_pair_arguments(args, config)
+        adaptive_interval: Optional[AdaptiveInterval] = get_adaptive_interval(args)
+    except ValueError as err:
+        print(err, file=sys.stderr)
+        return EXIT_USAGE
+    if args.directories and not configure_directories(config, args.directories):
+        print(f"At least {config.get_min_dir()} valid, unique directories are required.", file=sys.stderr)
+        return EXIT_USAGE
+    if args.trace_sample < 1:
+        print("--trace-sample must be at least 1.", file=sys.stderr)
+        return EXIT_USAGE
+    if config.has_pairs() and not (args.once or args.headless):
+        print("Named pairs are run with --once or --headless.", file=sys.stderr)
+        return EXIT_USAGE
+
+    observers: List[StateObserver] = []
+    with contextlib.ExitStack() as stack:
+        if args.trace is not None:
+            tracer: Tracer = Tracer(args.trace, sample_every=args.trace_sample)
+            set_tracer(tracer)
+            stack.callback(set_tracer, None)
+            stack.callback(tracer.close)
+            observers.append(TraceObserver(tracer))
+        if args.metrics_port is not None or args.metrics_file is not None:
+            from syncfiles.metrics import MetricsServer, SyncMetrics
+
+            metrics: SyncMetrics = SyncMetrics(textfile_path=args.metrics_file)
+            observers.append(metrics)
+            if args.metrics_port is not None:
+                metrics_server: MetricsServer = MetricsServer(metrics.registry, args.metrics_port)
+                metrics_server.start()
+                stack.callback(metrics_server.stop)
+        return run_mode(args, config, db, observers, adaptive_interval)
+
+
+def run_mode(args: argparse.Namespace, config: ConfigManager, db: Type[DBInterface],
+             observers: List[StateObserver], adaptive_interval: Optional[AdaptiveInterval] = None) -> int:
+    if args.once:
+        with contextlib.redirect_stdout(sys.stderr):
+            if config.has_pairs():
+                summary: Dict[str, Any] = run_pairs_once(config, db, args.verbose, observers, args.scan_workers,
+                                                         args.copy_workers)
+            else:
+                summary = run_once(config, db, args.verbose, observers)
+        write_summary(summary, args.output)
+        return EXIT_OK if summary['status'] == "ok" else EXIT_ERROR
+    if args.headless:
+        from syncfiles.daemon import install_signal_handlers, run_daemon, run_pairs
+
+        ui: HeadlessUI = HeadlessUI()
+        install_signal_handlers(ui)
+        if config.has_pairs():
+            return run_pairs(config, ui, db, args.interval, args.verbose, observers, adaptive_interval,
+                             args.scan_workers, args.copy_workers)
+        return run_daemon(config, ui, db, args.interval, args.verbose, observers, adaptive_interval)
+
+    from syncfiles.main import run_gui
+    return run_gui(args.interval, observers, adaptive_interval)
@@ -3,9 +3,84 @@
 Author: Kevin Hodge
 """
 
-from typing import List, Dict, Any, Type
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Pattern, Tuple, Type
 import json
+import re
+import threading
 from syncfiles.file_system_interface import DBInterface
+from syncfiles.ignore_rules import IgnoreRules
+from syncfiles.scan_scheduler import ScanScheduler
+from syncfiles.snapshot_records import Record, read_records, records_to_snapshot, snapshot_to_records, write_records
+from syncfiles.tombstone import Tombstone
+from syncfiles.tracer import get_tracer
+
+pair_name_pattern: Pattern[str] = re.compile(r"[A-Za-z0-9_.-]+\Z")
+flat_format: str = "flat"
+
+
+def get_snapshot_depth(last_sync_dict: Dict[str, Any]) -> int:
+    """Gets the number of directory levels of a snapshot with the structure of FileStructure.files_to_json()."""
+    max_depth: int = 0
+    pending: List[Tuple[int, Dict[str, Any]]] = [(0, last_sync_dict)]
+    while pending:
+        depth, directory = pending.pop()
+        max_depth = max(max_depth, depth)
+        for value in directory.values():
+            if isinstance(value, dict):
+                pending.append((depth + 1, get_json_contents(value)))
+    return max_depth
+
+
+def get_json_contents(value: Dict[str, Any]) -> Dict[str, Any]:
+    """Gets the entries of a directory of a snapshot, unwrapping {'dir': {...}} (see FileStructure.get_json_contents).
+    """
+    contents: Any = value.get('dir')
+    return contents if isinstance(contents, dict) else value
+
+
+def flatten_snapshot(last_sync_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts a snapshot with the structure of FileStructure.files_to_json() to one level, keyed by the "/" separated
+    path of each entry, parents before their entries. Files keep their mod time, directories keep the keys of their
+    {'dir': {...}, ...} dict other than 'dir' (e.g. 'digests').
+
+    Returns:
+        flat_dict (dict[str, Any]): Flattened snapshot, marked with {"/format": "flat"} (names do not contain "/", so
+            the key is not the path of an entry).
+    """
+    flat_dict: Dict[str, Any] = {"/format": flat_format}
+    pending: List[Tuple[str, Dict[str, Any]]] = [("", last_sync_dict)]
+    while pending:
+        path, directory = pending.pop()
+        for name, value in directory.items():
+            entry_path: str = f"{path}/{name}" if path else name
+            if isinstance(value, dict):
+                contents: Dict[str, Any] = get_json_contents(value)
+                flat_dict[entry_path] = {key: item for key, item in value.items() if key != 'dir'} \
+                    if contents is not value else dict()
+                pending.append((entry_path, contents))
+            else:
+                flat_dict[entry_path] = value
+    return flat_dict
+
+
+def unflatten_snapshot(flat_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts a snapshot flattened by flatten_snapshot back to the structure of FileStructure.files_to_json()."""
+    last_sync_dict: Dict[str, Any] = dict()
+    directories: Dict[str, Dict[str, Any]] = {"": last_sync_dict}
+    for entry_path, value in flat_dict.items():
+        if entry_path.startswith("/"):
+            continue
+        parent_path, _, name = entry_path.rpartition("/")
+        parent: Optional[Dict[str, Any]] = directories.get(parent_path)
+        if parent is None:
+            continue
+        if isinstance(value, dict):
+            contents: Dict[str, Any] = dict()
+            parent[name] = {'dir': contents, **value}
+            directories[entry_path] = contents
+        else:
+            parent[name] = value
+    return last_sync_dict
 
 
 class ConfigManager:
@@ -13,22 +88,148 @@ class ConfigManager:
 
     Args:
         config_path (Path): Path to the configuration directory.
-        sync_dir_file (Path): Path to sync_directories_file.json. File contains the directories that will be sync'd.
+        sync_dir_file (Path): Path to sync_directories_file.json. File contains the directories that will be sync'd,
+            either as a list or as {"directories": [...], "ignore": [...]} with the gitignore-style patterns of entries
+            excluded from the sync (see ignore_rules.py). Several independent pairs can be configured by name instead,
+            as {"pairs": {"photos": {"directories": [...], "ignore": [...], "priority": 2}, ...}} (see PairConfig).
+        sorted_last_sync_file (Path): Path to last_sync_file.sorted.jsonl. File contains the snapshot of the last sync
+            as records sorted by path when memory_budget is set (see external_diff.py), in place of last_sync_file.
+        tombstone_file (Path): Path to tombstone_file.json. File contains deletions that have been detected.
+        backends (dict[str, Type[DBInterface]]): DBInterface of sync directories that are not accessed through db
+            (e.g. directories on a remote agent), by the prefix of those directories (e.g. "remote:").
+        extra_ignore_patterns (list[str]): Ignore patterns added for this run (e.g. from the command line), applied
+            after the patterns in sync_directories_file.json.
         min_dir (int): Indicates the minimum number of directories required to sync.
+        tombstone_retention (float): Seconds a tombstone is kept after the deletion was detected.
+        full_sweep_every (int): Enables tiered (hot/cold) scanning with a full sweep every full_sweep_every cycles if
+            greater than 0 (see scan_scheduler.py).
+        pipeline (bool): Runs each cycle as one asyncio pipeline overlapping scan, diff and copy (see pipeline.py)
+            instead of Check then Sync.
+        memory_budget (int): Runs each cycle as a streaming diff of sorted runs on disk using about memory_budget bytes
+            for its records (see external_diff.py) if greater than 0, instead of building the trees in memory.
+        max_nested_depth (int): Snapshots with more directory levels are written to last_sync_file.json flattened.
+        lock (threading.RLock): Held while sync_directories_file.json is read or written, so pairs running on
+            different threads do not read a partially written file.
         verbose (bool)
     """
     min_dir: int = 2
+    tombstone_retention: float = 30 * 24 * 60 * 60
+    full_sweep_every: int = 0
+    pipeline: bool = False
+    memory_budget: int = 0
+    max_nested_depth: int = 100
 
     def __init__(self, db: Type[DBInterface], verbose: bool = False) -> None:
         self.db: Type[DBInterface] = db
         config_path: DBInterface = self.db.cwd()
         self.sync_dir_file: DBInterface = config_path / "sync_directories_file.json"
         self.last_sync_file: DBInterface = config_path / "last_sync_file.json"
+        self.sorted_last_sync_file: DBInterface = config_path / "last_sync_file.sorted.jsonl"
+        self.tombstone_file: DBInterface = config_path / "tombstone_file.json"
+        self.backends: Dict[str, Type[DBInterface]] = dict()
+        self.extra_ignore_patterns: List[str] = []
+        self.ignore_rules: Optional[IgnoreRules] = None
+        self.lock: threading.RLock = threading.RLock()
         self.verbose: bool = verbose
 
+    def add_backend(self, prefix: str, db: Type[DBInterface]) -> None:
+        """Accesses sync directories starting with prefix through db."""
+        self.backends[prefix] = db
+
+    def get_db(self, directory: str) -> Type[DBInterface]:
+        """Gets the DBInterface used to access a sync directory."""
+        for prefix, db in self.backends.items():
+            if directory.startswith(prefix):
+                return db
+        return self.db
+
     def get_min_dir(self) -> int:
         return self.min_dir
 
+    def get_tombstone_retention(self) -> float:
+        return self.tombstone_retention
+
+    def set_tombstone_retention(self, tombstone_retention: float) -> None:
+        self.tombstone_retention = tombstone_retention
+
+    def get_full_sweep_every(self) -> int:
+        return self.full_sweep_every
+
+    def set_full_sweep_every(self, full_sweep_every: int) -> None:
+        self.full_sweep_every = full_sweep_every
+
+    def get_pipeline(self) -> bool:
+        return self.pipeline
+
+    def set_pipeline(self, pipeline: bool = True) -> None:
+        self.pipeline = pipeline
+
+    def get_memory_budget(self) -> int:
+        return self.memory_budget
+
+    def set_memory_budget(self, memory_budget: int) -> None:
+        self.memory_budget = memory_budget
+
+    def get_scan_scheduler(self) -> Optional[ScanScheduler]:
+        """Creates the ScanScheduler of a sync directory, None if tiered scanning is disabled."""
+        if self.full_sweep_every <= 0:
+            return None
+        return ScanScheduler(self.full_sweep_every)
+
+    def read_sync_dir_file(self) -> Any:
+        with self.lock:
+            if not self.sync_dir_file.exists():
+                return []
+            with self.sync_dir_file.open() as file_to_read:
+                return json.load(file_to_read)
+
+    def write_sync_dir_file(self, buffer: Any) -> None:
+        with self.lock, self.sync_dir_file.open("w") as file_to_write:
+            json.dump(buffer, file_to_write)
+
+    def read_pairs(self) -> Dict[str, Any]:
+        """Gets the named sync pairs from sync_directories_file.json.
+
+        Returns:
+            pairs (dict[str, Any]): Settings of each pair with a valid name (letters, digits, "_", "." and "-"), by
+                name, in the same formats as the whole file (a list or a dict). Empty if no pairs are configured.
+        """
+        buffer: Any = self.read_sync_dir_file()
+        if not isinstance(buffer, dict) or not isinstance(buffer.get("pairs"), dict):
+            return dict()
+        return {name: settings for name, settings in buffer["pairs"].items()
+                if pair_name_pattern.match(name) and isinstance(settings, (list, dict))}
+
+    def write_pair(self, name: str, settings: Any) -> None:
+        """Stores the settings of a named pair in sync_directories_file.json, keeping its other settings.
+
+        Args:
+            name (str): Name of the pair.
+            settings (Any): Directories (list) or settings (dict) of the pair, merged into its existing settings.
+        """
+        if not pair_name_pattern.match(name):
+            raise ValueError(f"Invalid pair name: {name}")
+        with self.lock:
+            buffer: Any = self.read_sync_dir_file()
+            if not isinstance(buffer, dict):
+                buffer = dict()
+            if not isinstance(buffer.get("pairs"), dict):
+                buffer["pairs"] = dict()
+            previous: Any = buffer["pairs"].get(name)
+            if isinstance(previous, list):
+                previous = {'directories': previous}
+            if isinstance(previous, dict):
+                settings = dict(previous, **(settings if isinstance(settings, dict) else {'directories': settings}))
+            buffer["pairs"][name] = settings
+            self.write_sync_dir_file(buffer)
+
+    def has_pairs(self) -> bool:
+        return len(self.read_pairs()) > 0
+
+    def get_pair_configs(self) -> List["PairConfig"]:
+        """Creates the config of every named pair, in the order of sync_directories_file.json."""
+        return [PairConfig(self, name) for name in self.read_pairs()]
+
     def read_sync_directories(self) -> List[str]:
         """Gets directories to be synchronized from config file and/or from user.
 
@@ -38,10 +239,9 @@ class ConfigManager:
         Returns:
             directories (list[str]): Existing, unique directories found in "sync_directories_file.json".
         """
-        buffer: List[str] = []
-        if self.sync_dir_file.exists():
-            with self.sync_dir_file.open() as file_to_read:
-                buffer = json.load(file_to_read)
+        buffer: Any = self.read_sync_dir_file()
+        if isinstance(buffer, dict):
+            buffer = buffer.get("directories", [])
 
         if not isinstance(buffer, list):
             buffer = []
@@ -49,8 +249,10 @@ class ConfigManager:
         directories: List[str] = []
         for entry in buffer[::-1]:
             buffer.pop()
-            if self.db(entry).exists() and entry not in buffer:
+            if self.get_db(entry)(entry).exists() and entry not in buffer:
                 directories.append(entry)
+        # In the order of the file, so each directory keeps its side (index) in the snapshot digests (see merkle.py).
+        directories.reverse()
 
         return directories
 
@@ -64,7 +266,7 @@ class ConfigManager:
         Returns:
             existing_dirs (list[str]): existing directories with new directory added (or not).
         """
-        if new_dir not in existing_dirs and self.db(new_dir).exists():
+        if new_dir not in existing_dirs and self.get_db(new_dir)(new_dir).exists():
             existing_dirs.append(new_dir)
 
         return existing_dirs
@@ -81,23 +283,216 @@ class ConfigManager:
         assert isinstance(buffer, list)
 
         if len(buffer) >= self.min_dir:
-            with self.sync_dir_file.open("w") as file_to_write:
-                json.dump(buffer, file_to_write)
+            ignore_patterns: List[str] = self.read_ignore_patterns()
+            if ignore_patterns:
+                self.write_sync_dir_file({'directories': buffer, 'ignore': ignore_patterns})
+            else:
+                self.write_sync_dir_file(buffer)
             return True
         return False
 
+    def read_ignore_patterns(self) -> List[str]:
+        """Gets the ignore patterns of the sync directories from sync_directories_file.json.
+
+        Returns:
+            patterns (list[str]): Gitignore-style patterns, empty if the file only lists the directories.
+        """
+        buffer: Any = self.read_sync_dir_file()
+        if not isinstance(buffer, dict) or not isinstance(buffer.get("ignore"), list):
+            return []
+        return [pattern for pattern in buffer["ignore"] if isinstance(pattern, str)]
+
+    def write_ignore_patterns(self, patterns: List[str]) -> None:
+        """Stores the ignore patterns of the sync directories in sync_directories_file.json."""
+        buffer: Any = self.read_sync_dir_file()
+        directories: Any = buffer.get("directories", []) if isinstance(buffer, dict) else buffer
+        self.write_sync_dir_file({'directories': directories if isinstance(directories, list) else [],
+                                  'ignore': patterns})
+
+    def add_ignore_patterns(self, patterns: List[str]) -> None:
+        self.extra_ignore_patterns.extend(patterns)
+
+    def get_ignore_rules(self) -> Optional[IgnoreRules]:
+        """Gets the compiled ignore patterns of the sync directories, only compiled again when the patterns change.
+
+        Returns:
+            ignore_rules (IgnoreRules, optional): None if there are no patterns.
+        """
+        patterns: Tuple[str, ...] = tuple(self.read_ignore_patterns() + self.extra_ignore_patterns)
+        if not patterns:
+            return None
+        if self.ignore_rules is None or tuple(self.ignore_rules.get_patterns()) != patterns:
+            self.ignore_rules = IgnoreRules(list(patterns))
+        return self.ignore_rules
+
     def read_last_sync_file(self) -> Dict[str, Any]:
+        """Reads last_sync_file.json, migrating it to integer nanosecond mod times if it was written with floats.
+
+        If only last_sync_file.sorted.jsonl exists (the last sync used memory_budget), the snapshot is read from it.
+
+        Returns:
+            last_sync_files (dict[str, Any]): Same structure as FileStructure.files_to_json().
+        """
         last_sync_files: Dict[str, Any] = dict()
         if self.last_sync_file.exists():
-            with self.last_sync_file.open() as json_file:
+            with get_tracer().span("read_last_sync_file", "state_store"), self.last_sync_file.open() as json_file:
                 last_sync_files = json.load(json_file)
+                if last_sync_files.get("/format") == flat_format:
+                    last_sync_files = unflatten_snapshot(last_sync_files)
                 if self.verbose:
                     print("Read last_sync_file.json")
+            if self.count_float_mod_times(last_sync_files) > 0:
+                last_sync_files = self.migrate_mod_times(last_sync_files)
+                self.write_last_sync_file(last_sync_files)
+                if self.verbose:
+                    print("Migrated last_sync_file.json to nanosecond mod times")
+        elif self.sorted_last_sync_file.exists():
+            with self.sorted_last_sync_file.open() as records_file:
+                last_sync_files = records_to_snapshot(read_records(records_file))
         else:
             if self.verbose:
                 print("No last_sync_file found.")
         return last_sync_files
 
+    def count_float_mod_times(self, file_dict: Dict[str, Any]) -> int:
+        float_count: int = 0
+        pending: List[Dict[str, Any]] = [file_dict]
+        while pending:
+            for value in pending.pop().values():
+                if isinstance(value, dict):
+                    pending.append(value)
+                elif isinstance(value, float):
+                    float_count += 1
+        return float_count
+
+    def migrate_mod_times(self, file_dict: Dict[str, Any]) -> Dict[str, Any]:
+        """Converts float second mod times (written by older versions) to integer nanoseconds, with a stack instead of
+        recursion.
+
+        Args:
+            file_dict (dict[str, Any]): Same structure as FileStructure.files_to_json(), may contain floats.
+
+        Returns:
+            migrated_dict (dict[str, Any]): Copy of file_dict with every float mod time converted to an int.
+        """
+        migrated_dict: Dict[str, Any] = dict()
+        pending: List[Tuple[Dict[str, Any], Dict[str, Any]]] = [(file_dict, migrated_dict)]
+        while pending:
+            source_dict, target_dict = pending.pop()
+            for key, value in source_dict.items():
+                if isinstance(value, dict):
+                    target_dict[key] = dict()
+                    pending.append((value, target_dict[key]))
+                elif isinstance(value, float):
+                    target_dict[key] = round(value * 1_000_000_000)
+                else:
+                    target_dict[key] = value
+        return migrated_dict
+
     def write_last_sync_file(self, file_dict: Dict[str, Any]) -> None:
-        with self.last_sync_file.open("w") as json_file:
+        """Writes the snapshot of the last sync to last_sync_file.json.
+
+        JSON encoders and decoders recurse once per level, so a snapshot more than max_nested_depth directories deep
+        is written flattened (see flatten_snapshot), read_last_sync_file converts it back.
+        """
+        if get_snapshot_depth(file_dict) > self.max_nested_depth:
+            file_dict = flatten_snapshot(file_dict)
+        with get_tracer().span("write_last_sync_file", "state_store"), self.last_sync_file.open("w") as json_file:
             json.dump(file_dict, json_file)
+        if self.sorted_last_sync_file.exists():
+            self.sorted_last_sync_file.unlink()
+
+    def read_sorted_last_sync_file(self) -> Iterator[Record]:
+        """Streams the snapshot of the last sync from last_sync_file.sorted.jsonl as records sorted by path.
+
+        If only last_sync_file.json exists (the last sync did not use memory_budget), it is converted in memory once.
+        """
+        if not self.sorted_last_sync_file.exists():
+            for record in snapshot_to_records(self.read_last_sync_file()):
+                yield record
+            return None
+        with get_tracer().span("read_sorted_last_sync_file", "state_store"), \
+                self.sorted_last_sync_file.open() as records_file:
+            for record in read_records(records_file):
+                yield record
+
+    def write_sorted_last_sync_file(self, records: Iterable[Record]) -> None:
+        """Writes the snapshot of the last sync (records sorted by path) to last_sync_file.sorted.jsonl.
+
+        The records are written to a temporary file first, so the previous snapshot is kept if writing fails.
+        last_sync_file.json is removed, as it no longer matches the last sync.
+        """
+        temp_file: DBInterface = self.sorted_last_sync_file.get_parent() / \
+            f"{self.sorted_last_sync_file.get_name()}.tmp"
+        with get_tracer().span("write_sorted_last_sync_file", "state_store"):
+            with temp_file.open("w") as records_file:
+                write_records(records_file, records)
+            if self.sorted_last_sync_file.exists():
+                self.sorted_last_sync_file.unlink()
+            temp_file.rename(self.sorted_last_sync_file)
+        if self.last_sync_file.exists():
+            self.last_sync_file.unlink()
+
+    def read_tombstones(self) -> List[Tombstone]:
+        """Reads tombstones from tombstone_file.json, dropping tombstones older than tombstone_retention.
+
+        Returns:
+            tombstones (list[Tombstone]): Unexpired tombstones.
+        """
+        buffer: List[Dict[str, Any]] = []
+        if self.tombstone_file.exists():
+            with get_tracer().span("read_tombstones", "state_store"), self.tombstone_file.open() as json_file:
+                buffer = json.load(json_file)
+        return self.remove_expired([Tombstone.from_json(tombstone_dict) for tombstone_dict in buffer])
+
+    def write_tombstones(self, tombstones: List[Tombstone]) -> None:
+        with get_tracer().span("write_tombstones", "state_store"), self.tombstone_file.open("w") as json_file:
+            json.dump([tombstone.to_json() for tombstone in self.remove_expired(tombstones)], json_file)
+
+    def remove_expired(self, tombstones: List[Tombstone]) -> List[Tombstone]:
+        retention_ns: int = int(self.tombstone_retention * 1_000_000_000)
+        return [tombstone for tombstone in tombstones if not tombstone.is_expired(retention_ns)]
+
+
+class PairConfig(ConfigManager):
+    """Configuration of one named sync pair in sync_directories_file.json.
+
+    The pair's entry of "pairs" is read and written in place of the whole file, so its directories and ignore patterns
+    work as they do for a single pair. Each pair keeps its own last sync and tombstone files
+    (last_sync_file.<name>.json or last_sync_file.<name>.sorted.jsonl, tombstone_file.<name>.json), backends and
+    command line settings are shared with the parent ConfigManager.
+
+    Attributes:
+        parent (ConfigManager): Config the pair was read from.
+        name (str): Name of the pair.
+        priority (int): Weight of the pair when pairs share worker pools (see pair_scheduler.py), at least 1.
+    """
+    def __init__(self, parent: ConfigManager, name: str) -> None:
+        super().__init__(parent.db, verbose=parent.verbose)
+        self.parent: ConfigManager = parent
+        self.name: str = name
+        self.backends = parent.backends
+        self.extra_ignore_patterns = parent.extra_ignore_patterns
+        self.tombstone_retention = parent.tombstone_retention
+        self.full_sweep_every = parent.full_sweep_every
+        self.pipeline = parent.pipeline
+        self.memory_budget = parent.memory_budget
+        config_path: DBInterface = self.db.cwd()
+        self.last_sync_file = config_path / f"last_sync_file.{name}.json"
+        self.sorted_last_sync_file = config_path / f"last_sync_file.{name}.sorted.jsonl"
+        self.tombstone_file = config_path / f"tombstone_file.{name}.json"
+        settings: Any = self.read_sync_dir_file()
+        priority: Any = settings.get("priority", 1) if isinstance(settings, dict) else 1
+        self.priority: int = priority if isinstance(priority, int) and priority >= 1 else 1
+
+    def get_name(self) -> str:
+        return self.name
+
+    def get_priority(self) -> int:
+        return self.priority
+
+    def read_sync_dir_file(self) -> Any:
+        return self.parent.read_pairs().get(self.name, [])
+
+    def write_sync_dir_file(self, buffer: Any) -> None:
+        self.parent.write_pair(self.name, buffer)
@@ -0,0 +1,94 @@
+"""Headless Sync Daemon
+
+Runs sync cycles continuously without a GUI until SIGTERM or SIGINT is received. Only modules that do not depend on wx
+are imported, so the daemon runs on machines without a display.
+
+Usage:
+    python -m syncfiles.daemon [arguments ...]
+
+Same as python -m syncfiles --headless [arguments ...], the arguments are parsed by cli.py. The cli runs the daemon
+with run_daemon, or run_pairs if sync_directories_file.json configures named pairs ({"pairs": {...}}), in which case
+every pair is run by one PairScheduler with at most --scan-workers pairs scanning and --copy-workers pairs syncing at
+once (see pair_scheduler.py).
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, List, Optional, Type
+import signal
+import sys
+from syncfiles.adaptive_interval import AdaptiveInterval
+from syncfiles import cli
+from syncfiles.config_manager import ConfigManager
+from syncfiles.file_system_interface import DBInterface
+from syncfiles.headless_ui import HeadlessUI
+from syncfiles.pair_scheduler import PairScheduler
+from syncfiles.sync_state_machine import StateObserver, SyncStateMachine
+from syncfiles.sync_states import Initial, StateData
+
+
+def install_signal_handlers(ui: HeadlessUI) -> None:
+    """Requests a clean exit from the UI when SIGTERM or SIGINT is received."""
+    def handle_signal(signum: int, frame: Any) -> None:
+        ui.request_exit()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+
+def run_daemon(config: ConfigManager, ui: HeadlessUI, db: Type[DBInterface], interval: float,
+               verbose: bool = False, observers: Optional[List[StateObserver]] = None,
+               adaptive_interval: Optional[AdaptiveInterval] = None) -> int:
+    """Runs sync cycles until the ui requests an exit or an unrecoverable error occurs.
+
+    Args:
+        observers (list[StateObserver], optional): Observers added to the state machine.
+        adaptive_interval (AdaptiveInterval, optional): Adapts the interval after every cycle instead of keeping it.
+
+    Returns:
+        int: 0 if the daemon exited cleanly, 1 if it exited because of an error.
+    """
+    state_data: StateData = StateData(config, ui, db, verbose=verbose)
+    state_data.sleep_time = interval
+    state_data.adaptive_interval = adaptive_interval
+    state_machine: SyncStateMachine = SyncStateMachine()
+    for observer in observers if observers is not None else []:
+        state_machine.add_observer(observer)
+    state_machine.set_initial_state(Initial(state_data))
+    state_machine.run()
+    if state_data.error_raised:
+        if state_data.error is not None:
+            print(state_data.error.get_error_message(), file=sys.stderr)
+        return 1
+    return 0
+
+
+def run_pairs(config: ConfigManager, ui: HeadlessUI, db: Type[DBInterface], interval: float,
+              verbose: bool = False, observers: Optional[List[StateObserver]] = None,
+              adaptive_interval: Optional[AdaptiveInterval] = None, scan_workers: int = 2,
+              copy_workers: int = 2) -> int:
+    """Runs the named pairs of config on one PairScheduler until the ui requests an exit.
+
+    Returns:
+        int: 0 if every pair exited cleanly, 1 if a pair stopped because of an error.
+    """
+    scheduler: PairScheduler = PairScheduler(ui, scan_workers, copy_workers)
+    for pair_config in config.get_pair_configs():
+        scheduler.add_pair(pair_config, db, interval, verbose, observers, adaptive_interval)
+    scheduler.run()
+    exit_code: int = 0
+    for pair in scheduler.get_pairs():
+        if pair.state_data.error_raised:
+            if pair.state_data.error is not None:
+                print(f"{pair.name}: {pair.state_data.error.get_error_message()}", file=sys.stderr)
+            exit_code = 1
+    return exit_code
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Runs python -m syncfiles --headless with argv (sys.argv[1:] by default)."""
+    return cli.main(["--headless"] + (argv if argv is not None else sys.argv[1:]))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
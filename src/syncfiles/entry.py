@@ -3,14 +3,14 @@
 Author: Kevin Hodge
 """
 
-from typing import Dict, List, Optional, KeysView
+from typing import Dict, Iterator, List, Optional, KeysView, Tuple
 
 
 class entry:
     """Contains info on a file/folder.
 
     Attributes:
-        mod_time (float): last modification time of entry.
+        mod_time (int): last modification time of entry in integer nanoseconds.
         updated (bool): describes the modification status of entry.
     """
     def __init__(self):
@@ -24,28 +24,40 @@ class entry:
 
 
 class file_entry(entry):
-    def __init__(self, mod_time: float = -1.0) -> None:
-        self.__mod_time: float = mod_time
+    def __init__(self, mod_time: int = -1) -> None:
+        self.__mod_time: int = mod_time
         super().__init__()
 
-    def get_mod_time(self) -> float:
+    def get_mod_time(self) -> int:
         return self.__mod_time
 
 
 class dir_entry(entry):
+    """Contains the entries of a folder.
+
+    Attributes:
+        digests (dict[int, str], optional): Merkle digest of the folder by side (index of the sync directory, see
+            merkle.py), None until a digest is set.
+    """
     def __init__(self) -> None:
         self.__dict: Dict[str, entry] = dict()
+        self.__digests: Optional[Dict[int, str]] = None
         super().__init__()
 
     def __repr__(self, offset: int = 0) -> str:
-        print_str: str = ""
-        indent: str = 3 * offset * ' '
-        for entry_name in self.get_keys():
-            fstruct_entry: entry = self.get_entry(entry_name)
-            print_str += self.print_entry(indent, entry_name, fstruct_entry)
+        lines: List[str] = []
+        pending: List[Tuple[int, Iterator[Tuple[str, entry]]]] = [(offset, iter(self.__dict.items()))]
+        while pending:
+            level, entries = pending[-1]
+            next_entry: Optional[Tuple[str, entry]] = next(entries, None)
+            if next_entry is None:
+                pending.pop()
+                continue
+            entry_name, fstruct_entry = next_entry
+            lines.append(self.print_entry(3 * level * ' ', entry_name, fstruct_entry))
             if isinstance(fstruct_entry, dir_entry):
-                print_str += fstruct_entry.__repr__(offset + 1)
-        return print_str
+                pending.append((level + 1, iter(fstruct_entry.__dict.items())))
+        return "".join(lines)
 
     def print_entry(self, indent: str, entry_name: str, entry: entry) -> str:
         entry_repr: str = f"{indent}{entry_name}"
@@ -58,21 +70,42 @@ class dir_entry(entry):
     def add_entry(self, key: str, entry: entry) -> None:
         self.__dict[key] = entry
 
+    def has_entry(self, requested_entry: str) -> bool:
+        return requested_entry in self.__dict
+
     def get_entry(self, requested_entry: str) -> entry:
         return self.__dict[requested_entry]
 
     def get_entry_path(self, keys: List[str]) -> Optional[entry]:
-        if keys[0] in self.__dict:
-            file_or_dir_entry: entry = self.__dict[keys[0]]
-            if len(keys) == 1:
+        """Gets the entry at keys (names from this directory down), None if there is none.
+
+        Raises:
+            KeyError: An entry on the path before the last is not a directory.
+        """
+        directory: dir_entry = self
+        for index, key in enumerate(keys):
+            if key not in directory.__dict:
+                return None
+            file_or_dir_entry: entry = directory.__dict[key]
+            if index == len(keys) - 1:
                 return file_or_dir_entry
-            elif len(keys) > 1 and isinstance(file_or_dir_entry, dir_entry):
-                directory: dir_entry = file_or_dir_entry
-                return directory.get_entry_path(keys[1:])
-            else:
+            if not isinstance(file_or_dir_entry, dir_entry):
                 raise KeyError("get_entry_path argument keys was not valid")
-        else:
-            return None
+            directory = file_or_dir_entry
+        return None
 
     def get_keys(self) -> KeysView[str]:
         return self.__dict.keys()
+
+    def get_digest(self, side: int) -> Optional[str]:
+        if self.__digests is None:
+            return None
+        return self.__digests.get(side)
+
+    def set_digest(self, side: int, digest: str) -> None:
+        if self.__digests is None:
+            self.__digests = dict()
+        self.__digests[side] = digest
+
+    def set_digests(self, digests: Dict[int, str]) -> None:
+        self.__digests = digests
@@ -0,0 +1,350 @@
+"""Contains ExternalSorter and StreamingDiff.
+
+Syncs directories whose trees do not fit in memory. Instead of building a FileStructure of each sync directory, each
+cycle works on streams of records (path split into names, is_dir, mod_time) sorted by path:
+    - scan: the entries of each sync directory are read one at a time (DBInterface.iter_dir) into an ExternalSorter,
+      which sorts the records it holds and writes them to a run file on disk whenever they use up its share of
+      memory_budget, then merges the runs into one sorted stream (in passes of as many files as the share allows).
+    - diff: the streams of both directories and the sorted snapshot of the last sync are merge-joined, so each path
+      is seen once with its record in every directory and in the snapshot. Each updated entry is synced as soon as it
+      is seen, with the action SyncManager takes for it. Each entry of the snapshot that is missing from one directory
+      is deleted from the other unless it (or anything within it) was updated.
+    - snapshot: if changes were found, both directories are scanned again and the entries they share are joined into
+      the new sorted snapshot.
+Paths are compared as lists of names, so the entries within a directory directly follow it in every stream and a
+deleted directory has been seen completely once a path outside it comes up.
+
+Each scan gets an equal share of memory_budget. The records it buffers are measured as they are added (record_size), and
+its merges open only as many run files as fit in the share with their read buffers, so the memory used is about
+memory_budget plus the directories still to be listed, however many entries the sync directories have. Below a few
+KiB the minimum of two open runs with 512 byte buffers exceeds the budget. Deletions are found from the snapshot in each
+cycle, persisted tombstones are not used.
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Type
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+import time
+from syncfiles.file_system_interface import DBInterface
+from syncfiles.ignore_rules import IgnoreRules
+from syncfiles.snapshot_records import Record, read_records, record_key, write_records
+from syncfiles.sync_exception import SyncException
+from syncfiles.sync_manager import SyncManager
+from syncfiles.sync_stats import SyncStats
+
+
+def record_size(record: Record) -> int:
+    """Gets the bytes a buffered record holds: the tuple, its path and names, its mod time and its slot in the buffer
+    (names shared with other records are counted for each of them)."""
+    path: List[str] = record[0]
+    return sys.getsizeof(record) + sys.getsizeof(path) + sum(sys.getsizeof(name) for name in path) + \
+        sys.getsizeof(record[2]) + 8
+
+
+def merge_join(streams: List[Iterator[Record]]) -> Iterator[Tuple[List[str], List[Optional[Record]]]]:
+    """Joins streams sorted by path.
+
+    Yields:
+        path (list[str]): Each path found in any stream, in sorted order.
+        records (list[Record, optional]): Record of the path in each stream, None if the stream does not have it.
+    """
+    heads: List[Optional[Record]] = [next(stream, None) for stream in streams]
+    while any(head is not None for head in heads):
+        path: List[str] = min(head[0] for head in heads if head is not None)
+        records: List[Optional[Record]] = []
+        for index, head in enumerate(heads):
+            if head is not None and head[0] == path:
+                records.append(head)
+                heads[index] = next(streams[index], None)
+            else:
+                records.append(None)
+        yield path, records
+
+
+def is_within(path: List[str], directory: List[str]) -> bool:
+    return len(path) > len(directory) and path[:len(directory)] == directory
+
+
+class ExternalSorter:
+    """Sorts records by path, holding at most run_bytes of them in memory.
+
+    Attributes:
+        run_bytes (int): Bytes of records (record_size) buffered before they are sorted and written to a run file.
+        max_open_runs (int): Most run files merged (open) at once.
+        run_buffering (int): Buffer size of each run file, in bytes.
+        temp_dir (str, optional): Directory of the run files, created when the first run is written.
+        records (list[Record]): Buffered records.
+        buffered_bytes (int): Bytes of the buffered records.
+        runs (list[str]): Paths of the run files.
+        record_count (int): Records added.
+        runs_written (int): Run files written, including the runs of intermediate merge passes.
+    """
+    def __init__(self, run_bytes: int, max_open_runs: int = 64, run_buffering: int = 8192) -> None:
+        if run_bytes < 1 or max_open_runs < 2 or run_buffering < 1:
+            raise ValueError("An ExternalSorter needs at least 1 byte per run and buffer and 2 open runs.")
+        self.run_bytes: int = run_bytes
+        self.max_open_runs: int = max_open_runs
+        self.run_buffering: int = run_buffering
+        self.temp_dir: Optional[str] = None
+        self.records: List[Record] = []
+        self.buffered_bytes: int = 0
+        self.runs: List[str] = []
+        self.record_count: int = 0
+        self.runs_written: int = 0
+
+    def add(self, record: Record) -> None:
+        self.records.append(record)
+        self.record_count += 1
+        self.buffered_bytes += record_size(record)
+        if self.buffered_bytes >= self.run_bytes:
+            self.write_run()
+
+    def write_run(self) -> None:
+        self.records.sort(key=record_key)
+        self.runs.append(self.write_run_file(self.records))
+        self.records = []
+        self.buffered_bytes = 0
+
+    def write_run_file(self, records: Iterable[Record]) -> str:
+        if self.temp_dir is None:
+            self.temp_dir = tempfile.mkdtemp(prefix="syncfiles_runs_")
+        file_descriptor, run_path = tempfile.mkstemp(suffix=".jsonl", dir=self.temp_dir)
+        with open(file_descriptor, "w", buffering=self.run_buffering) as run_file:
+            write_records(run_file, records)
+        self.runs_written += 1
+        return run_path
+
+    def merge_runs(self, runs: List[str]) -> Iterator[Record]:
+        # Binary files, so run_buffering bounds what each one reads ahead (text files also decode 8 KiB at a time).
+        run_files: List[Any] = [open(run, "rb", buffering=self.run_buffering) for run in runs]
+        try:
+            for record in heapq.merge(*[read_records(line.decode() for line in run_file) for run_file in run_files],
+                                      key=record_key):
+                yield record
+        finally:
+            for run_file in run_files:
+                run_file.close()
+
+    def sort(self) -> Iterator[Record]:
+        """Gets the added records sorted by path.
+
+        Records that fit in one run are sorted in memory. Otherwise the remaining records are written to a last run
+        and the runs are merged max_open_runs at a time into new runs until one merge is left, which is streamed.
+        """
+        if not self.runs:
+            self.records.sort(key=record_key)
+            records: List[Record] = self.records
+            self.records = []
+            self.buffered_bytes = 0
+            return iter(records)
+        if self.records:
+            self.write_run()
+        while len(self.runs) > self.max_open_runs:
+            merged: List[str] = self.runs[:self.max_open_runs]
+            self.runs = self.runs[self.max_open_runs:] + [self.write_run_file(self.merge_runs(merged))]
+            for run in merged:
+                os.remove(run)
+        return self.merge_runs(self.runs)
+
+    def close(self) -> None:
+        """Removes the run files."""
+        self.records = []
+        self.buffered_bytes = 0
+        self.runs = []
+        if self.temp_dir is not None:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = None
+
+
+class StreamingDiff:
+    """Syncs two directories with merge-joins of sorted streams (see the module docstring).
+
+    Attributes:
+        directories (list[str]): Sync directories, only the first two are synced (as SyncManager does).
+        dbs (list[Type[DBInterface]]): DBInterface of each sync directory.
+        memory_budget (int): Bytes of records and run buffers all scans of a pass hold at once, shared equally between
+            the scans.
+        ignore_rules (IgnoreRules, optional): Entries it excludes are not scanned.
+        stats (SyncStats): Stats of the cycle.
+        sync_manager (SyncManager): Performs the action of each change, without FileStructures.
+        synced (bool): True once changes were found and synced.
+        runs_written (int): Run files written by the scans, 0 if every scan fit in memory_budget.
+    """
+    max_open_runs: int = 64
+    min_run_buffering: int = 512
+    max_run_buffering: int = 8192
+
+    def __init__(self, directories: List[str], dbs: List[Type[DBInterface]], memory_budget: int,
+                 ignore_rules: Optional[IgnoreRules] = None, stats: Optional[SyncStats] = None) -> None:
+        self.directories: List[str] = directories[:2]
+        self.dbs: List[Type[DBInterface]] = dbs[:2]
+        self.memory_budget: int = memory_budget
+        self.ignore_rules: Optional[IgnoreRules] = ignore_rules
+        self.stats: SyncStats = stats if stats is not None else SyncStats()
+        self.sync_manager: SyncManager = SyncManager([], dbs[0], stats=self.stats)
+        for directory, db in zip(self.directories, self.dbs):
+            self.sync_manager.add_directory(directory, db)
+        self.synced: bool = False
+        self.runs_written: int = 0
+
+    def is_synced(self) -> bool:
+        return self.synced
+
+    def get_scan_budget(self) -> int:
+        """Gets the share of memory_budget of each scan, for its buffered records and then for its merges."""
+        return max(self.memory_budget // len(self.directories), 1)
+
+    def get_run_buffering(self) -> int:
+        """Gets the buffer size of the run files, a sixteenth of the scan budget (between min_run_buffering and
+        max_run_buffering)."""
+        return min(max(self.get_scan_budget() // 16, self.min_run_buffering), self.max_run_buffering)
+
+    def get_max_open_runs(self) -> int:
+        """Gets the most run files a merge opens so their buffers, and the lines and records read from them, fit in
+        the scan budget (between 2 and max_open_runs)."""
+        return min(max(self.get_scan_budget() // (2 * self.get_run_buffering()), 2), self.max_open_runs)
+
+    def run(self, last_sync_records: Iterable[Record]) -> int:
+        """Scans both directories, diffs them against the snapshot and syncs each change as it is found.
+
+        Args:
+            last_sync_records (Iterable[Record]): Snapshot of the last sync, sorted by path.
+
+        Returns:
+            changes_found (int): Number of updated and deleted entries found.
+        """
+        start_time: float = time.monotonic()
+        sorters: List[ExternalSorter] = []
+        try:
+            for directory, db in zip(self.directories, self.dbs):
+                scan_start: float = time.monotonic()
+                sorters.append(self.scan(directory, db))
+                self.stats.add_root_scan(directory, sorters[-1].record_count, time.monotonic() - scan_start)
+            streams: List[Iterator[Record]] = [sorter.sort() for sorter in sorters]
+            changes_found: int = self.sync_rows(merge_join(streams + [iter(last_sync_records)]))
+        finally:
+            for sorter in sorters:
+                sorter.close()
+        self.stats.add_changes_found(changes_found)
+        self.synced = changes_found > 0
+        self.stats.add_phase_time("Check", time.monotonic() - start_time)
+        return changes_found
+
+    def scan(self, directory: str, db: Type[DBInterface]) -> ExternalSorter:
+        sorter: ExternalSorter = ExternalSorter(self.get_scan_budget(), self.get_max_open_runs(),
+                                                self.get_run_buffering())
+        try:
+            for record in self.iter_directory(directory, db):
+                sorter.add(record)
+        except BaseException:
+            sorter.close()
+            raise
+        self.runs_written += sorter.runs_written
+        return sorter
+
+    def iter_directory(self, directory: str, db: Type[DBInterface]) -> Iterator[Record]:
+        """Yields the record of every entry of a sync directory, reading one directory at a time and its entries as
+        they are yielded (DBInterface.iter_dir).
+
+        Raises:
+            SyncException: The sync directory does not exist.
+        """
+        pending: List[Tuple[List[str], DBInterface]] = [([], db(directory))]
+        while pending:
+            path, listed_dir = pending.pop()
+            try:
+                for stat_record in listed_dir.iter_dir():
+                    record_path: List[str] = path + [stat_record.name]
+                    if self.ignore_rules is not None and self.ignore_rules.is_ignored("/".join(record_path),
+                                                                                      stat_record.is_dir):
+                        continue
+                    if stat_record.is_dir:
+                        yield record_path, True, 0
+                        pending.append((record_path, listed_dir / stat_record.name))
+                    elif stat_record.is_file:
+                        yield record_path, False, stat_record.mod_time
+            except (FileNotFoundError, NotADirectoryError):
+                if not path:
+                    raise SyncException("Sync Directory Does Not Exist", error_id="sync_dirs_do_not_exist")
+                # Removed while the sync directory was scanned.
+                continue
+
+    def is_updated(self, record: Optional[Record], last_sync_record: Optional[Record]) -> bool:
+        """Checks if an entry is new since the last sync, changed between file and directory since then or is a file
+        modified since then."""
+        if record is None:
+            return False
+        if last_sync_record is None or record[1] != last_sync_record[1]:
+            return True
+        return not record[1] and record[2] > last_sync_record[2]
+
+    def sync_rows(self, rows: Iterator[Tuple[List[str], List[Optional[Record]]]]) -> int:
+        """Syncs each path of the merge-join of both directories and the snapshot.
+
+        A deleted directory is removed from the other directory once its last path has been seen, if nothing within
+        it was updated.
+
+        Returns:
+            changes_found (int): Number of updated and deleted entries.
+        """
+        changes_found: int = 0
+        deleted_dir: Optional[List[str]] = None
+        deleted_from: str = ""
+        deleted_dir_updated: bool = False
+        for path, (record1, record2, last_sync_record) in rows:
+            if deleted_dir is not None and not is_within(path, deleted_dir):
+                if not deleted_dir_updated:
+                    self.sync_manager.delete_folder_from("/".join(deleted_dir), deleted_from)
+                deleted_dir = None
+            updated: List[bool] = [self.is_updated(record1, last_sync_record),
+                                   self.is_updated(record2, last_sync_record)]
+            changes_found += sum(updated)
+            if deleted_dir is not None:
+                deleted_dir_updated = deleted_dir_updated or any(updated)
+            elif last_sync_record is not None and (record1 is None) != (record2 is None):
+                changes_found += 1
+                remaining: Optional[Record] = record1 if record1 is not None else record2
+                assert remaining is not None
+                target_dir: str = self.directories[0] if record1 is not None else self.directories[1]
+                if remaining[1]:
+                    deleted_dir, deleted_from, deleted_dir_updated = path, target_dir, any(updated)
+                elif not any(updated):
+                    self.sync_manager.delete_file_from("/".join(path), target_dir)
+            if any(updated):
+                source: Optional[Record] = record1 if updated[0] else record2
+                assert source is not None
+                exists: List[int] = [int(record1 is not None), int(record2 is not None)]
+                other: Optional[Record] = record2 if updated[0] else record1
+                if other is not None and other[1] != source[1] and not all(updated):
+                    # The entry changed between file and directory, the other directory still has the old one.
+                    other_index: int = 1 if updated[0] else 0
+                    if other[1]:
+                        self.sync_manager.delete_folder_from("/".join(path), self.directories[other_index])
+                    else:
+                        self.sync_manager.delete_file_from("/".join(path), self.directories[other_index])
+                    exists[other_index] = 0
+                attributes: List[int] = [int(not source[1]), exists[0], exists[1], int(updated[0]), int(updated[1])]
+                self.sync_manager.execute_entry_action(attributes, "/".join(path))
+        if deleted_dir is not None and not deleted_dir_updated:
+            self.sync_manager.delete_folder_from("/".join(deleted_dir), deleted_from)
+        return changes_found
+
+    def iter_last_sync(self) -> Iterator[Record]:
+        """Scans both directories again and yields the snapshot of the sync sorted by path: the entries both
+        directories have, with the newest mod time of each file (as SyncManager.get_last_sync)."""
+        sorters: List[ExternalSorter] = []
+        try:
+            for directory, db in zip(self.directories, self.dbs):
+                sorters.append(self.scan(directory, db))
+            for path, (record1, record2) in merge_join([sorter.sort() for sorter in sorters]):
+                if record1 is None or record2 is None or record1[1] != record2[1]:
+                    continue
+                yield path, record1[1], max(record1[2], record2[2])
+        finally:
+            for sorter in sorters:
+                sorter.close()
@@ -3,10 +3,16 @@
 Author: Kevin Hodge
 """
 
-from typing import Any, List, Optional, Dict, Type
-from syncfiles.file_system_interface import DBInterface
+from typing import Any, Iterator, List, Optional, Dict, Tuple, Type, Union
+from syncfiles.file_system_interface import DBInterface, StatRecord
 from syncfiles.sync_exception import SyncException
 from syncfiles.entry import entry, file_entry, dir_entry
+from syncfiles.ignore_rules import IgnorePrune, IgnoreRules
+from syncfiles.merkle import compute_digests, hash_directory, is_unchanged, read_digests
+from syncfiles.name_table import NameTable
+from syncfiles.scan_scheduler import ScanScheduler
+from syncfiles.tombstone import Tombstone
+from syncfiles.tracer import get_tracer
 
 
 class FileStructure:
@@ -18,13 +24,33 @@ class FileStructure:
         files (dir_entry): Contains names of all files (strings) and all folders (dict with entries corresponding to the
             files and directories in the directory) in the directory. Folders contained in dicts, contain names of all
             files and folders in those folders, pattern continues until a directory with no folders is found.
+        tombstones (list[Tombstone]): Entries found in the last sync that no longer exist in the directory. Updated by
+            check_file_structure.
+        entry_count (int): Number of files and folders read by the last update_file_structure.
+        ignore_rules (IgnoreRules, optional): Entries excluded from the file structure, excluded directories are not
+            scanned.
+        scan_scheduler (ScanScheduler, optional): Lists only the directories it schedules in each update (hot/cold
+            tiers), the entries of the others are kept from the previous update. Every directory is scanned if None.
+        name_table (NameTable): Interns the names of the entries and of the last sync snapshot, shared with the other
+            sync directories so each name is held once (a table of its own if none is given).
+        side (int): Index of the sync directory in the pair (0 or 1), its digests are stored under it in the snapshot
+            (see merkle.py).
         verbose (bool): Indicates if messages will be printed for debugging.
     """
-    def __init__(self, directory_path: str, db_interface: Type[DBInterface], verbose: bool = False) -> None:
+    def __init__(self, directory_path: str, db_interface: Type[DBInterface], verbose: bool = False,
+                 ignore_rules: Optional[IgnoreRules] = None, scan_scheduler: Optional[ScanScheduler] = None,
+                 name_table: Optional[NameTable] = None, side: int = 0) -> None:
         self.__directory_path: str = directory_path
+        self.side: int = side
         self.db: Type[DBInterface] = db_interface
+        self.ignore_rules: Optional[IgnoreRules] = ignore_rules
+        self.scan_scheduler: Optional[ScanScheduler] = scan_scheduler
+        self.name_table: NameTable = name_table if name_table is not None else NameTable()
         self.dir_path_list = self.split_path(self.get_directory_path())
-        self.files: dir_entry = self.update_file_structure()
+        self.entry_count: int = 0
+        self.files: dir_entry = dir_entry()
+        self.update_file_structure()
+        self.tombstones: List[Tombstone] = []
         self.verbose: bool = verbose
 
     def split_path(self, path: str):
@@ -33,18 +59,34 @@ class FileStructure:
         elif "/" in str(path):
             return str(path).split("/")
 
-    def update_file_structure(self) -> dir_entry:
-        """Reads all files and folders below the directory.
+    def update_file_structure(self, full_scan: bool = False) -> dir_entry:
+        """Reads all files and folders below the directory and computes the Merkle digest of each folder (see
+        merkle.py).
+
+        Args:
+            full_scan (bool): Reads every directory even if scan_scheduler is set, without advancing its cycle (e.g.
+                after a sync has written to the directory).
 
         Returns:
             self.files (dict): Structure of this dictionary is described in the arguments documentation of
                 FileStructure.
         """
-        self.files = self.get_directory(self.__directory_path)
+        self.entry_count = 0
+        with get_tracer().span("scan", "scan", root=self.__directory_path) as span:
+            if self.scan_scheduler is None or full_scan:
+                self.files = self.get_directory(self.__directory_path)
+            else:
+                self.files = self.get_scheduled_directory(self.scan_scheduler)
+                span.set_arg("tiers", self.scan_scheduler.get_counts())
+            compute_digests(self.files, self.side)
+            span.set_arg("entries", self.entry_count)
         return self.files
 
     def get_directory(self, directory: str) -> dir_entry:
-        """Recursive function that gives the structure of all files and folder contained within a directory.
+        """Gives the structure of all files and folder contained within a directory.
+
+        The whole tree is read with one DBInterface.list_tree call, which returns the stat records of all entries (one
+        round-trip for remote backends). Entries excluded by ignore_rules are pruned during the walk.
 
         Args:
             directory (str): Path to the directory.
@@ -52,60 +94,364 @@ class FileStructure:
         Returns:
             file_structure (dir_entry): Same structure as FileStructure.files.
         """
-        if not self.db(directory).exists():
+        listing: Dict[str, List[StatRecord]] = self.list_tree(directory)
+        self.entry_count += self.count_entries(listing)
+        return self.build_directory(listing, "")
+
+    def list_tree(self, directory: str) -> Dict[str, List[StatRecord]]:
+        try:
+            return self.db(directory).list_tree(self.get_prune())
+        except (FileNotFoundError, NotADirectoryError):
             raise SyncException("Sync Directory Does Not Exist", error_id="sync_dirs_do_not_exist")
 
+    def count_entries(self, listing: Dict[str, List[StatRecord]]) -> int:
+        return sum(len(records) for records in listing.values())
+
+    def list_top_level(self) -> List[StatRecord]:
+        """Lists the top-level entries of the sync directory (without those excluded by ignore_rules), so each one
+        can be scanned as a subtree of its own with scan_subtree."""
+        try:
+            records: List[StatRecord] = self.db(self.__directory_path).list_dir()
+        except (FileNotFoundError, NotADirectoryError):
+            raise SyncException("Sync Directory Does Not Exist", error_id="sync_dirs_do_not_exist")
+        return [record for record in records if not self.is_ignored_path(record.name, record.is_dir)]
+
+    def start_subtree_scan(self) -> None:
+        """Empties self.files before its subtrees are added one at a time with add_subtree."""
+        self.files = dir_entry()
+        self.entry_count = 0
+
+    def scan_subtree(self, record: StatRecord) -> Tuple[Optional[entry], int]:
+        """Reads one top-level entry (from list_top_level) and everything below it, and computes the Merkle digests
+        of its directories. Only reads the directory, so the subtrees of a sync directory can be scanned on separate
+        threads.
+
+        Args:
+            record (StatRecord): Record of the top-level entry.
+
+        Returns:
+            subtree (entry, optional): The entry, None if it no longer exists or is neither a file nor a directory.
+            entry_count (int): Number of files and folders read, including the entry itself.
+        """
+        if record.is_file:
+            return file_entry(record.mod_time), 1
+        if not record.is_dir:
+            return None, 1
+        with get_tracer().span("scan", "scan", root=self.__directory_path, subtree=record.name):
+            try:
+                listing: Dict[str, List[StatRecord]] = self.db(str(self.db(self.__directory_path) / record.name)) \
+                    .list_tree(self.get_prune(record.name))
+            except (FileNotFoundError, NotADirectoryError):
+                return None, 0
+            directory: dir_entry = self.build_directory(listing, "")
+            compute_digests(directory, self.side)
+        return directory, self.count_entries(listing) + 1
+
+    def add_subtree(self, name: str, subtree: entry, entry_count: int) -> None:
+        """Adds a top-level entry read by scan_subtree to self.files."""
+        self.files.add_entry(self.name_table.intern(name), subtree)
+        self.entry_count += entry_count
+
+    def finish_subtree_scan(self) -> None:
+        """Sets the digest of the sync directory once every subtree has been added (add_subtree)."""
+        self.files.set_digest(self.side, hash_directory(self.files, self.side))
+
+    def get_scheduled_directory(self, scan_scheduler: ScanScheduler) -> dir_entry:
+        """Gives the structure of the sync directory, listing only the directories due in this cycle.
+
+        A full sweep reads the whole tree with one list_tree call. Otherwise due directories are listed with list_dir
+        and the entries of the others are kept from the previous update. Each listed directory is compared to the
+        previous update to tell the scheduler if it changed.
+
+        Returns:
+            file_structure (dir_entry): Same structure as FileStructure.files.
+        """
+        scan_scheduler.start_cycle()
+        listing: Optional[Dict[str, List[StatRecord]]] = None
+        if scan_scheduler.is_full_sweep():
+            listing = self.list_tree(self.__directory_path)
+        file_structure: Optional[dir_entry] = self.scan_scheduled_directory(
+            scan_scheduler, self.__directory_path, "", self.files, listing)
+        if file_structure is None:
+            raise SyncException("Sync Directory Does Not Exist", error_id="sync_dirs_do_not_exist")
+        scan_scheduler.finish_cycle()
+        return file_structure
+
+    def scan_scheduled_directory(self, scan_scheduler: ScanScheduler, path: str, relative_path: str,
+                                 previous: Optional[dir_entry], listing: Optional[Dict[str, List[StatRecord]]]
+                                 ) -> Optional[dir_entry]:
+        """Builds the dir_entry of a directory for get_scheduled_directory.
+
+        Uses a stack of the directories being built instead of recursion, so the depth of the tree is not limited by
+        the recursion limit. A directory is recorded with the scheduler once all of its sub-directories are built.
+
+        Args:
+            path (str): Path to the directory.
+            relative_path (str): Path relative to the sync directory, "/" separated.
+            previous (dir_entry, optional): The directory in the previous update, None if it is new.
+            listing (dict[str, list[StatRecord]], optional): list_tree listing of the sync directory in a full sweep.
+
+        Returns:
+            file_structure (dir_entry, optional): None if the directory no longer exists.
+        """
+        root: Optional[ScheduledDirectory] = self.open_scheduled_directory(scan_scheduler, path, relative_path,
+                                                                           previous, listing)
+        if root is None:
+            return None
+        pending: List[ScheduledDirectory] = [root]
+        while pending:
+            current: ScheduledDirectory = pending[-1]
+            item: Optional[Tuple[str, Union[entry, StatRecord]]] = next(current.entries, None)
+            if item is None:
+                pending.pop()
+                if current.scanned:
+                    scan_scheduler.record_scan(current.relative_path, current.changed)
+                continue
+            key, value = item
+            # Entries kept from the previous update are interned again too, the table is cleared each cycle.
+            name: str = self.name_table.intern(key)
+            sub_dir: Optional[ScheduledDirectory]
+            if isinstance(value, entry):
+                if isinstance(value, dir_entry):
+                    sub_dir = self.open_scheduled_directory(scan_scheduler, str(self.db(current.path) / name),
+                                                            self.join_relative(current.relative_path, name), value,
+                                                            None)
+                    if sub_dir is None:
+                        scan_scheduler.mark_changed(current.relative_path)
+                        continue
+                    current.directory.add_entry(name, sub_dir.directory)
+                    pending.append(sub_dir)
+                elif isinstance(value, file_entry):
+                    current.directory.add_entry(name, file_entry(value.get_mod_time()))
+                self.entry_count += 1
+                continue
+
+            previous_entry: Optional[entry] = None
+            if current.previous is not None and current.previous.has_entry(name):
+                previous_entry = current.previous.get_entry(name)
+            if value.is_file:
+                current.directory.add_entry(name, file_entry(value.mod_time))
+                current.changed = current.changed or not isinstance(previous_entry, file_entry) or \
+                    previous_entry.get_mod_time() != value.mod_time
+            elif value.is_dir:
+                sub_dir = self.open_scheduled_directory(
+                    scan_scheduler, str(self.db(current.path) / name), self.join_relative(current.relative_path, name),
+                    previous_entry if isinstance(previous_entry, dir_entry) else None, current.listing)
+                if sub_dir is None:
+                    current.changed = True
+                    continue
+                current.directory.add_entry(name, sub_dir.directory)
+                current.changed = current.changed or not isinstance(previous_entry, dir_entry)
+                pending.append(sub_dir)
+            self.entry_count += 1
+        return root.directory
+
+    def open_scheduled_directory(self, scan_scheduler: ScanScheduler, path: str, relative_path: str,
+                                 previous: Optional[dir_entry], listing: Optional[Dict[str, List[StatRecord]]]
+                                 ) -> Optional["ScheduledDirectory"]:
+        """Starts building a directory for scan_scheduled_directory: lists it if it is due (or in a full sweep),
+        otherwise its entries are taken from previous.
+
+        Returns:
+            scheduled_directory (ScheduledDirectory, optional): None if the directory no longer exists.
+        """
+        if listing is None and previous is not None and not scan_scheduler.is_due(relative_path):
+            scan_scheduler.record_skip(relative_path)
+            return ScheduledDirectory(path, relative_path, previous, None,
+                                      ((key, previous.get_entry(key)) for key in previous.get_keys()), False,
+                                      len(previous.get_keys()))
+        records: List[StatRecord]
+        if listing is not None:
+            records = listing.get(relative_path, [])
+        else:
+            try:
+                records = [record for record in self.db(path).list_dir()
+                           if not self.is_ignored_path(self.join_relative(relative_path, record.name), record.is_dir)]
+            except (FileNotFoundError, NotADirectoryError):
+                return None
+        return ScheduledDirectory(path, relative_path, previous, listing,
+                                  ((record.name, record) for record in records), True, len(records))
+
+    def join_relative(self, relative_path: str, name: str) -> str:
+        return f"{relative_path}/{name}" if relative_path else name
+
+    def build_directory(self, listing: Dict[str, List[StatRecord]], relative_path: str) -> dir_entry:
+        """Builds the dir_entry of a directory from a DBInterface.list_tree listing.
+
+        Uses a stack of the directories still to be filled instead of recursion, so the depth of the tree is not
+        limited by the recursion limit.
+        """
         file_structure: dir_entry = dir_entry()
-        for entry_path in self.db(directory).iterdir():
-            if entry_path.is_file():
-                last_mod_time: float = entry_path.get_mod_time()
-                file_structure.add_entry(str(entry_path.get_name()), file_entry(last_mod_time))
-            elif entry_path.is_dir():
-                file_structure.add_entry(str(entry_path.get_name()), self.get_directory(str(entry_path)))
+        pending: List[Tuple[str, dir_entry]] = [(relative_path, file_structure)]
+        while pending:
+            directory_path, directory = pending.pop()
+            for record in listing.get(directory_path, []):
+                name: str = self.name_table.intern(record.name)
+                if record.is_file:
+                    directory.add_entry(name, file_entry(record.mod_time))
+                elif record.is_dir:
+                    sub_dir: dir_entry = dir_entry()
+                    directory.add_entry(name, sub_dir)
+                    pending.append((self.join_relative(directory_path, name), sub_dir))
         return file_structure
 
     def get_directory_path(self) -> str:
         return self.__directory_path
 
+    def get_entry_count(self) -> int:
+        return self.entry_count
+
     def print_file_structure(self, offset: int = 1) -> str:
         return self.db(self.__directory_path).get_name() + "\n" + self.files.__repr__(offset)
 
     def check_file_structure(self, last_sync_dict: Dict[str, Any], path: Optional[str] = None,
-                             file_dir: Optional[dir_entry] = None) -> int:
+                             file_dir: Optional[dir_entry] = None, last_sync_files: Optional[dir_entry] = None) -> int:
         """Checks for updates within the self.files since the last sync.
 
+        Entries from the last sync that no longer exist are recorded in self.tombstones and are not counted as changes
+        (see find_deletions). The directory and the last sync are walked side by side with a stack instead of
+        recursion, so each entry is looked up in its last sync directory rather than from the root. Directories whose
+        Merkle digest matches their digest at the last sync are not walked (see merkle.py).
+
         Args:
-            last_sync_files (dict[str, Any]): Same structure as FileStructure.files. Represents the file structure from
-                the previous sync.
+            last_sync_dict (dict[str, Any]): Same structure as FileStructure.files_to_json(). Represents the file
+                structure from the previous sync.
             path (str, optional): Path to the directory directory.
+            file_dir (dir_entry, optional): Directory within self.files corresponding to path.
+            last_sync_files (dir_entry, optional): last_sync_dict converted by from_json, so it is only converted once.
         """
+        if last_sync_files is None:
+            last_sync_files = self.from_json(last_sync_dict, self.files if file_dir is None else None)
         if path is None:
             path = self.__directory_path
         if file_dir is None:
-            file_dir = self.files
+            with get_tracer().span("diff", "diff", root=self.__directory_path):
+                self.tombstones = self.find_deletions(last_sync_files, self.files)
+                return self.check_file_structure(last_sync_dict, path, self.files, last_sync_files)
 
-        last_sync_files: dir_entry = self.from_json(last_sync_dict)
-        changes_found: int = 0
+        last_sync_dir: Optional[entry] = last_sync_files
+        path_list: List[str] = self.get_relative_path(path)
+        if path_list:
+            try:
+                last_sync_dir = last_sync_files.get_entry_path(path_list)
+            except KeyError:
+                last_sync_dir = None
 
-        for key in file_dir.get_keys():
-            fstruct_entry: entry = file_dir.get_entry(key)
-            new_path: str = str(self.db(path) / key)
-            path_list: List[str] = self.get_relative_path(new_path)
-            last_sync_entry: Optional[entry] = last_sync_files.get_entry_path(path_list)
+        changes_found: int = 0
+        pending: List[Tuple[dir_entry, Optional[dir_entry]]] = [
+            (file_dir, last_sync_dir if isinstance(last_sync_dir, dir_entry) else None)]
+        while pending:
+            directory, last_sync_directory = pending.pop()
+            for key in directory.get_keys():
+                fstruct_entry: entry = directory.get_entry(key)
+                last_sync_entry: Optional[entry] = None
+                if last_sync_directory is not None and last_sync_directory.has_entry(key):
+                    last_sync_entry = last_sync_directory.get_entry(key)
 
-            if last_sync_entry is None:
-                fstruct_entry.set_updated()
-                changes_found += 1
-            else:
-                if isinstance(fstruct_entry, file_entry) and isinstance(last_sync_entry, file_entry):
+                if last_sync_entry is None:
+                    fstruct_entry.set_updated()
+                    changes_found += 1
+                elif isinstance(fstruct_entry, file_entry) and isinstance(last_sync_entry, file_entry):
                     if fstruct_entry.get_mod_time() > last_sync_entry.get_mod_time():
                         fstruct_entry.set_updated()
                         changes_found += 1
 
-            if isinstance(fstruct_entry, dir_entry):
-                changes_found += self.check_file_structure(last_sync_dict, new_path, fstruct_entry)
+                if isinstance(fstruct_entry, dir_entry):
+                    if isinstance(last_sync_entry, dir_entry):
+                        if is_unchanged(fstruct_entry, last_sync_entry, self.side):
+                            continue
+                        pending.append((fstruct_entry, last_sync_entry))
+                    else:
+                        pending.append((fstruct_entry, None))
         return changes_found
 
+    def find_deletions(self, last_sync_dir: dir_entry, file_dir: dir_entry,
+                       path_list: Optional[List[str]] = None) -> List[Tombstone]:
+        """Creates a tombstone for each entry in the last sync that no longer exists.
+
+        Only the top-most deleted entry gets a tombstone, entries within a deleted directory are covered by it. Entries
+        excluded by ignore_rules were not scanned, so they do not get tombstones.
+
+        Directories whose Merkle digest matches their digest at the last sync are not walked (see merkle.py).
+
+        Args:
+            last_sync_dir (dir_entry): Directory from the last sync.
+            file_dir (dir_entry): Corresponding directory within self.files.
+            path_list (list[str], optional): Path to last_sync_dir relative to the sync directory.
+
+        Returns:
+            tombstones (list[Tombstone]): Tombstones for the deleted entries.
+        """
+        if path_list is None:
+            path_list = []
+        tombstones: List[Tombstone] = []
+        # Each level holds its path and the keys of its last sync directory still to visit, so tombstones are found in
+        # the same (depth first) order as a recursive walk.
+        pending: List[Tuple[List[str], dir_entry, dir_entry, Iterator[str]]] = [
+            (path_list, last_sync_dir, file_dir, iter(last_sync_dir.get_keys()))]
+        while pending:
+            dir_path_list, last_sync_directory, directory, keys = pending[-1]
+            key: Optional[str] = next(keys, None)
+            if key is None:
+                pending.pop()
+                continue
+            last_sync_entry: entry = last_sync_directory.get_entry(key)
+            if not directory.has_entry(key):
+                if self.is_ignored(dir_path_list + [key], isinstance(last_sync_entry, dir_entry)):
+                    continue
+                tombstones.append(Tombstone(dir_path_list + [key], self.__directory_path,
+                                            is_dir=isinstance(last_sync_entry, dir_entry)))
+                continue
+            fstruct_entry: entry = directory.get_entry(key)
+            if isinstance(last_sync_entry, dir_entry) and isinstance(fstruct_entry, dir_entry) and \
+                    not is_unchanged(fstruct_entry, last_sync_entry, self.side):
+                pending.append((dir_path_list + [key], last_sync_entry, fstruct_entry,
+                                iter(last_sync_entry.get_keys())))
+        return tombstones
+
+    def get_subtree(self, key: str, directory: Optional[dir_entry] = None) -> dir_entry:
+        """Gets a dir_entry holding only the top-level entry key of directory (self.files by default), so one subtree
+        can be checked, listed or synced on its own. Empty if directory has no entry key."""
+        if directory is None:
+            directory = self.files
+        subtree: dir_entry = dir_entry()
+        if directory.has_entry(key):
+            subtree.add_entry(key, directory.get_entry(key))
+        return subtree
+
+    def check_subtree(self, key: str, last_sync_files: dir_entry) -> Tuple[int, List[Tombstone]]:
+        """Checks one top-level entry (and everything below it) for updates and deletions since the last sync, as
+        check_file_structure does for the whole directory. The tombstones are added to self.tombstones.
+
+        Args:
+            key (str): Name of the top-level entry.
+            last_sync_files (dir_entry): File structure from the previous sync (converted by from_json).
+
+        Returns:
+            changes_found (int): Number of updated entries within the subtree.
+            tombstones (list[Tombstone]): Deletions within the subtree.
+        """
+        with get_tracer().span("diff", "diff", root=self.__directory_path, subtree=key):
+            tombstones: List[Tombstone] = self.find_deletions(self.get_subtree(key, last_sync_files),
+                                                              self.get_subtree(key))
+            self.tombstones.extend(tombstones)
+            return self.check_file_structure({}, self.__directory_path, self.get_subtree(key),
+                                             last_sync_files), tombstones
+
+    def get_prune(self, relative_path: str = "") -> Optional[IgnorePrune]:
+        """Gets the prune callable of DBInterface.list_tree excluding the entries ignore_rules excludes below the
+        directory at relative_path, None if there are no ignore rules."""
+        return self.ignore_rules.get_prune(relative_path) if self.ignore_rules is not None else None
+
+    def is_ignored(self, path_list: List[str], is_dir: bool) -> bool:
+        return self.is_ignored_path("/".join(path_list), is_dir)
+
+    def is_ignored_path(self, relative_path: str, is_dir: bool) -> bool:
+        return self.ignore_rules is not None and self.ignore_rules.is_ignored(relative_path, is_dir)
+
+    def get_tombstones(self) -> List[Tombstone]:
+        return self.tombstones
+
     def get_relative_path(self, path: str) -> List[str]:
         path_list: List[str] = self.split_path(path)
         for index, _ in enumerate(path_list):
@@ -117,51 +463,143 @@ class FileStructure:
         return self.to_json(self.files)
 
     def to_json(self, directory: dir_entry) -> Dict[str, Any]:
+        """Converts directory to the structure of FileStructure.files_to_json, with a stack instead of recursion."""
         file_dict: Dict[str, Any] = dict()
-        for dir_entry_name in directory.get_keys():
-            directory_entry: entry = directory.get_entry(dir_entry_name)
-            if isinstance(directory_entry, dir_entry):
-                file_dict[dir_entry_name] = {'dir': self.to_json(directory_entry)}
-            elif isinstance(directory_entry, file_entry):
-                file_dict[dir_entry_name] = directory_entry.get_mod_time()
-            else:
-                raise TypeError(f"{type(directory_entry)} is not a dir_entry or file_entry.")
+        pending: List[Tuple[dir_entry, Dict[str, Any]]] = [(directory, file_dict)]
+        while pending:
+            current_dir, current_dict = pending.pop()
+            for dir_entry_name in current_dir.get_keys():
+                directory_entry: entry = current_dir.get_entry(dir_entry_name)
+                if isinstance(directory_entry, dir_entry):
+                    sub_dict: Dict[str, Any] = dict()
+                    current_dict[dir_entry_name] = {'dir': sub_dict}
+                    pending.append((directory_entry, sub_dict))
+                elif isinstance(directory_entry, file_entry):
+                    current_dict[dir_entry_name] = directory_entry.get_mod_time()
+                else:
+                    raise TypeError(f"{type(directory_entry)} is not a dir_entry or file_entry.")
         return file_dict
 
     def files_to_list(self) -> List[str]:
         return self.to_list(self.files)
 
     def to_list(self, directory: dir_entry, only_updated: bool = False, path: Optional[str] = None) -> List[str]:
+        """Gets the paths of the entries below directory (prefixed with path, the sync directory by default), see
+        iter_entries for large trees."""
         if path is None:
             path = self.__directory_path
-        file_list: List[str] = []
-        for file_or_dir_name in directory.get_keys():
-            file_or_dir_entry: entry = directory.get_entry(file_or_dir_name)
-            file_or_dir_path: Type[DBInterface] = self.db(path) / file_or_dir_name
-            file_or_dir_path_string: str = str(file_or_dir_path)
-            if only_updated:
-                if file_or_dir_entry.get_updated() > 0:
-                    file_list.append(file_or_dir_path_string)
-            else:
-                file_list.append(file_or_dir_path_string)
-            if isinstance(file_or_dir_entry, dir_entry):
-                directory_entry: dir_entry = file_or_dir_entry
-                file_list.extend(self.to_list(directory_entry, only_updated, file_or_dir_path_string))
-        return file_list
+        return [str(self.db(path) / relative_path) for relative_path, _ in self.iter_entries(directory, only_updated)]
 
     def get_updated_list(self) -> List[str]:
         return self.to_list(self.files, only_updated=True)
 
-    def from_json(self, file_dict: Dict[str, Any]) -> dir_entry:
+    def iter_entries(self, directory: Optional[dir_entry] = None, only_updated: bool = False,
+                     relative_path: str = "") -> Iterator[Tuple[str, entry]]:
+        """Yields the entries below directory (self.files by default) one at a time, depth first in the order of
+        to_list. Only the directories on the path to the current entry are held, not a list of every path.
+
+        Args:
+            directory (dir_entry, optional): Directory whose entries are yielded.
+            only_updated (bool): Only yields updated entries (every directory is still descended into).
+            relative_path (str): Path of directory relative to the sync directory, prefixed to the yielded paths.
+
+        Yields:
+            relative_path (str): Path of the entry relative to the sync directory, separated by "/".
+            entry (entry): The entry.
+        """
+        if directory is None:
+            directory = self.files
+        stack: List[Tuple[str, dir_entry, Iterator[str]]] = [(relative_path, directory, iter(directory.get_keys()))]
+        while stack:
+            parent_path, parent_dir, keys = stack[-1]
+            key: Optional[str] = next(keys, None)
+            if key is None:
+                stack.pop()
+                continue
+            child_entry: entry = parent_dir.get_entry(key)
+            child_path: str = self.join_relative(parent_path, key)
+            if not only_updated or child_entry.get_updated() > 0:
+                yield child_path, child_entry
+            if isinstance(child_entry, dir_entry):
+                stack.append((child_path, child_entry, iter(child_entry.get_keys())))
+
+    def iter_updated(self, directory: Optional[dir_entry] = None, relative_path: str = ""
+                     ) -> Iterator[Tuple[str, entry]]:
+        return self.iter_entries(directory, only_updated=True, relative_path=relative_path)
+
+    def find_entry(self, relative_path: str) -> Optional[entry]:
+        """Gets the entry at relative_path (separated by "/") within self.files, None if there is none."""
+        try:
+            return self.files.get_entry_path(relative_path.split("/"))
+        except KeyError:
+            return None
+
+    def from_json(self, file_dict: Dict[str, Any], scanned_files: Optional[dir_entry] = None) -> dir_entry:
+        """Converts the structure of FileStructure.files_to_json to a dir_entry, with a stack instead of recursion.
+        The digests stored with a snapshot (see merkle.py) are set on its directories.
+
+        Args:
+            file_dict (dict[str, Any]): Same structure as FileStructure.files_to_json().
+            scanned_files (dir_entry, optional): Scanned tree of this sync directory (self.files). Directories that
+                are unchanged since the snapshot (same digest) are left empty, as check_file_structure does not walk
+                them.
+        """
         directory: dir_entry = dir_entry()
-        if 'dir' in file_dict:
-            directory = self.from_json(file_dict['dir'])
-        else:
-            for key, fstruct_entry in file_dict.items():
+        pending: List[Tuple[Dict[str, Any], dir_entry, Optional[dir_entry]]] = [
+            (self.get_json_contents(file_dict), directory, scanned_files)]
+        while pending:
+            current_dict, current_dir, scanned_dir = pending.pop()
+            for key, fstruct_entry in current_dict.items():
+                name: str = self.name_table.intern(key)
                 if isinstance(fstruct_entry, dict):
-                    directory.add_entry(key, self.from_json(fstruct_entry))
-                elif isinstance(fstruct_entry, float):
-                    directory.add_entry(key, file_entry(fstruct_entry))
+                    sub_dir: dir_entry = dir_entry()
+                    digests: Any = fstruct_entry.get('digests')
+                    if isinstance(digests, dict):
+                        sub_dir.set_digests(read_digests(digests))
+                    current_dir.add_entry(name, sub_dir)
+                    scanned_sub_dir: Optional[entry] = scanned_dir.get_entry(name) \
+                        if scanned_dir is not None and scanned_dir.has_entry(name) else None
+                    if not isinstance(scanned_sub_dir, dir_entry):
+                        scanned_sub_dir = None
+                    elif is_unchanged(scanned_sub_dir, sub_dir, self.side):
+                        continue
+                    pending.append((self.get_json_contents(fstruct_entry), sub_dir, scanned_sub_dir))
+                elif isinstance(fstruct_entry, int):
+                    current_dir.add_entry(name, file_entry(fstruct_entry))
                 else:
-                    raise TypeError(f"{type(fstruct_entry)} is not a float or dict.")
+                    raise TypeError(f"{type(fstruct_entry)} is not an int or dict.")
         return directory
+
+    def get_json_contents(self, file_dict: Dict[str, Any]) -> Dict[str, Any]:
+        """Gets the entries of a directory in to_json's structure, unwrapping {'dir': {...}}."""
+        contents: Any = file_dict.get('dir')
+        if isinstance(contents, dict):
+            return contents
+        return file_dict
+
+
+class ScheduledDirectory:
+    """Directory being built by FileStructure.scan_scheduled_directory.
+
+    Attributes:
+        path (str): Path to the directory.
+        relative_path (str): Path relative to the sync directory, "/" separated.
+        previous (dir_entry, optional): The directory in the previous update, None if it is new.
+        listing (dict[str, list[StatRecord]], optional): list_tree listing of the sync directory in a full sweep.
+        entries (Iterator[tuple[str, entry | StatRecord]]): Entries still to add by name, the listed StatRecords if the
+            directory was listed, the entries of previous otherwise.
+        scanned (bool): Indicates if the directory was listed.
+        changed (bool): Indicates if the listing differs from previous so far.
+        directory (dir_entry): The directory being built.
+    """
+    def __init__(self, path: str, relative_path: str, previous: Optional[dir_entry],
+                 listing: Optional[Dict[str, List[StatRecord]]],
+                 entries: Iterator[Tuple[str, Union[entry, StatRecord]]], scanned: bool, entry_count: int) -> None:
+        self.path: str = path
+        self.relative_path: str = relative_path
+        self.previous: Optional[dir_entry] = previous
+        self.listing: Optional[Dict[str, List[StatRecord]]] = listing
+        self.entries: Iterator[Tuple[str, Union[entry, StatRecord]]] = entries
+        self.scanned: bool = scanned
+        self.changed: bool = previous is None or len(previous.get_keys()) != entry_count
+        self.directory: dir_entry = dir_entry()
@@ -4,12 +4,40 @@ Author: Kevin Hodge
 """
 
 from abc import ABC, abstractmethod, abstractclassmethod
-from typing import Generator, Any
+from typing import Callable, Dict, Generator, Any, Iterator, List, Optional, Set, Tuple
 from pathlib import Path
+import os
 import shutil
+import stat
+
+
+class StatRecord:
+    """Metadata of one entry, returned by the batched DBInterface calls.
+
+    Attributes:
+        name (str): Last entry in the path.
+        is_file (bool): Entry is a file.
+        is_dir (bool): Entry is a directory.
+        mod_time (int): Last modification time in integer nanoseconds.
+        size (int): Size in bytes.
+    """
+    def __init__(self, name: str, is_file: bool, is_dir: bool, mod_time: int, size: int) -> None:
+        self.name: str = name
+        self.is_file: bool = is_file
+        self.is_dir: bool = is_dir
+        self.mod_time: int = mod_time
+        self.size: int = size
+
+    def __repr__(self) -> str:
+        return f"StatRecord({self.name!r}, is_file={self.is_file}, is_dir={self.is_dir}, mod_time={self.mod_time})"
 
 
 class DBInterface(ABC):
+    """Interface to a file system (or database) of files and directories.
+
+    The batched calls (list_dir, list_tree, stat_many, mkdir_many, unlink_many) have default implementations built on
+    the per-path calls, backends override them to cut round-trips.
+    """
     @abstractmethod
     def __init__(self, directory: str) -> None:
         """Create Path."""
@@ -35,8 +63,12 @@ class DBInterface(ABC):
         """Gets last entry in path."""
 
     @abstractmethod
-    def get_mod_time(self) -> float:
-        """Gets last modification time."""
+    def get_mod_time(self) -> int:
+        """Gets last modification time in integer nanoseconds."""
+
+    @abstractmethod
+    def get_size(self) -> int:
+        """Gets size in bytes."""
 
     @abstractmethod
     def __repr__(self) -> str:
@@ -80,8 +112,124 @@ class DBInterface(ABC):
     def rmtree(self) -> None:
         """Removes direcotry at self.__path."""
 
+    def list_dir(self) -> List[StatRecord]:
+        """Gets a StatRecord for every entry in the directory.
+
+        Raises:
+            FileNotFoundError: Directory does not exist.
+        """
+        return [entry.get_stat_record() for entry in self.iterdir()]
+
+    def iter_dir(self) -> Iterator[StatRecord]:
+        """Yields a StatRecord for every entry in the directory. Backends override it to read the entries as they are
+        yielded, so a large directory is not held in memory at once as with list_dir.
+
+        Raises:
+            FileNotFoundError: Directory does not exist (possibly only once iterated).
+        """
+        return iter(self.list_dir())
+
+    def list_tree(self, prune: Optional[Callable[[str, bool], bool]] = None) -> Dict[str, List[StatRecord]]:
+        """Gets the StatRecords of the entries of this directory and every directory below it.
+
+        Args:
+            prune (Callable[[str, bool], bool], optional): Called with the path of each entry relative to this
+                directory and whether it is a directory, entries it returns True for are left out of the listing and
+                pruned directories are not listed at all.
+
+        Returns:
+            listing (dict[str, list[StatRecord]]): Records of each directory's entries, by the directory's path
+                relative to this directory ("/" separated, "" for this directory).
+
+        Raises:
+            FileNotFoundError: Directory does not exist.
+        """
+        listing: Dict[str, List[StatRecord]] = dict()
+        pending: List[Tuple[str, DBInterface]] = [("", self)]
+        while pending:
+            directory_path, directory = pending.pop()
+            records: List[StatRecord] = directory.list_dir()
+            kept_records: List[StatRecord] = []
+            for record in records:
+                record_path: str = f"{directory_path}/{record.name}" if directory_path else record.name
+                if prune is not None and prune(record_path, record.is_dir):
+                    continue
+                kept_records.append(record)
+                if record.is_dir:
+                    pending.append((record_path, directory / record.name))
+            listing[directory_path] = kept_records
+        return listing
+
+    def get_stat_record(self) -> StatRecord:
+        is_file: bool = self.is_file()
+        return StatRecord(self.get_name(), is_file, self.is_dir(), self.get_mod_time(),
+                          self.get_size() if is_file else 0)
+
+    @classmethod
+    def join_path(cls, directory: str, *names: str) -> str:
+        """Gets the path of names (one per level) within directory, backends override it to join the path at once
+        instead of creating a DBInterface for each level."""
+        path: DBInterface = cls(directory)
+        for name in names:
+            path = path / name
+        return str(path)
+
+    @classmethod
+    def stat_many(cls, paths: List[str]) -> List[Optional[StatRecord]]:
+        """Gets a StatRecord for each path, None for paths that do not exist."""
+        records: List[Optional[StatRecord]] = []
+        for path in paths:
+            entry_path: DBInterface = cls(path)
+            records.append(entry_path.get_stat_record() if entry_path.exists() else None)
+        return records
+
+    @classmethod
+    def mkdir_many(cls, paths: List[str]) -> None:
+        """Makes each directory in paths, including missing parents, existing directories are skipped."""
+        for path in paths:
+            cls(path).mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def unlink_many(cls, paths: List[str]) -> None:
+        """Deletes each file in paths."""
+        for path in paths:
+            cls(path).unlink()
+
+
+def stat_to_record(name: str, stat_result: os.stat_result) -> StatRecord:
+    return StatRecord(name, stat.S_ISREG(stat_result.st_mode), stat.S_ISDIR(stat_result.st_mode),
+                      stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def stat_or_none(name: str, stat_function: Callable[[], os.stat_result]) -> Optional[StatRecord]:
+    try:
+        return stat_to_record(name, stat_function())
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def group_by_parent(paths: List[str]) -> Dict[str, List[Tuple[int, str]]]:
+    """Groups paths by parent directory, keeping the index of each path in paths and its name."""
+    groups: Dict[str, List[Tuple[int, str]]] = dict()
+    for index, path in enumerate(paths):
+        parent, name = os.path.split(path)
+        groups.setdefault(parent, []).append((index, name))
+    return groups
+
+
+def open_dir_fd(directory: str) -> int:
+    return os.open(directory, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+
 
 class FSInterface(DBInterface):
+    """DBInterface for the local file system.
+
+    Where the platform supports it, the batched calls open each directory once and stat, list and unlink entries
+    relative to the directory file descriptor (dir_fd), so the path is not resolved again for every entry.
+    """
+    dir_fd_supported: bool = os.stat in os.supports_dir_fd and os.listdir in os.supports_fd and \
+        os.unlink in os.supports_dir_fd
+
     def __init__(self, directory: str) -> None:
         self.__path: Path = Path(directory)
 
@@ -101,8 +249,11 @@ class FSInterface(DBInterface):
     def get_name(self) -> str:
         return self.__path.name
 
-    def get_mod_time(self) -> float:
-        return self.__path.stat().st_mtime
+    def get_mod_time(self) -> int:
+        return self.__path.stat().st_mtime_ns
+
+    def get_size(self) -> int:
+        return self.__path.stat().st_size
 
     def __repr__(self) -> str:
         return str(self.__path)
@@ -114,6 +265,10 @@ class FSInterface(DBInterface):
     def cwd(cls) -> DBInterface:
         return cls(str(Path.cwd()))
 
+    @classmethod
+    def join_path(cls, directory: str, *names: str) -> str:
+        return os.path.join(directory, *names)
+
     def open(self, mode: str = "r") -> Any:
         return self.__path.open(mode)
 
@@ -134,4 +289,86 @@ class FSInterface(DBInterface):
         self.__path.mkdir(parents=parents, exist_ok=exist_ok)
 
     def rmtree(self) -> None:
-        shutil.rmtree(str(self.__path))
+        """Deletes the directory and everything in it, bottom-up with a stack instead of recursion (shutil.rmtree and
+        os.walk recurse once per level before Python 3.12), so the depth of the tree is not limited by the recursion
+        limit. Symbolic links are deleted, not followed."""
+        root: str = str(self.__path)
+        if os.path.islink(root):
+            raise OSError(f"Cannot call rmtree on a symbolic link: '{root}'")
+        # Each directory is pushed again (as listed) below its sub-directories, so it is removed once they are.
+        pending: List[Tuple[str, bool]] = [(root, False)]
+        while pending:
+            directory, listed = pending.pop()
+            if listed:
+                os.rmdir(directory)
+                continue
+            pending.append((directory, True))
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append((entry.path, False))
+                    else:
+                        os.unlink(entry.path)
+
+    def list_dir(self) -> List[StatRecord]:
+        directory: str = str(self.__path)
+        records: List[StatRecord] = []
+        if not self.dir_fd_supported:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    records.append(stat_or_none(entry.name, entry.stat) or StatRecord(entry.name, False, False, -1, 0))
+            return records
+        dir_fd: int = open_dir_fd(directory)
+        try:
+            for name in os.listdir(dir_fd):
+                record: Optional[StatRecord] = stat_or_none(name, lambda: os.stat(name, dir_fd=dir_fd))
+                records.append(record if record is not None else StatRecord(name, False, False, -1, 0))
+        finally:
+            os.close(dir_fd)
+        return records
+
+    def iter_dir(self) -> Iterator[StatRecord]:
+        with os.scandir(str(self.__path)) as entries:
+            for entry in entries:
+                yield stat_or_none(entry.name, entry.stat) or StatRecord(entry.name, False, False, -1, 0)
+
+    @classmethod
+    def stat_many(cls, paths: List[str]) -> List[Optional[StatRecord]]:
+        records: List[Optional[StatRecord]] = [None] * len(paths)
+        if not cls.dir_fd_supported:
+            for index, path in enumerate(paths):
+                records[index] = stat_or_none(os.path.basename(path), lambda: os.stat(path))
+            return records
+        for parent, entries in group_by_parent(paths).items():
+            try:
+                dir_fd: int = open_dir_fd(parent if parent else ".")
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            try:
+                for index, name in entries:
+                    records[index] = stat_or_none(name, lambda: os.stat(name, dir_fd=dir_fd))
+            finally:
+                os.close(dir_fd)
+        return records
+
+    @classmethod
+    def mkdir_many(cls, paths: List[str]) -> None:
+        created: Set[str] = set()
+        for path in sorted(paths):
+            if path not in created:
+                os.makedirs(path, exist_ok=True)
+                created.add(path)
+
+    @classmethod
+    def unlink_many(cls, paths: List[str]) -> None:
+        if not cls.dir_fd_supported:
+            for path in paths:
+                os.unlink(path)
+            return None
+        for parent, entries in group_by_parent(paths).items():
+            dir_fd: int = open_dir_fd(parent if parent else ".")
+            try:
+                for _, name in entries:
+                    os.unlink(name, dir_fd=dir_fd)
+            finally:
+                os.close(dir_fd)
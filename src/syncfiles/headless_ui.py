@@ -0,0 +1,53 @@
+"""Headless UI Implementation
+
+Author: Kevin Hodge
+"""
+
+from typing import List, Optional
+import threading
+from syncfiles.sync_ui import SyncUI
+from syncfiles.sync_exception import SyncException
+
+
+class HeadlessUI(SyncUI):
+    """Handles UI interactions without a user, so sync cycles can run unattended.
+
+    The program keeps syncing until request_exit is called (e.g. from a signal handler).
+
+    Attributes:
+        directories (list[str]): Directories returned by directory_prompt, in order.
+    """
+    def __init__(self, directories: Optional[List[str]] = None) -> None:
+        self.__exit_event: threading.Event = threading.Event()
+        self.__request_count: int = 0
+        if directories is not None:
+            self.__directories: List[str] = directories
+        else:
+            self.__directories = []
+        super().__init__()
+
+    def exit_prompt(self) -> bool:
+        """Returns True once an exit has been requested, never blocks."""
+        return self.__exit_event.is_set()
+
+    def directory_prompt(self, num_valid_dir: int, min_dir: int = 2) -> str:
+        """Returns the next directory provided at initialization.
+
+        Raises:
+            SyncException: No directories are left to provide, there is no user to ask.
+        """
+        if self.__request_count >= len(self.__directories):
+            raise SyncException(f"Only {num_valid_dir} valid, unique directories. Must have {str(min_dir)}.",
+                                error_id="sync_dirs_not_provided")
+        self.__request_count += 1
+        return self.__directories[self.__request_count - 1]
+
+    def wait(self, sleep_time: float) -> bool:
+        """Waits between sync cycles, returns early if an exit is requested."""
+        return self.__exit_event.wait(sleep_time)
+
+    def request_exit(self) -> None:
+        self.__exit_event.set()
+
+    def get_exit_request(self) -> bool:
+        return self.__exit_event.is_set()
@@ -0,0 +1,142 @@
+"""Contains IgnoreRules and IgnorePrune.
+
+Gitignore-style patterns that exclude entries of a sync pair from scanning and syncing:
+    - Blank lines and lines starting with "#" are skipped.
+    - A pattern without a "/" (other than a trailing one) matches a name at any depth, e.g. "node_modules", "*.tmp".
+    - A pattern with a "/" is matched against the whole path relative to the sync directory, e.g. "/build",
+      "docs/*.pdf". "**" matches any number of directories, e.g. "**/cache", "logs/**".
+    - A trailing "/" only matches directories, e.g. "build/".
+    - A leading "!" re-includes entries excluded by an earlier pattern, e.g. "*.log" then "!keep.log". As with git, an
+      entry inside an excluded directory cannot be re-included, because excluded directories are never listed.
+    - The last pattern matching an entry decides whether it is excluded.
+
+IgnorePrune (IgnoreRules.get_prune) is the prune callable FileStructure passes to DBInterface.list_tree, so the
+backends only see a function of the listed paths and not the rules.
+
+Author: Kevin Hodge
+"""
+
+from typing import List, Optional, Pattern, Tuple
+import re
+
+
+def translate(pattern: str) -> str:
+    """Translates the glob of a gitignore pattern (without "!" and the trailing "/") to a regular expression matching
+    paths relative to the sync directory."""
+    anchored: bool = "/" in pattern
+    pattern = pattern.lstrip("/")
+    regex: str = ""
+    index: int = 0
+    while index < len(pattern):
+        char: str = pattern[index]
+        if pattern.startswith("**/", index):
+            regex += "(?:.*/)?"
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            regex += ".*"
+            index += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end: int = pattern.find("]", index + 2)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                char_class: str = pattern[index + 1:end]
+                if char_class.startswith("!"):
+                    char_class = "^" + char_class[1:]
+                regex += "[" + char_class.replace("\\", "\\\\") + "]"
+                index = end
+        elif char == "\\" and index + 1 < len(pattern):
+            index += 1
+            regex += re.escape(pattern[index])
+        else:
+            regex += re.escape(char)
+        index += 1
+    return regex if anchored else "(?:.*/)?" + regex
+
+
+class IgnoreRules:
+    """Compiled gitignore-style patterns (see the module docstring).
+
+    Without "!" patterns every pattern is combined into one regular expression for directories and one for files, so
+    is_ignored is a single match. With "!" patterns the compiled rules are checked from last to first.
+
+    Attributes:
+        patterns (list[str]): Patterns the rules were compiled from.
+        rules (list[tuple[Pattern, bool, bool]]): Compiled pattern, negated (starts with "!") and directory only (ends
+            with "/") of each pattern.
+    """
+    def __init__(self, patterns: List[str]) -> None:
+        self.patterns: List[str] = list(patterns)
+        self.rules: List[Tuple[Pattern[str], bool, bool]] = []
+        for line in patterns:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated: bool = line.startswith("!")
+            if negated:
+                line = line[1:]
+            dir_only: bool = line.endswith("/")
+            line = line.rstrip("/")
+            if line:
+                self.rules.append((re.compile(translate(line) + r"\Z"), negated, dir_only))
+        self.has_negation: bool = any(negated for _, negated, _ in self.rules)
+        self.dir_regex: Optional[Pattern[str]] = self.combine([rule for rule, _, _ in self.rules])
+        self.file_regex: Optional[Pattern[str]] = self.combine(
+            [rule for rule, _, dir_only in self.rules if not dir_only])
+
+    def combine(self, rules: List[Pattern[str]]) -> Optional[Pattern[str]]:
+        if not rules:
+            return None
+        return re.compile("|".join(f"(?:{rule.pattern})" for rule in rules))
+
+    def get_patterns(self) -> List[str]:
+        return self.patterns
+
+    def is_empty(self) -> bool:
+        return not self.rules
+
+    def get_prune(self, relative_path: str = "") -> "IgnorePrune":
+        """Gets the prune callable of DBInterface.list_tree for the directory at relative_path."""
+        return IgnorePrune(self, relative_path)
+
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        """Checks if an entry is excluded.
+
+        Args:
+            relative_path (str): Path of the entry relative to the sync directory, "/" separated.
+            is_dir (bool): True if the entry is a directory.
+        """
+        if not self.has_negation:
+            regex: Optional[Pattern[str]] = self.dir_regex if is_dir else self.file_regex
+            return regex is not None and regex.match(relative_path) is not None
+        for rule, negated, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if rule.match(relative_path) is not None:
+                return not negated
+        return False
+
+
+class IgnorePrune:
+    """Checks the paths DBInterface.list_tree lists below a directory against IgnoreRules.
+
+    RemoteFileSystem.list_tree sends the patterns and relative_path to the agent, which prunes the listing there.
+
+    Attributes:
+        rules (IgnoreRules): Rules the paths are checked against.
+        relative_path (str): Path of the listed directory relative to the sync directory ("" for the sync directory
+            itself), prefixed to the listed paths.
+    """
+    def __init__(self, rules: IgnoreRules, relative_path: str = "") -> None:
+        self.rules: IgnoreRules = rules
+        self.relative_path: str = relative_path
+        self.prefix: str = f"{relative_path}/" if relative_path else ""
+
+    def __call__(self, path: str, is_dir: bool) -> bool:
+        return self.rules.is_ignored(self.prefix + path, is_dir)
@@ -41,25 +41,42 @@ Requirements (LR: 18):
 Author: Kevin Hodge
 """
 
-from typing import Type
+from typing import List, Optional, Type
+import sys
+from syncfiles.adaptive_interval import AdaptiveInterval
 from syncfiles.config_manager import ConfigManager
-from syncfiles.wx_gui import WxGUI
-from syncfiles.sync_state_machine import SyncStateMachine
+from syncfiles.sync_state_machine import StateObserver, SyncStateMachine
 from syncfiles.sync_states import Initial, StateData
 from syncfiles.file_system_interface import DBInterface, FSInterface
 
 
-def main() -> None:
+def run_gui(sleep_time: float = StateData.sleep_time, observers: Optional[List[StateObserver]] = None,
+            adaptive_interval: Optional[AdaptiveInterval] = None) -> int:
+    # wx takes hundreds of ms to import and may not be installed, so it is only imported when the GUI is selected.
+    from syncfiles.wx_gui import WxStatusGUI
+
     db: Type[DBInterface] = FSInterface
     config: ConfigManager = ConfigManager(db)
-    gui: WxGUI = WxGUI()
+    gui: WxStatusGUI = WxStatusGUI()
     state_data: StateData = StateData(config, gui, db, verbose=True)
+    state_data.sleep_time = sleep_time
+    state_data.adaptive_interval = adaptive_interval
     initial: Initial = Initial(state_data)
     # initial.set_exit_request()
     state_machine: SyncStateMachine = SyncStateMachine()
+    for observer in observers if observers is not None else []:
+        state_machine.add_observer(observer)
     state_machine.set_initial_state(initial)
-    state_machine.run()
+    gui.run(state_machine)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Runs python -m syncfiles with argv (see cli.py), which shows the status window unless --once or --headless is
+    given."""
+    from syncfiles import cli
+    return cli.main(argv)
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
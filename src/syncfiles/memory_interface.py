@@ -0,0 +1,327 @@
+"""In-memory DBInterface
+
+MemoryFileSystem keeps a directory tree in memory with a virtual clock for mod times and optional injected latency.
+DBInterface is used as a class (db(path), db.cwd(), db.copyfile(...)), so get_interface() returns a MemoryInterface
+subclass bound to one MemoryFileSystem. Separate file systems do not share state, so tests using them can run in
+parallel.
+
+Example:
+    db: Type[DBInterface] = MemoryFileSystem().get_interface()
+    db("/dir1").mkdir()
+    fstruct = FileStructure("/dir1", db)
+
+Paths use "/" as the separator, relative paths are relative to the file system's cwd.
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, Generator, List, Optional, Type, Union
+import io
+import posixpath
+import threading
+import time
+from syncfiles.file_system_interface import DBInterface, StatRecord
+from syncfiles.tombstone import current_time_ns
+
+
+class VirtualClock:
+    """Clock used for mod times, every call to tick() advances it by tick_ns.
+
+    Attributes:
+        now_ns (int): Current time in integer nanoseconds, starts at the current wall clock time by default so mod
+            times can be compared to tombstone deletion times.
+        tick_ns (int): Nanoseconds the clock advances per modification.
+    """
+    def __init__(self, start_ns: Optional[int] = None, tick_ns: int = 1000) -> None:
+        self.now_ns: int = start_ns if start_ns is not None else current_time_ns()
+        self.tick_ns: int = tick_ns
+
+    def tick(self) -> int:
+        self.now_ns += self.tick_ns
+        return self.now_ns
+
+    def advance(self, seconds: float) -> None:
+        self.now_ns += int(seconds * 1_000_000_000)
+
+    def get_time(self) -> int:
+        return self.now_ns
+
+
+class MemoryFile:
+    def __init__(self, data: bytes, mod_time: int) -> None:
+        self.data: bytes = data
+        self.mod_time: int = mod_time
+
+
+class MemoryDir:
+    def __init__(self, mod_time: int) -> None:
+        self.children: Dict[str, Union[MemoryFile, "MemoryDir"]] = dict()
+        self.mod_time: int = mod_time
+
+
+MemoryNode = Union[MemoryFile, MemoryDir]
+
+
+def node_to_record(name: str, node: MemoryNode) -> StatRecord:
+    if isinstance(node, MemoryFile):
+        return StatRecord(name, True, False, node.mod_time, len(node.data))
+    return StatRecord(name, False, True, node.mod_time, 0)
+
+
+class MemoryFileSystem:
+    """Directory tree kept in memory.
+
+    Attributes:
+        clock (VirtualClock): Clock used for mod times.
+        latency (float): Seconds every operation sleeps, simulating a slow or remote backend.
+        latencies (dict[str, float]): Seconds slept by specific operations (e.g. "iterdir", "copyfile"), overriding
+            latency.
+        operation_counts (dict[str, int]): Number of calls to each operation.
+        cwd (str): Directory returned by cwd() and used to resolve relative paths.
+    """
+    def __init__(self, clock: Optional[VirtualClock] = None, latency: float = 0.0,
+                 latencies: Optional[Dict[str, float]] = None, cwd: str = "/") -> None:
+        self.clock: VirtualClock = clock if clock is not None else VirtualClock()
+        self.latency: float = latency
+        self.latencies: Dict[str, float] = latencies if latencies is not None else dict()
+        self.operation_counts: Dict[str, int] = dict()
+        self.cwd: str = posixpath.normpath(posixpath.join("/", cwd))
+        self.root: MemoryDir = MemoryDir(self.clock.get_time())
+        self.lock: threading.RLock = threading.RLock()
+        self.mkdir(self.cwd, parents=True, exist_ok=True)
+
+    def get_interface(self) -> Type["MemoryInterface"]:
+        """Gets a DBInterface class bound to this file system."""
+        return type("MemoryInterface", (MemoryInterface,), {'file_system': self})
+
+    def record_operation(self, operation: str) -> None:
+        self.operation_counts[operation] = self.operation_counts.get(operation, 0) + 1
+        delay: float = self.latencies.get(operation, self.latency)
+        if delay > 0.0:
+            time.sleep(delay)
+
+    def normalize(self, path: str) -> str:
+        return posixpath.normpath(posixpath.join(self.cwd, str(path)))
+
+    def split(self, path: str) -> List[str]:
+        return [name for name in self.normalize(path).split("/") if name]
+
+    def get_node(self, path: str) -> Optional[MemoryNode]:
+        node: MemoryNode = self.root
+        for name in self.split(path):
+            if not isinstance(node, MemoryDir) or name not in node.children:
+                return None
+            node = node.children[name]
+        return node
+
+    def get_dir(self, path: str) -> MemoryDir:
+        node: Optional[MemoryNode] = self.get_node(path)
+        if node is None:
+            raise FileNotFoundError(f"No such directory: '{path}'")
+        if not isinstance(node, MemoryDir):
+            raise NotADirectoryError(f"Not a directory: '{path}'")
+        return node
+
+    def get_file(self, path: str) -> MemoryFile:
+        node: Optional[MemoryNode] = self.get_node(path)
+        if node is None:
+            raise FileNotFoundError(f"No such file: '{path}'")
+        if not isinstance(node, MemoryFile):
+            raise IsADirectoryError(f"Is a directory: '{path}'")
+        return node
+
+    def get_parent_dir(self, path: str) -> MemoryDir:
+        return self.get_dir(posixpath.dirname(self.normalize(path)))
+
+    def add_node(self, path: str, node: MemoryNode) -> None:
+        parent: MemoryDir = self.get_parent_dir(path)
+        parent.children[posixpath.basename(self.normalize(path))] = node
+        parent.mod_time = self.clock.tick()
+
+    def remove_node(self, path: str) -> MemoryNode:
+        parent: MemoryDir = self.get_parent_dir(path)
+        name: str = posixpath.basename(self.normalize(path))
+        if name not in parent.children:
+            raise FileNotFoundError(f"No such file or directory: '{path}'")
+        node: MemoryNode = parent.children.pop(name)
+        parent.mod_time = self.clock.tick()
+        return node
+
+    def write_file(self, path: str, data: bytes) -> None:
+        with self.lock:
+            node: Optional[MemoryNode] = self.get_node(path)
+            if isinstance(node, MemoryDir):
+                raise IsADirectoryError(f"Is a directory: '{path}'")
+            if isinstance(node, MemoryFile):
+                node.data = data
+                node.mod_time = self.clock.tick()
+            else:
+                self.add_node(path, MemoryFile(data, self.clock.tick()))
+
+    def mkdir(self, path: str, parents: bool = True, exist_ok: bool = True) -> None:
+        with self.lock:
+            node: Optional[MemoryNode] = self.get_node(path)
+            if node is not None:
+                if exist_ok and isinstance(node, MemoryDir):
+                    return None
+                raise FileExistsError(f"File exists: '{path}'")
+            missing_paths: List[str] = [self.normalize(path)]
+            parent_path: str = posixpath.dirname(missing_paths[-1])
+            while self.get_node(parent_path) is None:
+                if not parents:
+                    raise FileNotFoundError(f"No such directory: '{parent_path}'")
+                missing_paths.append(parent_path)
+                parent_path = posixpath.dirname(parent_path)
+            for missing_path in reversed(missing_paths):
+                self.add_node(missing_path, MemoryDir(self.clock.tick()))
+
+    def get_stat_record(self, path: str) -> Optional[StatRecord]:
+        node: Optional[MemoryNode] = self.get_node(path)
+        if node is None:
+            return None
+        return node_to_record(posixpath.basename(self.normalize(path)), node)
+
+    def rename(self, old_path: str, new_path: str) -> None:
+        with self.lock:
+            if self.get_node(new_path) is not None:
+                raise FileExistsError(f"File exists: '{new_path}'")
+            self.get_parent_dir(new_path)
+            self.add_node(new_path, self.remove_node(old_path))
+
+
+class MemoryWriter(io.BytesIO):
+    """Buffer that stores its contents in the file system when it is closed."""
+    def __init__(self, file_system: MemoryFileSystem, path: str, data: bytes = b"") -> None:
+        super().__init__(data)
+        self.seek(0, io.SEEK_END)
+        self.file_system: MemoryFileSystem = file_system
+        self.path: str = path
+
+    def close(self) -> None:
+        if not self.closed:
+            self.file_system.write_file(self.path, self.getvalue())
+        super().close()
+
+
+class MemoryInterface(DBInterface):
+    """DBInterface for a MemoryFileSystem, use MemoryFileSystem.get_interface() to get a bound subclass."""
+    file_system: MemoryFileSystem
+
+    def __init__(self, directory: str) -> None:
+        self.__path: str = self.file_system.normalize(directory)
+
+    def exists(self) -> bool:
+        self.file_system.record_operation("exists")
+        return self.file_system.get_node(self.__path) is not None
+
+    def iterdir(self) -> Generator[DBInterface, None, None]:
+        self.file_system.record_operation("iterdir")
+        with self.file_system.lock:
+            names: List[str] = sorted(self.file_system.get_dir(self.__path).children)
+        for name in names:
+            yield type(self)(posixpath.join(self.__path, name))
+
+    def is_file(self) -> bool:
+        self.file_system.record_operation("is_file")
+        return isinstance(self.file_system.get_node(self.__path), MemoryFile)
+
+    def is_dir(self) -> bool:
+        self.file_system.record_operation("is_dir")
+        return isinstance(self.file_system.get_node(self.__path), MemoryDir)
+
+    def get_name(self) -> str:
+        return posixpath.basename(self.__path)
+
+    def get_mod_time(self) -> int:
+        self.file_system.record_operation("get_mod_time")
+        node: Optional[MemoryNode] = self.file_system.get_node(self.__path)
+        if node is None:
+            raise FileNotFoundError(f"No such file or directory: '{self.__path}'")
+        return node.mod_time
+
+    def get_size(self) -> int:
+        self.file_system.record_operation("get_size")
+        return len(self.file_system.get_file(self.__path).data)
+
+    def __repr__(self) -> str:
+        return self.__path
+
+    def __truediv__(self, other: str) -> DBInterface:
+        return type(self)(posixpath.join(self.__path, str(other)))
+
+    @classmethod
+    def cwd(cls) -> DBInterface:
+        return cls(cls.file_system.cwd)
+
+    @classmethod
+    def join_path(cls, directory: str, *names: str) -> str:
+        return posixpath.join(cls.file_system.normalize(directory), *names)
+
+    def open(self, mode: str = "r") -> Any:
+        self.file_system.record_operation("open")
+        if "r" in mode and "+" not in mode:
+            data: bytes = self.file_system.get_file(self.__path).data
+            return io.BytesIO(data) if "b" in mode else io.StringIO(data.decode("utf-8"))
+        initial_data: bytes = b""
+        if "a" in mode and self.file_system.get_node(self.__path) is not None:
+            initial_data = self.file_system.get_file(self.__path).data
+        if "x" in mode and self.file_system.get_node(self.__path) is not None:
+            raise FileExistsError(f"File exists: '{self.__path}'")
+        self.file_system.get_parent_dir(self.__path)
+        writer: MemoryWriter = MemoryWriter(self.file_system, self.__path, initial_data)
+        return writer if "b" in mode else io.TextIOWrapper(writer, encoding="utf-8")
+
+    def unlink(self) -> None:
+        self.file_system.record_operation("unlink")
+        with self.file_system.lock:
+            self.file_system.get_file(self.__path)
+            self.file_system.remove_node(self.__path)
+
+    def get_parent(self) -> DBInterface:
+        return type(self)(posixpath.dirname(self.__path))
+
+    def rename(self, new_path: Any) -> DBInterface:
+        self.file_system.record_operation("rename")
+        self.file_system.rename(self.__path, str(new_path))
+        return type(self)(str(new_path))
+
+    @classmethod
+    def copyfile(cls, old_path: str, new_path: str) -> None:
+        cls.file_system.record_operation("copyfile")
+        cls.file_system.write_file(new_path, cls.file_system.get_file(old_path).data)
+
+    def mkdir(self, parents: bool = True, exist_ok: bool = True) -> None:
+        self.file_system.record_operation("mkdir")
+        self.file_system.mkdir(self.__path, parents, exist_ok)
+
+    def rmtree(self) -> None:
+        self.file_system.record_operation("rmtree")
+        with self.file_system.lock:
+            self.file_system.get_dir(self.__path)
+            self.file_system.remove_node(self.__path)
+
+    def list_dir(self) -> List[StatRecord]:
+        self.file_system.record_operation("list_dir")
+        with self.file_system.lock:
+            children: Dict[str, MemoryNode] = self.file_system.get_dir(self.__path).children
+            return [node_to_record(name, node) for name, node in sorted(children.items())]
+
+    @classmethod
+    def stat_many(cls, paths: List[str]) -> List[Optional[StatRecord]]:
+        cls.file_system.record_operation("stat_many")
+        with cls.file_system.lock:
+            return [cls.file_system.get_stat_record(path) for path in paths]
+
+    @classmethod
+    def mkdir_many(cls, paths: List[str]) -> None:
+        cls.file_system.record_operation("mkdir_many")
+        for path in sorted(paths):
+            cls.file_system.mkdir(path, parents=True, exist_ok=True)
+
+    @classmethod
+    def unlink_many(cls, paths: List[str]) -> None:
+        cls.file_system.record_operation("unlink_many")
+        with cls.file_system.lock:
+            for path in paths:
+                cls.file_system.get_file(path)
+                cls.file_system.remove_node(path)
@@ -0,0 +1,95 @@
+"""Merkle digests of directories.
+
+The digest of a directory is a hash of the names, types and mod times of its entries and of the digests of its
+sub-directories, so a directory whose digest has not changed has the same entries, with the same mod times, all the
+way down. Sizes are not part of the digest, the snapshot does not record them and a write changes the mod time.
+FileStructure.update_file_structure computes the digest of every directory it scans.
+
+SyncManager.get_last_sync stores the digest each sync directory had at the sync with the snapshot, as
+{'dir': {...}, 'digests': {"0": <digest>, "1": <digest>}}, keyed by the side (index of the sync directory in the
+pair, FileStructure.side) so the snapshot does not depend on where the directories are mounted. Digests are only
+stored for directories that have the same entries (names and types) on both sides, whose snapshot then holds every
+entry of either side. When
+FileStructure.check_file_structure finds that a directory's digest matches its digest at the last sync, nothing within
+it was added, modified or deleted, so the directory is not walked: checking idle sync directories only visits their
+top-level entries.
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+from syncfiles.entry import entry, dir_entry, file_entry
+
+
+def hash_directory(directory: dir_entry, side: int) -> str:
+    """Hashes the entries of a directory, the digests of its sub-directories (for side) must already be set."""
+    digest: Any = hashlib.blake2b(digest_size=16)
+    for name in sorted(directory.get_keys()):
+        child: entry = directory.get_entry(name)
+        if isinstance(child, dir_entry):
+            value: Any = f"d{child.get_digest(side)}"
+        elif isinstance(child, file_entry):
+            value = f"f{child.get_mod_time()}"
+        else:
+            raise TypeError(f"{type(child)} is not a dir_entry or file_entry.")
+        digest.update(f"{name}\0{value}\0".encode("utf-8", "surrogateescape"))
+    return str(digest.hexdigest())
+
+
+def compute_digests(directory: dir_entry, side: int) -> str:
+    """Sets the digest (for side) of directory and every directory below it, children before their parents.
+
+    Returns:
+        digest (str): Digest of directory.
+    """
+    directories: List[dir_entry] = []
+    pending: List[dir_entry] = [directory]
+    while pending:
+        current_dir: dir_entry = pending.pop()
+        directories.append(current_dir)
+        for name in current_dir.get_keys():
+            child: entry = current_dir.get_entry(name)
+            if isinstance(child, dir_entry):
+                pending.append(child)
+    # Each directory was listed before its sub-directories, so the reversed list has children first (directory last).
+    digest: str = ""
+    for current_dir in reversed(directories):
+        digest = hash_directory(current_dir, side)
+        current_dir.set_digest(side, digest)
+    return digest
+
+
+def is_unchanged(directory: dir_entry, last_sync_directory: dir_entry, side: int) -> bool:
+    """Checks if a scanned directory has the digest it had (in the side sync directory) at the last sync."""
+    last_digest: Optional[str] = last_sync_directory.get_digest(side)
+    return last_digest is not None and last_digest == directory.get_digest(side)
+
+
+def add_snapshot_digests(directories: List[Tuple[dir_entry, dir_entry, Dict[str, Any], Optional[Dict[str, Any]]]],
+                         sides: Tuple[int, int] = (0, 1)) -> None:
+    """Stores the digests of both sides in the snapshot of each directory that is the same on both sides.
+
+    Args:
+        directories (list[tuple]): Directory of each side, its entries in the snapshot and the {'dir': ...} dict of
+            the snapshot that holds them (None for the sync directories), parents before their sub-directories. The
+            digests of both sides must already be set (compute_digests).
+        sides (tuple[int, int]): Sides of the two directories.
+    """
+    complete: Dict[int, bool] = dict()
+    for directory1, directory2, directory_dict, wrapper_dict in reversed(directories):
+        is_complete: bool = len(directory_dict) == len(directory1.get_keys()) == len(directory2.get_keys())
+        for value in directory_dict.values():
+            if isinstance(value, dict):
+                is_complete = is_complete and complete.get(id(value['dir']), False)
+        complete[id(directory_dict)] = is_complete
+        if is_complete and wrapper_dict is not None:
+            wrapper_dict['digests'] = {str(side): directory.get_digest(side)
+                                       for side, directory in zip(sides, [directory1, directory2])}
+
+
+def read_digests(digests: Dict[str, Any]) -> Dict[int, str]:
+    """Converts the 'digests' of a snapshot directory to digests by side. Digests stored under anything but a side
+    (e.g. by sync directory, as older snapshots did) are dropped, so those directories are walked."""
+    return {int(side): digest for side, digest in digests.items()
+            if str(side).isdigit() and isinstance(digest, str)}
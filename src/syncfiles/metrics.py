@@ -0,0 +1,239 @@
+"""Metrics
+
+Counters and gauges in the Prometheus text exposition format. SyncMetrics collects them from the state machine (as a
+StateObserver) and from the SyncStats that SyncManager fills in, and can rewrite a textfile (for the node_exporter
+textfile collector) after every cycle. MetricsServer serves them over HTTP at /metrics.
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import math
+import os
+import socketserver
+import threading
+import weakref
+from syncfiles.sync_state_machine import StateEvent, StateObserver
+from syncfiles.sync_states import DataState
+from syncfiles.sync_stats import SyncStats
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Metric:
+    """One metric family (all samples with the same name).
+
+    Attributes:
+        name (str): Metric name, e.g. syncfiles_cycles_total.
+        help (str): Description written in the HELP line.
+        metric_type (str): "counter" or "gauge".
+        label_names (list[str]): Labels every sample has.
+        values (dict[LabelValues, float]): Sample value for each combination of label values.
+    """
+    def __init__(self, name: str, help: str, metric_type: str, label_names: Optional[List[str]] = None,
+                 lock: Optional[threading.Lock] = None) -> None:
+        self.name: str = name
+        self.help: str = help
+        self.metric_type: str = metric_type
+        self.label_names: List[str] = label_names if label_names is not None else []
+        self.lock: threading.Lock = lock if lock is not None else threading.Lock()
+        self.values: Dict[LabelValues, float] = dict()
+        if not self.label_names:
+            self.values[()] = 0
+
+    def get_label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if sorted(labels) != sorted(self.label_names):
+            raise ValueError(f"{self.name} requires labels {self.label_names}, got {list(labels)}.")
+        return tuple((label_name, str(labels[label_name])) for label_name in self.label_names)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if self.metric_type == "counter" and amount < 0:
+            raise ValueError(f"Counter {self.name} can only be increased.")
+        label_values: LabelValues = self.get_label_values(labels)
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def set(self, value: float, **labels: str) -> None:
+        if self.metric_type == "counter":
+            raise ValueError(f"Counter {self.name} can only be increased.")
+        label_values: LabelValues = self.get_label_values(labels)
+        with self.lock:
+            self.values[label_values] = value
+
+    def get(self, **labels: str) -> float:
+        with self.lock:
+            return self.values.get(self.get_label_values(labels), 0)
+
+    def render(self) -> List[str]:
+        lines: List[str] = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.metric_type}"]
+        for label_values, value in sorted(self.values.items()):
+            labels: str = ",".join(f"{name}=\"{escape_label_value(label)}\"" for name, label in label_values)
+            sample_name: str = f"{self.name}{{{labels}}}" if labels else self.name
+            lines.append(f"{sample_name} {format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Keeps metric families and renders them in the Prometheus text exposition format."""
+    def __init__(self) -> None:
+        self.lock: threading.Lock = threading.Lock()
+        self.metrics: Dict[str, Metric] = dict()
+
+    def add_metric(self, name: str, help: str, metric_type: str, label_names: Optional[List[str]] = None) -> Metric:
+        if name in self.metrics:
+            raise ValueError(f"Metric {name} is already registered.")
+        metric: Metric = Metric(name, help, metric_type, label_names, self.lock)
+        self.metrics[name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, label_names: Optional[List[str]] = None) -> Metric:
+        return self.add_metric(name, help, "counter", label_names)
+
+    def gauge(self, name: str, help: str, label_names: Optional[List[str]] = None) -> Metric:
+        return self.add_metric(name, help, "gauge", label_names)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self.lock:
+            for metric in self.metrics.values():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Writes the metrics to path, replacing it atomically so a reader never sees a partial file."""
+        temp_path: str = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as metrics_file:
+            metrics_file.write(self.render())
+        os.replace(temp_path, path)
+
+
+class SyncMetrics(StateObserver):
+    """Collects sync metrics from the states run by a SyncStateMachine.
+
+    A cycle is recorded when the machine enters Wait or Final, after its Check (and Sync) states ran, errors are
+    recorded when the Error state exits.
+
+    Attributes:
+        registry (MetricsRegistry): Registry the metrics are kept in.
+        textfile_path (str, optional): File rewritten after every recorded cycle.
+        recorded_stats (WeakSet[SyncStats]): Stats of the cycles already recorded, so each cycle is recorded once
+            when the state machines of several sync pairs share the observer.
+    """
+    cycle_end_states: List[str] = ["Wait", "Final"]
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, textfile_path: Optional[str] = None) -> None:
+        self.registry: MetricsRegistry = registry if registry is not None else MetricsRegistry()
+        self.textfile_path: Optional[str] = textfile_path
+        self.recorded_stats: "weakref.WeakSet[SyncStats]" = weakref.WeakSet()
+        self.cycles: Metric = self.registry.counter("syncfiles_cycles_total", "Sync cycles run.")
+        self.scan_duration: Metric = self.registry.gauge(
+            "syncfiles_scan_duration_seconds", "Seconds spent reading a sync directory in the last cycle.", ["root"])
+        self.scan_duration_total: Metric = self.registry.counter(
+            "syncfiles_scan_duration_seconds_total", "Seconds spent reading a sync directory.", ["root"])
+        self.entries: Metric = self.registry.gauge(
+            "syncfiles_entries", "Files and folders in a sync directory at the last scan.", ["root"])
+        self.scan_directories: Metric = self.registry.counter(
+            "syncfiles_scan_directories_total",
+            "Directories listed by tier (hot, cold) and cold directories skipped by tiered scanning.", ["tier"])
+        self.changes: Metric = self.registry.counter("syncfiles_changes_detected_total",
+                                                     "Updated entries and deletions detected.")
+        self.bytes_copied: Metric = self.registry.counter("syncfiles_bytes_copied_total",
+                                                          "Bytes copied between sync directories.")
+        self.operations: Metric = self.registry.counter("syncfiles_operations_total", "Sync operations run.",
+                                                        ["type"])
+        self.errors: Metric = self.registry.counter("syncfiles_errors_total", "Errors raised, by SyncException id.",
+                                                    ["error_id"])
+        self.propagation_latency: Metric = self.registry.gauge(
+            "syncfiles_propagation_latency_seconds",
+            "Seconds from the last modification of a copied file until it was copied, largest in the last cycle that "
+            "copied files.")
+        self.last_cycle: Metric = self.registry.gauge("syncfiles_last_cycle_duration_seconds",
+                                                      "Seconds taken by the last cycle (excluding Wait).")
+        self.wait_interval: Metric = self.registry.gauge("syncfiles_wait_interval_seconds",
+                                                         "Seconds Wait sleeps after the last cycle.")
+
+    def on_enter(self, event: StateEvent) -> None:
+        if event.name in self.cycle_end_states and isinstance(event.state, DataState):
+            self.record_cycle(event.state.get_stats())
+
+    def on_exit(self, event: StateEvent) -> None:
+        if event.name == "Error" and isinstance(event.state, DataState):
+            error: Any = event.state.state_data.error
+            self.errors.inc(error_id=error.get_error_id() if error is not None else "Unknown Error")
+            self.write_textfile()
+
+    def record_cycle(self, stats: SyncStats) -> None:
+        if stats in self.recorded_stats:
+            return None
+        self.recorded_stats.add(stats)
+        self.cycles.inc()
+        for root, scan_time in stats.scan_times.items():
+            self.scan_duration.set(scan_time, root=root)
+            self.scan_duration_total.inc(scan_time, root=root)
+        for root, entries in stats.root_entries.items():
+            self.entries.set(entries, root=root)
+        for tier, count in stats.scan_tiers.items():
+            self.scan_directories.inc(count, tier=tier)
+        self.changes.inc(stats.changes_found)
+        self.bytes_copied.inc(stats.bytes_copied)
+        for operation, count in stats.operations.items():
+            self.operations.inc(count, type=operation)
+        latency: float = stats.get_latency()
+        self.last_cycle.set(latency)
+        if stats.propagation_latency is not None:
+            self.propagation_latency.set(stats.propagation_latency)
+        if stats.wait_interval is not None:
+            self.wait_interval.set(stats.wait_interval)
+        self.write_textfile()
+
+    def write_textfile(self) -> None:
+        if self.textfile_path is not None:
+            self.registry.write_textfile(self.textfile_path)
+
+
+class MetricsServer:
+    """Serves a MetricsRegistry at http://host:port/metrics from a daemon thread."""
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "127.0.0.1") -> None:
+        self.registry: MetricsRegistry = registry
+        # Imported here so the entry points only import http.server when metrics are served.
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return None
+                body: bytes = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.server: socketserver.TCPServer = HTTPServer((host, port), MetricsHandler)
+        self.thread: threading.Thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def get_port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
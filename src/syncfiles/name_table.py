@@ -0,0 +1,66 @@
+"""Contains NameTable.
+
+Interns the names of entries. FileStructures that share a NameTable key their dir_entries with the table's single copy
+of each name, and convert the last sync snapshot (from_json) the same way, so a name such as index.js or README.md is
+held once however often it occurs in the sync directories and the snapshot. Comparing two interned names is an
+identity check.
+
+Each name also gets an id (its index in the table), so a path can be held and compared as a tuple of ids (to_ids).
+Ids are only stable until the table is cleared, which StateData does at the start of each cycle so names of deleted
+entries do not accumulate in a long-running process. Every scan interns the names again, including those of the
+directories a tiered scan (see scan_scheduler.py) keeps from the previous cycle.
+
+Author: Kevin Hodge
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import threading
+
+
+class NameTable:
+    """Shared table of entry names (see the module docstring).
+
+    Attributes:
+        ids (dict[str, int]): Id of each name.
+        names (list[str]): Interned names, by id.
+    """
+    def __init__(self) -> None:
+        self.lock: threading.Lock = threading.Lock()
+        self.ids: Dict[str, int] = dict()
+        self.names: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def get_id(self, name: str) -> int:
+        """Gets the id of name, adding it to the table if it is new."""
+        name_id: Optional[int] = self.ids.get(name)
+        if name_id is None:
+            with self.lock:
+                name_id = self.ids.get(name)
+                if name_id is None:
+                    name_id = len(self.names)
+                    self.names.append(name)
+                    self.ids[name] = name_id
+        return name_id
+
+    def get_name(self, name_id: int) -> str:
+        return self.names[name_id]
+
+    def intern(self, name: str) -> str:
+        """Gets the table's copy of name (equal to name), adding it to the table if it is new."""
+        return self.names[self.get_id(name)]
+
+    def to_ids(self, path: Sequence[str]) -> Tuple[int, ...]:
+        """Converts a path split into names to a tuple of ids."""
+        return tuple(self.get_id(name) for name in path)
+
+    def to_names(self, path_ids: Iterable[int]) -> List[str]:
+        """Converts a tuple of ids back to the path split into names."""
+        return [self.names[name_id] for name_id in path_ids]
+
+    def clear(self) -> None:
+        """Forgets every name, previously returned ids are no longer valid."""
+        with self.lock:
+            self.ids = dict()
+            self.names = []
@@ -0,0 +1,310 @@
+"""Contains PairScheduler.
+
+Runs several named sync pairs (see PairConfig) in one process. Each pair has its own state machine, the states that
+read or write the sync directories run on worker pools shared by all pairs:
+    - scan pool: Initial and Check (reading the directories), Pipeline (see pipeline.py) and Stream (see
+      external_diff.py).
+    - copy pool: Sync (copying and deleting entries).
+Wait, Error and Final run on the scheduler's thread, Wait does not block, the pair is simply not scheduled again
+until its interval has passed. At most scan_workers + copy_workers states run at once, however many pairs there are.
+
+Each pool hands out queued states in weighted fair order (see FairQueue): the pair that has used the least pool time
+relative to its priority goes first, so a pair with a large tree cannot starve the others and a pair with priority 2
+gets about twice the pool time of a pair with priority 1 while both have work queued.
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Type
+from collections import deque
+import copy
+import queue
+import threading
+import time
+from syncfiles.adaptive_interval import AdaptiveInterval
+from syncfiles.config_manager import PairConfig
+from syncfiles.file_system_interface import DBInterface
+from syncfiles.sync_state_machine import StateObserver, SyncStateMachine
+from syncfiles.sync_states import Final, Initial, StateData
+from syncfiles.sync_stats import SyncStats
+from syncfiles.sync_ui import SyncUI
+
+SCAN: str = "scan"
+COPY: str = "copy"
+pool_by_state: Dict[str, str] = {"Initial": SCAN, "Check": SCAN, "Pipeline": SCAN, "Stream": SCAN, "Sync": COPY}
+
+
+class FairQueue:
+    """Items queued by several pairs, handed out in weighted fair order.
+
+    Each pair has a virtual time that advances by the seconds its items ran divided by its priority (charge). get
+    returns the oldest item of the pair with the lowest virtual time. A pair that had nothing queued starts from the
+    virtual time of the last item handed out, so time spent idle is not saved up to starve the others later.
+
+    Attributes:
+        queues (dict[str, deque]): Queued items of each pair, by pair name.
+        priorities (dict[str, int]): Priority of each pair, by pair name.
+        virtual_times (dict[str, float]): Virtual time of each pair, by pair name.
+        virtual_time (float): Virtual time of the pair of the last item handed out.
+        closed (bool): get returns None once the queue is closed.
+    """
+    def __init__(self) -> None:
+        self.condition: threading.Condition = threading.Condition()
+        self.queues: Dict[str, Deque[Any]] = dict()
+        self.priorities: Dict[str, int] = dict()
+        self.virtual_times: Dict[str, float] = dict()
+        self.virtual_time: float = 0.0
+        self.closed: bool = False
+
+    def put(self, name: str, priority: int, item: Any) -> None:
+        with self.condition:
+            pair_queue: Deque[Any] = self.queues.setdefault(name, deque())
+            if not pair_queue:
+                self.virtual_times[name] = max(self.virtual_times.get(name, 0.0), self.virtual_time)
+            self.priorities[name] = priority
+            pair_queue.append(item)
+            self.condition.notify()
+
+    def get(self) -> Optional[Tuple[str, Any]]:
+        """Waits for an item, returns the pair name and the item, or None once the queue is closed."""
+        with self.condition:
+            while True:
+                if self.closed:
+                    return None
+                queued: List[str] = [name for name, pair_queue in self.queues.items() if pair_queue]
+                if queued:
+                    break
+                self.condition.wait()
+            name: str = min(queued, key=lambda queued_name: self.virtual_times[queued_name])
+            self.virtual_time = self.virtual_times[name]
+            return name, self.queues[name].popleft()
+
+    def charge(self, name: str, cost: float) -> None:
+        """Advances the virtual time of a pair by the seconds one of its items ran."""
+        with self.condition:
+            self.virtual_times[name] = self.virtual_times.get(name, 0.0) + cost / self.priorities.get(name, 1)
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class WorkerPool:
+    """Runs the items of a FairQueue on a fixed number of threads.
+
+    Attributes:
+        name (str): Name of the pool, used to name its threads.
+        run_item (Callable[[Any], None]): Called with each item on a worker thread.
+        queue (FairQueue): Items waiting for a worker.
+        threads (list[threading.Thread]): Worker threads.
+    """
+    def __init__(self, name: str, workers: int, run_item: Callable[[Any], None]) -> None:
+        if workers < 1:
+            raise ValueError(f"The {name} pool needs at least 1 worker.")
+        self.name: str = name
+        self.run_item: Callable[[Any], None] = run_item
+        self.queue: FairQueue = FairQueue()
+        self.threads: List[threading.Thread] = [
+            threading.Thread(target=self.run_worker, name=f"{name}-{index}", daemon=True) for index in range(workers)]
+
+    def start(self) -> None:
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, name: str, priority: int, item: Any) -> None:
+        self.queue.put(name, priority, item)
+
+    def close(self) -> None:
+        """Stops the workers after their current items, items that have not started are dropped."""
+        self.queue.close()
+        for thread in self.threads:
+            if thread.is_alive():
+                thread.join()
+
+    def run_worker(self) -> None:
+        while True:
+            queued: Optional[Tuple[str, Any]] = self.queue.get()
+            if queued is None:
+                return None
+            name, item = queued
+            start_time: float = time.monotonic()
+            try:
+                self.run_item(item)
+            finally:
+                self.queue.charge(name, time.monotonic() - start_time)
+
+
+class PairUI(SyncUI):
+    """UI of one pair, forwards to the scheduler's UI except that wait returns at once and records when the pair is
+    due again.
+
+    Attributes:
+        ui (SyncUI): UI shared by all pairs.
+        due_time (float): time.monotonic() after which the pair's next state may run.
+    """
+    def __init__(self, ui: SyncUI) -> None:
+        self.ui: SyncUI = ui
+        self.due_time: float = 0.0
+
+    def exit_prompt(self) -> bool:
+        return self.ui.exit_prompt()
+
+    def directory_prompt(self, num_valid_dir: int, min_dir: int = 2) -> str:
+        return self.ui.directory_prompt(num_valid_dir, min_dir)
+
+    def wait(self, sleep_time: float) -> bool:
+        self.due_time = time.monotonic() + sleep_time
+        return False
+
+    def report_stats(self, stats: SyncStats) -> None:
+        self.ui.report_stats(stats)
+
+
+class SyncPair:
+    """One named sync pair run by PairScheduler.
+
+    Attributes:
+        name (str): Name of the pair.
+        priority (int): Weight of the pair in the worker pools.
+        state_data (StateData): State data of the pair's states.
+        ui (PairUI): UI of the pair's states.
+        state_machine (SyncStateMachine): Runs the pair's states one at a time.
+        running (bool): True while a state of the pair is queued or running on a worker pool.
+        done (bool): True once the pair's state machine has reached End.
+        exception (Exception, optional): Exception raised outside of the states (e.g. by an observer).
+    """
+    def __init__(self, name: str, priority: int, state_data: StateData, ui: PairUI,
+                 observers: Optional[List[StateObserver]] = None) -> None:
+        self.name: str = name
+        self.priority: int = priority
+        self.state_data: StateData = state_data
+        self.ui: PairUI = ui
+        self.state_machine: SyncStateMachine = SyncStateMachine()
+        for observer in observers if observers is not None else []:
+            self.state_machine.add_observer(observer)
+        self.state_machine.set_initial_state(Initial(state_data))
+        self.running: bool = False
+        self.done: bool = False
+        self.exception: Optional[Exception] = None
+
+    def get_state_name(self) -> str:
+        return self.state_machine.get_state().get_name()
+
+    def get_pool(self) -> Optional[str]:
+        """Gets the pool the pair's next state runs on, None if it runs on the scheduler's thread."""
+        return pool_by_state.get(self.get_state_name())
+
+    def is_due(self, now: float) -> bool:
+        return not self.done and not self.running and self.ui.due_time <= now
+
+    def step(self) -> None:
+        try:
+            self.done = not self.state_machine.step()
+        except Exception as err:
+            self.exception = err
+            self.done = True
+
+    def stop(self) -> None:
+        """Moves the pair to Final unless it is in the middle of a cycle (a Sync always completes)."""
+        if not self.done and not self.running and \
+                self.get_state_name() in ["Initial", "Check", "Pipeline", "Stream"]:
+            self.state_data.exit_request = True
+            self.state_machine.set_initial_state(Final(self.state_data))
+            self.ui.due_time = 0.0
+
+
+class PairScheduler:
+    """Runs named sync pairs on shared scan and copy worker pools (see the module docstring).
+
+    Attributes:
+        ui (SyncUI): UI shared by all pairs, the scheduler stops the pairs when it requests an exit.
+        pairs (list[SyncPair]): Pairs that are run.
+        pools (dict[str, WorkerPool]): Scan and copy pools, by name.
+        completed (queue.Queue[SyncPair]): Pairs whose state finished on a worker.
+        poll_interval (float): Longest time between checks for an exit request.
+    """
+    poll_interval: float = 0.1
+
+    def __init__(self, ui: SyncUI, scan_workers: int = 2, copy_workers: int = 2) -> None:
+        self.ui: SyncUI = ui
+        self.pairs: List[SyncPair] = []
+        self.pools: Dict[str, WorkerPool] = {
+            SCAN: WorkerPool(SCAN, scan_workers, self.run_pair),
+            COPY: WorkerPool(COPY, copy_workers, self.run_pair),
+        }
+        self.completed: "queue.Queue[SyncPair]" = queue.Queue()
+
+    def add_pair(self, config: PairConfig, db: Type[DBInterface], sleep_time: float = StateData.sleep_time,
+                 verbose: bool = False, observers: Optional[List[StateObserver]] = None,
+                 adaptive_interval: Optional[AdaptiveInterval] = None, once: bool = False) -> SyncPair:
+        """Adds a pair, its cycles start when run is called.
+
+        Args:
+            adaptive_interval (AdaptiveInterval, optional): Copied, so each pair adapts to its own changes.
+            once (bool): Runs one cycle of the pair (as --once does) instead of cycling until an exit is requested.
+        """
+        ui: PairUI = PairUI(self.ui)
+        state_data: StateData = StateData(config, ui, db, verbose=verbose)
+        state_data.sleep_time = sleep_time
+        state_data.adaptive_interval = copy.copy(adaptive_interval)
+        state_data.once = once
+        pair: SyncPair = SyncPair(config.get_name(), config.get_priority(), state_data, ui, observers)
+        self.pairs.append(pair)
+        return pair
+
+    def get_pairs(self) -> List[SyncPair]:
+        return self.pairs
+
+    def run_pair(self, pair: SyncPair) -> None:
+        pair.step()
+        self.completed.put(pair)
+
+    def run(self) -> None:
+        """Runs the pairs until every pair has reached End.
+
+        Raises:
+            Exception: First exception raised outside of the states of a pair.
+        """
+        for pool in self.pools.values():
+            pool.start()
+        try:
+            while not all(pair.done for pair in self.pairs):
+                if self.ui.exit_prompt():
+                    for pair in self.pairs:
+                        pair.stop()
+                self.dispatch_due_pairs()
+                self.wait_for_pairs()
+        finally:
+            for pool in self.pools.values():
+                pool.close()
+        for pair in self.pairs:
+            if pair.exception is not None:
+                raise pair.exception
+
+    def dispatch_due_pairs(self) -> None:
+        """Queues the next state of every due pair on its pool, states without a pool are run right away."""
+        for pair in self.pairs:
+            while pair.is_due(time.monotonic()):
+                pool: Optional[str] = pair.get_pool()
+                if pool is None:
+                    pair.step()
+                    continue
+                pair.running = True
+                self.pools[pool].submit(pair.name, pair.priority, pair)
+
+    def wait_for_pairs(self) -> None:
+        """Waits until a state finishes on a worker, the next pair is due or poll_interval has passed."""
+        now: float = time.monotonic()
+        timeout: float = self.poll_interval
+        for pair in self.pairs:
+            if not pair.done and not pair.running:
+                timeout = min(timeout, max(pair.ui.due_time - now, 0.0))
+        try:
+            completed_pair: SyncPair = self.completed.get(timeout=timeout) if timeout > 0.0 else \
+                self.completed.get_nowait()
+        except queue.Empty:
+            return None
+        completed_pair.running = False
+        while not self.completed.empty():
+            self.completed.get_nowait().running = False
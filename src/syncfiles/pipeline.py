@@ -0,0 +1,231 @@
+"""Contains SyncPipeline.
+
+Runs the work of Check and Sync as an asyncio pipeline instead of one phase after the other:
+    - scan: the top level of every sync directory is listed, then each top-level entry (subtree) of each sync
+      directory is read as its own task on the scan executor.
+    - diff: as soon as every sync directory has read a subtree, it is queued and diffed against the last sync on the
+      diff executor, while the other subtrees are still being read.
+    - copy: each subtree with changes is synced on the copy executor as soon as it is diffed, while the next subtree
+      is read and diffed.
+Subtrees are synced one at a time on a single copy thread, so SyncManager is only used from one thread. A sync
+directory with a scan_scheduler is read whole instead (its hot/cold tiers span subtrees), so its subtrees are ready
+together. The snapshot (last sync) is taken once every subtree has been synced, as Sync does.
+
+The stats get Check (scan and diff) and Sync (from the first subtree queued until the snapshot is taken) phase times,
+which overlap.
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+from syncfiles.entry import dir_entry
+from syncfiles.file_structure import FileStructure
+from syncfiles.file_system_interface import DBInterface, StatRecord
+from syncfiles.sync_manager import SyncManager
+from syncfiles.sync_stats import SyncStats
+from syncfiles.tombstone import Tombstone
+
+
+class SyncPipeline:
+    """Scans, diffs and syncs sync directories with overlapping phases (see the module docstring).
+
+    Attributes:
+        fstructs (list[FileStructure]): Sync directories.
+        db (Type[DBInterface]): DBInterface passed to SyncManager.
+        stats (SyncStats): Stats of the cycle.
+        sync_manager (SyncManager, optional): Syncs the subtrees, None until run.
+        synced (bool): True once changes were found and synced.
+        last_sync (dict[str, Any]): Snapshot taken after the sync, same structure as FileStructure.files_to_json().
+        tombstones (list[Tombstone]): Tombstones that are still valid after the sync.
+    """
+    def __init__(self, fstructs: List[FileStructure], db: Type[DBInterface], stats: Optional[SyncStats] = None) -> None:
+        self.fstructs: List[FileStructure] = fstructs
+        self.db: Type[DBInterface] = db
+        self.stats: SyncStats = stats if stats is not None else SyncStats()
+        self.sync_manager: Optional[SyncManager] = None
+        self.synced: bool = False
+        self.last_sync: Dict[str, Any] = dict()
+        self.tombstones: List[Tombstone] = []
+
+    def is_synced(self) -> bool:
+        return self.synced
+
+    def get_last_sync(self) -> Dict[str, Any]:
+        return self.last_sync
+
+    def get_tombstones(self) -> List[Tombstone]:
+        return self.tombstones
+
+    def run(self, last_sync_dict: Dict[str, Any], tombstones: Optional[List[Tombstone]] = None) -> int:
+        """Runs the pipeline on a new event loop.
+
+        Args:
+            last_sync_dict (dict[str, Any]): Snapshot of the last sync.
+            tombstones (list[Tombstone], optional): Persisted tombstones, applied if changes are found.
+
+        Returns:
+            changes_found (int): Number of updated entries and tombstones found.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self.run_pipeline(last_sync_dict,
+                                                             tombstones if tombstones is not None else []))
+        finally:
+            loop.close()
+
+    async def run_pipeline(self, last_sync_dict: Dict[str, Any], tombstones: List[Tombstone]) -> int:
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        start_time: float = time.monotonic()
+        scans: List["asyncio.Future[None]"] = []
+        with ThreadPoolExecutor(max_workers=len(self.fstructs)) as scan_executor, \
+                ThreadPoolExecutor(max_workers=1) as diff_executor, \
+                ThreadPoolExecutor(max_workers=1) as copy_executor:
+            try:
+                last_sync_future: "asyncio.Future[dir_entry]" = loop.run_in_executor(
+                    diff_executor, self.fstructs[0].from_json, last_sync_dict)
+                top_levels: List[List[StatRecord]] = await asyncio.gather(
+                    *[loop.run_in_executor(scan_executor, self.list_top_level, fstruct) for fstruct in self.fstructs])
+                persisted: Dict[str, List[Tombstone]] = dict()
+                for tombstone in tombstones:
+                    persisted.setdefault(tombstone.get_path()[0], []).append(tombstone)
+
+                # Number of sync directories still reading each subtree, and of subtrees each sync directory is still
+                # reading.
+                remaining: Dict[str, int] = dict.fromkeys(
+                    self.get_subtree_keys(top_levels, last_sync_dict, persisted), 0)
+                root_remaining: List[int] = [len(records) for records in top_levels]
+                records_by_name: List[Dict[str, StatRecord]] = [{record.name: record for record in records}
+                                                                for records in top_levels]
+                for records in top_levels:
+                    for record in records:
+                        remaining[record.name] += 1
+                ready: "asyncio.Queue[Union[str, BaseException]]" = asyncio.Queue()
+                for key, count in remaining.items():
+                    if count == 0:
+                        ready.put_nowait(key)
+                for index, fstruct in enumerate(self.fstructs):
+                    if fstruct.scan_scheduler is not None:
+                        self.stats.add_root_scan(fstruct.get_directory_path(), fstruct.get_entry_count(),
+                                                 time.monotonic() - start_time)
+                        self.stats.add_scan_tiers(fstruct.scan_scheduler.get_counts())
+                    elif root_remaining[index] == 0:
+                        self.finish_root_scan(fstruct, start_time)
+                # Each subtree is queued for every sync directory before the next one, so it is ready sooner.
+                for key in list(remaining):
+                    for index, records_of_root in enumerate(records_by_name):
+                        if key in records_of_root:
+                            scans.append(asyncio.ensure_future(self.scan_subtree(
+                                loop, scan_executor, index, records_of_root[key], remaining, root_remaining, ready,
+                                start_time)))
+
+                last_sync_files: dir_entry = await last_sync_future
+                sync_manager: SyncManager = SyncManager(self.fstructs, self.db, stats=self.stats,
+                                                        add_fstruct_tombstones=False)
+                self.sync_manager = sync_manager
+                changes_found: int = 0
+                copies: List["asyncio.Future[None]"] = []
+                deferred: List[Tuple[str, List[Tombstone]]] = []
+                sync_start: Optional[float] = None
+                for fstruct in self.fstructs:
+                    fstruct.tombstones = []
+                for _ in range(len(remaining)):
+                    item: Union[str, BaseException] = await ready.get()
+                    if isinstance(item, BaseException):
+                        raise item
+                    key = item
+                    subtree_changes, subtree_tombstones = await loop.run_in_executor(
+                        diff_executor, self.diff_subtree, key, last_sync_files)
+                    subtree_tombstones.extend(persisted.get(key, []))
+                    changes_found += subtree_changes
+                    self.stats.add_changes_found(subtree_changes)
+                    if subtree_changes == 0:
+                        if subtree_tombstones:
+                            deferred.append((key, subtree_tombstones))
+                        continue
+                    if sync_start is None:
+                        sync_start = time.monotonic()
+                    copies.append(loop.run_in_executor(copy_executor, sync_manager.sync_subtree, key,
+                                                       subtree_tombstones))
+                self.stats.add_phase_time("Check", time.monotonic() - start_time)
+            finally:
+                for scan in scans:
+                    scan.cancel()
+
+            if changes_found == 0:
+                return changes_found
+            for key, subtree_tombstones in deferred:
+                copies.append(loop.run_in_executor(copy_executor, sync_manager.sync_subtree, key, subtree_tombstones))
+            await asyncio.gather(*copies)
+            snapshots: List[dir_entry] = await asyncio.gather(
+                *[loop.run_in_executor(scan_executor, fstruct.update_file_structure, True)
+                  for fstruct in self.fstructs])
+        self.last_sync = sync_manager.get_last_sync(*snapshots)
+        self.tombstones = sync_manager.get_tombstones()
+        self.synced = True
+        self.stats.add_phase_time("Sync", time.monotonic() - (sync_start if sync_start is not None else start_time))
+        return changes_found
+
+    def list_top_level(self, fstruct: FileStructure) -> List[StatRecord]:
+        """Lists the top-level entries of a sync directory (on a scan executor thread), whose subtrees are then read by
+        scan_subtree. A sync directory with a scan_scheduler is read whole, so it has no subtrees left to read."""
+        if fstruct.scan_scheduler is not None:
+            fstruct.update_file_structure()
+            return []
+        records: List[StatRecord] = fstruct.list_top_level()
+        fstruct.start_subtree_scan()
+        return records
+
+    async def scan_subtree(self, loop: asyncio.AbstractEventLoop, scan_executor: ThreadPoolExecutor, index: int,
+                           record: StatRecord, remaining: Dict[str, int], root_remaining: List[int],
+                           ready: "asyncio.Queue[Union[str, BaseException]]", start_time: float) -> None:
+        """Reads one subtree of the sync directory at index on the scan executor and queues the subtree in ready once
+        every sync directory has read it. An error is queued instead, so it is raised by run_pipeline."""
+        fstruct: FileStructure = self.fstructs[index]
+        try:
+            subtree, entry_count = await loop.run_in_executor(scan_executor, fstruct.scan_subtree, record)
+        except Exception as error:
+            ready.put_nowait(error)
+            return
+        if subtree is not None:
+            fstruct.add_subtree(record.name, subtree, entry_count)
+        remaining[record.name] -= 1
+        if remaining[record.name] == 0:
+            ready.put_nowait(record.name)
+        root_remaining[index] -= 1
+        if root_remaining[index] == 0:
+            self.finish_root_scan(fstruct, start_time)
+
+    def finish_root_scan(self, fstruct: FileStructure, start_time: float) -> None:
+        fstruct.finish_subtree_scan()
+        self.stats.add_root_scan(fstruct.get_directory_path(), fstruct.get_entry_count(),
+                                 time.monotonic() - start_time)
+
+    def get_subtree_keys(self, top_levels: List[List[StatRecord]], last_sync_dict: Dict[str, Any],
+                         persisted: Dict[str, List[Tombstone]]) -> List[str]:
+        """Gets the names of the top-level entries of every sync directory, the last sync and persisted tombstones."""
+        keys: Dict[str, None] = dict()
+        for fstruct, records in zip(self.fstructs, top_levels):
+            if fstruct.scan_scheduler is not None:
+                keys.update(dict.fromkeys(fstruct.files.get_keys()))
+            keys.update(dict.fromkeys(record.name for record in records))
+        keys.update(dict.fromkeys(self.fstructs[0].get_json_contents(last_sync_dict)))
+        keys.update(dict.fromkeys(persisted))
+        return list(keys)
+
+    def diff_subtree(self, key: str, last_sync_files: dir_entry) -> Tuple[int, List[Tombstone]]:
+        """Diffs one top-level entry of every sync directory against the last sync, marking its updated entries.
+
+        Returns:
+            changes_found (int): Number of updated entries and tombstones found in the subtree.
+            tombstones (list[Tombstone]): Deletions within the subtree, in every sync directory.
+        """
+        changes_found: int = 0
+        subtree_tombstones: List[Tombstone] = []
+        for fstruct in self.fstructs:
+            updated_count, tombstones = fstruct.check_subtree(key, last_sync_files)
+            changes_found += updated_count + len(tombstones)
+            subtree_tombstones.extend(tombstones)
+        return changes_found, subtree_tombstones
@@ -0,0 +1,360 @@
+"""Remote Interface
+
+DBInterface backend for a directory served by a sync agent (agent.py), e.g. on another host reached through ssh:
+    connection = RemoteConnection.launch(["ssh", "host", "python", "-m", "syncfiles.agent", "--root", "/srv/files"])
+    db = RemoteFileSystem(connection, prefix="remote:").get_interface()
+    db("remote:/srv/files").list_tree()
+
+Requests are pipelined, every call sends a frame and waits only for its own response, so calls from many threads share
+the connection without waiting for each other. Whole subtrees are listed with a single list_tree call and files are
+streamed in chunks (see remote_protocol.py).
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, BinaryIO, Callable, Dict, Generator, Iterable, Iterator, List, Optional, Tuple, Type, cast
+import io
+import posixpath
+import queue
+import socket
+import subprocess
+import threading
+from syncfiles.file_system_interface import DBInterface, StatRecord
+from syncfiles.ignore_rules import IgnorePrune
+import syncfiles.remote_protocol as protocol
+
+
+class PendingRequest:
+    """Frames received for one request, queued by the reader thread of the connection."""
+    def __init__(self) -> None:
+        self.frames: "queue.Queue[Tuple[Optional[int], bytes]]" = queue.Queue()
+
+    def put(self, frame_type: Optional[int], payload: bytes) -> None:
+        self.frames.put((frame_type, payload))
+
+    def get(self) -> Tuple[int, bytes]:
+        frame_type, payload = self.frames.get()
+        if frame_type is None:
+            raise ConnectionError("Connection to the sync agent closed.")
+        if frame_type == protocol.ERROR:
+            raise protocol.decode_error(payload)
+        return frame_type, payload
+
+    def result(self) -> Any:
+        """Waits for the response and returns its value."""
+        _, payload = self.get()
+        return protocol.decode_json(payload)
+
+    def chunks(self) -> Iterator[bytes]:
+        """Yields the CHUNK payloads of a read until its END frame."""
+        while True:
+            frame_type, payload = self.get()
+            if frame_type == protocol.END:
+                return None
+            yield payload
+
+
+class RemoteConnection:
+    """Client side of the protocol, over any pair of binary streams.
+
+    A daemon thread reads every frame and hands it to the PendingRequest with the same request id, frames are written
+    under a lock, so any number of requests can be in flight.
+
+    Attributes:
+        reader (BinaryIO): Stream frames are read from.
+        writer (BinaryIO): Stream frames are written to.
+        process (subprocess.Popen, optional): Agent launched by launch(), waited for on close().
+        pending (dict[int, PendingRequest]): Requests that have not finished, by request id.
+    """
+    def __init__(self, reader: BinaryIO, writer: BinaryIO, process: "Optional[subprocess.Popen[bytes]]" = None,
+                 sock: Optional[socket.socket] = None) -> None:
+        self.reader: BinaryIO = reader
+        self.writer: BinaryIO = writer
+        self.process: "Optional[subprocess.Popen[bytes]]" = process
+        self.sock: Optional[socket.socket] = sock
+        self.lock: threading.Lock = threading.Lock()
+        self.write_lock: threading.Lock = threading.Lock()
+        self.pending: Dict[int, PendingRequest] = dict()
+        self.next_request_id: int = 1
+        self.closed: bool = False
+        self.reader_thread: threading.Thread = threading.Thread(target=self.read_loop, daemon=True)
+        self.reader_thread.start()
+
+    @classmethod
+    def launch(cls, command: List[str], env: Optional[Dict[str, str]] = None) -> "RemoteConnection":
+        """Starts an agent with command (e.g. ["ssh", "host", "python", "-m", "syncfiles.agent", "--root", "/srv"]) and
+        talks to it over its stdin and stdout."""
+        process: "subprocess.Popen[bytes]" = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                                              env=env)
+        assert process.stdout is not None and process.stdin is not None
+        return cls(cast(BinaryIO, process.stdout), cast(BinaryIO, process.stdin), process=process)
+
+    @classmethod
+    def connect(cls, host: str, port: int, token: str) -> "RemoteConnection":
+        """Connects to an agent started with --listen [HOST:]PORT and authenticates with its shared secret token.
+
+        Raises:
+            PermissionError: The agent rejected the token.
+        """
+        sock: socket.socket = socket.create_connection((host, port))
+        reader: BinaryIO = cast(BinaryIO, sock.makefile("rb"))
+        writer: BinaryIO = cast(BinaryIO, sock.makefile("wb"))
+        connection: RemoteConnection = cls(reader, writer, sock=sock)
+        try:
+            connection.call("auth", token)
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
+    def read_loop(self) -> None:
+        try:
+            while True:
+                frame: Optional[protocol.Frame] = protocol.read_frame(self.reader)
+                if frame is None:
+                    break
+                request_id, frame_type, payload = frame
+                with self.lock:
+                    pending: Optional[PendingRequest] = self.pending.get(request_id)
+                    if frame_type in (protocol.RESPONSE, protocol.ERROR, protocol.END):
+                        self.pending.pop(request_id, None)
+                if pending is not None:
+                    pending.put(frame_type, payload)
+        except (OSError, ValueError):
+            pass
+        with self.lock:
+            self.closed = True
+            pending_requests: List[PendingRequest] = list(self.pending.values())
+            self.pending.clear()
+        for pending in pending_requests:
+            pending.put(None, b"")
+
+    def send(self, request_id: int, frame_type: int, payload: bytes = b"") -> None:
+        with self.write_lock:
+            self.writer.write(protocol.encode_frame(request_id, frame_type, payload))
+            self.writer.flush()
+
+    def start_request(self, op: str, *args: Any) -> Tuple[int, PendingRequest]:
+        pending: PendingRequest = PendingRequest()
+        with self.lock:
+            if self.closed:
+                raise ConnectionError("Connection to the sync agent closed.")
+            request_id: int = self.next_request_id
+            self.next_request_id += 1
+            self.pending[request_id] = pending
+        self.send(request_id, protocol.REQUEST, protocol.encode_json({'op': op, 'args': list(args)}))
+        return request_id, pending
+
+    def request(self, op: str, *args: Any) -> PendingRequest:
+        """Sends a request without waiting for its response, call result() on the returned PendingRequest to get it."""
+        return self.start_request(op, *args)[1]
+
+    def call(self, op: str, *args: Any) -> Any:
+        """Sends a request and waits for its response."""
+        return self.request(op, *args).result()
+
+    def read_file(self, path: str) -> Iterator[bytes]:
+        """Yields the contents of the file at path in chunks."""
+        return self.request("read", path).chunks()
+
+    def write_file(self, path: str, chunks: Iterable[bytes]) -> None:
+        with self.open_writer(path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+
+    def open_writer(self, path: str) -> "RemoteWriter":
+        request_id, pending = self.start_request("write", path)
+        return RemoteWriter(self, request_id, pending)
+
+    def close(self) -> None:
+        """Closes the connection, the agent exits when its input ends."""
+        try:
+            self.writer.close()
+        except OSError:
+            pass
+        if self.sock is not None:
+            # shutdown wakes the reader thread blocked in recv, close alone does not while the files are open.
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+        if self.process is not None:
+            self.process.wait()
+            if self.process.stdout is not None:
+                self.process.stdout.close()
+        self.reader_thread.join()
+
+
+class RemoteReader(io.RawIOBase):
+    """Readable file whose data is the chunks of a read request."""
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        super().__init__()
+        self.chunks: Iterator[bytes] = chunks
+        self.buffer: bytes = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if not self.buffer:
+            self.buffer = next(self.chunks, b"")
+        size: int = min(len(buffer), len(self.buffer))
+        buffer[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+class RemoteWriter(io.RawIOBase):
+    """Writable file that sends its data as the chunks of a write request, closing it waits for the file to be
+    written."""
+    def __init__(self, connection: RemoteConnection, request_id: int, pending: PendingRequest) -> None:
+        super().__init__()
+        self.connection: RemoteConnection = connection
+        self.request_id: int = request_id
+        self.pending: PendingRequest = pending
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        data = bytes(data)
+        for start in range(0, len(data), protocol.chunk_size):
+            self.connection.send(self.request_id, protocol.CHUNK, data[start:start + protocol.chunk_size])
+        return len(data)
+
+    def close(self) -> None:
+        if self.closed:
+            return None
+        super().close()
+        self.connection.send(self.request_id, protocol.END)
+        self.pending.result()
+
+
+class RemoteFileSystem:
+    """Directories served by one agent.
+
+    Paths given to the interface start with prefix (e.g. "remote:/srv/files"), so they can be told apart from local
+    paths by ConfigManager.get_db, the prefix is removed before a path is sent to the agent.
+    """
+    def __init__(self, connection: RemoteConnection, prefix: str = "") -> None:
+        self.connection: RemoteConnection = connection
+        self.prefix: str = prefix
+
+    def get_interface(self) -> Type["RemoteInterface"]:
+        """Gets a DBInterface class bound to this file system."""
+        return type("BoundRemoteInterface", (RemoteInterface,), {'file_system': self})
+
+    def to_remote(self, path: str) -> str:
+        return path[len(self.prefix):] if path.startswith(self.prefix) else path
+
+    def to_local(self, path: str) -> str:
+        return self.prefix + path
+
+
+class RemoteInterface(DBInterface):
+    """DBInterface on a RemoteFileSystem, use RemoteFileSystem.get_interface() to get a bound subclass."""
+    file_system: RemoteFileSystem
+
+    def __init__(self, directory: str) -> None:
+        self.__path: str = self.file_system.to_remote(str(directory))
+
+    def call(self, op: str, *args: Any) -> Any:
+        return self.file_system.connection.call(op, *args)
+
+    def exists(self) -> bool:
+        return bool(self.call("exists", self.__path))
+
+    def iterdir(self) -> Generator[DBInterface, None, None]:
+        for record in self.list_dir():
+            yield self / record.name
+
+    def is_file(self) -> bool:
+        return bool(self.call("is_file", self.__path))
+
+    def is_dir(self) -> bool:
+        return bool(self.call("is_dir", self.__path))
+
+    def get_name(self) -> str:
+        return posixpath.basename(self.__path)
+
+    def get_mod_time(self) -> int:
+        return int(self.call("get_mod_time", self.__path))
+
+    def get_size(self) -> int:
+        return int(self.call("get_size", self.__path))
+
+    def __repr__(self) -> str:
+        return self.file_system.to_local(self.__path)
+
+    def __truediv__(self, other: str) -> DBInterface:
+        return type(self)(self.file_system.to_local(posixpath.join(self.__path, str(other))))
+
+    @classmethod
+    def cwd(cls) -> DBInterface:
+        return cls(cls.file_system.to_local(cls.file_system.connection.call("cwd")))
+
+    @classmethod
+    def join_path(cls, directory: str, *names: str) -> str:
+        return posixpath.join(str(cls(directory)), *names)
+
+    def open(self, mode: str = "r") -> Any:
+        if "+" in mode or "a" in mode or "x" in mode:
+            raise ValueError(f"Mode not supported by remote files: '{mode}'")
+        file_object: Any
+        if "r" in mode:
+            file_object = io.BufferedReader(RemoteReader(self.file_system.connection.read_file(self.__path)),
+                                            buffer_size=protocol.chunk_size)
+        else:
+            file_object = io.BufferedWriter(self.file_system.connection.open_writer(self.__path),
+                                            buffer_size=protocol.chunk_size)
+        return file_object if "b" in mode else io.TextIOWrapper(file_object, encoding="utf-8")
+
+    def unlink(self) -> None:
+        self.call("unlink", self.__path)
+
+    def get_parent(self) -> DBInterface:
+        return type(self)(self.file_system.to_local(posixpath.dirname(self.__path)))
+
+    def rename(self, new_path: Any) -> DBInterface:
+        self.call("rename", self.__path, self.file_system.to_remote(str(new_path)))
+        return type(self)(str(new_path))
+
+    @classmethod
+    def copyfile(cls, old_path: str, new_path: str) -> None:
+        cls.file_system.connection.call("copyfile", cls.file_system.to_remote(old_path),
+                                        cls.file_system.to_remote(new_path))
+
+    def mkdir(self, parents: bool = True, exist_ok: bool = True) -> None:
+        self.call("mkdir", self.__path, parents, exist_ok)
+
+    def rmtree(self) -> None:
+        self.call("rmtree", self.__path)
+
+    def list_dir(self) -> List[StatRecord]:
+        return [protocol.record_from_json(record) for record in self.call("list_dir", self.__path)]
+
+    def list_tree(self, prune: Optional[Callable[[str, bool], bool]] = None) -> Dict[str, List[StatRecord]]:
+        """Lists the tree with one list_tree call, pruned by the agent. Any prune other than an IgnorePrune cannot be
+        sent, so the tree is then listed a directory at a time (DBInterface.list_tree)."""
+        if prune is not None and not isinstance(prune, IgnorePrune):
+            return super().list_tree(prune)
+        patterns: List[str] = prune.rules.get_patterns() if prune is not None else []
+        listing: Dict[str, List[List[Any]]] = self.call("list_tree", self.__path, patterns,
+                                                        prune.relative_path if prune is not None else "")
+        return {relative_path: [protocol.record_from_json(record) for record in records]
+                for relative_path, records in listing.items()}
+
+    @classmethod
+    def stat_many(cls, paths: List[str]) -> List[Optional[StatRecord]]:
+        records: List[Optional[List[Any]]] = cls.file_system.connection.call(
+            "stat_many", [cls.file_system.to_remote(path) for path in paths])
+        return [protocol.record_from_json(record) if record is not None else None for record in records]
+
+    @classmethod
+    def mkdir_many(cls, paths: List[str]) -> None:
+        cls.file_system.connection.call("mkdir_many", [cls.file_system.to_remote(path) for path in paths])
+
+    @classmethod
+    def unlink_many(cls, paths: List[str]) -> None:
+        cls.file_system.connection.call("unlink_many", [cls.file_system.to_remote(path) for path in paths])
@@ -0,0 +1,111 @@
+"""Remote Protocol
+
+Length-prefixed binary frames exchanged by RemoteConnection (remote_interface.py) and the agent (agent.py) over stdio
+or a socket.
+
+Frame:
+    length (uint32, big-endian): Number of payload bytes.
+    request_id (uint32, big-endian): Id chosen by the client, every frame of a request and its response uses it, so
+        many requests can be in flight and responses can arrive in any order.
+    frame_type (uint8): One of the frame types below.
+    payload (bytes): JSON for REQUEST, RESPONSE and ERROR frames, raw file data for CHUNK frames, empty for END.
+
+Requests:
+    REQUEST {"op": name, "args": [...]} is answered by RESPONSE (JSON result) or ERROR {"type": ..., "message": ...}.
+    read: the agent answers with CHUNK frames followed by END (or ERROR).
+    write: the client follows the REQUEST with CHUNK frames and an END frame, the agent answers with RESPONSE or ERROR.
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Type
+import json
+import struct
+from syncfiles.file_system_interface import StatRecord
+
+header_format: str = ">IIB"
+header_size: int = struct.calcsize(header_format)
+max_payload_size: int = 256 * 1024 * 1024
+chunk_size: int = 64 * 1024
+
+REQUEST: int = 1
+RESPONSE: int = 2
+ERROR: int = 3
+CHUNK: int = 4
+END: int = 5
+
+Frame = Tuple[int, int, bytes]
+
+
+class RemoteError(Exception):
+    """Error raised by the agent that is not one of the mapped OSErrors."""
+
+
+error_types: Dict[str, Type[Exception]] = {
+    'FileNotFoundError': FileNotFoundError,
+    'FileExistsError': FileExistsError,
+    'IsADirectoryError': IsADirectoryError,
+    'NotADirectoryError': NotADirectoryError,
+    'PermissionError': PermissionError,
+    'OSError': OSError,
+    'ValueError': ValueError,
+}
+
+
+def encode_frame(request_id: int, frame_type: int, payload: bytes = b"") -> bytes:
+    return struct.pack(header_format, len(payload), request_id, frame_type) + payload
+
+
+def read_exactly(stream: BinaryIO, size: int) -> Optional[bytes]:
+    """Reads size bytes, None if the stream ends first."""
+    data: bytes = b""
+    while len(data) < size:
+        chunk: bytes = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def read_frame(stream: BinaryIO) -> Optional[Frame]:
+    """Reads a frame, None if the stream has ended.
+
+    Returns:
+        frame (tuple[int, int, bytes], optional): Request id, frame type and payload.
+    """
+    header: Optional[bytes] = read_exactly(stream, header_size)
+    if header is None:
+        return None
+    length, request_id, frame_type = struct.unpack(header_format, header)
+    if length > max_payload_size:
+        raise ValueError(f"Frame payload of {length} bytes exceeds {max_payload_size} bytes.")
+    payload: Optional[bytes] = read_exactly(stream, length)
+    if payload is None:
+        return None
+    return request_id, frame_type, payload
+
+
+def encode_json(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def decode_json(payload: bytes) -> Any:
+    return json.loads(payload.decode("utf-8"))
+
+
+def encode_error(err: Exception) -> bytes:
+    error_type: str = type(err).__name__ if type(err).__name__ in error_types else "RemoteError"
+    return encode_json({'type': error_type, 'message': str(err)})
+
+
+def decode_error(payload: bytes) -> Exception:
+    error: Dict[str, str] = decode_json(payload)
+    return error_types.get(error['type'], RemoteError)(error['message'])
+
+
+def record_to_json(record: StatRecord) -> List[Any]:
+    return [record.name, record.is_file, record.is_dir, record.mod_time, record.size]
+
+
+def record_from_json(record: List[Any]) -> StatRecord:
+    return StatRecord(record[0], record[1], record[2], record[3], record[4])
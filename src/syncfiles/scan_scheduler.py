@@ -0,0 +1,108 @@
+"""Contains ScanScheduler.
+
+Decides which directories of a sync directory are listed in each Check. Directories are classified by how recently
+their entries changed:
+    - hot: changed within the last hot_cycles cycles (or not seen before), listed every cycle.
+    - cold: unchanged for longer, listed every interval cycles. The interval starts at 2 and doubles each time a listing
+      finds no change (up to max_interval), a change makes the directory hot again.
+Every full_sweep_every cycles every directory is listed, so a change in a cold directory is found within
+min(max_interval, full_sweep_every) cycles.
+
+Author: Kevin Hodge
+"""
+
+from typing import Dict, Set
+
+HOT: str = "hot"
+COLD: str = "cold"
+SKIPPED: str = "skipped"
+
+
+class DirectorySchedule:
+    """Scan schedule of one directory.
+
+    Attributes:
+        last_change_cycle (int): Cycle in which the directory's entries last changed.
+        interval (int): Cycles between listings while the directory is cold.
+        next_scan_cycle (int): First cycle in which the directory is listed again.
+    """
+    def __init__(self, cycle: int) -> None:
+        self.last_change_cycle: int = cycle
+        self.interval: int = 1
+        self.next_scan_cycle: int = cycle + 1
+
+
+class ScanScheduler:
+    """Hot/cold scan schedule of the directories below one sync directory (see the module docstring).
+
+    Attributes:
+        full_sweep_every (int): Every directory is listed in every full_sweep_every-th cycle (the first cycle is one).
+        hot_cycles (int): Cycles without a change after which a directory becomes cold.
+        max_interval (int): Maximum cycles between listings of a cold directory.
+        cycle (int): Number of the current cycle, starting at 1.
+        directories (dict[str, DirectorySchedule]): Schedule of each known directory, by path relative to the sync
+            directory ("/" separated, "" for the sync directory).
+        counts (dict[str, int]): Directories listed in the current cycle by tier (hot, cold) and cold directories that
+            were not listed (skipped).
+    """
+    def __init__(self, full_sweep_every: int = 10, hot_cycles: int = 3, max_interval: int = 8) -> None:
+        if full_sweep_every < 1:
+            raise ValueError("full_sweep_every must be at least 1.")
+        self.full_sweep_every: int = full_sweep_every
+        self.hot_cycles: int = hot_cycles
+        self.max_interval: int = max_interval
+        self.cycle: int = 0
+        self.directories: Dict[str, DirectorySchedule] = dict()
+        self.counts: Dict[str, int] = {HOT: 0, COLD: 0, SKIPPED: 0}
+        self.visited: Set[str] = set()
+
+    def start_cycle(self) -> None:
+        self.cycle += 1
+        self.counts = {HOT: 0, COLD: 0, SKIPPED: 0}
+        self.visited = set()
+
+    def finish_cycle(self) -> None:
+        """Forgets directories that were not visited in the cycle (they no longer exist or are ignored)."""
+        self.directories = {path: schedule for path, schedule in self.directories.items() if path in self.visited}
+
+    def is_full_sweep(self) -> bool:
+        return (self.cycle - 1) % self.full_sweep_every == 0
+
+    def get_tier(self, path: str) -> str:
+        schedule: DirectorySchedule = self.directories.get(path, DirectorySchedule(self.cycle))
+        return HOT if self.cycle - schedule.last_change_cycle <= self.hot_cycles else COLD
+
+    def is_due(self, path: str) -> bool:
+        """Checks if a directory has to be listed in the current cycle."""
+        if self.is_full_sweep() or path not in self.directories:
+            return True
+        return self.get_tier(path) == HOT or self.cycle >= self.directories[path].next_scan_cycle
+
+    def record_scan(self, path: str, changed: bool) -> None:
+        """Records that a directory was listed in the current cycle and if its entries changed."""
+        self.visited.add(path)
+        tier: str = self.get_tier(path)
+        self.counts[tier] += 1
+        schedule: DirectorySchedule = self.directories.setdefault(path, DirectorySchedule(self.cycle))
+        if changed:
+            schedule.last_change_cycle = self.cycle
+            schedule.interval = 1
+        elif tier == COLD:
+            schedule.interval = min(max(schedule.interval * 2, 2), self.max_interval)
+        schedule.next_scan_cycle = self.cycle + schedule.interval
+
+    def record_skip(self, path: str) -> None:
+        """Records that a directory was not listed in the current cycle, its entries from the last cycle are kept."""
+        self.visited.add(path)
+        self.counts[SKIPPED] += 1
+
+    def mark_changed(self, path: str) -> None:
+        """Makes a directory hot, e.g. when a sub-directory kept from the last cycle has disappeared."""
+        self.visited.add(path)
+        schedule: DirectorySchedule = self.directories.setdefault(path, DirectorySchedule(self.cycle))
+        schedule.last_change_cycle = self.cycle
+        schedule.interval = 1
+        schedule.next_scan_cycle = self.cycle + 1
+
+    def get_counts(self) -> Dict[str, int]:
+        return dict(self.counts)
@@ -0,0 +1,67 @@
+"""Records of the sorted snapshot of the last sync.
+
+A record is a path split into names, is_dir and mod_time (0 for directories). The snapshot of a sync that used
+memory_budget is stored as records sorted by path, one JSON list per line (last_sync_file.sorted.jsonl), and streamed
+by StreamingDiff (see external_diff.py). This module only uses the standard library, so ConfigManager can read and
+write the snapshot without importing the sync machinery.
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+
+Record = Tuple[List[str], bool, int]
+
+
+def record_key(record: Record) -> List[str]:
+    return record[0]
+
+
+def read_records(lines: Iterable[str]) -> Iterator[Record]:
+    """Reads records written one JSON list per line (as write_records writes them)."""
+    for line in lines:
+        path, is_dir, mod_time = json.loads(line)
+        yield path, is_dir, mod_time
+
+
+def write_records(file_to_write: Any, records: Iterable[Record]) -> int:
+    """Writes records one JSON list per line, returns the number of records written."""
+    record_count: int = 0
+    for record in records:
+        file_to_write.write(json.dumps(record) + "\n")
+        record_count += 1
+    return record_count
+
+
+def snapshot_to_records(last_sync_dict: Dict[str, Any]) -> List[Record]:
+    """Converts a snapshot with the structure of FileStructure.files_to_json() to records sorted by path."""
+    records: List[Record] = []
+    pending: List[Tuple[List[str], Dict[str, Any]]] = [([], last_sync_dict)]
+    while pending:
+        path, directory = pending.pop()
+        for name, value in directory.items():
+            if isinstance(value, dict):
+                records.append((path + [name], True, 0))
+                pending.append((path + [name], value.get('dir', dict())))
+            else:
+                records.append((path + [name], False, value))
+    records.sort(key=record_key)
+    return records
+
+
+def records_to_snapshot(records: Iterable[Record]) -> Dict[str, Any]:
+    """Converts records sorted by path to a snapshot with the structure of FileStructure.files_to_json()."""
+    last_sync_dict: Dict[str, Any] = dict()
+    directories: Dict[Tuple[str, ...], Dict[str, Any]] = {(): last_sync_dict}
+    for path, is_dir, mod_time in records:
+        parent: Optional[Dict[str, Any]] = directories.get(tuple(path[:-1]))
+        if parent is None:
+            continue
+        if is_dir:
+            sub_dict: Dict[str, Any] = dict()
+            parent[path[-1]] = {'dir': sub_dict}
+            directories[tuple(path)] = sub_dict
+        else:
+            parent[path[-1]] = mod_time
+    return last_sync_dict
@@ -0,0 +1,107 @@
+"""Built-in StateObservers that aggregate state timings and counters.
+
+Author: Kevin Hodge
+"""
+
+from typing import Deque, Dict, List, Optional
+from collections import deque
+import bisect
+from syncfiles.sync_state_machine import StateEvent, StateObserver
+
+
+class StateHistogram:
+    """Histogram of the durations of one state.
+
+    Attributes:
+        bounds (list[float]): Upper bound (seconds) of each bucket, the last bucket has no upper bound.
+        bucket_counts (list[int]): Number of durations in each bucket (one more bucket than bounds).
+        count (int): Number of durations recorded.
+        total (float): Sum of durations recorded (seconds).
+    """
+    def __init__(self, bounds: List[float]) -> None:
+        self.bounds: List[float] = bounds
+        self.bucket_counts: List[int] = [0] * (len(bounds) + 1)
+        self.count: int = 0
+        self.total: float = 0.0
+
+    def add(self, duration: float) -> None:
+        self.bucket_counts[bisect.bisect_left(self.bounds, duration)] += 1
+        self.count += 1
+        self.total += duration
+
+    def get_mean(self) -> float:
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+
+    def get_percentile(self, percentile: float) -> float:
+        """Gets the upper bound of the bucket containing the percentile (0 to 100), inf if it is in the last bucket."""
+        if self.count == 0:
+            return 0.0
+        rank: float = self.count * percentile / 100.0
+        cumulative_count: int = 0
+        for index, bucket_count in enumerate(self.bucket_counts):
+            cumulative_count += bucket_count
+            if cumulative_count >= rank and bucket_count > 0:
+                return self.bounds[index] if index < len(self.bounds) else float("inf")
+        return float("inf")
+
+
+class HistogramObserver(StateObserver):
+    """Keeps a StateHistogram of durations for every state name.
+
+    Attributes:
+        bounds (list[float]): Bucket upper bounds (seconds), exponential from 1 ms to about 65 s by default.
+        histograms (dict[str, StateHistogram]): Histogram for each state name.
+    """
+    default_bounds: List[float] = [0.001 * 2 ** exponent for exponent in range(17)]
+
+    def __init__(self, bounds: Optional[List[float]] = None) -> None:
+        self.bounds: List[float] = sorted(bounds) if bounds is not None else self.default_bounds
+        self.histograms: Dict[str, StateHistogram] = dict()
+
+    def on_exit(self, event: StateEvent) -> None:
+        if event.name not in self.histograms:
+            self.histograms[event.name] = StateHistogram(self.bounds)
+        self.histograms[event.name].add(event.get_duration())
+
+    def get_histogram(self, name: str) -> Optional[StateHistogram]:
+        return self.histograms.get(name)
+
+
+class MovingAverageObserver(StateObserver):
+    """Keeps the moving average of the duration and counters of the last window runs of every state.
+
+    Attributes:
+        window (int): Number of runs averaged.
+        durations (dict[str, Deque[float]]): Last durations (seconds) of each state.
+        counters (dict[str, dict[str, Deque[int]]]): Last counter values of each state, by counter name.
+    """
+    def __init__(self, window: int = 10) -> None:
+        assert window > 0
+        self.window: int = window
+        self.durations: Dict[str, Deque[float]] = dict()
+        self.counters: Dict[str, Dict[str, Deque[int]]] = dict()
+
+    def on_exit(self, event: StateEvent) -> None:
+        if event.name not in self.durations:
+            self.durations[event.name] = deque(maxlen=self.window)
+            self.counters[event.name] = dict()
+        self.durations[event.name].append(event.get_duration())
+        state_counters: Dict[str, Deque[int]] = self.counters[event.name]
+        for counter_name, value in event.counters.items():
+            if counter_name not in state_counters:
+                state_counters[counter_name] = deque(maxlen=self.window)
+            state_counters[counter_name].append(value)
+
+    def get_average_duration(self, name: str) -> float:
+        durations: Deque[float] = self.durations.get(name, deque())
+        if len(durations) == 0:
+            return 0.0
+        return sum(durations) / len(durations)
+
+    def get_average_counter(self, name: str, counter_name: str) -> float:
+        values: Deque[int] = self.counters.get(name, dict()).get(counter_name, deque())
+        if len(values) == 0:
+            return 0.0
+        return sum(values) / len(values)
@@ -3,60 +3,195 @@
 Author: Kevin Hodge
 """
 
-from typing import List, Dict, Any, Type, Optional
+from typing import List, Dict, Any, Type, Optional, Set, Tuple
 from datetime import datetime, timezone
-from syncfiles.file_system_interface import DBInterface
+from syncfiles.file_system_interface import DBInterface, StatRecord
 from syncfiles.file_structure import FileStructure
 from syncfiles.entry import entry, file_entry, dir_entry
+from syncfiles.merkle import add_snapshot_digests, compute_digests
+from syncfiles.name_table import NameTable
 from syncfiles.sync_exception import SyncException
+from syncfiles.sync_stats import SyncStats
+from syncfiles.tombstone import Tombstone
+from syncfiles.tracer import get_tracer
 
 
 class SyncManager:
-    """Synchronizes files and folders between two FileStructures."""
-    def __init__(self, fstructs: List[FileStructure], db_interface: Type[DBInterface]) -> None:
+    """Synchronizes files and folders between two FileStructures.
+
+    Deletions are propagated from the tombstones found by FileStructure.check_file_structure (and any persisted
+    tombstones passed in), all other actions are driven by the updated entries, so a sync only visits changes. The
+    updated entries are streamed from the FileStructures (FileStructure.iter_updated) and looked up in their trees, so
+    no list or set of every path is built.
+
+    Each sync directory is accessed through the DBInterface of its FileStructure, so directories can be on different
+    backends (e.g. one local and one remote), files are streamed between backends that differ.
+
+    With add_fstruct_tombstones=False the tombstones of the FileStructures are not added, subtrees are then synced one
+    at a time with sync_subtree (see pipeline.py).
+
+    A SyncManager is used for one sync cycle, it keeps the directories (relative paths) it knows exist in each sync
+    directory. Entries are synced parents first, so each new directory is made once before its children are copied
+    and copies into known directories do not check for or make their parent.
+
+    Before tombstones are applied, the relative paths of the updated entries and of every directory above them are
+    indexed in updated_paths, so checking if anything within a deleted entry was updated is a set lookup. A tombstone
+    that has been applied to every other sync directory is dropped (not returned by get_tombstones).
+    """
+    copy_chunk_size: int = 1024 * 1024
+
+    def __init__(self, fstructs: List[FileStructure], db_interface: Type[DBInterface],
+                 tombstones: Optional[List[Tombstone]] = None, stats: Optional[SyncStats] = None,
+                 add_fstruct_tombstones: bool = True) -> None:
         self.fstructs: List[FileStructure] = fstructs
         self.db: Type[DBInterface] = db_interface
+        self.stats: SyncStats = stats if stats is not None else SyncStats()
         self.fstruct_dirs: List[str] = []
-        self.fstructs_files_list: List[List[str]] = []
-        self.fstructs_updated_list: List[List[str]] = []
-        self.get_fstruct_info(fstructs)
-
-    def get_fstruct_info(self, fstructs: List[FileStructure]) -> None:
-        for fstruct in fstructs:
-            self.fstruct_dirs.append(fstruct.get_directory_path())
-            files_list: List[str] = self.remove_prefixes(fstruct.files_to_list(), self.fstruct_dirs[-1])
-            self.fstructs_files_list.append(files_list)
-            updated_list: List[str] = self.remove_prefixes(fstruct.get_updated_list(), self.fstruct_dirs[-1])
-            self.fstructs_updated_list.append(updated_list)
-
-    def remove_prefixes(self, files_list: List[str], prefix: str) -> List[str]:
-        files_list_copy: List[str] = files_list[:]
-        for index, list_entry in enumerate(files_list_copy):
-            files_list_copy[index] = self.remove_prefix(list_entry, prefix)
-        return files_list_copy
-
-    def remove_prefix(self, fstruct_entry: str, prefix: str) -> str:
-        assert self.starts_with(fstruct_entry, prefix)
-        return self.remove_leading_slash(fstruct_entry[len(prefix):])
-
-    def starts_with(self, entry: str, prefix: str) -> bool:
-        if entry[:len(prefix)] == prefix:
-            return True
-        raise ValueError("starts_with argument entry does not contain prefix.")
-
-    def remove_leading_slash(self, path: str) -> str:
-        if path[0] == "/" or path[0] == "\\":
-            return path[1:]
-        else:
-            return path
+        self.dir_dbs: Dict[str, Type[DBInterface]] = {}
+        self.name_table: NameTable = fstructs[0].name_table if fstructs else NameTable()
+        self.tombstones: Dict[Tuple[str, Tuple[int, ...]], Tombstone] = {}
+        self.known_dirs: Dict[str, Set[str]] = {}
+        self.updated_paths: Set[str] = set()
+        self.applied_tombstones: Set[Tuple[str, Tuple[int, ...]]] = set()
+        self.get_fstruct_info(fstructs, add_fstruct_tombstones)
+        self.add_tombstones(tombstones if tombstones is not None else [])
+
+    def get_fstruct_info(self, fstructs: List[FileStructure], add_fstruct_tombstones: bool = True) -> None:
+        with get_tracer().span("plan", "plan"):
+            for fstruct in fstructs:
+                self.add_fstruct_info(fstruct, add_fstruct_tombstones)
+
+    def add_fstruct_info(self, fstruct: FileStructure, add_fstruct_tombstones: bool = True) -> None:
+        self.add_directory(fstruct.get_directory_path(), fstruct.db)
+        if add_fstruct_tombstones:
+            self.add_tombstones(fstruct.get_tombstones())
+
+    def add_directory(self, directory: str, db: Type[DBInterface]) -> None:
+        """Adds a sync directory without a FileStructure, its actions are then driven by the caller (see
+        external_diff.py)."""
+        self.fstruct_dirs.append(directory)
+        self.dir_dbs[directory] = db
+
+    def get_db(self, directory: str) -> Type[DBInterface]:
+        """Gets the DBInterface of the sync directory."""
+        return self.dir_dbs.get(directory, self.db)
+
+    def add_tombstones(self, tombstones: List[Tombstone]) -> None:
+        """Adds tombstones, keeping the earliest deletion if the same entry has more than one tombstone."""
+        for tombstone in tombstones:
+            key: Tuple[str, Tuple[int, ...]] = self.get_tombstone_key(tombstone)
+            if key not in self.tombstones or \
+                    tombstone.get_deletion_time() < self.tombstones[key].get_deletion_time():
+                self.tombstones[key] = tombstone
+
+    def get_tombstone_key(self, tombstone: Tombstone) -> Tuple[str, Tuple[int, ...]]:
+        """Gets the sync directory and the path (as name ids) of the entry a tombstone deletes."""
+        return tombstone.get_side(), self.name_table.to_ids(tombstone.get_path())
+
+    def get_tombstones(self) -> List[Tombstone]:
+        """Gets the tombstones that are still valid (deleted entry has not been recreated in its directory) and have
+        not been applied to every other sync directory."""
+        side_tombstones: Dict[str, List[Tombstone]] = {}
+        for key, tombstone in self.tombstones.items():
+            if key in self.applied_tombstones:
+                continue
+            side_tombstones.setdefault(tombstone.get_side(), []).append(tombstone)
+        valid_tombstones: List[Tombstone] = []
+        for side, tombstones in side_tombstones.items():
+            db: Type[DBInterface] = self.get_db(side)
+            paths: List[str] = [db.join_path(side, *tombstone.get_path()) for tombstone in tombstones]
+            records: List[Optional[StatRecord]] = db.stat_many(paths)
+            valid_tombstones.extend(tombstone for tombstone, record in zip(tombstones, records) if record is None)
+        return valid_tombstones
 
     def sync(self) -> None:
-        visited_entries: Dict[str, int] = {}
-        for fstruct_index, fstruct_list in enumerate(self.fstructs_files_list):
-            for fstruct_entry in fstruct_list:
-                if fstruct_entry not in visited_entries:
+        if self.tombstones:
+            self.index_updates()
+        for tombstone in self.tombstones.values():
+            self.apply_tombstone(tombstone)
+        self.sync_updated()
+
+    def index_updates(self, key: Optional[str] = None) -> None:
+        """Adds the relative path of each updated entry, and of every directory above it, to updated_paths.
+
+        Args:
+            key (str, optional): Only indexes the top-level entry key (and everything below it).
+        """
+        for fstruct in self.fstructs:
+            directory: Optional[dir_entry] = fstruct.get_subtree(key) if key is not None else None
+            for fstruct_entry, _ in fstruct.iter_updated(directory):
+                path: str = fstruct_entry
+                # The directories above an indexed path are indexed already.
+                while path and path not in self.updated_paths:
+                    self.updated_paths.add(path)
+                    path = path.rpartition("/")[0]
+
+    def sync_updated(self, key: Optional[str] = None) -> None:
+        """Performs the action of each updated entry once, as the entries are streamed from the FileStructures.
+
+        Args:
+            key (str, optional): Only syncs the top-level entry key (and everything below it).
+        """
+        for fstruct_index, fstruct in enumerate(self.fstructs):
+            directory: Optional[dir_entry] = fstruct.get_subtree(key) if key is not None else None
+            for fstruct_entry, _ in fstruct.iter_updated(directory):
+                # Entries updated in an earlier sync directory were already synced from it.
+                if not any(self.is_updated(fstruct_entry, index) for index in range(fstruct_index)):
                     self.perform_entry_action(fstruct_entry, self.fstruct_dirs[fstruct_index])
-                    visited_entries[fstruct_entry] = 0
+
+    def sync_subtree(self, key: str, tombstones: List[Tombstone]) -> None:
+        """Syncs one top-level entry of the sync directories once it has been checked (FileStructure.check_subtree).
+
+        Subtrees do not overlap, so the entries of the other subtrees are not needed to sync this one.
+
+        Args:
+            key (str): Name of the top-level entry.
+            tombstones (list[Tombstone]): Deletions within the subtree.
+        """
+        self.add_tombstones(tombstones)
+        if tombstones:
+            self.index_updates(key)
+        for tombstone_key in dict.fromkeys(self.get_tombstone_key(tombstone) for tombstone in tombstones):
+            self.apply_tombstone(self.tombstones[tombstone_key])
+        self.sync_updated(key)
+
+    def apply_tombstone(self, tombstone: Tombstone) -> None:
+        """Deletes the entry described by tombstone from every other sync directory.
+
+        The entry is kept if it (or anything within it) was updated in any directory since the last sync, or if it is
+        a file modified after the deletion was detected. The updated entry is then copied back by sync. Otherwise the
+        tombstone is marked as applied once the entry is gone from every other sync directory.
+        """
+        if tombstone.get_side() not in self.fstruct_dirs:
+            return None
+        relative_path: str = "/".join(tombstone.get_path())
+        applied: bool = True
+        for target_dir in self.fstruct_dirs:
+            if target_dir == tombstone.get_side():
+                continue
+            entry_path: DBInterface = self.get_db(target_dir)(self.join_paths(target_dir, relative_path))
+            if not entry_path.exists():
+                continue
+            if self.updated_within(relative_path):
+                applied = False
+                continue
+            if entry_path.is_file() and entry_path.get_mod_time() <= tombstone.get_deletion_time():
+                self.delete_file_from(relative_path, target_dir)
+            elif entry_path.is_dir():
+                self.delete_folder_from(relative_path, target_dir)
+            else:
+                applied = False
+        if applied:
+            self.applied_tombstones.add(self.get_tombstone_key(tombstone))
+
+    def updated_within(self, fstruct_entry: str) -> bool:
+        """Checks if the entry at fstruct_entry, or anything within it, was updated in any sync directory (as indexed
+        by index_updates)."""
+        return fstruct_entry in self.updated_paths
+
+    def is_updated(self, fstruct_entry: str, fstruct_index: int) -> bool:
+        found_entry: Optional[entry] = self.fstructs[fstruct_index].find_entry(fstruct_entry)
+        return found_entry is not None and found_entry.get_updated() > 0
 
     def perform_entry_action(self, fstruct_entry: str, parent_dir: str) -> None:
         attributes: List[int] = self.get_entry_attributes(fstruct_entry, parent_dir)
@@ -64,31 +199,24 @@ class SyncManager:
 
     def get_entry_attributes(self, fstruct_entry: str, parent_dir: str) -> List[int]:
         attributes: List[int] = [0] * 5
-        entry_path: DBInterface = self.db(self.join_paths(parent_dir, fstruct_entry))
+        entry_path: DBInterface = self.get_db(parent_dir)(self.join_paths(parent_dir, fstruct_entry))
         if entry_path.is_file():
             attributes[0] = 1
-        if fstruct_entry in self.fstructs_files_list[0]:
+        entries: List[Optional[entry]] = [fstruct.find_entry(fstruct_entry) for fstruct in self.fstructs[:2]]
+        if entries[0] is not None:
             attributes[1] = 1
-        if fstruct_entry in self.fstructs_files_list[1]:
+        if entries[1] is not None:
             attributes[2] = 1
-        if fstruct_entry in self.fstructs_updated_list[0]:
+        if entries[0] is not None and entries[0].get_updated() > 0:
             attributes[3] = 1
-        if fstruct_entry in self.fstructs_updated_list[1]:
+        if entries[1] is not None and entries[1].get_updated() > 0:
             attributes[4] = 1
         return attributes
 
     def join_paths(self, parent_dir: str, append_dir: str) -> str:
-        entry_str: str = parent_dir
-        append_dir_remaining: str = append_dir
-        while '/' in append_dir_remaining:
-            next_dir: str = append_dir_remaining.split('/')[0]
-            append_dir_remaining = append_dir_remaining[len(next_dir)+1:]
-            entry_str = str(self.db(entry_str) / next_dir)
-        while '\\' in append_dir_remaining:
-            next_dir = append_dir_remaining.split('\\')[-1]
-            append_dir_remaining = append_dir_remaining[len(next_dir)+1:]
-            entry_str = str(self.db(entry_str) / next_dir)
-        return str(self.db(entry_str) / append_dir_remaining)
+        """Gets the path of append_dir (relative, separated by "/" as in FileStructure.iter_entries) within the sync
+        directory parent_dir, joined at once."""
+        return self.get_db(parent_dir).join_path(parent_dir, *append_dir.split("/"))
 
     def execute_entry_action(self, attributes: List[int], fstruct_entry: str) -> None:
         dir1: str = self.fstruct_dirs[0]
@@ -115,7 +243,7 @@ class SyncManager:
         elif self.check_attributes(attributes, [0, 1, 0, 1, -1]):
             self.make_dir_in(fstruct_entry, dir2)
         elif self.check_attributes(attributes, [0, 0, 1, -1, 1]):
-            self.make_dir_in(fstruct_entry, dir2)
+            self.make_dir_in(fstruct_entry, dir1)
         elif self.check_attributes(attributes, [0, 1, 0, 0, -1]):
             self.delete_folder_from(fstruct_entry, dir1)
         elif self.check_attributes(attributes, [0, 0, 1, -1, 0]):
@@ -130,33 +258,89 @@ class SyncManager:
     def copy_file_from_to(self, fstruct_entry: str, from_dir: str, to_dir: str) -> None:
         source: str = self.join_paths(from_dir, fstruct_entry)
         dest: str = self.join_paths(to_dir, fstruct_entry)
-        if self.db(source).exists():
-            if not self.db(dest).get_parent().exists():
-                self.db(dest).get_parent().mkdir(parents=True, exist_ok=True)
-            self.db.copyfile(source, dest)
+        source_db: Type[DBInterface] = self.get_db(from_dir)
+        dest_db: Type[DBInterface] = self.get_db(to_dir)
+        source_path: DBInterface = source_db(source)
+        if source_path.exists():
+            source_mod_time: int = source_path.get_mod_time()
+            dest_path: DBInterface = dest_db(dest)
+            with get_tracer().sampled_span("copy", path=fstruct_entry):
+                self.make_parent_dir(fstruct_entry, dest_path, to_dir)
+                if source_db is dest_db:
+                    dest_db.copyfile(source, dest)
+                else:
+                    self.stream_file(source_path, dest_path)
+            self.stats.add_operation("copy")
+            self.stats.add_bytes_copied(dest_path.get_size())
+            self.stats.add_propagation(source_mod_time)
+
+    def make_parent_dir(self, fstruct_entry: str, entry_path: DBInterface, target_dir: str) -> None:
+        """Makes the parent directory of an entry about to be written in target_dir, unless it is known to exist."""
+        parent: str = fstruct_entry.rpartition("/")[0]
+        if parent not in self.known_dirs.get(target_dir, ()):
+            entry_path.get_parent().mkdir(parents=True, exist_ok=True)
+            self.add_known_dir(parent, target_dir)
+
+    def add_known_dir(self, fstruct_entry: str, target_dir: str) -> None:
+        """Records that the directory fstruct_entry ("" for target_dir itself) and its parents exist in target_dir."""
+        known: Set[str] = self.known_dirs.setdefault(target_dir, set())
+        while fstruct_entry not in known:
+            known.add(fstruct_entry)
+            if not fstruct_entry:
+                break
+            fstruct_entry = fstruct_entry.rpartition("/")[0]
+
+    def remove_known_dirs(self, fstruct_entry: str, target_dir: str) -> None:
+        """Forgets the directory fstruct_entry and every directory within it, after it is deleted from target_dir."""
+        known: Set[str] = self.known_dirs.get(target_dir, set())
+        prefix: str = fstruct_entry + "/"
+        known.difference_update([known_dir for known_dir in known
+                                 if known_dir == fstruct_entry or known_dir.startswith(prefix)])
+
+    def stream_file(self, source: DBInterface, dest: DBInterface) -> None:
+        """Copies source to dest in chunks, used when they are on different backends."""
+        with source.open("rb") as source_file, dest.open("wb") as dest_file:
+            chunk: bytes = source_file.read(self.copy_chunk_size)
+            while chunk:
+                dest_file.write(chunk)
+                chunk = source_file.read(self.copy_chunk_size)
 
     def make_dir_in(self, fstruct_entry: str, target_dir: str) -> None:
-        dest: str = str(self.db(target_dir) / fstruct_entry)
-        self.db(dest).mkdir(parents=True, exist_ok=True)
+        db: Type[DBInterface] = self.get_db(target_dir)
+        if fstruct_entry in self.known_dirs.get(target_dir, ()):
+            return None
+        dest: str = self.join_paths(target_dir, fstruct_entry)
+        with get_tracer().sampled_span("make_dir", path=fstruct_entry):
+            db(dest).mkdir(parents=True, exist_ok=True)
+        self.add_known_dir(fstruct_entry, target_dir)
+        self.stats.add_operation("make_dir")
 
     def delete_file_from(self, fstruct_entry: str, from_dir: str) -> None:
-        entry_path: DBInterface = self.db(self.join_paths(from_dir, fstruct_entry))
+        entry_path: DBInterface = self.get_db(from_dir)(self.join_paths(from_dir, fstruct_entry))
         if entry_path.exists():
-            entry_path.unlink()
+            with get_tracer().sampled_span("delete_file", path=fstruct_entry):
+                entry_path.unlink()
+            self.stats.add_operation("delete_file")
 
     def delete_folder_from(self, fstruct_entry: str, from_dir: str) -> None:
-        entry_path: DBInterface = self.db(self.join_paths(from_dir, fstruct_entry))
+        entry_path: DBInterface = self.get_db(from_dir)(self.join_paths(from_dir, fstruct_entry))
         if entry_path.exists():
-            entry_path.rmtree()
+            with get_tracer().sampled_span("delete_folder", path=fstruct_entry):
+                entry_path.rmtree()
+            self.remove_known_dirs(fstruct_entry, from_dir)
+            self.stats.add_operation("delete_folder")
 
     def rename_with_timestamp(self, fstruct_entry: str, parent_dir: str) -> str:
-        entry_path: DBInterface = self.db(self.join_paths(parent_dir, fstruct_entry))
+        entry_path: DBInterface = self.get_db(parent_dir)(self.join_paths(parent_dir, fstruct_entry))
         new_path: DBInterface = self.get_name_with_timestamp(entry_path)
         new_path = self.attempt_rename(new_path, entry_path)
+        self.stats.add_operation("rename")
         return (str(new_path.get_name()))
 
     def get_name_with_timestamp(self, entry_path: DBInterface) -> Any:
-        entry_timestamp: datetime = datetime.fromtimestamp(entry_path.get_mod_time(), tz=timezone.utc)
+        mod_time: int = entry_path.get_mod_time()
+        entry_timestamp: datetime = datetime.fromtimestamp(mod_time // 1_000_000_000, tz=timezone.utc)
+        entry_timestamp = entry_timestamp.replace(microsecond=(mod_time // 1000) % 1_000_000)
         timestamp_format: str = "%Y-%m-%d-%H-%M-%S-%f"
         timestamp: str = entry_timestamp.strftime(timestamp_format)
         new_name: str = f"{str(entry_path)} ({timestamp})"
@@ -170,29 +354,43 @@ class SyncManager:
                 entry_path.rename(path_name)
                 return path_name
             except FileExistsError:
-                path_name = self.db(f"{path_name} {attempt+1}")
+                path_name = type(entry_path)(f"{path_name} {attempt+1}")
         raise FileExistsError(f"{str(entry_path)} has been copied 100 times.")
 
     def get_last_sync(self, file_dir1: Optional[dir_entry] = None, file_dir2: Optional[dir_entry] = None
                       ) -> Dict[str, Any]:
+        """Gets the snapshot of the synced directories (newest mod time of each file), walked with a stack instead of
+        recursion. The Merkle digests of both directories are stored with it (see merkle.py)."""
         last_sync_dict: Dict[str, Any] = {}
         if file_dir1 is None:
-            file_dir1 = self.fstructs[0].update_file_structure()
+            file_dir1 = self.fstructs[0].update_file_structure(full_scan=True)
         if file_dir2 is None:
-            file_dir2 = self.fstructs[1].update_file_structure()
+            file_dir2 = self.fstructs[1].update_file_structure(full_scan=True)
 
-        for key in file_dir1.get_keys():
-            try:
-                file_dir1_entry: entry = file_dir1.get_entry(key)
-                file_dir2_entry: entry = file_dir2.get_entry(key)
-            except KeyError as err:
-                raise SyncException(str(err), error_id="sync_manager_key_error")
-
-            if isinstance(file_dir1_entry, file_entry) and isinstance(file_dir2_entry, file_entry):
-                if file_dir1_entry.get_mod_time() > file_dir2_entry.get_mod_time():
-                    last_sync_dict[key] = file_dir1_entry.get_mod_time()
-                else:
-                    last_sync_dict[key] = file_dir2_entry.get_mod_time()
-            elif isinstance(file_dir1_entry, dir_entry) and isinstance(file_dir2_entry, dir_entry):
-                last_sync_dict[key] = {'dir': self.get_last_sync(file_dir1_entry, file_dir2_entry)}
+        visited: List[Tuple[dir_entry, dir_entry, Dict[str, Any], Optional[Dict[str, Any]]]] = []
+        pending: List[Tuple[dir_entry, dir_entry, Dict[str, Any], Optional[Dict[str, Any]]]] = [
+            (file_dir1, file_dir2, last_sync_dict, None)]
+        while pending:
+            directory1, directory2, directory_dict, wrapper_dict = pending.pop()
+            visited.append((directory1, directory2, directory_dict, wrapper_dict))
+            for key in directory1.get_keys():
+                try:
+                    file_dir1_entry: entry = directory1.get_entry(key)
+                    file_dir2_entry: entry = directory2.get_entry(key)
+                except KeyError as err:
+                    raise SyncException(str(err), error_id="sync_manager_key_error")
+
+                if isinstance(file_dir1_entry, file_entry) and isinstance(file_dir2_entry, file_entry):
+                    directory_dict[key] = max(file_dir1_entry.get_mod_time(), file_dir2_entry.get_mod_time())
+                elif isinstance(file_dir1_entry, dir_entry) and isinstance(file_dir2_entry, dir_entry):
+                    sub_dict: Dict[str, Any] = {}
+                    directory_dict[key] = {'dir': sub_dict}
+                    pending.append((file_dir1_entry, file_dir2_entry, sub_dict, directory_dict[key]))
+
+        sides: Tuple[int, int] = (0, 1)
+        for directory, side in zip([file_dir1, file_dir2], sides):
+            # Trees from update_file_structure already have their digests.
+            if directory.get_digest(side) is None:
+                compute_digests(directory, side)
+        add_snapshot_digests(visited, sides)
         return last_sync_dict
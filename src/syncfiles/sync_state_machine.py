@@ -4,6 +4,8 @@ Author: Kevin Hodge
 """
 
 from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+import time
 
 
 class SyncState(ABC):
@@ -15,6 +17,13 @@ class SyncState(ABC):
     def get_next(self) -> object:
         """Gets next state."""
 
+    def get_name(self) -> str:
+        return type(self).__name__
+
+    def get_counters(self) -> Dict[str, int]:
+        """Gets counters (e.g. entries scanned) reported to StateObservers when the state exits."""
+        return dict()
+
 
 class End(SyncState):
     def run(self) -> None:
@@ -24,17 +33,87 @@ class End(SyncState):
         return End()
 
 
+class StateEvent:
+    """Describes one run of a state, passed to StateObservers.
+
+    Attributes:
+        state (SyncState): State that is running.
+        name (str): Name of the state.
+        enter_time (float): time.monotonic() before the state ran.
+        exit_time (float, optional): time.monotonic() after the state ran, None until the state exits.
+        counters (dict[str, int]): Counters reported by the state when it exited.
+    """
+    def __init__(self, state: SyncState, enter_time: float) -> None:
+        self.state: SyncState = state
+        self.name: str = state.get_name()
+        self.enter_time: float = enter_time
+        self.exit_time: Optional[float] = None
+        self.counters: Dict[str, int] = dict()
+
+    def get_duration(self) -> float:
+        assert self.exit_time is not None
+        return self.exit_time - self.enter_time
+
+
+class StateObserver(ABC):
+    """Is notified by SyncStateMachine when each state is entered and exited."""
+    def on_enter(self, event: StateEvent) -> None:
+        """Called before the state runs, does nothing by default."""
+
+    @abstractmethod
+    def on_exit(self, event: StateEvent) -> None:
+        """Called after the state runs, event.exit_time and event.counters are set."""
+
+
 class SyncStateMachine:
     def __init__(self) -> None:
         self.state: SyncState = End()
+        self.observers: List[StateObserver] = []
 
     def set_initial_state(self, initial: SyncState) -> None:
         assert isinstance(initial, SyncState)
         self.state = initial
 
+    def add_observer(self, observer: StateObserver) -> None:
+        assert isinstance(observer, StateObserver)
+        self.observers.append(observer)
+
+    def remove_observer(self, observer: StateObserver) -> None:
+        self.observers.remove(observer)
+
+    def get_state(self) -> SyncState:
+        return self.state
+
     def run(self) -> None:
+        if self.observers:
+            self.run_observed()
+            return None
         while True:
             self.state.run()
             self.state = self.state.get_next()  # type: ignore[assignment]
             if isinstance(self.state, End):
                 break
+
+    def run_observed(self) -> None:
+        """Same as run, but notifies the observers around every state (kept separate so run has no overhead)."""
+        while self.step():
+            pass
+
+    def step(self) -> bool:
+        """Runs the current state, notifying the observers, and moves to the next state.
+
+        Used when states are run one at a time by a scheduler (see pair_scheduler.py) instead of by run.
+
+        Returns:
+            bool: False once the next state is End.
+        """
+        event: StateEvent = StateEvent(self.state, time.monotonic())
+        for observer in self.observers:
+            observer.on_enter(event)
+        self.state.run()
+        event.exit_time = time.monotonic()
+        event.counters = self.state.get_counters()
+        for observer in self.observers:
+            observer.on_exit(event)
+        self.state = self.state.get_next()  # type: ignore[assignment]
+        return not isinstance(self.state, End)
@@ -3,31 +3,43 @@
 Author: Kevin Hodge
 """
 
-from typing import List, Optional, Type
+from typing import Dict, List, Optional, Type
 import time
+from syncfiles.adaptive_interval import AdaptiveInterval
+from syncfiles.external_diff import StreamingDiff
 from syncfiles.file_system_interface import DBInterface
 from syncfiles.file_structure import FileStructure
+from syncfiles.ignore_rules import IgnoreRules
 from syncfiles.sync_ui import SyncUI
 from syncfiles.config_manager import ConfigManager
 from syncfiles.sync_exception import SyncException
+from syncfiles.name_table import NameTable
 from syncfiles.sync_manager import SyncManager
+from syncfiles.sync_stats import SyncStats
 from syncfiles.sync_state_machine import SyncState, End
 
 
 class StateData:
     fstructs: List[FileStructure] = []
+    sync_directories: List[str] = []
     error_raised: bool = False
     error: Optional[SyncException] = None
     exit_request: bool = False
     sync_required: bool = False
+    once: bool = False
+    sleep_time: float = 10.0
+    adaptive_interval: Optional[AdaptiveInterval] = None
     verbose: bool = False
 
     def __init__(self, config: ConfigManager, ui: SyncUI, db: Type[DBInterface], verbose: bool = False) -> None:
         self.fstructs = []
+        self.sync_directories = []
         self.error_raised = False
         self.error = None
         self.exit_request = False
         self.exit_required = False
+        self.stats: SyncStats = SyncStats()
+        self.name_table: NameTable = NameTable()
         self.config: ConfigManager = config
         self.ui: SyncUI = ui
         self.db: Type[DBInterface] = db
@@ -36,6 +48,7 @@ class StateData:
 
 class DataState(SyncState):
     name: str = "Unkown State"
+    starts_cycle: bool = False
 
     def __init__(self, state_data: StateData) -> None:
         self.state_data: StateData = state_data
@@ -69,7 +82,40 @@ class DataState(SyncState):
     def set_error_raised(self, error_raised: bool = True) -> None:
         self.state_data.error_raised = error_raised
 
+    def get_stats(self) -> SyncStats:
+        return self.state_data.stats
+
+    def get_once(self) -> bool:
+        return self.state_data.once
+
+    def get_name(self) -> str:
+        return self.name
+
+    def get_counters(self) -> Dict[str, int]:
+        """Gets the counters of the current sync cycle (cumulative since the cycle started at Check)."""
+        stats: SyncStats = self.get_stats()
+        return {
+            'entries_scanned': stats.entries_scanned,
+            'changes_found': stats.changes_found,
+            'operations': stats.get_operation_count(),
+            'bytes_copied': stats.bytes_copied,
+        }
+
+    def get_check_state(self) -> SyncState:
+        """Gets the state that starts a cycle, Stream or Pipeline if the config enables it, Check otherwise."""
+        if self.config.get_memory_budget() > 0:
+            return Stream(self.state_data)
+        if self.config.get_pipeline():
+            return Pipeline(self.state_data)
+        return Check(self.state_data)
+
     def run(self) -> None:
+        if self.starts_cycle and self.get_stats().is_finished():
+            self.state_data.stats = SyncStats()
+            # Names of entries deleted in earlier cycles are dropped, the scan interns the current ones again.
+            self.state_data.name_table.clear()
+        stats: SyncStats = self.get_stats()
+        start_time: float = time.monotonic()
         try:
             self.run_commands()
         except SyncException as err:
@@ -79,6 +125,7 @@ class DataState(SyncState):
         except Exception as err:
             self.set_error_raised()
             self.state_data.error = SyncException(str(err))
+        stats.add_phase_time(self.name, time.monotonic() - start_time)
 
     def run_commands(self) -> None:
         """Commands run by default run function"""
@@ -104,10 +151,20 @@ class Initial(DataState):
         return sync_directories
 
     def initialize_file_structures(self, sync_directories: List[str]) -> None:
+        """Creates the FileStructure of each sync directory, except with a memory budget (Stream scans the
+        directories in each cycle without building their trees)."""
         if self.verbose:
             print("Directories to sync:")
-        for dir in sync_directories:
-            self.add_fstruct(FileStructure(dir, self.db, verbose=self.verbose))
+        self.state_data.sync_directories = sync_directories
+        if self.config.get_memory_budget() > 0:
+            if self.verbose:
+                print("\n".join(sync_directories))
+            return None
+        ignore_rules: Optional[IgnoreRules] = self.config.get_ignore_rules()
+        for side, dir in enumerate(sync_directories):
+            self.add_fstruct(FileStructure(dir, self.config.get_db(dir), verbose=self.verbose,
+                                           ignore_rules=ignore_rules, scan_scheduler=self.config.get_scan_scheduler(),
+                                           name_table=self.state_data.name_table, side=side))
             if self.verbose:
                 print(self.get_fstructs()[-1].get_directory_path())
 
@@ -116,19 +173,27 @@ class Initial(DataState):
             return Error(self.state_data)
         if self.get_exit_request():
             return Final(self.state_data)
-        return Check(self.state_data)
+        return self.get_check_state()
 
 
 class Check(DataState):
     name: str = "Check"
+    starts_cycle: bool = True
 
     def run_commands(self) -> None:
         if self.verbose:
             print("Checking...")
 
         for index, fstruct in enumerate(self.get_fstructs()):
+            scan_start: float = time.monotonic()
             fstruct.update_file_structure()
+            self.get_stats().add_root_scan(fstruct.get_directory_path(), fstruct.get_entry_count(),
+                                           time.monotonic() - scan_start)
+            if fstruct.scan_scheduler is not None:
+                self.get_stats().add_scan_tiers(fstruct.scan_scheduler.get_counts())
             changes: int = fstruct.check_file_structure(self.config.read_last_sync_file())
+            changes += len(fstruct.get_tombstones())
+            self.get_stats().add_changes_found(changes)
             if changes > 0:
                 self.set_sync_required()
             if self.verbose:
@@ -142,6 +207,8 @@ class Check(DataState):
             return Final(self.state_data)
         elif self.get_sync_required():
             return Sync(self.state_data)
+        elif self.get_once():
+            return Final(self.state_data)
         return Wait(self.state_data)
 
 
@@ -149,21 +216,38 @@ class Wait(DataState):
     name: str = "Wait"
 
     def __init__(self, *args, **kwargs) -> None:
-        self.sleep_time: float = 10.0
         super().__init__(*args, **kwargs)
+        self.sleep_time: float = self.state_data.sleep_time
 
     def run_commands(self) -> None:
         if self.verbose:
             print("Waiting...")
 
+        self.get_stats().finish()
+        self.update_sleep_time()
+        self.ui.report_stats(self.get_stats())
+
         if self.prompt_user_to_exit():
             return None
 
-        time.sleep(self.sleep_time)
+        if self.ui.wait(self.sleep_time):
+            self.set_exit_request()
 
     def set_sleep_time(self, sleep_time: float) -> None:
         self.sleep_time = sleep_time
 
+    def update_sleep_time(self) -> None:
+        """Adapts sleep_time to the finished cycle if an AdaptiveInterval is set, and records it in the stats."""
+        adaptive_interval: Optional[AdaptiveInterval] = self.state_data.adaptive_interval
+        if adaptive_interval is None:
+            self.get_stats().set_wait_interval(self.sleep_time, "fixed")
+            return None
+        stats: SyncStats = self.get_stats()
+        self.sleep_time = adaptive_interval.update(stats.changes_found, stats.phase_times.get("Check", 0.0))
+        stats.set_wait_interval(self.sleep_time, adaptive_interval.get_reason())
+        if self.verbose:
+            print(f"Next check in {self.sleep_time:.1f} s ({adaptive_interval.get_reason()})")
+
     def prompt_user_to_exit(self) -> bool:
         if self.ui.exit_prompt():
             self.set_exit_request()
@@ -174,7 +258,65 @@ class Wait(DataState):
             return Error(self.state_data)
         elif self.get_exit_request():
             return Final(self.state_data)
-        return Check(self.state_data)
+        return self.get_check_state()
+
+
+class Pipeline(DataState):
+    """Runs the work of Check and Sync as one asyncio pipeline that overlaps scanning, diffing and copying (see
+    pipeline.py)."""
+    name: str = "Pipeline"
+    starts_cycle: bool = True
+
+    def run_commands(self) -> None:
+        if self.verbose:
+            print("Checking and syncing...")
+
+        # Imported here so the entry points only import asyncio when --pipeline is used.
+        from syncfiles.pipeline import SyncPipeline
+        pipeline: SyncPipeline = SyncPipeline(self.get_fstructs(), self.db, self.get_stats())
+        pipeline.run(self.config.read_last_sync_file(), self.config.read_tombstones())
+        if pipeline.is_synced():
+            self.config.write_last_sync_file(pipeline.get_last_sync())
+            self.config.write_tombstones(pipeline.get_tombstones())
+        if self.verbose:
+            for index, fstruct in enumerate(self.get_fstructs()):
+                print(f"Directory {str(index + 1)}:")
+                print(fstruct.print_file_structure(), end="")
+
+    def get_next(self) -> SyncState:
+        if self.get_error_raised():
+            return Error(self.state_data)
+        elif self.get_exit_request() or self.get_once():
+            return Final(self.state_data)
+        return Wait(self.state_data)
+
+
+class Stream(DataState):
+    """Runs the work of Check and Sync as merge-joins of sorted streams, with memory bounded by the config's
+    memory_budget (see external_diff.py)."""
+    name: str = "Stream"
+    starts_cycle: bool = True
+
+    def run_commands(self) -> None:
+        if self.verbose:
+            print("Checking and syncing...")
+
+        directories: List[str] = self.state_data.sync_directories
+        streaming_diff: StreamingDiff = StreamingDiff(directories, [self.config.get_db(dir) for dir in directories],
+                                                      self.config.get_memory_budget(), self.config.get_ignore_rules(),
+                                                      self.get_stats())
+        streaming_diff.run(self.config.read_sorted_last_sync_file())
+        if streaming_diff.is_synced():
+            sync_start: float = time.monotonic()
+            self.config.write_sorted_last_sync_file(streaming_diff.iter_last_sync())
+            self.get_stats().add_phase_time("Sync", time.monotonic() - sync_start)
+
+    def get_next(self) -> SyncState:
+        if self.get_error_raised():
+            return Error(self.state_data)
+        elif self.get_exit_request() or self.get_once():
+            return Final(self.state_data)
+        return Wait(self.state_data)
 
 
 class Sync(DataState):
@@ -184,15 +326,19 @@ class Sync(DataState):
         if self.verbose:
             print("Syncing...")
 
-        synchonizer: SyncManager = SyncManager(self.get_fstructs(), self.db)
+        synchonizer: SyncManager = SyncManager(self.get_fstructs(), self.db, self.config.read_tombstones(),
+                                               self.get_stats())
         synchonizer.sync()
         self.config.write_last_sync_file(synchonizer.get_last_sync())
+        self.config.write_tombstones(synchonizer.get_tombstones())
 
         self.set_sync_required(False)
 
     def get_next(self) -> SyncState:
         if self.get_error_raised():
             return Error(self.state_data)
+        if self.get_once():
+            return Final(self.state_data)
         return Wait(self.state_data)
 
 
@@ -206,7 +352,7 @@ class Error(DataState):
             print("Error...")
             print(self.error.get_error_message())
 
-        if self.error.get_error_id() == "sync_dirs_do_not_exist":
+        if self.error.get_error_id() == "sync_dirs_do_not_exist" and not self.get_once():
             self.next_state = Initial(self.state_data)
 
     def get_next(self) -> SyncState:
@@ -221,6 +367,7 @@ class Final(DataState):
     def run(self) -> None:
         if self.verbose:
             print("Exiting...")
+        self.get_stats().finish()
 
     def get_next(self) -> SyncState:
         return End()
@@ -0,0 +1,124 @@
+"""Sync Stats
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, Optional
+import time
+from syncfiles.tombstone import current_time_ns
+
+
+class SyncStats:
+    """Counters and timings for one sync cycle (Check, then Sync if changes were found).
+
+    Attributes:
+        entries_scanned (int): Number of files and folders read from all sync directories.
+        changes_found (int): Number of updated entries and tombstones found.
+        bytes_copied (int): Number of bytes copied between sync directories.
+        operations (dict[str, int]): Number of operations run, by operation type.
+        phase_times (dict[str, float]): Seconds spent in each state during the cycle, by state name.
+        root_entries (dict[str, int]): Number of files and folders read from each sync directory, by directory path.
+        scan_times (dict[str, float]): Seconds spent reading each sync directory, by directory path.
+        scan_tiers (dict[str, int]): Directories listed by tier (hot, cold) and cold directories that were not listed
+            (skipped) over all sync directories, empty unless tiered scanning (ScanScheduler) is used.
+        wait_interval (float, optional): Seconds Wait sleeps after the cycle, None until Wait has run.
+        wait_interval_reason (str, optional): Why an AdaptiveInterval chose wait_interval (changes, idle or
+            scan_budget), "fixed" without one.
+        first_copy_latency (float, optional): Seconds from the start of the cycle until the first file was copied, None
+            if nothing was copied.
+        propagation_latency (float, optional): Largest number of seconds from the last modification of a copied file
+            until it was copied, None if nothing was copied.
+        start_time (float): time.monotonic() when the cycle started.
+        end_time (float, optional): time.monotonic() when the cycle finished, None while the cycle is running.
+    """
+    def __init__(self) -> None:
+        self.entries_scanned: int = 0
+        self.changes_found: int = 0
+        self.bytes_copied: int = 0
+        self.operations: Dict[str, int] = dict()
+        self.phase_times: Dict[str, float] = dict()
+        self.root_entries: Dict[str, int] = dict()
+        self.scan_times: Dict[str, float] = dict()
+        self.scan_tiers: Dict[str, int] = dict()
+        self.wait_interval: Optional[float] = None
+        self.wait_interval_reason: Optional[str] = None
+        self.first_copy_latency: Optional[float] = None
+        self.propagation_latency: Optional[float] = None
+        self.start_time: float = time.monotonic()
+        self.end_time: Optional[float] = None
+
+    def add_entries_scanned(self, entries_scanned: int) -> None:
+        self.entries_scanned += entries_scanned
+
+    def add_changes_found(self, changes_found: int) -> None:
+        self.changes_found += changes_found
+
+    def add_bytes_copied(self, bytes_copied: int) -> None:
+        self.bytes_copied += bytes_copied
+
+    def add_operation(self, operation: str) -> None:
+        self.operations[operation] = self.operations.get(operation, 0) + 1
+        if operation == "copy" and self.first_copy_latency is None:
+            self.first_copy_latency = time.monotonic() - self.start_time
+
+    def add_propagation(self, mod_time: int) -> None:
+        """Records that a file last modified at mod_time (integer nanoseconds since the epoch) has just been copied."""
+        latency: float = max(0, current_time_ns() - mod_time) / 1_000_000_000
+        if self.propagation_latency is None or latency > self.propagation_latency:
+            self.propagation_latency = latency
+
+    def add_phase_time(self, phase: str, phase_time: float) -> None:
+        self.phase_times[phase] = self.phase_times.get(phase, 0.0) + phase_time
+
+    def add_root_scan(self, root: str, entries: int, scan_time: float) -> None:
+        self.root_entries[root] = entries
+        self.scan_times[root] = self.scan_times.get(root, 0.0) + scan_time
+        self.add_entries_scanned(entries)
+
+    def add_scan_tiers(self, tier_counts: Dict[str, int]) -> None:
+        for tier, count in tier_counts.items():
+            self.scan_tiers[tier] = self.scan_tiers.get(tier, 0) + count
+
+    def set_wait_interval(self, wait_interval: float, reason: Optional[str]) -> None:
+        self.wait_interval = wait_interval
+        self.wait_interval_reason = reason
+
+    def get_operation_count(self) -> int:
+        return sum(self.operations.values())
+
+    def is_finished(self) -> bool:
+        return self.end_time is not None
+
+    def finish(self) -> None:
+        if self.end_time is None:
+            self.end_time = time.monotonic()
+
+    def get_latency(self) -> float:
+        """Gets seconds from the start of the cycle until it finished (or until now if it is still running)."""
+        end_time: float = self.end_time if self.end_time is not None else time.monotonic()
+        return end_time - self.start_time
+
+    def get_throughput(self) -> float:
+        """Gets bytes copied per second over the cycle."""
+        latency: float = self.get_latency()
+        if latency <= 0.0:
+            return 0.0
+        return self.bytes_copied / latency
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'entries_scanned': self.entries_scanned,
+            'changes_found': self.changes_found,
+            'bytes_copied': self.bytes_copied,
+            'operations': dict(self.operations),
+            'phase_times': dict(self.phase_times),
+            'root_entries': dict(self.root_entries),
+            'scan_times': dict(self.scan_times),
+            'scan_tiers': dict(self.scan_tiers),
+            'wait_interval': self.wait_interval,
+            'wait_interval_reason': self.wait_interval_reason,
+            'first_copy_latency': self.first_copy_latency,
+            'propagation_latency': self.propagation_latency,
+            'latency': self.get_latency(),
+            'throughput': self.get_throughput(),
+        }
@@ -5,6 +5,8 @@ Author: Kevin Hodge
 """
 
 from abc import ABC, abstractmethod
+import time
+from syncfiles.sync_stats import SyncStats
 
 
 class SyncUI(ABC):
@@ -27,3 +29,18 @@ class SyncUI(ABC):
             min_dir (int): number of directories required.
 
         """
+
+    def wait(self, sleep_time: float) -> bool:
+        """Waits between sync cycles.
+
+        Args:
+            sleep_time (float): Seconds to wait.
+
+        Returns:
+            bool: True if an exit was requested while waiting.
+        """
+        time.sleep(sleep_time)
+        return False
+
+    def report_stats(self, stats: SyncStats) -> None:
+        """Shows the stats of a finished sync cycle, does nothing by default."""
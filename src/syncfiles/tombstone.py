@@ -0,0 +1,65 @@
+"""Tombstone
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Optional
+import time
+
+
+def current_time_ns() -> int:
+    return int(time.time() * 1_000_000_000)
+
+
+class Tombstone:
+    """Records that an entry was deleted from one of the sync directories.
+
+    Attributes:
+        path (list[str]): Path of the deleted entry relative to the sync directory, split into components.
+        side (str): Sync directory the entry was deleted from.
+        deletion_time (int): Time the deletion was detected in integer nanoseconds since the epoch.
+        is_dir (bool): Indicates if the deleted entry was a directory.
+    """
+    def __init__(self, path: List[str], side: str, deletion_time: Optional[int] = None, is_dir: bool = False) -> None:
+        self.__path: List[str] = path
+        self.__side: str = side
+        if deletion_time is None:
+            deletion_time = current_time_ns()
+        self.__deletion_time: int = deletion_time
+        self.__is_dir: bool = is_dir
+
+    def __repr__(self) -> str:
+        return f"Tombstone({'/'.join(self.__path)}, {self.__side}, {self.__deletion_time})"
+
+    def get_path(self) -> List[str]:
+        return self.__path
+
+    def get_side(self) -> str:
+        return self.__side
+
+    def get_deletion_time(self) -> int:
+        return self.__deletion_time
+
+    def is_dir(self) -> bool:
+        return self.__is_dir
+
+    def get_key(self) -> str:
+        return f"{self.__side}:{'/'.join(self.__path)}"
+
+    def is_expired(self, retention_ns: int, now: Optional[int] = None) -> bool:
+        if now is None:
+            now = current_time_ns()
+        return now - self.__deletion_time > retention_ns
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            'path': self.__path,
+            'side': self.__side,
+            'deletion_time': self.__deletion_time,
+            'is_dir': self.__is_dir,
+        }
+
+    @classmethod
+    def from_json(cls, tombstone_dict: Dict[str, Any]) -> "Tombstone":
+        return cls(list(tombstone_dict['path']), str(tombstone_dict['side']), int(tombstone_dict['deletion_time']),
+                   bool(tombstone_dict.get('is_dir', False)))
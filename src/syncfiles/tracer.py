@@ -0,0 +1,185 @@
+"""Tracer
+
+Records spans (state runs, scans, diffs, plans, file operations and state-store I/O) in the Chrome trace-event format,
+which can be loaded in chrome://tracing or https://ui.perfetto.dev.
+
+Tracing is off by default: get_tracer() returns a NullTracer whose spans do nothing, set_tracer(Tracer(...)) turns it
+on.
+When the tracer has an output path, events are streamed to it in the JSON array format (which trace viewers accept
+without the closing bracket), so memory stays bounded when tracing is left on for a long time.
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Optional, TextIO
+import json
+import os
+import threading
+import time
+from syncfiles.sync_state_machine import StateEvent, StateObserver
+
+
+class Span:
+    """Context manager that records a complete ("X") trace event when it exits."""
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: Dict[str, Any]) -> None:
+        self.tracer: Tracer = tracer
+        self.name: str = name
+        self.category: str = category
+        self.args: Dict[str, Any] = args
+        self.start_time: float = 0.0
+
+    def __enter__(self) -> "Span":
+        self.start_time = time.perf_counter()
+        return self
+
+    def set_arg(self, name: str, value: Any) -> None:
+        """Adds an argument known only once the span has run (e.g. the number of entries scanned)."""
+        self.args[name] = value
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.tracer.add_complete_event(self.name, self.category, self.start_time, time.perf_counter(), self.args)
+
+
+class NullSpan:
+    """Span that records nothing, shared by every NullTracer span."""
+    def __enter__(self) -> "NullSpan":
+        return self
+
+    def set_arg(self, name: str, value: Any) -> None:
+        pass
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+null_span: NullSpan = NullSpan()
+
+
+class Tracer:
+    """Records spans as Chrome trace events.
+
+    Attributes:
+        output_path (str, optional): File events are streamed to, events are kept in memory if None.
+        sample_every (int): Only 1 in sample_every per-file spans (sampled_span) is recorded.
+        buffer_size (int): Number of events buffered before they are written to output_path.
+        events (list[dict[str, Any]]): Events not yet written to output_path.
+        origin (float): time.perf_counter() that trace timestamps are relative to.
+    """
+    def __init__(self, output_path: Optional[str] = None, sample_every: int = 1, buffer_size: int = 10000) -> None:
+        assert sample_every > 0
+        self.output_path: Optional[str] = output_path
+        self.sample_every: int = sample_every
+        self.buffer_size: int = buffer_size
+        self.events: List[Dict[str, Any]] = []
+        self.origin: float = time.perf_counter()
+        self.pid: int = os.getpid()
+        self.sample_count: int = 0
+        self.lock: threading.Lock = threading.Lock()
+        self.output_file: Optional[TextIO] = None
+        if output_path is not None:
+            self.output_file = open(output_path, "w")
+            self.output_file.write("[\n")
+
+    def span(self, name: str, category: str = "sync", **args: Any) -> Any:
+        return Span(self, name, category, args)
+
+    def sampled_span(self, name: str, category: str = "file", **args: Any) -> Any:
+        """Span for high-volume events (e.g. one per file), only 1 in sample_every is recorded."""
+        self.sample_count += 1
+        if self.sample_count % self.sample_every != 0:
+            return null_span
+        return Span(self, name, category, args)
+
+    def add_complete_event(self, name: str, category: str, start_time: float, end_time: float,
+                           args: Optional[Dict[str, Any]] = None) -> None:
+        """Adds an event spanning start_time to end_time (time.perf_counter() values)."""
+        event: Dict[str, Any] = {
+            'name': name,
+            'cat': category,
+            'ph': "X",
+            'ts': (start_time - self.origin) * 1e6,
+            'dur': (end_time - start_time) * 1e6,
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+        }
+        if args:
+            event['args'] = args
+        with self.lock:
+            self.events.append(event)
+            if self.output_file is not None and len(self.events) >= self.buffer_size:
+                self.flush_events()
+
+    def flush_events(self) -> None:
+        if self.output_file is None:
+            return None
+        for event in self.events:
+            self.output_file.write(json.dumps(event) + ",\n")
+        self.output_file.flush()
+        self.events = []
+
+    def close(self) -> None:
+        """Writes buffered events and closes output_path."""
+        with self.lock:
+            if self.output_file is not None:
+                self.flush_events()
+                self.output_file.write("{}]\n")
+                self.output_file.close()
+                self.output_file = None
+
+    def write(self, path: str) -> None:
+        """Writes the events kept in memory to path in the Chrome trace JSON object format."""
+        with self.lock:
+            with open(path, "w") as trace_file:
+                json.dump({'traceEvents': self.events, 'displayTimeUnit': "ms"}, trace_file)
+
+
+class NullTracer(Tracer):
+    """Tracer that records nothing, used when tracing is off."""
+    def __init__(self) -> None:
+        super().__init__()
+
+    def span(self, name: str, category: str = "sync", **args: Any) -> Any:
+        return null_span
+
+    def sampled_span(self, name: str, category: str = "file", **args: Any) -> Any:
+        return null_span
+
+    def add_complete_event(self, name: str, category: str, start_time: float, end_time: float,
+                           args: Optional[Dict[str, Any]] = None) -> None:
+        pass
+
+
+class TraceObserver(StateObserver):
+    """Records a span for every state run by a SyncStateMachine, with the state counters as arguments.
+
+    One observer can be shared by the state machines of several sync pairs running at once, so start times are kept
+    per event rather than on the observer.
+
+    Attributes:
+        tracer (Tracer): Tracer the spans are added to.
+        start_times (dict[int, float]): time.perf_counter() when each running state was entered, by id of its event.
+    """
+    def __init__(self, tracer: Tracer) -> None:
+        self.tracer: Tracer = tracer
+        self.start_times: Dict[int, float] = dict()
+
+    def on_enter(self, event: StateEvent) -> None:
+        self.start_times[id(event)] = time.perf_counter()
+
+    def on_exit(self, event: StateEvent) -> None:
+        end_time: float = time.perf_counter()
+        start_time: float = self.start_times.pop(id(event), end_time)
+        self.tracer.add_complete_event(event.name, "state", start_time, end_time, event.counters)
+
+
+current_tracer: Tracer = NullTracer()
+
+
+def get_tracer() -> Tracer:
+    return current_tracer
+
+
+def set_tracer(tracer: Optional[Tracer]) -> None:
+    """Sets the tracer used by all modules, None turns tracing off."""
+    global current_tracer
+    current_tracer = tracer if tracer is not None else NullTracer()
@@ -4,7 +4,12 @@ Author: Kevin Hodge
 """
 
 from syncfiles.sync_ui import SyncUI
-from typing import Any, List
+from syncfiles.sync_exception import SyncException
+from syncfiles.sync_state_machine import SyncStateMachine
+from syncfiles.sync_stats import SyncStats
+from typing import Any, Callable, Dict, List, Optional
+import queue
+import threading
 import wx
 
 
@@ -30,6 +35,175 @@ class WxGUI(SyncUI):
         return app.get_response()
 
 
+class WxStatusGUI(SyncUI):
+    """Persistent GUI, a single window shows live sync stats while the state machine runs on a worker thread.
+
+    Prompts never block the sync loop on the window: exit_prompt only checks if Exit was clicked, and the worker is
+    only blocked when directories are missing and the user has to enter one.
+    """
+    def __init__(self) -> None:
+        self.__exit_event: threading.Event = threading.Event()
+        self.app: Optional[StatusApp] = None
+        self.cycle_count: int = 0
+
+    def run(self, state_machine: SyncStateMachine) -> None:
+        """Runs state_machine on a worker thread and the window on the calling (main) thread until both finish."""
+        self.app = StatusApp(exit_callback=self.request_exit)
+        worker: threading.Thread = threading.Thread(target=self.run_worker, args=(state_machine,), daemon=True)
+        worker.start()
+        self.app.MainLoop()
+        self.request_exit()
+        worker.join()
+
+    def run_worker(self, state_machine: SyncStateMachine) -> None:
+        try:
+            state_machine.run()
+        finally:
+            if self.app is not None:
+                wx.CallAfter(self.app.close)
+
+    def request_exit(self) -> None:
+        self.__exit_event.set()
+
+    def exit_prompt(self) -> bool:
+        """Returns True once Exit has been clicked or the window closed, never blocks."""
+        return self.__exit_event.is_set()
+
+    def wait(self, sleep_time: float) -> bool:
+        return self.__exit_event.wait(sleep_time)
+
+    def report_stats(self, stats: SyncStats) -> None:
+        self.cycle_count += 1
+        if self.app is not None:
+            wx.CallAfter(self.app.show_stats, self.cycle_count, stats.to_dict())
+
+    def directory_prompt(self, num_valid_dir: int, min_dir: int = 2) -> str:
+        """Asks the user for a directory on the GUI thread and blocks the worker until it is entered."""
+        message: str = f"""Only {num_valid_dir} valid, unique directories. Must have {str(min_dir)}.
+        Please enter directory to sync below."""
+        responses: "queue.Queue[str]" = queue.Queue()
+        if self.app is None:
+            raise SyncException("GUI is not running", error_id="gui_not_running")
+        wx.CallAfter(self.app.ask_directory, message, responses.put)
+        while True:
+            try:
+                return responses.get(timeout=0.1)
+            except queue.Empty:
+                if self.__exit_event.is_set():
+                    raise SyncException("Exit requested while waiting for directory", error_id="exit_requested")
+
+
+def format_bytes(num_bytes: float) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(num_bytes) < 1024.0:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024.0
+    return f"{num_bytes:.1f} TB"
+
+
+# noinspection PyAttributeOutsideInit
+class StatusApp(wx.App):
+    """Inherits from wx.App, shows the status window for WxStatusGUI.
+
+    Attributes:
+        exit_callback (Callable[[], None]): Called when Exit is clicked or the window is closed.
+    """
+    def __init__(self, exit_callback: Callable[[], None]) -> None:
+        self.exit_callback: Callable[[], None] = exit_callback
+        super().__init__()
+
+    def OnInit(self) -> bool:
+        self.frame: StatusFrame = StatusFrame(parent=None, title="Sync Files Project")
+        self.frame.Bind(wx.EVT_BUTTON, self.on_exit)
+        self.frame.Bind(wx.EVT_CLOSE, self.on_close)
+        self.frame.Show()
+        return True
+
+    def on_exit(self, event: wx.Event) -> None:
+        """Requests an exit, the window stays open until the worker finishes its current state."""
+        self.exit_callback()
+        self.frame.status_panel.set_status("Exiting...")
+
+    def on_close(self, event: wx.Event) -> None:
+        self.exit_callback()
+        self.frame.Destroy()
+
+    def close(self) -> None:
+        if self.frame:
+            self.frame.Close()
+
+    def show_stats(self, cycle_count: int, stats: Dict[str, Any]) -> None:
+        if self.frame:
+            self.frame.status_panel.show_stats(cycle_count, stats)
+
+    def ask_directory(self, message: str, respond: Callable[[str], None]) -> None:
+        dialog: wx.TextEntryDialog = wx.TextEntryDialog(self.frame, message, "Sync Files Project", "", style=wx.OK)
+        dialog.Center()
+        dialog.ShowModal()
+        respond(str(dialog.GetValue()))
+        dialog.Destroy()
+
+
+class StatusFrame(wx.Frame):
+    """Inherits from wx.Frame, draws the status window and contains panel.
+
+    Attributes:
+        status_panel (StatusPanel): Panel on which the stats and Exit button are displayed.
+    """
+    def __init__(self, parent: Any, title: str) -> None:
+        super().__init__(parent, title=title, size=(340, 260))
+        self.status_panel: StatusPanel = StatusPanel(parent=self)
+        self.Center()
+
+
+class StatusPanel(wx.Panel):
+    """Inherits from wx.Panel, displays the stats of the last sync cycle and an Exit button.
+
+    Attributes:
+        status (wx.StaticText): Current status of the program.
+        values (dict[str, wx.StaticText]): Displayed value of each stat.
+        exit_button (wx.Button): Requests an exit.
+    """
+    stat_labels: Dict[str, str] = {
+        'cycles': "Cycles",
+        'entries_scanned': "Files scanned",
+        'changes_found': "Changes found",
+        'bytes_copied': "Bytes copied",
+        'throughput': "Throughput",
+        'latency': "Last cycle latency",
+    }
+
+    def __init__(self, parent: Any) -> None:
+        super().__init__(parent)
+        self.status: wx.StaticText = wx.StaticText(self, label="Syncing...")
+        vbox: wx.BoxSizer = wx.BoxSizer(wx.VERTICAL)
+        vbox.Add(self.status, 0, wx.ALL, 5)
+
+        gridsizer: wx.FlexGridSizer = wx.FlexGridSizer(len(self.stat_labels), 2, 5, 15)
+        self.values: Dict[str, wx.StaticText] = dict()
+        for key, label in self.stat_labels.items():
+            gridsizer.Add(wx.StaticText(self, label=label))
+            self.values[key] = wx.StaticText(self, label="-")
+            gridsizer.Add(self.values[key])
+        vbox.Add(gridsizer, 1, wx.ALL | wx.EXPAND, 5)
+
+        self.exit_button: wx.Button = wx.Button(self, -1, label="Exit")
+        vbox.Add(self.exit_button, 0, wx.ALIGN_RIGHT | wx.ALL, 5)
+        self.SetSizer(vbox)
+
+    def set_status(self, status: str) -> None:
+        self.status.SetLabel(status)
+
+    def show_stats(self, cycle_count: int, stats: Dict[str, Any]) -> None:
+        self.values['cycles'].SetLabel(str(cycle_count))
+        self.values['entries_scanned'].SetLabel(str(stats['entries_scanned']))
+        self.values['changes_found'].SetLabel(str(stats['changes_found']))
+        self.values['bytes_copied'].SetLabel(format_bytes(stats['bytes_copied']))
+        self.values['throughput'].SetLabel(f"{format_bytes(stats['throughput'])}/s")
+        self.values['latency'].SetLabel(f"{stats['latency'] * 1000:.1f} ms")
+        self.Layout()
+
+
 # noinspection PyAttributeOutsideInit
 class YesNoPromptApp(wx.App):
     """Inherits from wx.App, prompts user for yes/no response.
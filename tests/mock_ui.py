@@ -5,12 +5,14 @@ Author: Kevin Hodge
 
 from typing import List, Optional
 from syncfiles.sync_ui import SyncUI
+from syncfiles.sync_stats import SyncStats
 
 
 class MockUI(SyncUI):
     def __init__(self, directories: Optional[List[str]] = None) -> None:
         self.__exit_request: bool = True
         self.__request_count: int = 0
+        self.__reported_stats: List[SyncStats] = []
         if directories is not None:
             self.__directories: List[str] = directories
         else:
@@ -27,6 +29,12 @@ class MockUI(SyncUI):
             self.__request_count += 1
         return self.__directories[self.__request_count-1]
 
+    def report_stats(self, stats: SyncStats) -> None:
+        self.__reported_stats.append(stats)
+
+    def get_reported_stats(self) -> List[SyncStats]:
+        return self.__reported_stats
+
     def get_exit_request(self) -> bool:
         return self.__exit_request
 
@@ -0,0 +1,43 @@
+"""Tests adaptive_interval
+
+Author: Kevin Hodge
+"""
+
+from typing import List
+import unittest
+from syncfiles.adaptive_interval import AdaptiveInterval
+
+
+class AdaptiveIntervalTestCase(unittest.TestCase):
+    def test_backoff_when_idle(self) -> None:
+        adaptive_interval: AdaptiveInterval = AdaptiveInterval(1.0, 10.0, initial_interval=2.0)
+        self.assertIsNone(adaptive_interval.get_reason())
+        intervals: List[float] = [adaptive_interval.update(0, 0.0) for _ in range(4)]
+        self.assertEqual(intervals, [4.0, 8.0, 10.0, 10.0])
+        self.assertEqual(adaptive_interval.get_reason(), "idle")
+
+    def test_shrink_on_changes(self) -> None:
+        adaptive_interval: AdaptiveInterval = AdaptiveInterval(1.0, 10.0, backoff=4.0, initial_interval=10.0)
+        intervals: List[float] = [adaptive_interval.update(3, 0.0) for _ in range(3)]
+        self.assertEqual(intervals, [2.5, 1.0, 1.0])
+        self.assertEqual(adaptive_interval.get_reason(), "changes")
+
+    def test_scan_budget(self) -> None:
+        adaptive_interval: AdaptiveInterval = AdaptiveInterval(1.0, 10.0, max_scan_fraction=0.2)
+        # A 5 s scan may take at most 20% of the time, so the interval is at least 20 s (over max_interval).
+        self.assertEqual(adaptive_interval.update(1, 5.0), 20.0)
+        self.assertEqual(adaptive_interval.get_reason(), "scan_budget")
+        self.assertEqual(adaptive_interval.update(1, 0.0), 10.0)
+        self.assertEqual(adaptive_interval.get_reason(), "changes")
+
+    def test_initial_interval_bounded(self) -> None:
+        self.assertEqual(AdaptiveInterval(1.0, 10.0).get_interval(), 1.0)
+        self.assertEqual(AdaptiveInterval(1.0, 10.0, initial_interval=60.0).get_interval(), 10.0)
+
+    def test_invalid(self) -> None:
+        with self.assertRaises(ValueError):
+            AdaptiveInterval(5.0, 1.0)
+        with self.assertRaises(ValueError):
+            AdaptiveInterval(backoff=1.0)
+        with self.assertRaises(ValueError):
+            AdaptiveInterval(max_scan_fraction=1.0)
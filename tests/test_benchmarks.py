@@ -0,0 +1,120 @@
+"""Tests the benchmark tree generator and runner
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List
+import os
+import shutil
+import tempfile
+import unittest
+from benchmarks.run_benchmarks import (benchmark_deep_tree, benchmark_digests, benchmark_external_diff,
+                                       benchmark_ignored_scan, benchmark_names, benchmark_pipeline, benchmark_tree,
+                                       parse_args, run_benchmarks, stream_paths)
+from benchmarks.tree_generator import TreeSpec, apply_changes, generate_tree
+from syncfiles.file_structure import FileStructure
+from syncfiles.file_system_interface import FSInterface
+
+
+class BenchmarksTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.base_dir: str = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_spec_deterministic(self) -> None:
+        spec: TreeSpec = TreeSpec(file_count=50, fan_out=3, depth=2, seed=1)
+        self.assertEqual(len(spec.get_dir_paths()), 3 + 9)
+        self.assertEqual(spec.get_entry_count(), 62)
+        self.assertEqual(spec.get_files(), TreeSpec(file_count=50, fan_out=3, depth=2, seed=1).get_files())
+        self.assertNotEqual(spec.get_files(), TreeSpec(file_count=50, fan_out=3, depth=2, seed=2).get_files())
+
+    def test_for_entry_count(self) -> None:
+        for entry_count in [10, 1000, 10000]:
+            spec: TreeSpec = TreeSpec.for_entry_count(entry_count)
+            self.assertEqual(spec.get_entry_count(), entry_count)
+        with self.assertRaises(ValueError):
+            TreeSpec.for_entry_count(1000, fan_out=1)
+        with self.assertRaises(SystemExit):
+            parse_args(["--fan-out", "1"])
+
+    def test_generate_tree(self) -> None:
+        spec: TreeSpec = TreeSpec(file_count=30, fan_out=2, depth=2, sizes=[(10, 1.0)])
+        root: str = os.path.join(self.base_dir, "tree")
+        self.assertEqual(generate_tree(root, spec), 36)
+        fstruct: FileStructure = FileStructure(root, FSInterface)
+        self.assertEqual(fstruct.get_entry_count(), 36)
+        file_path, size = spec.get_files()[0]
+        self.assertEqual(os.path.getsize(os.path.join(root, *file_path)), size)
+
+    def test_apply_changes(self) -> None:
+        spec: TreeSpec = TreeSpec(file_count=30, fan_out=2, depth=1, change_rate=0.2)
+        root: str = os.path.join(self.base_dir, "tree")
+        generate_tree(root, spec)
+        self.assertEqual(apply_changes(root, spec), {'modified': 2, 'deleted': 2, 'created': 2})
+        self.assertEqual(FileStructure(root, FSInterface).get_entry_count(), spec.get_entry_count())
+
+    def test_stream_paths(self) -> None:
+        root: str = os.path.join(self.base_dir, "tree")
+        generate_tree(root, TreeSpec(file_count=30, fan_out=2, depth=2))
+        fstruct: FileStructure = FileStructure(root, FSInterface)
+        self.assertEqual(list(stream_paths(fstruct)), fstruct.files_to_list())
+
+    def test_benchmark_tree(self) -> None:
+        results: List[Dict[str, Any]] = benchmark_tree(100, self.base_dir, repeat=1, change_rate=0.1)
+        self.assertEqual([result['benchmark'] for result in results],
+                         ["update_file_structure", "to_json", "from_json", "traverse_list", "traverse_stream",
+                          "sync_initial", "check_file_structure", "plan_entries", "sync_changes"])
+        for result in results:
+            self.assertEqual(result['entries'], 100)
+            self.assertGreaterEqual(result['seconds'], 0.0)
+        self.assertLess(results[4]['peak_bytes'], results[3]['peak_bytes'])
+        synced: FileStructure = FileStructure(os.path.join(self.base_dir, "tree_100_2"), FSInterface)
+        source: FileStructure = FileStructure(os.path.join(self.base_dir, "tree_100_1"), FSInterface)
+        self.assertEqual(synced.get_entry_count(), source.get_entry_count())
+
+    def test_run_benchmarks_memory(self) -> None:
+        report: Dict[str, Any] = run_benchmarks([100], repeat=1, memory=True, depth=20)
+        self.assertEqual(report['backend'], "memory")
+        self.assertEqual(len(report['results']), 26)
+
+    def test_benchmark_ignored_scan(self) -> None:
+        results: List[Dict[str, Any]] = benchmark_ignored_scan(200, self.base_dir, repeat=1)
+        self.assertEqual([result['benchmark'] for result in results], ["scan_all", "scan_ignored"])
+        root: str = os.path.join(self.base_dir, "ignored_200")
+        self.assertEqual(FileStructure(root, FSInterface).get_entry_count(), results[0]['entries'])
+
+    def test_benchmark_pipeline(self) -> None:
+        results: List[Dict[str, Any]] = benchmark_pipeline(100, self.base_dir)
+        self.assertEqual([result['benchmark'] for result in results],
+                         ["sync_sequential", "first_copy_sequential", "sync_pipeline", "first_copy_pipeline"])
+        for mode in ["sequential", "pipeline"]:
+            source: FileStructure = FileStructure(os.path.join(self.base_dir, f"{mode}_100_1"), FSInterface)
+            synced: FileStructure = FileStructure(os.path.join(self.base_dir, f"{mode}_100_2"), FSInterface)
+            self.assertEqual(synced.get_entry_count(), source.get_entry_count())
+        self.assertLessEqual(results[3]['seconds'], results[2]['seconds'])
+
+    def test_benchmark_deep_tree(self) -> None:
+        results: List[Dict[str, Any]] = benchmark_deep_tree(50, self.base_dir, repeat=1)
+        self.assertEqual([result['benchmark'] for result in results],
+                         ["deep_update_file_structure", "deep_to_json", "deep_from_json", "deep_check_file_structure",
+                          "deep_get_last_sync"])
+        for result in results:
+            self.assertEqual(result['entries'], 51)
+            self.assertAlmostEqual(result['seconds_per_level'] * 50, result['seconds'])
+
+    def test_benchmark_names(self) -> None:
+        results: List[Dict[str, Any]] = benchmark_names(200, self.base_dir)
+        self.assertEqual([result['benchmark'] for result in results], ["trees_separate_names", "trees_shared_names"])
+        self.assertLess(results[1]['retained_bytes'], results[0]['retained_bytes'])
+
+    def test_benchmark_external_diff(self) -> None:
+        results: List[Dict[str, Any]] = benchmark_external_diff(1000, self.base_dir, memory_budget=16 * 1024)
+        self.assertEqual([result['benchmark'] for result in results], ["diff_in_memory", "diff_external"])
+        self.assertLess(results[1]['peak_bytes'], results[0]['peak_bytes'])
+
+    def test_benchmark_digests(self) -> None:
+        results: List[Dict[str, Any]] = benchmark_digests(1000, self.base_dir, repeat=1)
+        self.assertEqual([result['benchmark'] for result in results], ["check_full", "check_digests"])
+        self.assertLess(results[1]['seconds'], results[0]['seconds'])
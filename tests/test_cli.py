@@ -0,0 +1,152 @@
+"""Tests cli
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Type
+import argparse
+import contextlib
+import io
+import json
+import os
+import shlex
+import subprocess
+import sys
+import unittest
+import unittest.mock
+from syncfiles.cli import parse_args, run_once, run_pairs_once, main, EXIT_OK, EXIT_ERROR, EXIT_USAGE
+from syncfiles.config_manager import ConfigManager
+from syncfiles.file_system_interface import DBInterface, FSInterface
+from syncfiles.memory_interface import MemoryFileSystem
+from tests.test_daemon import get_subprocess_env
+import tests.tfuncs as tfuncs
+
+
+class CLITestCase(unittest.TestCase):
+    def __init__(self, *args, **kwargs) -> None:
+        self.tf: tfuncs.TFunctions = tfuncs.TFunctions()
+        super().__init__(*args, **kwargs)
+
+    def test_parse_args(self) -> None:
+        args: argparse.Namespace = parse_args(["dir1", "dir2", "--once", "-o", "summary.json"])
+        self.assertEqual(args.directories, ["dir1", "dir2"])
+        self.assertTrue(args.once)
+        self.assertFalse(args.headless)
+        self.assertEqual(args.output, "summary.json")
+        self.assertEqual(args.full_sweep_every, 0)
+        self.assertEqual(parse_args(["--full-sweep-every", "10"]).full_sweep_every, 10)
+        self.assertFalse(args.adaptive)
+        self.assertEqual((args.scan_workers, args.copy_workers), (2, 2))
+        self.assertFalse(args.pipeline)
+        self.assertTrue(parse_args(["--pipeline"]).pipeline)
+        adaptive_args: argparse.Namespace = parse_args(["--adaptive", "--min-interval", "0.5", "--max-interval", "60"])
+        self.assertTrue(adaptive_args.adaptive)
+        self.assertEqual((adaptive_args.min_interval, adaptive_args.max_interval), (0.5, 60.0))
+        with unittest.mock.patch('sys.stderr'):
+            with self.assertRaises(SystemExit):
+                parse_args(["--once", "--headless"])
+
+    @tfuncs.handle_dir_tempfile
+    @tfuncs.handle_test_dirs
+    @tfuncs.handle_last_tempfile
+    def test_run_once_sync(self) -> None:
+        with open(str(self.tf.test_path1 / "test_file.txt"), "w") as file_to_write:
+            file_to_write.write("1234")
+        config: ConfigManager = ConfigManager(FSInterface)
+        config.write_sync_directories([str(self.tf.test_path1), str(self.tf.test_path2)])
+
+        summary: Dict[str, Any] = run_once(config, FSInterface)
+        self.assertEqual(summary["status"], "ok")
+        self.assertTrue(summary["synced"])
+        self.assertEqual(summary["entries_scanned"], 1)
+        self.assertEqual(summary["changes_found"], 1)
+        self.assertEqual(summary["operations"], {"copy": 1})
+        self.assertEqual(summary["bytes_copied"], 4)
+        self.assertCountEqual(summary["phase_times"].keys(), ["Initial", "Check", "Sync"])
+        self.assertTrue((self.tf.test_path2 / "test_file.txt").exists())
+
+        summary = run_once(config, FSInterface)
+        self.assertFalse(summary["synced"])
+        self.assertEqual(summary["changes_found"], 0)
+        self.assertCountEqual(summary["phase_times"].keys(), ["Initial", "Check"])
+
+    @tfuncs.handle_dir_tempfile
+    def test_run_once_error(self) -> None:
+        summary: Dict[str, Any] = run_once(ConfigManager(FSInterface), FSInterface)
+        self.assertEqual(summary["status"], "error")
+        self.assertEqual(summary["error"]["error_id"], "sync_dirs_not_provided")
+
+    def test_run_pairs_once(self) -> None:
+        db: Type[DBInterface] = MemoryFileSystem(cwd="/config").get_interface()
+        db.mkdir_many(["/a1", "/a2", "/b1", "/b2"])
+        with db("/a1/test_file.txt").open("w") as file_to_write:
+            file_to_write.write("1234")
+        config: ConfigManager = ConfigManager(db)
+        config.write_pair("a", ["/a1", "/a2"])
+        config.write_pair("b", ["/b1", "/b2"])
+        summary: Dict[str, Any] = run_pairs_once(config, db, scan_workers=1, copy_workers=1)
+        self.assertEqual(summary["status"], "ok")
+        self.assertEqual(summary["pairs"]["a"]["operations"], {"copy": 1})
+        self.assertFalse(summary["pairs"]["b"]["synced"])
+        self.assertTrue(db("/a2/test_file.txt").exists())
+        config.write_pair("c", ["/c1", "/c2"])
+        self.assertEqual(run_pairs_once(config, db)["status"], "error")
+
+    @tfuncs.handle_dir_tempfile
+    @tfuncs.handle_test_dirs
+    def test_main_pairs_usage(self) -> None:
+        ConfigManager(FSInterface).write_pair("a", [str(self.tf.test_path1), str(self.tf.test_path2)])
+        directories: List[str] = [str(self.tf.test_path1), str(self.tf.test_path2)]
+        with unittest.mock.patch('sys.stderr'):
+            self.assertEqual(main(directories + ["--once"]), EXIT_USAGE)
+            self.assertEqual(main(["--once", "--scan-workers", "0"]), EXIT_USAGE)
+            self.assertEqual(main([]), EXIT_USAGE)
+        self.tf.sync_dir_file.unlink()
+
+    @tfuncs.handle_dir_tempfile
+    @tfuncs.handle_test_dirs
+    @tfuncs.handle_last_tempfile
+    def test_main_once(self) -> None:
+        output: List[str] = []
+        directories: List[str] = [str(self.tf.test_path1), str(self.tf.test_path2)]
+        with unittest.mock.patch('builtins.print', output.append):
+            self.assertEqual(main(directories + ["--once"]), EXIT_OK)
+        self.assertEqual(json.loads(output[0])["status"], "ok")
+
+    @tfuncs.handle_dir_tempfile
+    @tfuncs.handle_test_dirs
+    @tfuncs.handle_last_tempfile
+    def test_main_once_verbose(self) -> None:
+        stdout: io.StringIO = io.StringIO()
+        stderr: io.StringIO = io.StringIO()
+        directories: List[str] = [str(self.tf.test_path1), str(self.tf.test_path2)]
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            self.assertEqual(main(directories + ["--once", "--verbose"]), EXIT_OK)
+        self.assertEqual(json.loads(stdout.getvalue())["status"], "ok")
+        self.assertNotEqual(stderr.getvalue(), "")
+
+    @tfuncs.handle_dir_tempfile
+    def test_main_once_error(self) -> None:
+        with unittest.mock.patch('builtins.print'):
+            self.assertEqual(main(["--once"]), EXIT_ERROR)
+            self.assertEqual(main([str(self.tf.test_path1), "--once"]), EXIT_USAGE)
+
+    @tfuncs.handle_dir_tempfile
+    @tfuncs.handle_test_dirs
+    @tfuncs.handle_last_tempfile
+    def test_main_remote_agent(self) -> None:
+        tfuncs.create_file(str(self.tf.test_path1 / "test_file.txt"))
+        directories: List[str] = [str(self.tf.test_path1), "remote:" + self.tf.test_path2.as_posix()]
+        agent_command: str = " ".join(shlex.quote(arg) for arg in [sys.executable, "-m", "syncfiles.agent", "--root",
+                                                                   str(self.tf.test_path2)])
+        with unittest.mock.patch.dict(os.environ, get_subprocess_env()):
+            with unittest.mock.patch('builtins.print'):
+                self.assertEqual(main(directories + ["--once", "--remote-agent", agent_command]), EXIT_OK)
+        self.assertTrue((self.tf.test_path2 / "test_file.txt").exists())
+
+    def test_python_m_syncfiles(self) -> None:
+        result: "subprocess.CompletedProcess[str]" = subprocess.run(
+            [sys.executable, "-m", "syncfiles", "--help"], env=get_subprocess_env(), stdout=subprocess.PIPE,
+            universal_newlines=True)
+        self.assertEqual(result.returncode, 0)
+        self.assertIn("--once", result.stdout)
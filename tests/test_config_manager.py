@@ -9,6 +9,7 @@ import tests.tfuncs as tfuncs
 from syncfiles.config_manager import ConfigManager
 from syncfiles.file_system_interface import FSInterface
 from syncfiles.file_structure import FileStructure
+from syncfiles.tombstone import Tombstone, current_time_ns
 
 
 class ConfigManagerTestCase(unittest.TestCase):
@@ -92,6 +93,17 @@ class ConfigManagerTestCase(unittest.TestCase):
         # Check result
         self.assertCountEqual(result, [str(self.tf.test_path2)])
 
+    @tfuncs.handle_dir_tempfile
+    @tfuncs.handle_test_dirs
+    def test_read_dirs_in_order(self) -> None:
+        # The order is kept, it sets the side of each directory in the snapshot digests
+        input: List[str] = [str(self.tf.test_path2), str(self.tf.test_path1), str(self.tf.test_path2)]
+        tfuncs.write_json(input, str(self.tf.sync_dir_file))
+        manager: ConfigManager = ConfigManager(FSInterface)
+
+        # Check result
+        self.assertEqual(manager.read_sync_directories(), [str(self.tf.test_path2), str(self.tf.test_path1)])
+
     @tfuncs.handle_dir_tempfile
     @tfuncs.handle_test_dirs
     def test_read_valid_dirs(self) -> None:
@@ -130,6 +142,26 @@ class ConfigManagerTestCase(unittest.TestCase):
         with self.assertRaises(AssertionError):
             manager.write_sync_directories(input)  # type: ignore[arg-type]
 
+    @tfuncs.handle_dir_tempfile
+    @tfuncs.handle_test_dirs
+    def test_ignore_patterns(self) -> None:
+        directories: List[str] = [str(self.tf.test_path1), str(self.tf.test_path2)]
+        manager: ConfigManager = ConfigManager(FSInterface)
+        self.assertIsNone(manager.get_ignore_rules())
+        manager.write_sync_directories(directories)
+        manager.write_ignore_patterns(["node_modules/", "*.tmp"])
+        self.assertEqual(tfuncs.get_json_contents(str(self.tf.sync_dir_file)),
+                         {'directories': directories, 'ignore': ["node_modules/", "*.tmp"]})
+        self.assertCountEqual(manager.read_sync_directories(), directories)
+        manager.write_sync_directories(directories[::-1])
+        self.assertEqual(manager.read_ignore_patterns(), ["node_modules/", "*.tmp"])
+        manager.add_ignore_patterns(["build/"])
+        ignore_rules = manager.get_ignore_rules()
+        assert ignore_rules is not None
+        self.assertEqual(ignore_rules.get_patterns(), ["node_modules/", "*.tmp", "build/"])
+        self.assertTrue(ignore_rules.is_ignored("web/build", True))
+        self.assertIs(manager.get_ignore_rules(), ignore_rules)
+
     @tfuncs.handle_last_tempfile
     def test_no_last_sync(self) -> None:
         # Initialize
@@ -166,6 +198,38 @@ class ConfigManagerTestCase(unittest.TestCase):
         last_sync_files: Dict[str, Any] = tfuncs.get_json_contents(str(self.tf.last_sync_file))
         self.assertCountEqual(last_sync_files, fstruct.files_to_json())
 
+    @tfuncs.handle_last_tempfile
+    def test_migrate_float_last_sync(self) -> None:
+        legacy_dict: Dict[str, Any] = {"file.txt": 1638316800.123456, "folder": {"dir": {"inner.txt": 1.5}}}
+        tfuncs.write_json(legacy_dict, str(self.tf.last_sync_file))
+        manager: ConfigManager = ConfigManager(FSInterface)
+
+        # Run test
+        expected: Dict[str, Any] = {"file.txt": 1638316800123456000, "folder": {"dir": {"inner.txt": 1500000000}}}
+        self.assertEqual(manager.read_last_sync_file(), expected)
+        self.assertEqual(tfuncs.get_json_contents(str(self.tf.last_sync_file)), expected)
+
+    @tfuncs.handle_last_tempfile
+    def test_read_write_tombstones(self) -> None:
+        manager: ConfigManager = ConfigManager(FSInterface)
+        self.assertEqual(manager.read_tombstones(), [])
+        recent: Tombstone = Tombstone(["folder", "file.txt"], str(self.tf.test_path1))
+        expired: Tombstone = Tombstone(["old.txt"], str(self.tf.test_path2), deletion_time=0, is_dir=True)
+        manager.write_tombstones([recent, expired])
+
+        # Run test
+        tombstones: List[Tombstone] = manager.read_tombstones()
+        self.assertEqual([tombstone.to_json() for tombstone in tombstones], [recent.to_json()])
+
+    @tfuncs.handle_last_tempfile
+    def test_tombstone_retention(self) -> None:
+        manager: ConfigManager = ConfigManager(FSInterface)
+        manager.set_tombstone_retention(60.0)
+        old_time: int = current_time_ns() - 120 * 1_000_000_000
+        manager.write_tombstones([Tombstone(["file.txt"], str(self.tf.test_path1), deletion_time=old_time)])
+        self.assertEqual(manager.read_tombstones(), [])
+        self.assertEqual(ConfigManager.tombstone_retention, 30 * 24 * 60 * 60)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,95 @@
+"""Tests daemon
+
+Author: Kevin Hodge
+"""
+
+from typing import Dict, List
+import unittest
+import unittest.mock
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+import syncfiles
+from syncfiles.config_manager import ConfigManager
+from syncfiles.cli import configure_directories
+from syncfiles.daemon import main, run_daemon
+from syncfiles.file_system_interface import FSInterface
+from syncfiles.headless_ui import HeadlessUI
+from syncfiles.main import main as gui_main
+import tests.tfuncs as tfuncs
+
+
+def get_subprocess_env() -> Dict[str, str]:
+    env: Dict[str, str] = dict(os.environ)
+    src_path: str = str(Path(syncfiles.__file__).parent.parent)
+    env["PYTHONPATH"] = os.pathsep.join([src_path, env.get("PYTHONPATH", "")])
+    return env
+
+
+class DaemonTestCase(unittest.TestCase):
+    def __init__(self, *args, **kwargs) -> None:
+        self.tf: tfuncs.TFunctions = tfuncs.TFunctions()
+        super().__init__(*args, **kwargs)
+
+    def test_main(self) -> None:
+        with unittest.mock.patch("syncfiles.cli.main", return_value=0) as cli_main:
+            self.assertEqual(main(["dir1", "dir2", "--interval", "2.5"]), 0)
+        cli_main.assert_called_once_with(["--headless", "dir1", "dir2", "--interval", "2.5"])
+        with unittest.mock.patch("syncfiles.cli.main", return_value=0) as cli_main:
+            self.assertEqual(gui_main(["--once"]), 0)
+        cli_main.assert_called_once_with(["--once"])
+        with unittest.mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+            main(["--once"])
+
+    @tfuncs.handle_dir_tempfile
+    @tfuncs.handle_test_dirs
+    def test_configure_directories(self) -> None:
+        config: ConfigManager = ConfigManager(FSInterface)
+        self.assertFalse(configure_directories(config, [str(self.tf.test_path1), str(self.tf.test_path1)]))
+        directories: List[str] = [str(self.tf.test_path1), str(self.tf.test_path2)]
+        self.assertTrue(configure_directories(config, directories))
+        self.assertCountEqual(config.read_sync_directories(), directories)
+
+    @tfuncs.handle_dir_tempfile
+    @tfuncs.handle_test_dirs
+    @tfuncs.handle_last_tempfile
+    def test_run_daemon(self) -> None:
+        tfuncs.create_file(str(self.tf.test_path1 / "test_file.txt"))
+        config: ConfigManager = ConfigManager(FSInterface)
+        configure_directories(config, [str(self.tf.test_path1), str(self.tf.test_path2)])
+        ui: HeadlessUI = HeadlessUI()
+        timer: threading.Timer = threading.Timer(0.2, ui.request_exit)
+        timer.start()
+        self.assertEqual(run_daemon(config, ui, FSInterface, interval=10e-3), 0)
+        timer.join()
+        self.assertTrue((self.tf.test_path2 / "test_file.txt").exists())
+
+    @tfuncs.handle_dir_tempfile
+    def test_run_daemon_no_directories(self) -> None:
+        config: ConfigManager = ConfigManager(FSInterface)
+        with unittest.mock.patch('builtins.print'):
+            self.assertEqual(run_daemon(config, HeadlessUI(), FSInterface, interval=10e-3), 1)
+
+    def test_wx_not_imported(self) -> None:
+        command: str = "import sys, syncfiles.daemon; sys.exit('wx' in sys.modules)"
+        result: "subprocess.CompletedProcess[bytes]" = subprocess.run([sys.executable, "-c", command],
+                                                                      env=get_subprocess_env())
+        self.assertEqual(result.returncode, 0)
+
+    @unittest.skipIf(sys.platform == "win32", "SIGTERM cannot be handled on Windows")
+    def test_sigterm_exits_cleanly(self) -> None:
+        with tempfile.TemporaryDirectory() as config_dir:
+            sync_dirs: List[str] = [str(Path(config_dir) / "dir1"), str(Path(config_dir) / "dir2")]
+            for sync_dir in sync_dirs:
+                Path(sync_dir).mkdir()
+            command: List[str] = [sys.executable, "-m", "syncfiles.daemon", *sync_dirs, "-i", "0.05"]
+            process: "subprocess.Popen[bytes]" = subprocess.Popen(command, cwd=config_dir, env=get_subprocess_env())
+            time.sleep(1.0)
+            process.send_signal(signal.SIGTERM)
+            self.assertEqual(process.wait(timeout=10), 0)
+            self.assertTrue((Path(config_dir) / "sync_directories_file.json").exists())
@@ -0,0 +1,174 @@
+"""Tests external_diff
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Type
+import os
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+from syncfiles.cli import run_once
+from syncfiles.config_manager import ConfigManager
+from syncfiles.external_diff import ExternalSorter, StreamingDiff
+from syncfiles.file_structure import FileStructure
+from syncfiles.file_system_interface import DBInterface, FSInterface
+from syncfiles.memory_interface import MemoryFileSystem
+from syncfiles.snapshot_records import Record, records_to_snapshot, snapshot_to_records
+from syncfiles.sync_manager import SyncManager
+
+
+def write_file(db: Type[DBInterface], path: str, contents: str = "") -> None:
+    with db(path).open("w") as file_to_write:
+        file_to_write.write(contents)
+
+
+class ExternalDiffTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.file_system: MemoryFileSystem = MemoryFileSystem(cwd="/config")
+        self.db: Type[DBInterface] = self.file_system.get_interface()
+        self.db.mkdir_many(["/config", "/root1/a/sub", "/root1/a-b", "/root1/b", "/root2/c"])
+        write_file(self.db, "/root1/top.txt", "1")
+        write_file(self.db, "/root1/a/sub/file.txt", "12")
+        write_file(self.db, "/root1/a-b/file.txt", "12")
+        write_file(self.db, "/root1/b/file.txt", "123")
+        write_file(self.db, "/root2/c/file.txt", "1234")
+
+    def get_last_sync(self) -> Dict[str, Any]:
+        fstructs: List[FileStructure] = [FileStructure("/root1", self.db), FileStructure("/root2", self.db)]
+        return SyncManager(fstructs, self.db).get_last_sync()
+
+    def run_diff(self, last_sync_records: List[Record]) -> StreamingDiff:
+        # A budget of one record per run and two open runs, so every scan writes runs and merges them in several passes.
+        streaming_diff: StreamingDiff = StreamingDiff(["/root1", "/root2"], [self.db, self.db], 2)
+        streaming_diff.run(last_sync_records)
+        return streaming_diff
+
+    def test_sorter(self) -> None:
+        paths: List[List[str]] = [["b"], ["a", "z"], ["a-b"], ["a"], ["c", "d", "e"], ["a", "y"], ["c"], ["c", "d"]]
+        sorter: ExternalSorter = ExternalSorter(run_bytes=1, max_open_runs=2, run_buffering=64)
+        for index, path in enumerate(paths):
+            sorter.add((path, False, index))
+        sorted_paths: List[List[str]] = [path for path, _, _ in sorter.sort()]
+        self.assertEqual(sorted_paths, [["a"], ["a", "y"], ["a", "z"], ["a-b"], ["b"], ["c"], ["c", "d"],
+                                        ["c", "d", "e"]])
+        self.assertEqual(sorter.record_count, 8)
+        self.assertGreater(sorter.runs_written, 4)
+        sorter.close()
+        self.assertIsNone(sorter.temp_dir)
+
+        in_memory: ExternalSorter = ExternalSorter(run_bytes=1024 * 1024)
+        for path in paths:
+            in_memory.add((path, False, 0))
+        self.assertEqual([path for path, _, _ in in_memory.sort()], sorted_paths)
+        self.assertEqual(in_memory.runs_written, 0)
+
+    def test_memory_budget(self) -> None:
+        base_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir, ignore_errors=True)
+        roots: List[str] = [os.path.join(base_dir, "root1"), os.path.join(base_dir, "root2")]
+        for root in roots:
+            os.makedirs(os.path.join(root, "wide"))
+            for index in range(2000):
+                open(os.path.join(root, "wide", f"file_{index}.txt"), "w").close()
+        memory_budget: int = 32 * 1024
+        last_sync_records: List[Record] = list(
+            StreamingDiff(roots, [FSInterface, FSInterface], memory_budget).iter_last_sync())
+        streaming_diff: StreamingDiff = StreamingDiff(roots, [FSInterface, FSInterface], memory_budget)
+        tracemalloc.start()
+        try:
+            self.assertEqual(streaming_diff.run(iter(last_sync_records)), 0)
+            peak_bytes: int = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertGreater(streaming_diff.runs_written, 0)
+        # The records of the scans, their run buffers and the entries of the wide directory stay within the budget
+        # (they would take over 10 times the budget if held at once).
+        self.assertLessEqual(peak_bytes, 3 * memory_budget)
+
+    def test_snapshot_records(self) -> None:
+        snapshot: Dict[str, Any] = {"a": {'dir': {"x.txt": 3, "sub": {'dir': {}}}}, "a-b": 1, "b.txt": 2}
+        records: List[Record] = snapshot_to_records(snapshot)
+        self.assertEqual([path for path, _, _ in records], [["a"], ["a", "sub"], ["a", "x.txt"], ["a-b"], ["b.txt"]])
+        self.assertEqual(records_to_snapshot(records), snapshot)
+
+    def test_initial_sync(self) -> None:
+        streaming_diff: StreamingDiff = self.run_diff([])
+        self.assertTrue(streaming_diff.is_synced())
+        self.assertGreater(streaming_diff.runs_written, 0)
+        self.assertEqual(sorted(path for path, _ in FileStructure("/root1", self.db).iter_entries()),
+                         sorted(path for path, _ in FileStructure("/root2", self.db).iter_entries()))
+        self.assertEqual(streaming_diff.stats.operations, {"copy": 5, "make_dir": 5})
+        self.assertEqual(streaming_diff.stats.changes_found, 10)
+        self.assertEqual(list(streaming_diff.iter_last_sync()), snapshot_to_records(self.get_last_sync()))
+
+    def test_matches_sync_manager(self) -> None:
+        last_sync_records: List[Record] = list(self.run_diff([]).iter_last_sync())
+        self.db("/root1/b").rmtree()
+        self.db("/root2/a/sub/file.txt").unlink()
+        write_file(self.db, "/root2/c/file.txt", "changed")
+        write_file(self.db, "/root2/new.txt")
+        self.db("/root1/a-b").rmtree()
+        write_file(self.db, "/root2/a-b/new.txt")
+        streaming_diff: StreamingDiff = self.run_diff(last_sync_records)
+        self.assertFalse(self.db("/root2/b").exists())
+        self.assertFalse(self.db("/root1/a/sub/file.txt").exists())
+        self.assertTrue(self.db("/root1/a/sub").exists())
+        with self.db("/root1/c/file.txt").open() as file_to_read:
+            self.assertEqual(file_to_read.read(), "changed")
+        self.assertTrue(self.db("/root1/new.txt").exists())
+        # a-b was deleted from root1 but a file was added within it in root2, so it is kept and synced back.
+        self.assertTrue(self.db("/root1/a-b/new.txt").exists())
+        self.assertTrue(self.db("/root2/a-b/file.txt").exists())
+        # c/file.txt is replaced (deleted, then copied) in root1, as SyncManager does.
+        self.assertEqual(streaming_diff.stats.operations, {"copy": 3, "delete_file": 2, "delete_folder": 1})
+
+        new_records: List[Record] = list(streaming_diff.iter_last_sync())
+        self.assertEqual(new_records, snapshot_to_records(self.get_last_sync()))
+        # a-b/file.txt was only in root2 when the snapshot was taken, so it is copied back next (as with SyncManager).
+        self.assertEqual(self.run_diff(new_records).stats.operations, {"copy": 1})
+        self.assertTrue(self.db("/root1/a-b/file.txt").exists())
+
+    def test_type_changes(self) -> None:
+        last_sync_records: List[Record] = list(self.run_diff([]).iter_last_sync())
+        self.db("/root1/top.txt").unlink()
+        self.db.mkdir_many(["/root1/top.txt"])
+        write_file(self.db, "/root1/top.txt/file.txt", "12")
+        self.db("/root2/b").rmtree()
+        write_file(self.db, "/root2/b", "1")
+        streaming_diff: StreamingDiff = self.run_diff(last_sync_records)
+        self.assertTrue(streaming_diff.is_updated((["b"], False, 0), (["b"], True, 0)))
+        self.assertTrue(self.db("/root2/top.txt").is_dir())
+        self.assertTrue(self.db("/root2/top.txt/file.txt").exists())
+        self.assertTrue(self.db("/root1/b").is_file())
+        self.assertEqual(streaming_diff.stats.operations,
+                         {"copy": 2, "make_dir": 1, "delete_file": 1, "delete_folder": 1})
+        self.assertEqual(list(streaming_diff.iter_last_sync()), snapshot_to_records(self.get_last_sync()))
+        self.assertEqual(self.run_diff(list(streaming_diff.iter_last_sync())).stats.operations, {})
+
+    def test_state(self) -> None:
+        config: ConfigManager = ConfigManager(self.db)
+        config.set_memory_budget(1024)
+        config.write_sync_directories(["/root1", "/root2"])
+        summary: Dict[str, Any] = run_once(config, self.db)
+        self.assertEqual(summary["status"], "ok")
+        self.assertTrue(summary["synced"])
+        self.assertCountEqual(summary["phase_times"], ["Initial", "Stream", "Check", "Sync"])
+        self.assertTrue(self.db("/root1/c/file.txt").exists())
+        self.assertTrue(config.sorted_last_sync_file.exists())
+        self.assertFalse(config.last_sync_file.exists())
+        self.assertEqual(snapshot_to_records(config.read_last_sync_file()), snapshot_to_records(self.get_last_sync()))
+        summary = run_once(config, self.db)
+        self.assertFalse(summary["synced"])
+        self.assertEqual(summary["changes_found"], 0)
+
+    def test_migrates_last_sync_file(self) -> None:
+        config: ConfigManager = ConfigManager(self.db)
+        config.write_sync_directories(["/root1", "/root2"])
+        run_once(config, self.db)
+        self.assertTrue(config.last_sync_file.exists())
+        config.set_memory_budget(1024)
+        summary: Dict[str, Any] = run_once(config, self.db)
+        self.assertEqual(summary["changes_found"], 0)
+        self.assertEqual(list(config.read_sorted_last_sync_file()), snapshot_to_records(self.get_last_sync()))
@@ -3,15 +3,17 @@
 Author: Kevin Hodge
 """
 
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Iterator, Optional, Tuple, Type
 import unittest
 from pathlib import Path
 import time
 import tests.tfuncs as tfuncs
-from syncfiles.entry import dir_entry, file_entry
-from syncfiles.file_system_interface import FSInterface
+from syncfiles.entry import entry, dir_entry, file_entry
+from syncfiles.file_system_interface import DBInterface, FSInterface
+from syncfiles.memory_interface import MemoryFileSystem
 from syncfiles.sync_exception import SyncException
 from syncfiles.file_structure import FileStructure
+from syncfiles.ignore_rules import IgnoreRules
 
 
 class FileStructureTestCase(unittest.TestCase):
@@ -32,8 +34,8 @@ class FileStructureTestCase(unittest.TestCase):
         first_level.add_entry('test_file4.txt', file_entry())
         first_level.add_entry('test_file5.csv', file_entry())
         first_level.add_entry('second_level', second_level)
-        validation_string: str = "test_file4.txt: -1.0\n" + "test_file5.csv: -1.0\n" + "second_level\n" + \
-            "   test_file1.txt: -1.0 X\n" + "   test_file2.json: -1.0\n" + "   test_file3.xml: -1.0\n"
+        validation_string: str = "test_file4.txt: -1\n" + "test_file5.csv: -1\n" + "second_level\n" + \
+            "   test_file1.txt: -1 X\n" + "   test_file2.json: -1\n" + "   test_file3.xml: -1\n"
         assert str(first_level) == validation_string
 
     @tfuncs.handle_test_dirs
@@ -50,9 +52,9 @@ class FileStructureTestCase(unittest.TestCase):
         first_level.add_entry('second_level', second_level)
         fstruct: FileStructure = FileStructure(str(tfuncs.TFunctions.test_path1), FSInterface)
         fstruct.files = first_level
-        validation_string: str = "test_dir1\n" + "   test_file4.txt: -1.0\n" + "   test_file5.csv: -1.0\n" + \
-            "   second_level\n" + "      test_file1.txt: -1.0 X\n" + "      test_file2.json: -1.0\n" + \
-            "      test_file3.xml: -1.0\n"
+        validation_string: str = "test_dir1\n" + "   test_file4.txt: -1\n" + "   test_file5.csv: -1\n" + \
+            "   second_level\n" + "      test_file1.txt: -1 X\n" + "      test_file2.json: -1\n" + \
+            "      test_file3.xml: -1\n"
         assert fstruct.print_file_structure() == validation_string
 
     def test_init_nonexistant_dir(self) -> None:
@@ -206,6 +208,92 @@ class FileStructureTestCase(unittest.TestCase):
         self.assertCountEqual(before_dict, after_dict)
         self.assertCountEqual(after_dict, fstruct.files_to_json())
 
+    @tfuncs.handle_test_dirs
+    def test_json_mod_times_are_ns(self) -> None:
+        test_directory: str = str(self.tf.test_path1)
+        test_file: str = str(self.tf.test_path1 / "test_file1.txt")
+        tfuncs.create_file(test_file)
+        fstruct: FileStructure = FileStructure(test_directory, FSInterface)
+        file_dict: Dict[str, Any] = fstruct.files_to_json()
+        self.assertIsInstance(file_dict["test_file1.txt"], int)
+        self.assertEqual(file_dict["test_file1.txt"], Path(test_file).stat().st_mtime_ns)
+        self.assertEqual(fstruct.check_file_structure(file_dict), 0)
+
+    @tfuncs.handle_test_dirs
+    def test_from_json_rejects_float(self) -> None:
+        fstruct: FileStructure = FileStructure(str(self.tf.test_path1), FSInterface)
+        with self.assertRaises(TypeError):
+            fstruct.from_json({"test_file1.txt": 1.5})
+
+    @tfuncs.handle_test_dirs
+    def test_ignore_rules(self) -> None:
+        tfuncs.create_directory(str(self.tf.test_path1 / "node_modules"))
+        tfuncs.create_directory(str(self.tf.test_path1 / "node_modules" / "pkg"))
+        tfuncs.create_file(str(self.tf.test_path1 / "node_modules" / "pkg" / "index.js"))
+        tfuncs.create_file(str(self.tf.test_path1 / "notes.txt"))
+        tfuncs.create_file(str(self.tf.test_path1 / "notes.txt.tmp"))
+        last_sync_files: Dict[str, Any] = FileStructure(str(self.tf.test_path1), FSInterface).files_to_json()
+        fstruct: FileStructure = FileStructure(str(self.tf.test_path1), FSInterface,
+                                               ignore_rules=IgnoreRules(["node_modules/", "*.tmp"]))
+        self.assertEqual(fstruct.files_to_json(), {"notes.txt": last_sync_files["notes.txt"]})
+        self.assertEqual(fstruct.get_entry_count(), 1)
+        # Entries that are now ignored were not deleted, so they do not get tombstones.
+        self.assertEqual(fstruct.check_file_structure(last_sync_files), 0)
+        self.assertEqual(fstruct.get_tombstones(), [])
+
+    @tfuncs.handle_test_dirs
+    def test_iter_entries(self) -> None:
+        test_directory: str = str(self.tf.test_path1)
+        tfuncs.create_directory(str(self.tf.test_path1 / "folder"))
+        tfuncs.create_directory(str(self.tf.test_path1 / "folder" / "sub"))
+        tfuncs.create_file(str(self.tf.test_path1 / "folder" / "sub" / "file.txt"))
+        tfuncs.create_file(str(self.tf.test_path1 / "top.txt"))
+        fstruct: FileStructure = FileStructure(test_directory, FSInterface)
+        last_sync_files: Dict[str, Any] = fstruct.files_to_json()
+        del last_sync_files["folder"]["dir"]["sub"]
+        fstruct.check_file_structure(last_sync_files)
+
+        entries: Iterator[Tuple[str, entry]] = fstruct.iter_entries()
+        self.assertIn(next(entries)[0], ["folder", "top.txt"])
+        self.assertEqual([str(Path(test_directory, relative_path)) for relative_path, _ in fstruct.iter_entries()],
+                         fstruct.files_to_list())
+        self.assertEqual([relative_path for relative_path, _ in fstruct.iter_updated()],
+                         ["folder/sub", "folder/sub/file.txt"])
+        folder: entry = fstruct.files.get_entry("folder")
+        assert isinstance(folder, dir_entry)
+        self.assertEqual([relative_path for relative_path, _ in fstruct.iter_entries(folder, relative_path="folder")],
+                         ["folder/sub", "folder/sub/file.txt"])
+        self.assertIsInstance(fstruct.find_entry("folder/sub/file.txt"), file_entry)
+        self.assertIsNone(fstruct.find_entry("top.txt/file.txt"))
+        self.assertIsNone(fstruct.find_entry("missing"))
+
+    def test_deep_tree(self) -> None:
+        depth: int = 1200
+        db: Type[DBInterface] = MemoryFileSystem().get_interface()
+        tfuncs.create_deep_tree(db, "/root", depth)
+        fstruct: FileStructure = FileStructure("/root", db)
+        self.assertEqual(fstruct.get_entry_count(), depth + 1)
+        file_dict: Dict[str, Any] = fstruct.files_to_json()
+        self.assertEqual(repr(fstruct.from_json(file_dict)), repr(fstruct.files))
+        self.assertEqual(len(fstruct.files_to_list()), depth + 1)
+        self.assertEqual(fstruct.check_file_structure(file_dict), 0)
+
+        deep_file: str = "/".join(["d"] * depth + ["file.txt"])
+        self.assertEqual(fstruct.check_file_structure({}), depth + 1)
+        deepest: Optional[entry] = fstruct.files.get_entry_path(deep_file.split("/")[:-1])
+        assert isinstance(deepest, dir_entry)
+        deepest.add_entry("new.txt", file_entry())
+        self.assertEqual(fstruct.check_file_structure(file_dict), 1)
+        new_entry: Optional[entry] = fstruct.find_entry(deep_file.replace("file.txt", "new.txt"))
+        assert new_entry is not None
+        self.assertTrue(new_entry.get_updated())
+        self.assertEqual(len(str(fstruct.files).splitlines()), depth + 2)
+
+        db(f"/root/{deep_file}").unlink()
+        fstruct.update_file_structure()
+        fstruct.check_file_structure(file_dict)
+        self.assertEqual(["/".join(tombstone.get_path()) for tombstone in fstruct.get_tombstones()], [deep_file])
+
 
 if __name__ == "__main__":
     unittest.main()
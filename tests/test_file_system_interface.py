@@ -4,10 +4,11 @@ Author: Kevin Hodge
 """
 
 import unittest
-from typing import List
+import unittest.mock
+from typing import List, Optional
 import tests.tfuncs as tfuncs
 from pathlib import Path
-from syncfiles.file_system_interface import DBInterface, FSInterface
+from syncfiles.file_system_interface import DBInterface, FSInterface, StatRecord
 
 
 class FSInterfaceTestCase(unittest.TestCase):
@@ -80,7 +81,7 @@ class FSInterfaceTestCase(unittest.TestCase):
         tfuncs.create_file(test_file)
 
         path: FSInterface = FSInterface(test_file)
-        self.assertEqual(path.get_mod_time(), Path(test_file).stat().st_mtime)
+        self.assertEqual(path.get_mod_time(), Path(test_file).stat().st_mtime_ns)
 
     def test_repr(self) -> None:
         test_file: str = str(self.tf.test_path1 / "test_file.txt")
@@ -188,3 +189,46 @@ class FSInterfaceTestCase(unittest.TestCase):
         FSInterface(new_file).mkdir(parents=True, exist_ok=True)
         self.assertTrue(Path(new_folder).exists())
         self.assertTrue(Path(new_file).exists())
+
+    @tfuncs.handle_test_dirs
+    def test_list_dir(self) -> None:
+        tfuncs.create_directory(str(self.tf.test_path1 / "test_folder"))
+        with open(str(self.tf.test_path1 / "test_file.txt"), "w") as file_to_write:
+            file_to_write.write("1234")
+        for dir_fd_supported in [True, False]:
+            with unittest.mock.patch.object(FSInterface, "dir_fd_supported", dir_fd_supported):
+                records: List[StatRecord] = FSInterface(str(self.tf.test_path1)).list_dir()
+            records.sort(key=lambda record: record.name)
+            self.assertEqual([record.name for record in records], ["test_file.txt", "test_folder"])
+            self.assertTrue(records[0].is_file)
+            self.assertEqual(records[0].size, 4)
+            self.assertEqual(records[0].mod_time, (self.tf.test_path1 / "test_file.txt").stat().st_mtime_ns)
+            self.assertTrue(records[1].is_dir)
+        with self.assertRaises(FileNotFoundError):
+            FSInterface(str(self.tf.test_path1 / "missing")).list_dir()
+
+    @tfuncs.handle_test_dirs
+    def test_stat_many(self) -> None:
+        test_file: str = str(self.tf.test_path1 / "test_file.txt")
+        tfuncs.create_file(test_file)
+        paths: List[str] = [test_file, str(self.tf.test_path1 / "missing.txt"), str(self.tf.test_path2),
+                            str(self.tf.test_path1 / "missing" / "missing.txt")]
+        for dir_fd_supported in [True, False]:
+            with unittest.mock.patch.object(FSInterface, "dir_fd_supported", dir_fd_supported):
+                records: List[Optional[StatRecord]] = FSInterface.stat_many(paths)
+            self.assertEqual([record.name if record is not None else None for record in records],
+                             ["test_file.txt", None, "test_dir2", None])
+
+    @tfuncs.handle_test_dirs
+    def test_mkdir_unlink_many(self) -> None:
+        new_dirs: List[str] = [str(self.tf.test_path1 / "a" / "b"), str(self.tf.test_path1 / "a"),
+                               str(self.tf.test_path2 / "c")]
+        FSInterface.mkdir_many(new_dirs)
+        for new_dir in new_dirs:
+            self.assertTrue(Path(new_dir).is_dir())
+        files: List[str] = [str(Path(new_dir) / "test_file.txt") for new_dir in new_dirs]
+        for test_file in files:
+            tfuncs.create_file(test_file)
+        FSInterface.unlink_many(files)
+        for test_file in files:
+            self.assertFalse(Path(test_file).exists())
@@ -0,0 +1,40 @@
+"""Tests headless_ui
+
+Author: Kevin Hodge
+"""
+
+import unittest
+import threading
+import time
+from syncfiles.headless_ui import HeadlessUI
+from syncfiles.sync_exception import SyncException
+
+
+class HeadlessUITestCase(unittest.TestCase):
+    def test_exit_prompt(self) -> None:
+        ui: HeadlessUI = HeadlessUI()
+        self.assertFalse(ui.exit_prompt())
+        ui.request_exit()
+        self.assertTrue(ui.exit_prompt())
+        self.assertTrue(ui.get_exit_request())
+
+    def test_directory_prompt(self) -> None:
+        ui: HeadlessUI = HeadlessUI(["dir1", "dir2"])
+        self.assertEqual(ui.directory_prompt(0), "dir1")
+        self.assertEqual(ui.directory_prompt(1), "dir2")
+        with self.assertRaises(SyncException) as context:
+            ui.directory_prompt(1)
+        self.assertEqual(context.exception.get_error_id(), "sync_dirs_not_provided")
+
+    def test_wait_timeout(self) -> None:
+        ui: HeadlessUI = HeadlessUI()
+        self.assertFalse(ui.wait(10e-3))
+
+    def test_wait_interrupted(self) -> None:
+        ui: HeadlessUI = HeadlessUI()
+        timer: threading.Timer = threading.Timer(0.05, ui.request_exit)
+        timer.start()
+        start: float = time.monotonic()
+        self.assertTrue(ui.wait(10.0))
+        self.assertLess(time.monotonic() - start, 5.0)
+        timer.join()
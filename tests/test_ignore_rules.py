@@ -0,0 +1,82 @@
+"""Tests ignore_rules
+
+Author: Kevin Hodge
+"""
+
+from typing import Dict, List, Type
+import unittest
+from syncfiles.file_system_interface import DBInterface, StatRecord
+from syncfiles.ignore_rules import IgnoreRules, translate
+from syncfiles.memory_interface import MemoryFileSystem
+
+
+class IgnoreRulesTestCase(unittest.TestCase):
+    def test_name_patterns(self) -> None:
+        rules: IgnoreRules = IgnoreRules(["# editor files", "", "*.tmp", "node_modules", "file?.txt"])
+        self.assertTrue(rules.is_ignored("a.tmp", False))
+        self.assertTrue(rules.is_ignored("dir/sub/a.tmp", False))
+        self.assertTrue(rules.is_ignored("node_modules", True))
+        self.assertTrue(rules.is_ignored("web/node_modules", True))
+        self.assertTrue(rules.is_ignored("file1.txt", False))
+        self.assertFalse(rules.is_ignored("file10.txt", False))
+        self.assertFalse(rules.is_ignored("a.tmp.txt", False))
+        self.assertFalse(rules.is_ignored("# editor files", False))
+
+    def test_anchored_patterns(self) -> None:
+        rules: IgnoreRules = IgnoreRules(["/build", "docs/*.pdf", "**/cache", "logs/**", "a/**/b"])
+        self.assertTrue(rules.is_ignored("build", True))
+        self.assertFalse(rules.is_ignored("src/build", True))
+        self.assertTrue(rules.is_ignored("docs/manual.pdf", False))
+        self.assertFalse(rules.is_ignored("docs/old/manual.pdf", False))
+        self.assertTrue(rules.is_ignored("cache", True))
+        self.assertTrue(rules.is_ignored("x/y/cache", True))
+        self.assertTrue(rules.is_ignored("logs/today.log", False))
+        self.assertFalse(rules.is_ignored("logs", True))
+        self.assertTrue(rules.is_ignored("a/b", True))
+        self.assertTrue(rules.is_ignored("a/x/y/b", True))
+
+    def test_dir_only_patterns(self) -> None:
+        rules: IgnoreRules = IgnoreRules(["build/"])
+        self.assertTrue(rules.is_ignored("build", True))
+        self.assertTrue(rules.is_ignored("src/build", True))
+        self.assertFalse(rules.is_ignored("build", False))
+
+    def test_negation(self) -> None:
+        rules: IgnoreRules = IgnoreRules(["*.log", "!keep.log", "tmp/", "!tmp"])
+        self.assertTrue(rules.is_ignored("debug.log", False))
+        self.assertFalse(rules.is_ignored("keep.log", False))
+        self.assertFalse(rules.is_ignored("tmp", True))
+        self.assertTrue(IgnoreRules(["!keep.log", "*.log"]).is_ignored("keep.log", False))
+
+    def test_char_classes(self) -> None:
+        rules: IgnoreRules = IgnoreRules(["[ab].txt", "[!0-9]x", r"\!important"])
+        self.assertTrue(rules.is_ignored("a.txt", False))
+        self.assertFalse(rules.is_ignored("c.txt", False))
+        self.assertTrue(rules.is_ignored("ax", False))
+        self.assertFalse(rules.is_ignored("1x", False))
+        self.assertTrue(rules.is_ignored("!important", False))
+        self.assertEqual(translate("a.b"), r"(?:.*/)?a\.b")
+
+    def test_empty(self) -> None:
+        self.assertTrue(IgnoreRules([]).is_empty())
+        self.assertFalse(IgnoreRules([]).is_ignored("anything", True))
+
+    def test_list_tree_prunes(self) -> None:
+        file_system: MemoryFileSystem = MemoryFileSystem()
+        db: Type[DBInterface] = file_system.get_interface()
+        db.mkdir_many(["/root/node_modules/pkg", "/root/src"])
+        for path in ["/root/node_modules/pkg/index.js", "/root/src/main.py", "/root/src/main.py.tmp"]:
+            with db(path).open("w") as file_to_write:
+                file_to_write.write("")
+        file_system.operation_counts.clear()
+        rules: IgnoreRules = IgnoreRules(["node_modules/", "*.tmp", "/src/main.py"])
+        listing: Dict[str, List[StatRecord]] = db("/root").list_tree(rules.get_prune())
+        self.assertEqual({path: [record.name for record in records] for path, records in listing.items()},
+                         {"": ["src"], "src": []})
+        self.assertEqual(file_system.operation_counts, {'list_dir': 2})
+        # The paths of a directory below the sync directory are matched with its relative path prefixed.
+        listing = db("/root/src").list_tree(rules.get_prune("src"))
+        self.assertEqual({path: [record.name for record in records] for path, records in listing.items()}, {"": []})
+        listing = db("/root/src").list_tree(lambda path, is_dir: path.endswith(".tmp"))
+        self.assertEqual({path: [record.name for record in records] for path, records in listing.items()},
+                         {"": ["main.py"]})
@@ -0,0 +1,135 @@
+"""Tests memory_interface
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Optional, Type
+import time
+import unittest
+from syncfiles.file_structure import FileStructure
+from syncfiles.file_system_interface import DBInterface, StatRecord
+from syncfiles.memory_interface import MemoryFileSystem, VirtualClock
+from syncfiles.sync_manager import SyncManager
+
+
+def write_file(db: Type[DBInterface], path: str, contents: str = "") -> None:
+    with db(path).open("w") as file_to_write:
+        file_to_write.write(contents)
+
+
+class MemoryInterfaceTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock: VirtualClock = VirtualClock(start_ns=1_000_000_000, tick_ns=10)
+        self.file_system: MemoryFileSystem = MemoryFileSystem(self.clock)
+        self.db: Type[DBInterface] = self.file_system.get_interface()
+
+    def test_mkdir_iterdir(self) -> None:
+        self.db("/dir1/sub").mkdir()
+        write_file(self.db, "/dir1/file.txt")
+        self.assertTrue(self.db("/dir1").is_dir())
+        self.assertTrue(self.db("/dir1/file.txt").is_file())
+        self.assertFalse(self.db("/dir1/other").exists())
+        self.assertEqual([entry.get_name() for entry in self.db("/dir1").iterdir()], ["file.txt", "sub"])
+        with self.assertRaises(FileExistsError):
+            self.db("/dir1").mkdir(exist_ok=False)
+        with self.assertRaises(FileNotFoundError):
+            self.db("/dir2/sub").mkdir(parents=False)
+
+    def test_open(self) -> None:
+        self.db("/dir1").mkdir()
+        write_file(self.db, "/dir1/file.txt", "1234")
+        with self.db("/dir1/file.txt").open() as file_to_read:
+            self.assertEqual(file_to_read.read(), "1234")
+        with self.db("/dir1/file.txt").open("ab") as file_to_append:
+            file_to_append.write(b"5")
+        with self.db("/dir1/file.txt").open("rb") as file_to_read:
+            self.assertEqual(file_to_read.read(), b"12345")
+        self.assertEqual(self.db("/dir1/file.txt").get_size(), 5)
+        with self.assertRaises(FileNotFoundError):
+            self.db("/dir2/file.txt").open("w")
+
+    def test_virtual_clock(self) -> None:
+        write_file(self.db, "/file1.txt")
+        first_mod_time: int = self.db("/file1.txt").get_mod_time()
+        self.clock.advance(1.0)
+        write_file(self.db, "/file2.txt")
+        self.assertEqual(self.db("/file2.txt").get_mod_time(), first_mod_time + 1_000_000_000 + 20)
+        write_file(self.db, "/file1.txt", "changed")
+        self.assertGreater(self.db("/file1.txt").get_mod_time(), self.db("/file2.txt").get_mod_time())
+
+    def test_unlink_rename_rmtree(self) -> None:
+        self.db("/dir1/sub").mkdir()
+        write_file(self.db, "/dir1/file.txt")
+        write_file(self.db, "/dir1/other.txt")
+        new_path: DBInterface = self.db("/dir1/file.txt").rename(self.db("/dir1/renamed.txt"))
+        self.assertEqual(str(new_path), "/dir1/renamed.txt")
+        self.assertFalse(self.db("/dir1/file.txt").exists())
+        with self.assertRaises(FileExistsError):
+            self.db("/dir1/renamed.txt").rename(self.db("/dir1/other.txt"))
+        self.db("/dir1/renamed.txt").unlink()
+        self.assertFalse(self.db("/dir1/renamed.txt").exists())
+        with self.assertRaises(FileNotFoundError):
+            self.db("/dir1/renamed.txt").unlink()
+        self.db("/dir1").rmtree()
+        self.assertFalse(self.db("/dir1/sub").exists())
+
+    def test_paths(self) -> None:
+        self.assertEqual(str(self.db("/dir1") / "file.txt"), "/dir1/file.txt")
+        self.assertEqual(str(self.db("/dir1/file.txt").get_parent()), "/dir1")
+        self.assertEqual(str(self.db.cwd()), "/")
+        self.assertEqual(str(MemoryFileSystem(cwd="/home").get_interface()("config.json")), "/home/config.json")
+
+    def test_copyfile(self) -> None:
+        write_file(self.db, "/file.txt", "1234")
+        self.db.copyfile("/file.txt", "/copy.txt")
+        with self.db("/copy.txt").open() as file_to_read:
+            self.assertEqual(file_to_read.read(), "1234")
+
+    def test_separate_file_systems(self) -> None:
+        other_db: Type[DBInterface] = MemoryFileSystem().get_interface()
+        write_file(self.db, "/file.txt")
+        self.assertFalse(other_db("/file.txt").exists())
+
+    def test_latency(self) -> None:
+        file_system: MemoryFileSystem = MemoryFileSystem(latencies={'exists': 0.05})
+        db: Type[DBInterface] = file_system.get_interface()
+        start_time: float = time.monotonic()
+        db("/").exists()
+        db("/").is_dir()
+        self.assertGreaterEqual(time.monotonic() - start_time, 0.05)
+        self.assertEqual(file_system.operation_counts, {'exists': 1, 'is_dir': 1})
+
+    def test_sync(self) -> None:
+        self.db("/dir1/sub").mkdir()
+        self.db("/dir2").mkdir()
+        write_file(self.db, "/dir1/sub/file.txt", "1234")
+        fstructs: List[FileStructure] = [FileStructure("/dir1", self.db), FileStructure("/dir2", self.db)]
+        for fstruct in fstructs:
+            fstruct.check_file_structure({})
+        sync_manager: SyncManager = SyncManager(fstructs, self.db)
+        sync_manager.sync()
+        self.assertTrue(self.db("/dir2/sub/file.txt").is_file())
+        self.assertEqual(sync_manager.stats.bytes_copied, 4)
+        last_sync: Dict[str, Any] = sync_manager.get_last_sync()
+        self.assertEqual(list(last_sync['sub']['dir']), ["file.txt"])
+
+    def test_batched_operations(self) -> None:
+        self.db.mkdir_many(["/dir1/sub", "/dir2"])
+        write_file(self.db, "/dir1/file.txt", "1234")
+        records: List[StatRecord] = self.db("/dir1").list_dir()
+        self.assertEqual([(record.name, record.is_file, record.size) for record in records],
+                         [("file.txt", True, 4), ("sub", False, 0)])
+        stat_records: List[Optional[StatRecord]] = self.db.stat_many(["/dir1/file.txt", "/missing", "/dir2"])
+        self.assertEqual([record.name if record is not None else None for record in stat_records],
+                         ["file.txt", None, "dir2"])
+        self.db.unlink_many(["/dir1/file.txt"])
+        self.assertFalse(self.db("/dir1/file.txt").exists())
+
+    def test_scan_round_trips(self) -> None:
+        self.db.mkdir_many(["/dir1/sub1", "/dir1/sub2"])
+        for index in range(10):
+            write_file(self.db, f"/dir1/sub1/file{index}.txt")
+        self.file_system.operation_counts.clear()
+        fstruct: FileStructure = FileStructure("/dir1", self.db)
+        self.assertEqual(fstruct.get_entry_count(), 12)
+        self.assertEqual(self.file_system.operation_counts, {'list_dir': 3})
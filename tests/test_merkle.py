@@ -0,0 +1,88 @@
+"""Tests merkle
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Type
+import unittest
+from syncfiles.entry import entry, dir_entry
+from syncfiles.file_structure import FileStructure
+from syncfiles.file_system_interface import DBInterface
+from syncfiles.memory_interface import MemoryFileSystem
+from syncfiles.merkle import compute_digests
+from syncfiles.sync_manager import SyncManager
+
+
+def write_file(db: Type[DBInterface], path: str, contents: str = "") -> None:
+    with db(path).open("w") as file_to_write:
+        file_to_write.write(contents)
+
+
+class MerkleTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db: Type[DBInterface] = MemoryFileSystem().get_interface()
+        self.db.mkdir_many(["/root1/a/sub", "/root1/b", "/root2"])
+        write_file(self.db, "/root1/a/sub/file.txt", "1")
+        write_file(self.db, "/root1/b/file.txt", "12")
+        self.fstructs: List[FileStructure] = [FileStructure("/root1", self.db),
+                                              FileStructure("/root2", self.db, side=1)]
+        for fstruct in self.fstructs:
+            fstruct.check_file_structure({})
+        sync_manager: SyncManager = SyncManager(self.fstructs, self.db)
+        sync_manager.sync()
+        self.last_sync: Dict[str, Any] = sync_manager.get_last_sync()
+
+    def get_digest(self, fstruct: FileStructure, path: List[str]) -> Any:
+        directory: Any = fstruct.files.get_entry_path(path)
+        return directory.get_digest(fstruct.side)
+
+    def test_digests(self) -> None:
+        fstruct: FileStructure = self.fstructs[0]
+        fstruct.update_file_structure()
+        digests: Dict[str, Any] = {name: self.get_digest(fstruct, [name]) for name in ["a", "b"]}
+        sub_digest: Any = self.get_digest(fstruct, ["a", "sub"])
+        folder: entry = fstruct.files.get_entry("a")
+        assert isinstance(folder, dir_entry)
+        self.assertEqual(compute_digests(folder, 1), digests["a"])
+        write_file(self.db, "/root1/a/sub/file.txt", "changed")
+        fstruct.update_file_structure()
+        self.assertNotEqual(self.get_digest(fstruct, ["a", "sub"]), sub_digest)
+        self.assertNotEqual(self.get_digest(fstruct, ["a"]), digests["a"])
+        self.assertEqual(self.get_digest(fstruct, ["b"]), digests["b"])
+
+    def test_snapshot_digests(self) -> None:
+        self.assertEqual(set(self.last_sync["a"]["digests"]), {"0", "1"})
+        self.assertEqual(self.last_sync["a"]["digests"]["0"], self.get_digest(self.fstructs[0], ["a"]))
+        last_sync_folder: entry = FileStructure("/root1", self.db).from_json(self.last_sync).get_entry("b")
+        assert isinstance(last_sync_folder, dir_entry)
+        self.assertEqual(last_sync_folder.get_digest(1), self.get_digest(self.fstructs[1], ["b"]))
+
+        write_file(self.db, "/root2/a/sub/only2.txt")
+        snapshot: Dict[str, Any] = SyncManager(self.fstructs, self.db).get_last_sync()
+        # a and a/sub no longer have the same entries on both sides, b still does.
+        self.assertNotIn("digests", snapshot["a"])
+        self.assertNotIn("digests", snapshot["a"]["dir"]["sub"])
+        self.assertIn("digests", snapshot["b"])
+
+    def test_check_skips_unchanged(self) -> None:
+        # b/file.txt is dropped from the snapshot while the digests of b are kept, so it is only found as a new entry
+        # if b is walked.
+        snapshot: Dict[str, Any] = {key: value for key, value in self.last_sync.items()}
+        snapshot["b"] = {'dir': {}, 'digests': self.last_sync["b"]["digests"]}
+        fstruct: FileStructure = FileStructure("/root1", self.db)
+        self.assertEqual(fstruct.check_file_structure(snapshot), 0)
+        # Digests of older snapshots, stored by sync directory, are not used.
+        snapshot["b"]["digests"] = {"/root1": self.last_sync["b"]["digests"]["0"]}
+        self.assertEqual(fstruct.check_file_structure(snapshot), 1)
+        del snapshot["b"]["digests"]
+        self.assertEqual(fstruct.check_file_structure(snapshot), 1)
+
+    def test_check_finds_changes(self) -> None:
+        write_file(self.db, "/root1/a/sub/new.txt")
+        self.db("/root2/b/file.txt").unlink()
+        fstructs: List[FileStructure] = [FileStructure("/root1", self.db), FileStructure("/root2", self.db, side=1)]
+        self.assertEqual(fstructs[0].check_file_structure(self.last_sync), 1)
+        self.assertEqual(fstructs[1].check_file_structure(self.last_sync), 0)
+        self.assertEqual([tombstone.get_path() for tombstone in fstructs[1].get_tombstones()], [["b", "file.txt"]])
+        last_sync_files: dir_entry = fstructs[0].from_json(self.last_sync)
+        self.assertIsNotNone(last_sync_files.get_entry("a").get_digest(0))  # type: ignore[attr-defined]
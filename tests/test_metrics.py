@@ -0,0 +1,128 @@
+"""Tests metrics
+
+Author: Kevin Hodge
+"""
+
+from typing import List
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+import urllib.error
+import urllib.request
+from syncfiles.cli import main, EXIT_OK
+from syncfiles.config_manager import ConfigManager
+from syncfiles.file_system_interface import FSInterface
+from syncfiles.headless_ui import HeadlessUI
+from syncfiles.metrics import Metric, MetricsRegistry, MetricsServer, SyncMetrics, format_value
+from syncfiles.sync_exception import SyncException
+from syncfiles.sync_state_machine import StateEvent
+from syncfiles.sync_states import Error, StateData, Wait
+from syncfiles.sync_stats import SyncStats
+import tests.tfuncs as tfuncs
+
+
+class MetricsTestCase(unittest.TestCase):
+    def __init__(self, *args, **kwargs) -> None:
+        self.tf: tfuncs.TFunctions = tfuncs.TFunctions()
+        super().__init__(*args, **kwargs)
+
+    def test_render(self) -> None:
+        registry: MetricsRegistry = MetricsRegistry()
+        cycles: Metric = registry.counter("cycles_total", "Cycles run.")
+        entries: Metric = registry.gauge("entries", "Entries.", ["root"])
+        cycles.inc()
+        cycles.inc(2)
+        entries.set(1.5, root="C:\\dir \"1\"")
+        self.assertEqual(registry.render(), "\n".join([
+            "# HELP cycles_total Cycles run.",
+            "# TYPE cycles_total counter",
+            "cycles_total 3",
+            "# HELP entries Entries.",
+            "# TYPE entries gauge",
+            "entries{root=\"C:\\\\dir \\\"1\\\"\"} 1.5",
+        ]) + "\n")
+
+    def test_metric_errors(self) -> None:
+        registry: MetricsRegistry = MetricsRegistry()
+        counter: Metric = registry.counter("operations_total", "Operations.", ["type"])
+        with self.assertRaises(ValueError):
+            counter.inc(-1, type="copy")
+        with self.assertRaises(ValueError):
+            counter.set(1, type="copy")
+        with self.assertRaises(ValueError):
+            counter.inc(1)
+        with self.assertRaises(ValueError):
+            registry.counter("operations_total", "Operations.")
+
+    def test_format_value(self) -> None:
+        self.assertEqual(format_value(3), "3")
+        self.assertEqual(format_value(2.0), "2")
+        self.assertEqual(format_value(0.25), "0.25")
+        self.assertEqual(format_value(float("inf")), "+Inf")
+
+    def test_record_cycle(self) -> None:
+        metrics: SyncMetrics = SyncMetrics()
+        stats: SyncStats = SyncStats()
+        stats.add_root_scan("dir1", 3, 0.5)
+        stats.add_root_scan("dir2", 2, 0.25)
+        stats.add_changes_found(1)
+        stats.add_operation("copy")
+        stats.add_bytes_copied(4)
+        stats.add_phase_time("Sync", 0.1)
+        stats.propagation_latency = 1.5
+        metrics.record_cycle(stats)
+        other_stats: SyncStats = SyncStats()
+        metrics.record_cycle(other_stats)
+        metrics.record_cycle(stats)
+        metrics.record_cycle(other_stats)
+        self.assertEqual(metrics.cycles.get(), 2)
+        self.assertEqual(metrics.entries.get(root="dir1"), 3)
+        self.assertEqual(metrics.scan_duration.get(root="dir2"), 0.25)
+        self.assertEqual(metrics.changes.get(), 1)
+        self.assertEqual(metrics.operations.get(type="copy"), 1)
+        self.assertEqual(metrics.bytes_copied.get(), 4)
+        self.assertEqual(metrics.propagation_latency.get(), 1.5)
+
+    def test_observer(self) -> None:
+        metrics: SyncMetrics = SyncMetrics()
+        state_data: StateData = StateData(ConfigManager(FSInterface), HeadlessUI(), FSInterface)
+        metrics.on_enter(StateEvent(Wait(state_data), 0.0))
+        self.assertEqual(metrics.cycles.get(), 1)
+        state_data.error = SyncException("Sync Directory Does Not Exist", error_id="sync_dirs_do_not_exist")
+        metrics.on_exit(StateEvent(Error(state_data), 0.0))
+        self.assertEqual(metrics.errors.get(error_id="sync_dirs_do_not_exist"), 1)
+
+    def test_server(self) -> None:
+        registry: MetricsRegistry = MetricsRegistry()
+        registry.counter("cycles_total", "Cycles run.").inc()
+        server: MetricsServer = MetricsServer(registry, 0)
+        server.start()
+        try:
+            url: str = f"http://127.0.0.1:{server.get_port()}"
+            with urllib.request.urlopen(f"{url}/metrics") as response:
+                self.assertIn("cycles_total 1", response.read().decode("utf-8"))
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{url}/other")
+        finally:
+            server.stop()
+
+    @tfuncs.handle_dir_tempfile
+    @tfuncs.handle_test_dirs
+    @tfuncs.handle_last_tempfile
+    def test_main_metrics_file(self) -> None:
+        with open(str(self.tf.test_path1 / "test_file.txt"), "w") as file_to_write:
+            file_to_write.write("1234")
+        metrics_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir, ignore_errors=True)
+        metrics_path: str = os.path.join(metrics_dir, "syncfiles.prom")
+        directories: List[str] = [str(self.tf.test_path1), str(self.tf.test_path2)]
+        with unittest.mock.patch('builtins.print'):
+            self.assertEqual(main(directories + ["--once", "--metrics-file", metrics_path]), EXIT_OK)
+        with open(metrics_path) as metrics_file:
+            metrics_text: str = metrics_file.read()
+        self.assertIn("syncfiles_cycles_total 1", metrics_text)
+        self.assertIn("syncfiles_bytes_copied_total 4", metrics_text)
+        self.assertIn("syncfiles_operations_total{type=\"copy\"} 1", metrics_text)
+        self.assertIn(f"syncfiles_entries{{root=\"{directories[0]}\"}} 1", metrics_text)
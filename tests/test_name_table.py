@@ -0,0 +1,86 @@
+"""Tests name_table
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Tuple, Type
+import unittest
+from syncfiles.entry import dir_entry
+from syncfiles.file_structure import FileStructure
+from syncfiles.file_system_interface import DBInterface
+from syncfiles.memory_interface import MemoryFileSystem
+from syncfiles.name_table import NameTable
+from syncfiles.scan_scheduler import ScanScheduler
+from syncfiles.sync_manager import SyncManager
+from syncfiles.tombstone import Tombstone
+
+
+def get_keys(directory: dir_entry) -> List[str]:
+    return list(directory.get_keys())
+
+
+class NameTableTestCase(unittest.TestCase):
+    def test_ids(self) -> None:
+        name_table: NameTable = NameTable()
+        self.assertEqual(name_table.to_ids(["src", "index.js"]), (0, 1))
+        self.assertEqual(name_table.to_ids(["lib", "src", "index.js"]), (2, 0, 1))
+        self.assertEqual(name_table.to_names((2, 0, 1)), ["lib", "src", "index.js"])
+        self.assertEqual(name_table.get_name(1), "index.js")
+        self.assertEqual(len(name_table), 3)
+        name: str = "".join(["R", "EADME.md"])
+        self.assertIsNot(name, name_table.intern("README.md"))
+        self.assertIs(name_table.intern(name), name_table.intern("README.md"))
+        name_table.clear()
+        self.assertEqual(len(name_table), 0)
+        self.assertEqual(name_table.get_id("lib"), 0)
+
+    def test_shared_by_file_structures(self) -> None:
+        db: Type[DBInterface] = MemoryFileSystem().get_interface()
+        for root in ["/root1", "/root2"]:
+            db(f"{root}/src").mkdir()
+            with db(f"{root}/src/index.js").open("w") as file_to_write:
+                file_to_write.write("")
+        name_table: NameTable = NameTable()
+        fstruct1: FileStructure = FileStructure("/root1", db, name_table=name_table)
+        fstruct2: FileStructure = FileStructure("/root2", db, name_table=name_table)
+        snapshot: Dict[str, Any] = {"".join(["s", "rc"]): {'dir': {"".join(["index", ".js"]): 1}}}
+        last_sync_files: dir_entry = fstruct1.from_json(snapshot)
+
+        directories: List[dir_entry] = [fstruct1.files, fstruct2.files, last_sync_files]
+        names: List[str] = [get_keys(directory)[0] for directory in directories]
+        self.assertTrue(all(name is names[0] for name in names))
+        files: List[str] = [get_keys(directory.get_entry(name))[0]  # type: ignore[arg-type]
+                            for directory, name in zip(directories, names)]
+        self.assertTrue(all(name is files[0] for name in files))
+        self.assertEqual(len(name_table), 2)
+
+    def test_skipped_directories(self) -> None:
+        db: Type[DBInterface] = MemoryFileSystem().get_interface()
+        db("/root/cold/sub").mkdir()
+        with db("/root/cold/sub/file.txt").open("w") as file_to_write:
+            file_to_write.write("")
+        name_table: NameTable = NameTable()
+        scheduler: ScanScheduler = ScanScheduler(full_sweep_every=10, hot_cycles=0, max_interval=8)
+        fstruct: FileStructure = FileStructure("/root", db, scan_scheduler=scheduler, name_table=name_table)
+        fstruct.update_file_structure()
+        # StateData clears the table at the start of each cycle.
+        name_table.clear()
+        fstruct.update_file_structure()
+        self.assertEqual(scheduler.get_counts()['skipped'], 3)
+        directory: dir_entry = fstruct.files
+        for name in ["cold", "sub", "file.txt"]:
+            self.assertIs(get_keys(directory)[0], name_table.intern(name))
+            directory = directory.get_entry(name)  # type: ignore[assignment]
+        self.assertEqual(len(name_table), 3)
+
+    def test_tombstone_keys(self) -> None:
+        db: Type[DBInterface] = MemoryFileSystem().get_interface()
+        db.mkdir_many(["/root1", "/root2"])
+        sync_manager: SyncManager = SyncManager([FileStructure("/root1", db), FileStructure("/root2", db)], db)
+        sync_manager.add_tombstones([Tombstone(["src", "index.js"], "/root1", 2),
+                                     Tombstone(["src", "index.js"], "/root1", 1),
+                                     Tombstone(["src", "index.js"], "/root2", 3)])
+        self.assertEqual(sorted(tombstone.get_deletion_time() for tombstone in sync_manager.tombstones.values()),
+                         [1, 3])
+        path_ids: Tuple[int, ...] = sync_manager.name_table.to_ids(["src", "index.js"])
+        self.assertEqual(list(sync_manager.tombstones), [("/root1", path_ids), ("/root2", path_ids)])
@@ -0,0 +1,136 @@
+"""Tests pair_scheduler
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, List, Optional, Tuple, Type
+import threading
+import time
+import unittest
+from syncfiles.config_manager import ConfigManager, PairConfig
+from syncfiles.file_system_interface import DBInterface
+from syncfiles.headless_ui import HeadlessUI
+from syncfiles.memory_interface import MemoryFileSystem
+from syncfiles.pair_scheduler import FairQueue, PairScheduler, SyncPair, WorkerPool
+
+
+def write_file(db: Type[DBInterface], path: str, contents: str = "") -> None:
+    with db(path).open("w") as file_to_write:
+        file_to_write.write(contents)
+
+
+def get_order(fair_queue: FairQueue, count: int, cost: float = 1.0) -> List[str]:
+    order: List[str] = []
+    for _ in range(count):
+        queued: Optional[Tuple[str, Any]] = fair_queue.get()
+        assert queued is not None
+        order.append(queued[0])
+        fair_queue.charge(queued[0], cost)
+    return order
+
+
+class PairSchedulerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.file_system: MemoryFileSystem = MemoryFileSystem(cwd="/config")
+        self.db: Type[DBInterface] = self.file_system.get_interface()
+        self.db.mkdir_many(["/photos/a", "/photos/b", "/docs/a", "/docs/b"])
+        self.config: ConfigManager = ConfigManager(self.db)
+        self.config.write_pair("photos", {'directories': ["/photos/a", "/photos/b"], 'priority': 2})
+        self.config.write_pair("docs", ["/docs/a", "/docs/b"])
+
+    def test_fair_queue_priorities(self) -> None:
+        fair_queue: FairQueue = FairQueue()
+        for index in range(3):
+            fair_queue.put("low", 1, index)
+            fair_queue.put("high", 2, index)
+        # Priority 2 is charged half of the time, so it runs twice as often while both have items queued.
+        self.assertEqual(get_order(fair_queue, 6), ["low", "high", "high", "low", "high", "low"])
+
+    def test_fair_queue_idle_pair(self) -> None:
+        fair_queue: FairQueue = FairQueue()
+        for index in range(10):
+            fair_queue.put("busy", 1, index)
+            get_order(fair_queue, 1)
+        for index in range(3):
+            fair_queue.put("busy", 1, index)
+            fair_queue.put("idle", 1, index)
+        # The idle pair starts at the current virtual time instead of running 10 items in a row.
+        self.assertEqual(get_order(fair_queue, 6), ["idle", "busy", "idle", "busy", "idle", "busy"])
+        fair_queue.close()
+        self.assertIsNone(fair_queue.get())
+
+    def test_worker_pool_bounded(self) -> None:
+        lock: threading.Lock = threading.Lock()
+        active: List[int] = [0, 0]
+        finished: threading.Semaphore = threading.Semaphore(0)
+
+        def run_item(item: int) -> None:
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+            finished.release()
+
+        pool: WorkerPool = WorkerPool("scan", 2, run_item)
+        pool.start()
+        for index in range(9):
+            pool.submit(f"pair{index % 3}", 1, index)
+        for _ in range(9):
+            self.assertTrue(finished.acquire(timeout=5))
+        pool.close()
+        self.assertEqual(active[1], 2)
+        with self.assertRaises(ValueError):
+            WorkerPool("copy", 0, run_item)
+
+    def test_pair_config(self) -> None:
+        pair_configs: List[PairConfig] = self.config.get_pair_configs()
+        self.assertEqual([pair_config.get_name() for pair_config in pair_configs], ["photos", "docs"])
+        self.assertEqual([pair_config.get_priority() for pair_config in pair_configs], [2, 1])
+        self.assertCountEqual(pair_configs[0].read_sync_directories(), ["/photos/a", "/photos/b"])
+        pair_configs[1].write_ignore_patterns(["*.tmp"])
+        self.assertEqual(self.config.read_pairs()["docs"], {'directories': ["/docs/a", "/docs/b"], 'ignore': ["*.tmp"]})
+        self.assertEqual(self.config.read_sync_directories(), [])
+        self.assertEqual(str(pair_configs[0].last_sync_file), "/config/last_sync_file.photos.json")
+        with self.assertRaises(ValueError):
+            self.config.write_pair("../photos", [])
+
+    def test_run_once(self) -> None:
+        write_file(self.db, "/photos/a/photo.jpg", "1234")
+        write_file(self.db, "/docs/b/doc.txt", "12")
+        scheduler: PairScheduler = PairScheduler(HeadlessUI(), scan_workers=1, copy_workers=1)
+        for pair_config in self.config.get_pair_configs():
+            scheduler.add_pair(pair_config, self.db, once=True)
+        scheduler.run()
+        self.assertTrue(self.db("/photos/b/photo.jpg").exists())
+        self.assertTrue(self.db("/docs/a/doc.txt").exists())
+        for pair in scheduler.get_pairs():
+            self.assertTrue(pair.done)
+            self.assertFalse(pair.state_data.error_raised)
+            self.assertEqual(pair.state_data.stats.get_operation_count(), 1)
+        self.assertTrue(self.db("/config/last_sync_file.photos.json").exists())
+        self.assertTrue(self.db("/config/last_sync_file.docs.json").exists())
+        self.assertFalse(self.db("/config/last_sync_file.json").exists())
+
+    def test_run_until_exit(self) -> None:
+        ui: HeadlessUI = HeadlessUI()
+        scheduler: PairScheduler = PairScheduler(ui)
+        for pair_config in self.config.get_pair_configs():
+            scheduler.add_pair(pair_config, self.db, sleep_time=10e-3)
+        timer: threading.Timer = threading.Timer(0.1, ui.request_exit)
+        timer.start()
+        write_file(self.db, "/photos/b/photo.jpg", "1234")
+        scheduler.run()
+        timer.join()
+        self.assertTrue(self.db("/photos/a/photo.jpg").exists())
+        pairs: List[SyncPair] = scheduler.get_pairs()
+        self.assertTrue(all(pair.done and not pair.state_data.error_raised for pair in pairs))
+
+    def test_pair_error(self) -> None:
+        self.config.write_pair("missing", ["/missing/a", "/missing/b"])
+        scheduler: PairScheduler = PairScheduler(HeadlessUI())
+        for pair_config in self.config.get_pair_configs():
+            scheduler.add_pair(pair_config, self.db, once=True)
+        scheduler.run()
+        self.assertEqual([pair.state_data.error_raised for pair in scheduler.get_pairs()], [False, False, True])
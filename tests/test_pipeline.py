@@ -0,0 +1,140 @@
+"""Tests pipeline
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Tuple, Type
+import time
+import unittest
+import unittest.mock
+from syncfiles.cli import run_once
+from syncfiles.config_manager import ConfigManager
+from syncfiles.entry import dir_entry
+from syncfiles.file_structure import FileStructure
+from syncfiles.file_system_interface import DBInterface, StatRecord
+from syncfiles.memory_interface import MemoryFileSystem
+from syncfiles.pipeline import SyncPipeline
+from syncfiles.sync_exception import SyncException
+from syncfiles.sync_manager import SyncManager
+from syncfiles.sync_stats import SyncStats
+from syncfiles.tombstone import Tombstone
+
+
+def write_file(db: Type[DBInterface], path: str, contents: str = "") -> None:
+    with db(path).open("w") as file_to_write:
+        file_to_write.write(contents)
+
+
+class RecordingPipeline(SyncPipeline):
+    """Records when each subtree was read and diffed, each diff takes at least diff_time."""
+    diff_time: float = 0.01
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.events: List[Tuple[str, str, float]] = []
+
+    async def scan_subtree(self, *args: Any) -> None:
+        await super().scan_subtree(*args)
+        record: StatRecord = args[3]
+        self.events.append(("scan", record.name, time.monotonic()))
+
+    def diff_subtree(self, key: str, last_sync_files: dir_entry) -> Tuple[int, List[Tombstone]]:
+        time.sleep(self.diff_time)
+        result: Tuple[int, List[Tombstone]] = super().diff_subtree(key, last_sync_files)
+        self.events.append(("diff", key, time.monotonic()))
+        return result
+
+
+class PipelineTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.file_system: MemoryFileSystem = MemoryFileSystem(cwd="/config")
+        self.db: Type[DBInterface] = self.file_system.get_interface()
+        self.db.mkdir_many(["/root1/a/sub", "/root1/b", "/root2/c"])
+        write_file(self.db, "/root1/top.txt", "1")
+        write_file(self.db, "/root1/a/sub/file.txt", "12")
+        write_file(self.db, "/root1/b/file.txt", "123")
+        write_file(self.db, "/root2/c/file.txt", "1234")
+        self.fstructs: List[FileStructure] = [FileStructure("/root1", self.db), FileStructure("/root2", self.db)]
+
+    def run_pipeline(self, last_sync: Dict[str, Any]) -> SyncPipeline:
+        pipeline: SyncPipeline = SyncPipeline(self.fstructs, self.db)
+        pipeline.run(last_sync)
+        return pipeline
+
+    def test_initial_sync(self) -> None:
+        pipeline: SyncPipeline = self.run_pipeline({})
+        self.assertTrue(pipeline.is_synced())
+        self.assertEqual(self.fstructs[0].update_file_structure(full_scan=True).get_keys(),
+                         self.fstructs[1].update_file_structure(full_scan=True).get_keys())
+        self.assertEqual(set(pipeline.get_last_sync()), {"top.txt", "a", "b", "c"})
+        self.assertEqual(pipeline.stats.operations, {"copy": 4, "make_dir": 4})
+        self.assertEqual(pipeline.stats.changes_found, 8)
+        self.assertIsNotNone(pipeline.stats.first_copy_latency)
+        self.assertCountEqual(pipeline.stats.phase_times, ["Check", "Sync"])
+
+    def test_matches_sync_manager(self) -> None:
+        last_sync: Dict[str, Any] = self.run_pipeline({}).get_last_sync()
+        self.db("/root1/b").rmtree()
+        write_file(self.db, "/root2/a/sub/file.txt", "changed")
+        write_file(self.db, "/root2/new.txt")
+        pipeline: SyncPipeline = self.run_pipeline(last_sync)
+        self.assertFalse(self.db("/root2/b").exists())
+        with self.db("/root1/a/sub/file.txt").open() as file_to_read:
+            self.assertEqual(file_to_read.read(), "changed")
+        self.assertTrue(self.db("/root1/new.txt").exists())
+        self.assertEqual(pipeline.get_tombstones(), [])
+
+        fstructs: List[FileStructure] = [FileStructure("/root1", self.db), FileStructure("/root2", self.db)]
+        self.assertEqual(pipeline.get_last_sync(), SyncManager(fstructs, self.db).get_last_sync())
+        self.assertFalse(self.run_pipeline(pipeline.get_last_sync()).is_synced())
+
+    def test_copies_overlap_diff(self) -> None:
+        for index in range(5):
+            write_file(self.db, f"/root1/d{index}.txt", str(index))
+        pipeline: RecordingPipeline = RecordingPipeline(self.fstructs, self.db, SyncStats())
+        pipeline.run({})
+        last_diff: float = max(event_time for event, _, event_time in pipeline.events if event == "diff")
+        assert pipeline.stats.first_copy_latency is not None
+        # The first subtree was copied before the last subtree had been diffed.
+        self.assertLess(pipeline.stats.start_time + pipeline.stats.first_copy_latency, last_diff)
+
+    def test_copies_overlap_scan(self) -> None:
+        file_system: MemoryFileSystem = MemoryFileSystem(latencies={"list_dir": 0.01})
+        db: Type[DBInterface] = file_system.get_interface()
+        db.mkdir_many([f"/root1/d{index}/sub" for index in range(6)] + ["/root2"])
+        for index in range(6):
+            write_file(db, f"/root1/d{index}/sub/file.txt", str(index))
+        pipeline: RecordingPipeline = RecordingPipeline([FileStructure("/root1", db), FileStructure("/root2", db)], db,
+                                                        SyncStats())
+        pipeline.run({})
+        self.assertTrue(db("/root2/d5/sub/file.txt").exists())
+        last_scan: float = max(event_time for event, _, event_time in pipeline.events if event == "scan")
+        assert pipeline.stats.first_copy_latency is not None
+        # The first subtree was copied before the last subtree had been read.
+        self.assertLess(pipeline.stats.start_time + pipeline.stats.first_copy_latency, last_scan)
+        self.assertEqual(pipeline.stats.entries_scanned, 18)
+
+    def test_scan_error(self) -> None:
+        with unittest.mock.patch.object(self.fstructs[1], "scan_subtree", side_effect=OSError("unreadable")):
+            with self.assertRaises(OSError):
+                self.run_pipeline({})
+        # A subtree that was not read in every sync directory is not synced.
+        self.assertFalse(self.db("/root1/c").exists())
+        self.db("/root2").rmtree()
+        with self.assertRaises(SyncException):
+            self.run_pipeline({})
+
+    def test_state(self) -> None:
+        config: ConfigManager = ConfigManager(self.db)
+        config.set_pipeline()
+        config.write_sync_directories(["/root1", "/root2"])
+        summary: Dict[str, Any] = run_once(config, self.db)
+        self.assertEqual(summary["status"], "ok")
+        self.assertTrue(summary["synced"])
+        self.assertCountEqual(summary["phase_times"], ["Initial", "Pipeline", "Check", "Sync"])
+        self.assertTrue(self.db("/root1/c/file.txt").exists())
+        fstructs: List[FileStructure] = [FileStructure("/root1", self.db), FileStructure("/root2", self.db, side=1)]
+        self.assertEqual(config.read_last_sync_file(), SyncManager(fstructs, self.db).get_last_sync())
+        summary = run_once(config, self.db)
+        self.assertFalse(summary["synced"])
+        self.assertEqual(summary["changes_found"], 0)
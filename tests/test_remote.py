@@ -0,0 +1,221 @@
+"""Tests remote_protocol, remote_interface and agent
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Optional, Type
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+import unittest.mock
+from pathlib import Path
+from syncfiles.agent import AgentServer, main, token_variable
+from syncfiles.file_structure import FileStructure
+from syncfiles.file_system_interface import DBInterface, FSInterface, StatRecord
+from syncfiles.ignore_rules import IgnoreRules
+from syncfiles.remote_interface import PendingRequest, RemoteConnection, RemoteFileSystem
+from syncfiles.sync_manager import SyncManager
+import syncfiles.remote_protocol as protocol
+from tests.test_daemon import get_subprocess_env
+
+
+class RemoteTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.remote_dir: str = tempfile.mkdtemp(prefix="syncfiles_remote_")
+        self.connection: RemoteConnection = RemoteConnection.launch(
+            [sys.executable, "-m", "syncfiles.agent", "--root", self.remote_dir], env=get_subprocess_env())
+        self.db: Type[DBInterface] = RemoteFileSystem(self.connection, "remote:").get_interface()
+        self.root: str = "remote:" + Path(self.remote_dir).as_posix()
+
+    def tearDown(self) -> None:
+        self.connection.close()
+        shutil.rmtree(self.remote_dir, ignore_errors=True)
+
+    def test_frames(self) -> None:
+        stream: io.BytesIO = io.BytesIO(protocol.encode_frame(7, protocol.CHUNK, b"1234") +
+                                        protocol.encode_frame(8, protocol.END))
+        self.assertEqual(protocol.read_frame(stream), (7, protocol.CHUNK, b"1234"))
+        self.assertEqual(protocol.read_frame(stream), (8, protocol.END, b""))
+        self.assertIsNone(protocol.read_frame(stream))
+        self.assertIsNone(protocol.read_frame(io.BytesIO(protocol.encode_frame(1, protocol.CHUNK, b"1234")[:-1])))
+        error: Exception = protocol.decode_error(protocol.encode_error(FileNotFoundError("missing")))
+        self.assertIsInstance(error, FileNotFoundError)
+        self.assertIsInstance(protocol.decode_error(protocol.encode_error(KeyError("key"))), protocol.RemoteError)
+
+    def test_basic_operations(self) -> None:
+        self.assertEqual(self.connection.call("hello"), {'version': 1})
+        self.db(self.root + "/dir1/sub").mkdir()
+        with self.db(self.root + "/dir1/file.txt").open("w") as file_to_write:
+            file_to_write.write("1234")
+        self.assertTrue(self.db(self.root + "/dir1").is_dir())
+        self.assertTrue(self.db(self.root + "/dir1/file.txt").is_file())
+        self.assertEqual(self.db(self.root + "/dir1/file.txt").get_size(), 4)
+        self.assertEqual(self.db(self.root + "/dir1/file.txt").get_mod_time(),
+                         os.stat(os.path.join(self.remote_dir, "dir1", "file.txt")).st_mtime_ns)
+        self.assertEqual(str(self.db(self.root) / "dir1"), self.root + "/dir1")
+        self.assertEqual(str(self.db(self.root + "/dir1").get_parent()), self.root)
+        self.assertEqual([str(entry) for entry in self.db(self.root + "/dir1").iterdir()],
+                         [self.root + "/dir1/file.txt", self.root + "/dir1/sub"])
+        renamed: DBInterface = self.db(self.root + "/dir1/file.txt").rename(self.db(self.root + "/dir1/renamed.txt"))
+        self.assertEqual(str(renamed), self.root + "/dir1/renamed.txt")
+        self.db.copyfile(self.root + "/dir1/renamed.txt", self.root + "/copy.txt")
+        with self.db(self.root + "/copy.txt").open() as file_to_read:
+            self.assertEqual(file_to_read.read(), "1234")
+        self.db(self.root + "/copy.txt").unlink()
+        self.db(self.root + "/dir1").rmtree()
+        self.assertFalse(self.db(self.root + "/dir1").exists())
+
+    def test_batched_operations(self) -> None:
+        self.db.mkdir_many([self.root + "/dir1/sub", self.root + "/dir2"])
+        with self.db(self.root + "/dir1/sub/file.txt").open("w") as file_to_write:
+            file_to_write.write("1234")
+        listing: Dict[str, List[StatRecord]] = self.db(self.root).list_tree()
+        self.assertEqual({path: [record.name for record in records] for path, records in listing.items()},
+                         {"": ["dir1", "dir2"], "dir1": ["sub"], "dir1/sub": ["file.txt"], "dir2": []})
+        self.assertEqual(listing["dir1/sub"][0].size, 4)
+        listing = self.db(self.root).list_tree(IgnoreRules(["sub/"]).get_prune())
+        self.assertEqual({path: [record.name for record in records] for path, records in listing.items()},
+                         {"": ["dir1", "dir2"], "dir1": [], "dir2": []})
+        listing = self.db(self.root + "/dir1").list_tree(IgnoreRules(["/dir1/sub"]).get_prune("dir1"))
+        self.assertEqual({path: [record.name for record in records] for path, records in listing.items()}, {"": []})
+        # A prune that cannot be sent to the agent is applied locally.
+        listing = self.db(self.root).list_tree(lambda path, is_dir: path == "dir2")
+        self.assertEqual({path: [record.name for record in records] for path, records in listing.items()},
+                         {"": ["dir1"], "dir1": ["sub"], "dir1/sub": ["file.txt"]})
+        records: List[Optional[StatRecord]] = self.db.stat_many([self.root + "/dir1/sub/file.txt",
+                                                                 self.root + "/missing"])
+        self.assertEqual([record.name if record is not None else None for record in records], ["file.txt", None])
+        self.db.unlink_many([self.root + "/dir1/sub/file.txt"])
+        self.assertEqual(self.db(self.root + "/dir1/sub").list_dir(), [])
+
+    def test_large_file(self) -> None:
+        data: bytes = os.urandom(3 * protocol.chunk_size + 123)
+        self.connection.write_file(Path(self.remote_dir, "large.bin").as_posix(), [data[:1000], data[1000:]])
+        with open(os.path.join(self.remote_dir, "large.bin"), "rb") as file_to_read:
+            self.assertEqual(file_to_read.read(), data)
+        chunks: List[bytes] = list(self.connection.read_file(Path(self.remote_dir, "large.bin").as_posix()))
+        self.assertEqual(len(chunks), 4)
+        with self.db(self.root + "/large.bin").open("rb") as file_to_read:
+            self.assertEqual(file_to_read.read(), data)
+
+    def test_pipelining(self) -> None:
+        for index in range(20):
+            with open(os.path.join(self.remote_dir, f"file{index}.txt"), "w") as file_to_write:
+                file_to_write.write("x" * index)
+        requests: List[PendingRequest] = [self.connection.request("get_size",
+                                                                  Path(self.remote_dir, f"file{index}.txt").as_posix())
+                                          for index in range(20)]
+        self.assertEqual([request.result() for request in requests], list(range(20)))
+        sizes: List[int] = []
+        threads: List[threading.Thread] = [
+            threading.Thread(target=lambda: sizes.append(self.db(self.root + "/file5.txt").get_size()))
+            for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sizes, [5] * 8)
+
+    def test_errors(self) -> None:
+        with self.assertRaises(FileNotFoundError):
+            self.db(self.root + "/missing.txt").get_size()
+        with self.assertRaises(FileNotFoundError):
+            self.db(self.root + "/missing.txt").open("rb").read()
+        with self.assertRaises(FileNotFoundError):
+            with self.db(self.root + "/missing/file.txt").open("wb") as file_to_write:
+                file_to_write.write(b"1234")
+        with self.assertRaises(ValueError):
+            self.connection.call("unknown")
+        self.assertTrue(self.db(self.root).exists())
+
+    def test_malformed_requests(self) -> None:
+        for request_id, payload in [(1000, b"{not json"), (1001, b'{"args": []}'), (1002, b'[]'), (1003, b"\xff")]:
+            pending: PendingRequest = PendingRequest()
+            with self.connection.lock:
+                self.connection.pending[request_id] = pending
+            self.connection.send(request_id, protocol.REQUEST, payload)
+            with self.assertRaises(protocol.RemoteError):
+                pending.result()
+        self.assertTrue(self.db(self.root).exists())
+
+    def test_outside_roots(self) -> None:
+        outside_dir: str = tempfile.mkdtemp(prefix="syncfiles_outside_")
+        self.addCleanup(shutil.rmtree, outside_dir, ignore_errors=True)
+        outside: str = "remote:" + Path(outside_dir).as_posix()
+        os.symlink(outside_dir, os.path.join(self.remote_dir, "link"))
+        for path in [outside, self.root + "/..", self.root + "/link", self.root + "/link/file.txt"]:
+            with self.assertRaises(PermissionError):
+                self.db(path).exists()
+        with self.assertRaises(PermissionError):
+            self.db(self.root).rename(self.db(outside + "/moved"))
+        with self.assertRaises(PermissionError):
+            with self.db(outside + "/file.txt").open("w") as file_to_write:
+                file_to_write.write("1234")
+        with self.assertRaises(PermissionError):
+            self.db.stat_many([self.root, outside])
+        with self.assertRaises(PermissionError):
+            self.db(outside).rmtree()
+        for path in [self.root, self.root + "/dir/..", self.root + "/link/.."]:
+            with self.assertRaises(PermissionError):
+                self.db(path).rmtree()
+        with self.assertRaises(PermissionError):
+            self.db(self.root).unlink()
+        with self.assertRaises(PermissionError):
+            self.db(self.root + "/file.txt").rename(self.db(self.root))
+        with self.assertRaises(PermissionError):
+            self.db.unlink_many([self.root + "/link/file.txt"])
+        self.db(self.root + "/link").unlink()
+        self.assertFalse(os.path.lexists(os.path.join(self.remote_dir, "link")))
+        self.assertEqual(os.listdir(outside_dir), [])
+        self.assertTrue(self.db(self.root).exists())
+
+    def test_closed_connection(self) -> None:
+        self.connection.close()
+        with self.assertRaises(ConnectionError):
+            self.db(self.root).exists()
+
+    def test_socket(self) -> None:
+        server: AgentServer = AgentServer("127.0.0.1", 0, "secret", [self.remote_dir])
+        server_thread: threading.Thread = threading.Thread(target=server.serve_forever)
+        server_thread.start()
+        try:
+            with self.assertRaises(PermissionError):
+                RemoteConnection.connect("127.0.0.1", server.get_port(), "wrong")
+            connection: RemoteConnection = RemoteConnection.connect("127.0.0.1", server.get_port(), "secret")
+            try:
+                db: Type[DBInterface] = RemoteFileSystem(connection).get_interface()
+                self.assertTrue(db(Path(self.remote_dir).as_posix()).is_dir())
+                with self.assertRaises(PermissionError):
+                    db(Path(self.remote_dir).parent.as_posix()).is_dir()
+            finally:
+                connection.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+            server_thread.join()
+
+    def test_listen_requires_token(self) -> None:
+        with unittest.mock.patch.dict(os.environ, {token_variable: ""}), unittest.mock.patch('sys.stderr'):
+            self.assertEqual(main(["--root", self.remote_dir, "--listen", "0"]), 2)
+
+    def test_sync(self) -> None:
+        local_dir: str = tempfile.mkdtemp(prefix="syncfiles_local_")
+        try:
+            os.makedirs(os.path.join(local_dir, "sub"))
+            with open(os.path.join(local_dir, "sub", "file.txt"), "w") as file_to_write:
+                file_to_write.write("1234")
+            fstructs: List[FileStructure] = [FileStructure(local_dir, FSInterface), FileStructure(self.root, self.db)]
+            for fstruct in fstructs:
+                fstruct.check_file_structure({})
+            sync_manager: SyncManager = SyncManager(fstructs, FSInterface)
+            sync_manager.sync()
+            with open(os.path.join(self.remote_dir, "sub", "file.txt")) as file_to_read:
+                self.assertEqual(file_to_read.read(), "1234")
+            last_sync: Dict[str, Any] = sync_manager.get_last_sync()
+            self.assertEqual(list(last_sync['sub']['dir']), ["file.txt"])
+        finally:
+            shutil.rmtree(local_dir, ignore_errors=True)
@@ -0,0 +1,97 @@
+"""Tests scan_scheduler
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List, Type
+import unittest
+from syncfiles.file_structure import FileStructure
+from syncfiles.file_system_interface import DBInterface
+from syncfiles.memory_interface import MemoryFileSystem, VirtualClock
+from syncfiles.scan_scheduler import ScanScheduler
+
+
+def write_file(db: Type[DBInterface], path: str, contents: str = "") -> None:
+    with db(path).open("w") as file_to_write:
+        file_to_write.write(contents)
+
+
+class ScanSchedulerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.file_system: MemoryFileSystem = MemoryFileSystem(VirtualClock(start_ns=1_000_000_000))
+        self.db: Type[DBInterface] = self.file_system.get_interface()
+        self.db.mkdir_many(["/root/hot", "/root/cold/sub"])
+        write_file(self.db, "/root/hot/file.txt")
+        write_file(self.db, "/root/cold/sub/file.txt")
+
+    def run_cycle(self, scheduler: ScanScheduler) -> List[bool]:
+        scheduler.start_cycle()
+        due: List[bool] = [scheduler.is_due(path) for path in ["", "hot", "cold"]]
+        for path, is_due in zip(["", "hot", "cold"], due):
+            if is_due:
+                scheduler.record_scan(path, path == "hot")
+            else:
+                scheduler.record_skip(path)
+        scheduler.finish_cycle()
+        return due
+
+    def test_schedule(self) -> None:
+        scheduler: ScanScheduler = ScanScheduler(full_sweep_every=20, hot_cycles=2, max_interval=4)
+        due_cycles: List[List[bool]] = [self.run_cycle(scheduler) for _ in range(12)]
+        self.assertTrue(all(due[1] for due in due_cycles))
+        # Unchanged directories are hot for 2 cycles, then listed after intervals of 2, 4, 4, ...
+        self.assertEqual([cycle + 1 for cycle, due in enumerate(due_cycles) if due[2]], [1, 2, 3, 4, 6, 10])
+        self.assertEqual(scheduler.get_tier("hot"), "hot")
+        self.assertEqual(scheduler.get_tier("cold"), "cold")
+
+    def test_full_sweep(self) -> None:
+        scheduler: ScanScheduler = ScanScheduler(full_sweep_every=5, hot_cycles=0, max_interval=100)
+        due_cycles: List[List[bool]] = [self.run_cycle(scheduler) for _ in range(11)]
+        # Cycles 1, 6 and 11 are full sweeps, the interval keeps growing through them.
+        self.assertEqual([cycle + 1 for cycle, due in enumerate(due_cycles) if due[2]], [1, 2, 4, 6, 11])
+        with self.assertRaises(ValueError):
+            ScanScheduler(full_sweep_every=0)
+
+    def test_counts(self) -> None:
+        scheduler: ScanScheduler = ScanScheduler(full_sweep_every=10, hot_cycles=1)
+        self.run_cycle(scheduler)
+        self.assertEqual(scheduler.get_counts(), {'hot': 3, 'cold': 0, 'skipped': 0})
+        self.run_cycle(scheduler)
+        self.assertEqual(scheduler.get_counts(), {'hot': 3, 'cold': 0, 'skipped': 0})
+        self.run_cycle(scheduler)
+        self.assertEqual(scheduler.get_counts(), {'hot': 1, 'cold': 2, 'skipped': 0})
+        self.run_cycle(scheduler)
+        self.assertEqual(scheduler.get_counts(), {'hot': 1, 'cold': 0, 'skipped': 2})
+
+    def test_file_structure(self) -> None:
+        scheduler: ScanScheduler = ScanScheduler(full_sweep_every=10, hot_cycles=1, max_interval=8)
+        fstruct: FileStructure = FileStructure("/root", self.db, scan_scheduler=scheduler)
+        full_scan: Dict[str, Any] = fstruct.files_to_json()
+        for _ in range(2):
+            write_file(self.db, "/root/hot/file.txt", "changed")
+            fstruct.update_file_structure()
+        self.assertEqual(scheduler.get_counts(), {'hot': 1, 'cold': 3, 'skipped': 0})
+        write_file(self.db, "/root/hot/file.txt", "changed again")
+        write_file(self.db, "/root/cold/sub/new.txt")
+        self.file_system.operation_counts.clear()
+        fstruct.update_file_structure()
+        self.assertEqual(scheduler.get_counts(), {'hot': 1, 'cold': 0, 'skipped': 3})
+        self.assertEqual(self.file_system.operation_counts, {'list_dir': 1})
+        self.assertEqual(fstruct.get_entry_count(), 5)
+        # Changes in cold directories are found when they are next listed.
+        self.assertEqual(set(fstruct.files_to_json()['cold']['dir']['sub']['dir']), {"file.txt"})
+        self.assertNotEqual(fstruct.files_to_json()['hot'], full_scan['hot'])
+        fstruct.update_file_structure(full_scan=True)
+        self.assertEqual(set(fstruct.files_to_json()['cold']['dir']['sub']['dir']), {"file.txt", "new.txt"})
+
+    def test_deleted_cold_directory(self) -> None:
+        scheduler: ScanScheduler = ScanScheduler(full_sweep_every=10, hot_cycles=0, max_interval=8)
+        fstruct: FileStructure = FileStructure("/root", self.db, scan_scheduler=scheduler)
+        write_file(self.db, "/root/cold/sub/new.txt")
+        fstruct.update_file_structure()
+        # cold/sub changed, so it is listed in the next cycle, but the other directories are not.
+        self.db("/root/cold/sub").rmtree()
+        fstruct.update_file_structure()
+        self.assertEqual(scheduler.get_counts()['skipped'], 3)
+        self.assertEqual(fstruct.files_to_json()['cold'], {'dir': {}})
+        self.assertEqual(scheduler.get_tier("cold"), "hot")
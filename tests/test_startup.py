@@ -0,0 +1,74 @@
+"""Startup benchmark, measures entry point import time with python -X importtime.
+
+Author: Kevin Hodge
+"""
+
+from typing import Dict, List
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+import syncfiles
+
+
+def measure_import_time(module: str) -> Dict[str, int]:
+    """Imports module in a new interpreter and returns the cumulative import time (us) of every module imported.
+
+    Args:
+        module (str): Name of the module to import.
+
+    Returns:
+        import_times (dict[str, int]): Cumulative import time in microseconds, keyed by module name.
+    """
+    env: Dict[str, str] = dict(os.environ)
+    src_path: str = str(Path(syncfiles.__file__).parent.parent)
+    env["PYTHONPATH"] = os.pathsep.join([src_path, env.get("PYTHONPATH", "")])
+    result: "subprocess.CompletedProcess[str]" = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], env=env, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+    import_times: Dict[str, int] = dict()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        fields: List[str] = line[len("import time:"):].split("|")
+        import_times[fields[2].strip()] = int(fields[1])
+    return import_times
+
+
+def best_import_time(module: str, repeat: int = 3) -> int:
+    """Gets the best cumulative import time (us) of module over repeat new interpreters."""
+    return min(measure_import_time(module)[module] for _ in range(repeat))
+
+
+class StartupTestCase(unittest.TestCase):
+    entry_points: List[str] = ["syncfiles.main", "syncfiles.daemon", "syncfiles.cli"]
+    lazy_modules: List[str] = ["wx", "numpy", "syncfiles.wx_gui", "syncfiles.pipeline", "asyncio", "http.server"]
+    baseline_modules: List[str] = ["argparse", "json", "pathlib", "subprocess", "threading", "typing"]
+    max_import_time_ratio: float = 2.5
+    max_import_time_ms: float = 250.0
+
+    def test_optional_modules_not_imported(self) -> None:
+        for entry_point in self.entry_points:
+            import_times: Dict[str, int] = measure_import_time(entry_point)
+            self.assertIn(entry_point, import_times)
+            for lazy_module in self.lazy_modules:
+                self.assertNotIn(lazy_module, import_times, f"{entry_point} imports {lazy_module}")
+
+    def test_import_time(self) -> None:
+        """Compares the import time of each entry point to that of the standard library modules every entry point
+        needs, measured in the same run so the limit does not depend on the speed of the machine."""
+        baseline_us: int = sum(best_import_time(module) for module in self.baseline_modules)
+        for entry_point in self.entry_points:
+            import_time_us: int = best_import_time(entry_point)
+            self.assertLess(import_time_us, self.max_import_time_ratio * baseline_us,
+                            f"{entry_point} took {import_time_us / 1000:.1f} ms to import, the baseline modules took "
+                            f"{baseline_us / 1000:.1f} ms")
+
+    @unittest.skipIf(os.environ.get("SYNCFILES_SLOW_CI"), "absolute import time limit skipped on slow CI machines")
+    def test_import_time_ceiling(self) -> None:
+        """Limits the import time of each entry point in absolute terms, so it cannot grow along with the baseline."""
+        for entry_point in self.entry_points:
+            import_time_ms: float = best_import_time(entry_point) / 1000
+            self.assertLess(import_time_ms, self.max_import_time_ms,
+                            f"{entry_point} took {import_time_ms:.1f} ms to import (set SYNCFILES_SLOW_CI to skip)")
@@ -0,0 +1,51 @@
+"""Tests state_observers
+
+Author: Kevin Hodge
+"""
+
+from typing import Dict, List, Optional
+import unittest
+from syncfiles.state_observers import HistogramObserver, MovingAverageObserver, StateHistogram
+from syncfiles.sync_state_machine import End, StateEvent
+
+
+def make_event(duration: float, counters: Optional[Dict[str, int]] = None) -> StateEvent:
+    event: StateEvent = StateEvent(End(), 100.0)
+    event.exit_time = 100.0 + duration
+    if counters is not None:
+        event.counters = counters
+    return event
+
+
+class StateObserversTestCase(unittest.TestCase):
+    def test_histogram(self) -> None:
+        histogram: StateHistogram = StateHistogram([0.1, 1.0, 10.0])
+        for duration in [0.05, 0.5, 0.5, 5.0, 50.0]:
+            histogram.add(duration)
+        self.assertEqual(histogram.bucket_counts, [1, 2, 1, 1])
+        self.assertEqual(histogram.count, 5)
+        self.assertAlmostEqual(histogram.get_mean(), 56.05 / 5)
+        self.assertEqual(histogram.get_percentile(50), 1.0)
+        self.assertEqual(histogram.get_percentile(80), 10.0)
+        self.assertEqual(histogram.get_percentile(100), float("inf"))
+        self.assertEqual(StateHistogram([1.0]).get_percentile(50), 0.0)
+
+    def test_histogram_observer(self) -> None:
+        observer: HistogramObserver = HistogramObserver([0.1, 1.0])
+        observer.on_exit(make_event(0.5))
+        observer.on_exit(make_event(2.0))
+        histogram: Optional[StateHistogram] = observer.get_histogram("End")
+        assert histogram is not None
+        self.assertEqual(histogram.bucket_counts, [0, 1, 1])
+        self.assertIsNone(observer.get_histogram("Check"))
+        self.assertEqual(len(HistogramObserver().bounds), 17)
+
+    def test_moving_average_observer(self) -> None:
+        observer: MovingAverageObserver = MovingAverageObserver(window=2)
+        durations: List[float] = [1.0, 2.0, 4.0]
+        for index, duration in enumerate(durations):
+            observer.on_exit(make_event(duration, {"entries_scanned": index * 10}))
+        self.assertAlmostEqual(observer.get_average_duration("End"), 3.0)
+        self.assertAlmostEqual(observer.get_average_counter("End", "entries_scanned"), 15.0)
+        self.assertEqual(observer.get_average_duration("Check"), 0.0)
+        self.assertEqual(observer.get_average_counter("End", "bytes_copied"), 0.0)
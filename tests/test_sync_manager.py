@@ -3,13 +3,17 @@
 Author: Kevin Hodge
 """
 
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Type
 import unittest
+import shutil
 import time
 from pathlib import Path
-from syncfiles.file_system_interface import FSInterface
+from syncfiles.file_system_interface import DBInterface, FSInterface
+from syncfiles.memory_interface import MemoryFileSystem, VirtualClock
 from syncfiles.file_structure import FileStructure
 from syncfiles.sync_manager import SyncManager
+from syncfiles.sync_stats import SyncStats
+from syncfiles.tombstone import Tombstone, current_time_ns
 import tests.tfuncs as tfuncs
 
 
@@ -427,6 +431,171 @@ class SyncManagerTestCase(unittest.TestCase):
         self.assertCountEqual(files_in1, [new_folder_np, new_file_np])
         self.assertCountEqual(files_in2, [new_folder_np, new_file_np])
 
+    @tfuncs.handle_test_dirs
+    def test_stats(self) -> None:
+        fstruct_list: List[FileStructure] = self.initialize_test_directories()
+        last_sync_dict: Dict[str, Any] = fstruct_list[0].files_to_json()
+        with open(str(self.tf.test_path1 / "test_file.txt"), 'w') as file_to_write:
+            file_to_write.write('12345')
+        tfuncs.create_directory(str(self.tf.test_path2 / "test_folder"))
+        self.check_fstructs_for_updates(fstruct_list, last_sync_dict)
+
+        stats: SyncStats = SyncStats()
+        synchronizer: SyncManager = SyncManager(fstruct_list, FSInterface, stats=stats)
+        synchronizer.sync()
+        self.assertEqual(stats.operations, {"copy": 1, "make_dir": 1})
+        self.assertEqual(stats.bytes_copied, 5)
+
+    def test_stats_propagation(self) -> None:
+        db: Type[DBInterface] = MemoryFileSystem(VirtualClock(current_time_ns() - 5_000_000_000)).get_interface()
+        db.mkdir_many(["/root1", "/root2"])
+        with db("/root1/new.txt").open("w") as file_to_write:
+            file_to_write.write("new")
+        fstruct_list: List[FileStructure] = [FileStructure("/root1", db), FileStructure("/root2", db)]
+        for fstruct in fstruct_list:
+            fstruct.check_file_structure({})
+        stats: SyncStats = SyncStats()
+        SyncManager(fstruct_list, db, stats=stats).sync()
+        self.assertEqual(stats.operations, {"copy": 1})
+        propagation_latency: Optional[float] = stats.propagation_latency
+        assert propagation_latency is not None
+        self.assertGreaterEqual(propagation_latency, 5.0)
+        self.assertLess(propagation_latency, 60.0)
+
+    @tfuncs.handle_test_dirs
+    def test_tombstone_deleted2_updated1(self) -> None:
+        common_file_name: str = "test_file.txt"
+        file_in1: str = str(self.tf.test_path1 / common_file_name)
+        tfuncs.create_file(file_in1)
+        file_in2: str = str(self.tf.test_path2 / common_file_name)
+        tfuncs.create_file(file_in2)
+
+        fstruct_list: List[FileStructure] = self.initialize_test_directories()
+        last_sync_dict: Dict[str, Any] = fstruct_list[1].files_to_json()
+
+        time.sleep(self.delay_sec)
+        Path(file_in2).unlink()
+        with open(file_in1, 'w') as file_to_update:
+            file_to_update.write('This file is updated.')
+        self.check_fstructs_for_updates(fstruct_list, last_sync_dict)
+        self.assertEqual(len(fstruct_list[1].get_tombstones()), 1)
+
+        synchronizer: SyncManager = SyncManager(fstruct_list, FSInterface)
+        synchronizer.sync()
+
+        with open(file_in2) as restored_file:
+            self.assertEqual(restored_file.read(), 'This file is updated.')
+        self.assertEqual(synchronizer.get_tombstones(), [])
+
+    @tfuncs.handle_test_dirs
+    def test_tombstone_folder_deleted1(self) -> None:
+        common_folder_name: str = "test_folder"
+        for test_path in [self.tf.test_path1, self.tf.test_path2]:
+            tfuncs.create_directory(str(test_path / common_folder_name))
+            tfuncs.create_file(str(test_path / common_folder_name / "test_file.txt"))
+
+        fstruct_list: List[FileStructure] = self.initialize_test_directories()
+        last_sync_dict: Dict[str, Any] = fstruct_list[1].files_to_json()
+
+        shutil.rmtree(str(self.tf.test_path1 / common_folder_name))
+        self.check_fstructs_for_updates(fstruct_list, last_sync_dict)
+        tombstones: List[Tombstone] = fstruct_list[0].get_tombstones()
+        self.assertEqual([tombstone.get_path() for tombstone in tombstones], [[common_folder_name]])
+        self.assertTrue(tombstones[0].is_dir())
+
+        synchronizer: SyncManager = SyncManager(fstruct_list, FSInterface)
+        synchronizer.sync()
+
+        self.check_fstructs_for_updates(fstruct_list, last_sync_dict)
+        files_in1, files_in2 = self.get_file_lists_without_prefixes(fstruct_list)
+        self.assertCountEqual(files_in1, [])
+        self.assertCountEqual(files_in2, [])
+        self.assertEqual(synchronizer.get_tombstones(), [])
+
+    @tfuncs.handle_test_dirs
+    def test_persisted_tombstone(self) -> None:
+        file_in2: str = str(self.tf.test_path2 / "test_file.txt")
+        tfuncs.create_file(file_in2)
+        fstruct_list: List[FileStructure] = self.initialize_test_directories()
+        last_sync_dict: Dict[str, Any] = fstruct_list[1].files_to_json()
+        for fstruct in fstruct_list:
+            fstruct.check_file_structure(last_sync_dict)
+            fstruct.tombstones = []
+
+        tombstone: Tombstone = Tombstone(["test_file.txt"], str(self.tf.test_path1))
+        synchronizer: SyncManager = SyncManager(fstruct_list, FSInterface, [tombstone])
+        synchronizer.sync()
+
+        self.assertFalse(Path(file_in2).exists())
+        # Applied to every other sync directory, so it is not kept.
+        self.assertEqual(synchronizer.get_tombstones(), [])
+
+    def test_join_paths(self) -> None:
+        db: Type[DBInterface] = MemoryFileSystem(cwd="/config").get_interface()
+        synchronizer: SyncManager = SyncManager([], db)
+        synchronizer.add_directory("root1", db)
+        synchronizer.add_directory(str(self.tf.test_path2), FSInterface)
+        self.assertEqual(synchronizer.join_paths("root1", "a/b/c.txt"), "/config/root1/a/b/c.txt")
+        # "\\" is not a separator of relative paths, it can be part of a name on POSIX.
+        self.assertEqual(synchronizer.join_paths("root1", "a\\b/c.txt"), "/config/root1/a\\b/c.txt")
+        self.assertEqual(synchronizer.join_paths(str(self.tf.test_path2), "a/b/c.txt"),
+                         str(self.tf.test_path2 / "a" / "b" / "c.txt"))
+        self.assertEqual(db.join_path("root1", "a", "b"), str(db("root1") / "a" / "b"))
+
+    def test_known_dirs(self) -> None:
+        file_system: MemoryFileSystem = MemoryFileSystem()
+        db: Type[DBInterface] = file_system.get_interface()
+        db.mkdir_many(["/root1/a/sub", "/root2/empty"])
+        for index in range(10):
+            for parent in ["/root1/a", "/root1/a/sub"]:
+                with db(f"{parent}/file{index}.txt").open("w") as file_to_write:
+                    file_to_write.write(str(index))
+        fstruct_list: List[FileStructure] = [FileStructure("/root1", db), FileStructure("/root2", db)]
+        for fstruct in fstruct_list:
+            fstruct.check_file_structure({})
+        synchronizer: SyncManager = SyncManager(fstruct_list, db)
+        file_system.operation_counts.clear()
+        synchronizer.sync()
+        # Each new directory is made once (a and a/sub in root2, empty in root1), its files are then copied into it.
+        self.assertEqual(file_system.operation_counts["mkdir"], 3)
+        self.assertEqual(synchronizer.stats.operations, {"copy": 20, "make_dir": 3})
+        self.assertTrue(db("/root1/empty").is_dir())
+        self.assertEqual(synchronizer.known_dirs["/root2"], {"", "a", "a/sub"})
+
+        synchronizer.delete_folder_from("a", "/root2")
+        self.assertEqual(synchronizer.known_dirs["/root2"], {""})
+        synchronizer.copy_file_from_to("a/sub/file0.txt", "/root1", "/root2")
+        self.assertTrue(db("/root2/a/sub/file0.txt").exists())
+
+    def test_index_updates(self) -> None:
+        db: Type[DBInterface] = MemoryFileSystem().get_interface()
+        db.mkdir_many(["/root1/a/b", "/root1/c", "/root2/a/b"])
+        with db("/root1/a/b/new.txt").open("w") as file_to_write:
+            file_to_write.write("new")
+        fstruct_list: List[FileStructure] = [FileStructure("/root1", db), FileStructure("/root2", db)]
+        last_sync_dict: Dict[str, Any] = {"a": {"dir": {"b": {"dir": {}}}}, "c": {"dir": {}}}
+        for fstruct in fstruct_list:
+            fstruct.check_file_structure(last_sync_dict)
+        synchronizer: SyncManager = SyncManager(fstruct_list, db)
+        synchronizer.index_updates()
+        self.assertEqual(synchronizer.updated_paths, {"a", "a/b", "a/b/new.txt"})
+        self.assertTrue(synchronizer.updated_within("a"))
+        self.assertFalse(synchronizer.updated_within("c"))
+        self.assertFalse(synchronizer.updated_within("a/b/old.txt"))
+
+    def test_deep_tree(self) -> None:
+        depth: int = 1200
+        db: Type[DBInterface] = MemoryFileSystem().get_interface()
+        for root in ["/root1", "/root2"]:
+            tfuncs.create_deep_tree(db, root, depth)
+        fstruct_list: List[FileStructure] = [FileStructure("/root1", db), FileStructure("/root2", db)]
+        synchronizer: SyncManager = SyncManager(fstruct_list, db)
+
+        last_sync_dict: Dict[str, Any] = synchronizer.get_last_sync()
+        self.assertEqual(repr(fstruct_list[0].from_json(last_sync_dict)), repr(fstruct_list[1].files))
+        for fstruct in fstruct_list:
+            self.assertEqual(fstruct.check_file_structure(last_sync_dict), 0)
+
 
 if __name__ == "__main__":
     unittest.main()
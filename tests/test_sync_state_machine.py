@@ -3,8 +3,9 @@
 Author: Kevin Hodge
 """
 
+from typing import Dict, List, Tuple
 import unittest
-from syncfiles.sync_state_machine import SyncStateMachine, SyncState, End
+from syncfiles.sync_state_machine import SyncStateMachine, SyncState, End, StateEvent, StateObserver
 
 
 class State1(SyncState):
@@ -23,6 +24,36 @@ class State2(SyncState):
         return End()
 
 
+class CountingState(SyncState):
+    def __init__(self, remaining: int) -> None:
+        self.remaining: int = remaining
+
+    def run(self) -> None:
+        pass
+
+    def get_next(self) -> SyncState:
+        if self.remaining > 1:
+            return CountingState(self.remaining - 1)
+        return End()
+
+    def get_counters(self) -> Dict[str, int]:
+        return {"remaining": self.remaining}
+
+
+class RecordingObserver(StateObserver):
+    def __init__(self) -> None:
+        self.events: List[Tuple[str, str]] = []
+        self.counters: List[Dict[str, int]] = []
+
+    def on_enter(self, event: StateEvent) -> None:
+        self.events.append(("enter", event.name))
+
+    def on_exit(self, event: StateEvent) -> None:
+        self.events.append(("exit", event.name))
+        self.counters.append(event.counters)
+        assert event.get_duration() >= 0.0
+
+
 class SyncStateMachineTestCase(unittest.TestCase):
     def test_no_set_initial(self) -> None:
         state_machine: SyncStateMachine = SyncStateMachine()
@@ -40,3 +71,22 @@ class SyncStateMachineTestCase(unittest.TestCase):
             state_machine.run()
         except ValueError as err:
             assert str(err) == "Pass"
+
+    def test_observer(self) -> None:
+        observer: RecordingObserver = RecordingObserver()
+        state_machine: SyncStateMachine = SyncStateMachine()
+        state_machine.add_observer(observer)
+        state_machine.set_initial_state(CountingState(2))
+        state_machine.run()
+        self.assertEqual(observer.events, [("enter", "CountingState"), ("exit", "CountingState"),
+                                           ("enter", "CountingState"), ("exit", "CountingState")])
+        self.assertEqual(observer.counters, [{"remaining": 2}, {"remaining": 1}])
+
+    def test_remove_observer(self) -> None:
+        observer: RecordingObserver = RecordingObserver()
+        state_machine: SyncStateMachine = SyncStateMachine()
+        state_machine.add_observer(observer)
+        state_machine.remove_observer(observer)
+        state_machine.set_initial_state(CountingState(2))
+        state_machine.run()
+        self.assertEqual(observer.events, [])
@@ -3,16 +3,21 @@
 Author: Kevin Hodge
 """
 
+import json
 import unittest
 import unittest.mock
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Type
 from pathlib import Path
-from syncfiles.config_manager import ConfigManager
-from syncfiles.sync_state_machine import SyncState, End
-from syncfiles.file_system_interface import FSInterface
+from syncfiles.adaptive_interval import AdaptiveInterval
+from syncfiles.config_manager import ConfigManager, get_snapshot_depth
+from syncfiles.sync_state_machine import SyncState, SyncStateMachine, End
+from syncfiles.state_observers import MovingAverageObserver
+from syncfiles.file_system_interface import DBInterface, FSInterface
 from syncfiles.file_structure import FileStructure
+from syncfiles.memory_interface import MemoryFileSystem
 from syncfiles.sync_exception import SyncException
 from syncfiles.sync_states import DataState, Initial, Wait, Check, Sync, Error, Final, StateData
+from syncfiles.sync_stats import SyncStats
 from tests.mock_ui import MockUI
 from tests import tfuncs
 
@@ -175,9 +180,10 @@ class SyncStateTestCase(unittest.TestCase):
         test_file_name: str = "test_file1.txt"
         test_file: str = str(Path(test_dir1) / test_file_name)
         tfuncs.create_file(test_file)
+        tfuncs.create_file(str(Path(test_dir2) / test_file_name))
         fstruct1: FileStructure = FileStructure(str(self.tf.test_path1), FSInterface, verbose=True)
         fstruct2: FileStructure = FileStructure(str(self.tf.test_path2), FSInterface, verbose=True)
-        last_sync_files: Dict[str, Any] = fstruct1.files_to_json()
+        last_sync_files: Dict[str, Any] = fstruct2.files_to_json()
         config.write_last_sync_file(last_sync_files)
 
         state_data: StateData = StateData(config, MockUI(), FSInterface, verbose=True)
@@ -192,10 +198,33 @@ class SyncStateTestCase(unittest.TestCase):
             "Directory 1:",
             test_dir1 + "\n   " + str(fstruct1.files),
             "Directory 2:",
-            test_dir2 + "\n" + str(fstruct2.files)
+            test_dir2 + "\n   " + str(fstruct2.files)
         ]
         self.assertCountEqual(self.get_and_clear_test_string(), validation_strings)
 
+    def test_check_run_fstruct_deleted(self) -> None:
+        db: Type[DBInterface] = MemoryFileSystem(cwd="/config").get_interface()
+        db.mkdir_many(["/config", "/root1", "/root2"])
+        for root in ["/root1", "/root2"]:
+            with db(f"{root}/test_file1.txt").open("w") as file_to_write:
+                file_to_write.write("1234")
+        config: ConfigManager = ConfigManager(db)
+        fstruct1: FileStructure = FileStructure("/root1", db)
+        fstruct2: FileStructure = FileStructure("/root2", db)
+        config.write_last_sync_file(fstruct1.files_to_json())
+        db("/root2/test_file1.txt").unlink()
+
+        state_data: StateData = StateData(config, MockUI(), db)
+        check: Check = Check(state_data)
+        check.add_fstruct(fstruct1)
+        check.add_fstruct(fstruct2)
+        check.run()
+        self.assertTrue(check.get_sync_required())
+        self.assertEqual(check.get_stats().entries_scanned, 1)
+        self.assertEqual(check.get_stats().changes_found, 1)
+        self.assertEqual(len(fstruct1.get_tombstones()), 0)
+        self.assertEqual([tombstone.get_path() for tombstone in fstruct2.get_tombstones()], [["test_file1.txt"]])
+
     def test_check_get_next_error_raised(self) -> None:
         state_data: StateData = StateData(ConfigManager(FSInterface), MockUI(), FSInterface)
         check: Check = Check(state_data)
@@ -237,6 +266,34 @@ class SyncStateTestCase(unittest.TestCase):
             wait.run()
         self.assertFalse(wait.get_exit_request())
         self.assertEqual(["Waiting..."], self.get_and_clear_test_string())
+        self.assertEqual(mock_ui.get_reported_stats(), [state_data.stats])
+        self.assertIsNotNone(state_data.stats.end_time)
+
+    def test_wait_adaptive_interval(self) -> None:
+        mock_ui: MockUI = MockUI()
+        mock_ui.set_exit_request(False)
+        state_data: StateData = StateData(ConfigManager(FSInterface), mock_ui, FSInterface)
+        state_data.adaptive_interval = AdaptiveInterval(1e-6, 1e-3, initial_interval=1e-4)
+        wait: Wait = Wait(state_data)
+        wait.run()
+        self.assertEqual(state_data.stats.wait_interval, 2e-4)
+        self.assertEqual(state_data.stats.to_dict()["wait_interval_reason"], "idle")
+        state_data.stats = SyncStats()
+        state_data.stats.add_changes_found(1)
+        wait = Wait(state_data)
+        wait.run()
+        self.assertEqual(wait.sleep_time, 1e-4)
+        self.assertEqual(state_data.stats.wait_interval_reason, "changes")
+
+    def test_wait_fixed_interval(self) -> None:
+        mock_ui: MockUI = MockUI()
+        mock_ui.set_exit_request(False)
+        state_data: StateData = StateData(ConfigManager(FSInterface), mock_ui, FSInterface)
+        wait: Wait = Wait(state_data)
+        wait.set_sleep_time(10e-6)
+        wait.run()
+        self.assertEqual(state_data.stats.wait_interval, 10e-6)
+        self.assertEqual(state_data.stats.wait_interval_reason, "fixed")
 
     def test_wait_get_next_error_raised(self) -> None:
         state_data: StateData = StateData(ConfigManager(FSInterface), MockUI(), FSInterface)
@@ -349,3 +406,60 @@ class SyncStateTestCase(unittest.TestCase):
         state_data: StateData = StateData(ConfigManager(FSInterface), MockUI(), FSInterface)
         final: Final = Final(state_data)
         self.assertTrue(isinstance(final.get_next(), End))
+
+    @tfuncs.handle_dir_tempfile
+    @tfuncs.handle_test_dirs
+    @tfuncs.handle_last_tempfile
+    def test_state_counters_observed(self) -> None:
+        tfuncs.write_json([str(self.tf.test_path1), str(self.tf.test_path2)], str(self.tf.sync_dir_file))
+        tfuncs.create_file(str(self.tf.test_path1 / "test_file.txt"))
+        state_data: StateData = StateData(ConfigManager(FSInterface), MockUI(), FSInterface)
+        state_data.once = True
+        observer: MovingAverageObserver = MovingAverageObserver()
+        state_machine: SyncStateMachine = SyncStateMachine()
+        state_machine.add_observer(observer)
+        state_machine.set_initial_state(Initial(state_data))
+        state_machine.run()
+
+        self.assertCountEqual(observer.durations.keys(), ["Initial", "Check", "Sync", "Final"])
+        self.assertEqual(observer.get_average_counter("Check", "entries_scanned"), 1)
+        self.assertEqual(observer.get_average_counter("Check", "changes_found"), 1)
+        self.assertEqual(observer.get_average_counter("Sync", "operations"), 1)
+
+    def run_deep_cycles(self, full_sweep_every: int) -> None:
+        depth: int = 1200
+        db: Type[DBInterface] = MemoryFileSystem(cwd="/config").get_interface()
+        db.mkdir_many(["/config", "/root2"])
+        deep_file: str = tfuncs.create_deep_tree(db, "/root1", depth)
+        config: ConfigManager = ConfigManager(db)
+        config.set_full_sweep_every(full_sweep_every)
+        config.write_sync_directories(["/root1", "/root2"])
+        mock_ui: MockUI = MockUI()
+        mock_ui.set_exit_request(False)
+        state_data: StateData = StateData(config, mock_ui, db)
+        state_data.sleep_time = 0.0
+
+        state: SyncState = Initial(state_data)
+        states: List[str] = []
+        for _ in range(6):
+            state.run()
+            states.append(state.get_name())
+            next_state: object = state.get_next()
+            assert isinstance(next_state, SyncState)
+            state = next_state
+        self.assertEqual(states, ["Initial", "Check", "Sync", "Wait", "Check", "Wait"])
+        self.assertFalse(state_data.error_raised)
+        self.assertTrue(db(deep_file.replace("/root1", "/root2", 1)).exists())
+        with config.last_sync_file.open("r") as json_file:
+            self.assertEqual(json.load(json_file)["/format"], "flat")
+        self.assertEqual(get_snapshot_depth(config.read_last_sync_file()), depth)
+
+    def test_deep_tree_cycle(self) -> None:
+        self.run_deep_cycles(0)
+
+    def test_deep_tree_cycle_tiered(self) -> None:
+        self.run_deep_cycles(5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Tests sync_stats
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, Optional
+import unittest
+import time
+from syncfiles.sync_stats import SyncStats
+from syncfiles.tombstone import current_time_ns
+
+
+class SyncStatsTestCase(unittest.TestCase):
+    def test_counters(self) -> None:
+        stats: SyncStats = SyncStats()
+        stats.add_entries_scanned(10)
+        stats.add_changes_found(2)
+        stats.add_bytes_copied(100)
+        self.assertIsNone(stats.first_copy_latency)
+        stats.add_operation("copy")
+        first_copy_latency: Optional[float] = stats.first_copy_latency
+        self.assertIsNotNone(first_copy_latency)
+        stats.add_operation("copy")
+        stats.add_operation("delete_file")
+        self.assertEqual(stats.entries_scanned, 10)
+        self.assertEqual(stats.changes_found, 2)
+        self.assertEqual(stats.bytes_copied, 100)
+        self.assertEqual(stats.operations, {"copy": 2, "delete_file": 1})
+        self.assertEqual(stats.get_operation_count(), 3)
+        self.assertEqual(stats.first_copy_latency, first_copy_latency)
+
+    def test_propagation(self) -> None:
+        stats: SyncStats = SyncStats()
+        self.assertIsNone(stats.propagation_latency)
+        stats.add_propagation(current_time_ns() - 2_000_000_000)
+        stats.add_propagation(current_time_ns() - 1_000_000_000)
+        propagation_latency: Optional[float] = stats.propagation_latency
+        assert propagation_latency is not None
+        self.assertGreaterEqual(propagation_latency, 2.0)
+        self.assertLess(propagation_latency, 60.0)
+        stats.add_propagation(current_time_ns() + 1_000_000_000)
+        self.assertEqual(stats.propagation_latency, propagation_latency)
+
+    def test_phase_times(self) -> None:
+        stats: SyncStats = SyncStats()
+        stats.add_phase_time("Check", 0.5)
+        stats.add_phase_time("Sync", 0.25)
+        stats.add_phase_time("Check", 0.5)
+        self.assertEqual(stats.phase_times, {"Check": 1.0, "Sync": 0.25})
+
+    def test_root_scan(self) -> None:
+        stats: SyncStats = SyncStats()
+        stats.add_root_scan("dir1", 3, 0.5)
+        stats.add_root_scan("dir2", 4, 0.25)
+        self.assertEqual(stats.root_entries, {"dir1": 3, "dir2": 4})
+        self.assertEqual(stats.scan_times, {"dir1": 0.5, "dir2": 0.25})
+        self.assertEqual(stats.entries_scanned, 7)
+
+    def test_scan_tiers(self) -> None:
+        stats: SyncStats = SyncStats()
+        stats.add_scan_tiers({"hot": 2, "cold": 1, "skipped": 5})
+        stats.add_scan_tiers({"hot": 1, "cold": 0, "skipped": 3})
+        self.assertEqual(stats.scan_tiers, {"hot": 3, "cold": 1, "skipped": 8})
+
+    def test_finish(self) -> None:
+        stats: SyncStats = SyncStats()
+        stats.add_bytes_copied(1000)
+        time.sleep(10e-3)
+        stats.finish()
+        latency: float = stats.get_latency()
+        self.assertGreater(latency, 0.0)
+        stats.finish()
+        self.assertEqual(stats.get_latency(), latency)
+        self.assertAlmostEqual(stats.get_throughput(), 1000 / latency)
+
+    def test_to_dict(self) -> None:
+        stats: SyncStats = SyncStats()
+        stats.add_operation("make_dir")
+        stats.finish()
+        stats_dict: Dict[str, Any] = stats.to_dict()
+        self.assertEqual(stats_dict["operations"], {"make_dir": 1})
+        self.assertCountEqual(stats_dict.keys(), ["entries_scanned", "changes_found", "bytes_copied", "operations",
+                                                  "phase_times", "root_entries", "scan_times", "scan_tiers",
+                                                  "wait_interval", "wait_interval_reason", "first_copy_latency",
+                                                  "propagation_latency", "latency", "throughput"])
@@ -0,0 +1,131 @@
+"""Tests tracer
+
+Author: Kevin Hodge
+"""
+
+from typing import Any, Dict, List
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from syncfiles.cli import main, EXIT_OK
+from syncfiles.sync_state_machine import End, StateEvent
+from syncfiles.tracer import NullTracer, TraceObserver, Tracer, get_tracer, null_span, set_tracer
+import tests.tfuncs as tfuncs
+
+
+class TracerTestCase(unittest.TestCase):
+    def __init__(self, *args, **kwargs) -> None:
+        self.tf: tfuncs.TFunctions = tfuncs.TFunctions()
+        super().__init__(*args, **kwargs)
+
+    def test_span(self) -> None:
+        tracer: Tracer = Tracer()
+        with tracer.span("scan", "scan", root="dir1") as span:
+            span.set_arg("entries", 3)
+        self.assertEqual(len(tracer.events), 1)
+        event: Dict[str, Any] = tracer.events[0]
+        self.assertEqual(event['name'], "scan")
+        self.assertEqual(event['cat'], "scan")
+        self.assertEqual(event['ph'], "X")
+        self.assertEqual(event['args'], {'root': "dir1", 'entries': 3})
+        self.assertGreaterEqual(event['ts'], 0.0)
+        self.assertGreaterEqual(event['dur'], 0.0)
+
+    def test_sampled_span(self) -> None:
+        tracer: Tracer = Tracer(sample_every=3)
+        for _ in range(9):
+            with tracer.sampled_span("copy"):
+                pass
+        self.assertEqual(len(tracer.events), 3)
+
+    def test_null_tracer(self) -> None:
+        tracer: NullTracer = NullTracer()
+        self.assertIs(tracer.span("scan"), null_span)
+        self.assertIs(tracer.sampled_span("copy"), null_span)
+        with tracer.span("scan"):
+            pass
+        self.assertEqual(tracer.events, [])
+        self.assertIsInstance(get_tracer(), NullTracer)
+
+    def test_set_tracer(self) -> None:
+        tracer: Tracer = Tracer()
+        set_tracer(tracer)
+        try:
+            self.assertIs(get_tracer(), tracer)
+        finally:
+            set_tracer(None)
+        self.assertIsInstance(get_tracer(), NullTracer)
+
+    def test_write(self) -> None:
+        tracer: Tracer = Tracer()
+        with tracer.span("plan"):
+            pass
+        trace_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, trace_dir, ignore_errors=True)
+        trace_path: str = os.path.join(trace_dir, "trace.json")
+        tracer.write(trace_path)
+        with open(trace_path) as trace_file:
+            trace: Dict[str, Any] = json.load(trace_file)
+        self.assertEqual([event['name'] for event in trace['traceEvents']], ["plan"])
+
+    def test_streamed_output(self) -> None:
+        trace_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, trace_dir, ignore_errors=True)
+        trace_path: str = os.path.join(trace_dir, "trace.json")
+        tracer: Tracer = Tracer(trace_path, buffer_size=2)
+        for name in ["a", "b", "c"]:
+            with tracer.span(name):
+                pass
+        self.assertEqual([event['name'] for event in tracer.events], ["c"])
+        tracer.close()
+        with open(trace_path) as trace_file:
+            events: List[Dict[str, Any]] = json.load(trace_file)
+        self.assertEqual([event.get('name') for event in events], ["a", "b", "c", None])
+
+    def test_trace_observer(self) -> None:
+        tracer: Tracer = Tracer()
+        observer: TraceObserver = TraceObserver(tracer)
+        event: StateEvent = StateEvent(End(), 0.0)
+        event.counters = {'entries_scanned': 2}
+        observer.on_enter(event)
+        observer.on_exit(event)
+        self.assertEqual(tracer.events[0]['name'], "End")
+        self.assertEqual(tracer.events[0]['cat'], "state")
+        self.assertEqual(tracer.events[0]['args'], {'entries_scanned': 2})
+
+    def test_trace_observer_interleaved(self) -> None:
+        tracer: Tracer = Tracer()
+        observer: TraceObserver = TraceObserver(tracer)
+        first_event: StateEvent = StateEvent(End(), 0.0)
+        second_event: StateEvent = StateEvent(End(), 0.0)
+        with unittest.mock.patch('time.perf_counter', side_effect=[1.0, 2.0, 3.0, 5.0]):
+            observer.on_enter(first_event)
+            observer.on_enter(second_event)
+            observer.on_exit(first_event)
+            observer.on_exit(second_event)
+        self.assertEqual([event['dur'] for event in tracer.events], [2.0e6, 3.0e6])
+        self.assertEqual(observer.start_times, dict())
+
+    @tfuncs.handle_dir_tempfile
+    @tfuncs.handle_test_dirs
+    @tfuncs.handle_last_tempfile
+    def test_main_trace(self) -> None:
+        with open(str(self.tf.test_path1 / "test_file.txt"), "w") as file_to_write:
+            file_to_write.write("1234")
+        trace_dir: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, trace_dir, ignore_errors=True)
+        trace_path: str = os.path.join(trace_dir, "trace.json")
+        directories: List[str] = [str(self.tf.test_path1), str(self.tf.test_path2)]
+        with unittest.mock.patch('builtins.print'):
+            self.assertEqual(main(directories + ["--once", "--trace", trace_path]), EXIT_OK)
+        self.assertIsInstance(get_tracer(), NullTracer)
+        with open(trace_path) as trace_file:
+            events: List[Dict[str, Any]] = json.load(trace_file)[:-1]
+        names: List[str] = [event['name'] for event in events]
+        for name in ["Initial", "Check", "Sync", "Final", "scan", "diff", "plan", "copy", "write_last_sync_file"]:
+            self.assertIn(name, names)
+        scanned_roots: List[str] = [event['args']['root'] for event in events if event['name'] == "scan"]
+        self.assertCountEqual(set(scanned_roots), directories)
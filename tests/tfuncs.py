@@ -19,6 +19,8 @@ class TFunctions:
     dir_tempfile: Path = config_path / Path("temp_sync_directories_file.json")
     last_sync_file: Path = config_path / Path("last_sync_file.json")
     last_tempfile: Path = config_path / Path("temp_last_sync_file.json")
+    tombstone_file: Path = config_path / Path("tombstone_file.json")
+    tombstone_tempfile: Path = config_path / Path("temp_tombstone_file.json")
     test_path1: Path = config_path / Path("test_dir1")
     test_path2: Path = config_path / Path("test_dir2")
     sync_dir_lock: threading.Lock = threading.Lock()
@@ -42,7 +44,9 @@ class TFunctions:
             self.sync_dir_lock.release()
 
     def create_last_tempfile(self) -> None:
-        """Move last sync file contents and delete last sync file."""
+        """Move last sync and tombstone file contents and delete last sync and tombstone files."""
+        if self.tombstone_file.exists():
+            shutil.move(str(self.tombstone_file), str(self.tombstone_tempfile))
         if self.last_sync_file.exists():
             self.last_sync_lock.acquire(timeout=1)
             with self.last_tempfile.open("w") as json_file:
@@ -50,7 +54,11 @@ class TFunctions:
             self.last_sync_file.unlink()
 
     def remove_last_tempfile(self) -> None:
-        """Restore last sync file contents and delete last sync temporary file."""
+        """Restore last sync and tombstone file contents and delete temporary files."""
+        if self.tombstone_file.exists():
+            self.tombstone_file.unlink()
+        if self.tombstone_tempfile.exists():
+            shutil.move(str(self.tombstone_tempfile), str(self.tombstone_file))
         if self.last_tempfile.exists():
             with self.last_sync_file.open("w") as json_file:
                 json.dump(get_json_contents(str(self.last_tempfile)), json_file)
@@ -158,6 +166,23 @@ def make_rand_mods(path: str, parent_name_change: bool = False) -> List[str]:
     return change_list
 
 
+def create_deep_tree(db: Any, root: str, depth: int, name: str = "d") -> str:
+    """Creates a chain of depth nested directories below root (one level at a time) with file.txt at the bottom.
+
+    Returns:
+        str: Path of file.txt.
+    """
+    directory: Any = db(root)
+    directory.mkdir(parents=True, exist_ok=True)
+    for _ in range(depth):
+        directory = directory / name
+        directory.mkdir(parents=False, exist_ok=True)
+    deep_file: Any = directory / "file.txt"
+    with deep_file.open("w") as file_to_write:
+        file_to_write.write("deep")
+    return str(deep_file)
+
+
 def change_file_name(old_path: str, change_count: int) -> str:
     new_name = f"Edited_file_{change_count}.txt"
     dest = str(Path(old_path).parent / new_name)
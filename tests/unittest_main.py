@@ -4,23 +4,61 @@ Author: Kevin Hodge
 """
 
 import unittest
+from tests.test_adaptive_interval import AdaptiveIntervalTestCase
+from tests.test_benchmarks import BenchmarksTestCase
+from tests.test_cli import CLITestCase
 from tests.test_config_manager import ConfigManagerTestCase
+from tests.test_daemon import DaemonTestCase
+from tests.test_external_diff import ExternalDiffTestCase
 from tests.test_file_structure import FileStructureTestCase
 from tests.test_file_system_interface import FSInterfaceTestCase
+from tests.test_headless_ui import HeadlessUITestCase
+from tests.test_ignore_rules import IgnoreRulesTestCase
+from tests.test_memory_interface import MemoryInterfaceTestCase
+from tests.test_merkle import MerkleTestCase
+from tests.test_metrics import MetricsTestCase
+from tests.test_name_table import NameTableTestCase
+from tests.test_pair_scheduler import PairSchedulerTestCase
+from tests.test_pipeline import PipelineTestCase
+from tests.test_remote import RemoteTestCase
+from tests.test_scan_scheduler import ScanSchedulerTestCase
+from tests.test_state_observers import StateObserversTestCase
 from tests.test_sync_exception import SyncExceptionTestCase
 from tests.test_sync_manager import SyncManagerTestCase
 from tests.test_sync_state_machine import SyncStateMachineTestCase
 from tests.test_sync_states import SyncStateTestCase
+from tests.test_sync_stats import SyncStatsTestCase
+from tests.test_startup import StartupTestCase
+from tests.test_tracer import TracerTestCase
 from tests.test_wx_gui import WxGUITestCase
 
 
+AdaptiveIntervalTestCase()
+BenchmarksTestCase()
+CLITestCase()
 ConfigManagerTestCase()
+DaemonTestCase()
+ExternalDiffTestCase()
 FileStructureTestCase()
 FSInterfaceTestCase()
+HeadlessUITestCase()
+IgnoreRulesTestCase()
+MemoryInterfaceTestCase()
+MerkleTestCase()
+MetricsTestCase()
+NameTableTestCase()
+PairSchedulerTestCase()
+PipelineTestCase()
+RemoteTestCase()
+ScanSchedulerTestCase()
+StateObserversTestCase()
 SyncExceptionTestCase()
 SyncManagerTestCase()
 SyncStateMachineTestCase()
 SyncStateTestCase()
+SyncStatsTestCase()
+StartupTestCase()
+TracerTestCase()
 WxGUITestCase()
 
 